@@ -6,6 +6,11 @@ Configuração robusta para produção com Gunicorn
 """
 
 import os
+import sys
+import time
+import signal
+import threading
+import subprocess
 import multiprocessing
 
 # Server socket
@@ -14,7 +19,10 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
-worker_class = "sync"
+# gthread: cada worker atende várias requisições em threads, então conexões longas
+# de streaming (SSE de progresso) ocupam uma thread e não o worker inteiro
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8))
 worker_connections = 1000
 timeout = 60
 keepalive = 2
@@ -26,6 +34,11 @@ max_requests_jitter = 100
 # Preload app for better performance
 preload_app = True
 
+# Análises em background rodam num processo dedicado (src/job_worker.py), nunca
+# nos workers web: reciclagem por max_requests/graceful_timeout não interrompe jobs
+os.environ.setdefault('ANALYSIS_JOB_EXECUTION', 'worker')
+_job_worker = {'process': None, 'stopping': False}
+
 # Logging
 accesslog = "logs/gunicorn_access.log" if os.getenv('LOG_FILE_ENABLED', 'true').lower() == 'true' else "-"
 errorlog = "logs/gunicorn_error.log" if os.getenv('LOG_FILE_ENABLED', 'true').lower() == 'true' else "-"
@@ -54,9 +67,31 @@ limit_request_field_size = 8190
 # Performance tuning
 worker_tmp_dir = '/dev/shm' if os.path.exists('/dev/shm') else None
 
+def _supervise_job_worker(server):
+    """Mantém o job worker vivo enquanto o master estiver de pé"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'job_worker.py')
+    while not _job_worker['stopping']:
+        process = subprocess.Popen([sys.executable, script])
+        _job_worker['process'] = process
+        server.log.info("⚙️ Job worker iniciado (pid %s)", process.pid)
+        code = process.wait()
+        if not _job_worker['stopping']:
+            server.log.warning("⚠️ Job worker saiu com código %s, reiniciando em 5s", code)
+            time.sleep(5)
+
 def when_ready(server):
     """Called just after the server is started"""
     server.log.info("🚀 ARQV30 Enhanced v2.0 server is ready. Listening on: %s", server.address)
+    if os.environ.get('ANALYSIS_JOB_EXECUTION') == 'worker':
+        threading.Thread(target=_supervise_job_worker, args=(server,), name='job-worker-supervisor', daemon=True).start()
+
+def on_exit(server):
+    """Called just before exiting Gunicorn"""
+    _job_worker['stopping'] = True
+    process = _job_worker['process']
+    if process and process.poll() is None:
+        # O job worker termina as análises em andamento (ANALYSIS_JOB_SHUTDOWN_GRACE)
+        process.send_signal(signal.SIGTERM)
 
 def worker_int(worker):
     """Called just after a worker exited on SIGINT or SIGQUIT"""
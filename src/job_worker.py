@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Job Worker
+Processo dedicado que consome a fila de análises (fora dos workers web do gunicorn)
+"""
+
+import os
+import sys
+import signal
+import logging
+import threading
+
+from dotenv import load_dotenv
+
+# Carrega variáveis de ambiente
+load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.env'))
+
+# Configuração de logging
+logging.basicConfig(
+    level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper()),
+    format=os.getenv('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s'),
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('ANALYSIS_JOB_EXECUTION', 'worker')
+
+
+def main():
+    """Consome a fila até receber SIGTERM/SIGINT; análises em andamento terminam antes de sair"""
+    # Imports aqui, não no topo: os pools de páginas PDF e de extração criam processos
+    # com spawn, que reimportam este script como __mp_main__ e não devem recriar os
+    # singletons de serviço (SQLite, fetch_health, loop de fetch, IA) em cada filho.
+    # routes.analysis registra os runners de job (mesmo código que o endpoint síncrono usa)
+    import routes.analysis  # noqa: F401
+    from services.analysis_job_manager import analysis_job_manager
+    from services.progress_store import progress_store
+
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"🛑 Job worker recebeu sinal {signum}: parando de reivindicar jobs")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    if progress_store.backend == 'memory':
+        logger.warning("⚠️ PROGRESS_STORE=memory: o progresso dos jobs não chega aos workers web")
+
+    analysis_job_manager.fail_stale_jobs()
+    analysis_job_manager.start_consumers()
+    logger.info(f"🚀 Job worker {os.getpid()} consumindo a fila de análises")
+
+    while not stop.wait(1.0):
+        pass
+
+    grace = float(os.getenv('ANALYSIS_JOB_SHUTDOWN_GRACE', 600))
+    if not analysis_job_manager.stop_consumers(timeout=grace):
+        logger.warning("⚠️ Job worker encerrado com análises em andamento (serão marcadas como falhas)")
+    logger.info("👋 Job worker encerrado")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,16 +10,19 @@ import logging
 import time
 import json
 from datetime import datetime
+from typing import Dict, Any, Tuple
 from flask import Blueprint, request, jsonify, session
 from services.enhanced_analysis_engine import enhanced_analysis_engine
 from services.ultra_detailed_analysis_engine import ultra_detailed_analysis_engine
 from services.ai_manager import ai_manager
 from services.production_search_manager import production_search_manager
 from services.robust_content_extractor import robust_content_extractor
+from services.extraction_cache import extraction_cache
 from services.content_quality_validator import content_quality_validator
 from services.attachment_service import attachment_service
+from services.analysis_job_manager import analysis_job_manager, JobQueueFullError
 from database import db_manager
-from routes.progress import get_progress_tracker, update_analysis_progress
+from routes.progress import get_progress_tracker, update_analysis_progress, publish_component
 
 logger = logging.getLogger(__name__)
 
@@ -28,10 +31,13 @@ analysis_bp = Blueprint('analysis', __name__)
 
 @analysis_bp.route('/analyze', methods=['POST'])
 def analyze_market():
-    """Endpoint principal para análise de mercado"""
+    """
+    Endpoint principal para análise de mercado.
+    Com ?async=true (ou "async": true no corpo) apenas enfileira a análise e
+    retorna o job_id; status e resultado ficam em /api/analyze/jobs/<job_id>.
+    """
     
     try:
-        start_time = time.time()
         logger.info("🚀 Iniciando análise de mercado ultra-detalhada")
         
         # Coleta dados da requisição
@@ -53,14 +59,6 @@ def analyze_market():
         if not data.get('session_id'):
             data['session_id'] = f"session_{int(time.time())}_{os.urandom(4).hex()}"
         
-        # Inicia rastreamento de progresso
-        session_id = data['session_id']
-        progress_tracker = get_progress_tracker(session_id)
-        
-        # Função de callback para progresso
-        def progress_callback(step: int, message: str, details: str = None):
-            update_analysis_progress(session_id, step, message, details)
-        
         # Log dos dados recebidos
         logger.info(f"📊 Dados recebidos: Segmento={data.get('segmento')}, Produto={data.get('produto')}")
         
@@ -75,13 +73,66 @@ def analyze_market():
         
         logger.info(f"🔍 Query de pesquisa: {data['query']}")
         
+        # Modo job: libera o worker web imediatamente
+        async_requested = data.pop('async', False) is True
+        if async_requested or request.args.get('async', '').lower() == 'true':
+            # Rastreamento já existe para o cliente acompanhar enquanto o job está na fila
+            get_progress_tracker(data['session_id'])
+            try:
+                job = analysis_job_manager.submit(data, 'market_analysis')
+            except JobQueueFullError as e:
+                return jsonify({
+                    'error': 'Fila de análises cheia',
+                    'message': str(e),
+                    'retry_after': 30
+                }), 503, {'Retry-After': '30'}
+
+            return jsonify({
+                'success': True,
+                'job_id': job['job_id'],
+                'session_id': data['session_id'],
+                'status': job['status'],
+                'status_url': f"/api/analyze/jobs/{job['job_id']}",
+                'result_url': f"/api/analyze/jobs/{job['job_id']}/result"
+            }), 202
+
+        analysis_result, status_code = _run_market_analysis(data)
+        return jsonify(analysis_result), status_code
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao iniciar análise: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Erro na análise',
+            'message': str(e),
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
+def _run_market_analysis(data: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Executa a análise completa (no request ou em job de background) e retorna (payload, status HTTP)"""
+    
+    try:
+        start_time = time.time()
+        
+        # Inicia rastreamento de progresso
+        session_id = data['session_id']
+        progress_tracker = get_progress_tracker(session_id)
+        
+        # Função de callback para progresso
+        def progress_callback(step: int, message: str, details: str = None):
+            update_analysis_progress(session_id, step, message, details)
+        
+        # Componentes concluídos vão para o streaming assim que ficam prontos
+        def component_callback(component_name: str, payload: Any):
+            publish_component(session_id, component_name, payload)
+        
         # Executa análise GIGANTE ultra-detalhada
         logger.info("🚀 Executando análise GIGANTE ultra-detalhada...")
         try:
             analysis_result = ultra_detailed_analysis_engine.generate_gigantic_analysis(
                 data,
                 session_id=session_id,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                component_callback=component_callback
             )
         except Exception as e:
             logger.error(f"❌ Análise GIGANTE falhou: {str(e)}")
@@ -137,7 +188,7 @@ def analyze_market():
         # Verifica se a análise foi bem-sucedida
         if not analysis_result or not isinstance(analysis_result, dict):
             logger.error("❌ Análise retornou resultado inválido ou vazio")
-            return jsonify({
+            return {
                 'error': 'Análise retornou resultado inválido',
                 'message': 'Sistema não conseguiu gerar análise válida',
                 'timestamp': datetime.now().isoformat(),
@@ -147,7 +198,7 @@ def analyze_market():
                     'result_length': len(str(analysis_result)) if analysis_result else 0,
                     'ai_status': ai_manager.get_provider_status()
                 }
-            }), 500
+            }, 500
         
         # Marca progresso como completo
         progress_tracker.complete()
@@ -209,19 +260,19 @@ def analyze_market():
         
         logger.info(f"✅ Análise concluída em {processing_time:.2f} segundos")
         
-        return jsonify(analysis_result)
+        return analysis_result, 200
         
     except Exception as e:
         logger.error(f"❌ Erro crítico na análise: {str(e)}", exc_info=True)
         
-        # Remove progresso em caso de erro
+        # Encerra progresso em caso de erro (streaming recebe evento 'failed')
         try:
-            if 'session_id' in locals() and session_id in get_progress_tracker.__globals__.get('progress_sessions', {}):
-                del get_progress_tracker.__globals__['progress_sessions'][session_id]
+            if 'session_id' in locals():
+                get_progress_tracker(session_id).fail(str(e))
         except:
             pass  # Ignora erros de limpeza
         
-        return jsonify({
+        return {
             'error': 'Erro na análise',
             'message': str(e),
             'timestamp': datetime.now().isoformat(),
@@ -237,6 +288,85 @@ def analyze_market():
                 'ai_status': ai_manager.get_provider_status(),
                 'search_status': production_search_manager.get_provider_status()
             }
+        }, 500
+
+# Jobs da fila são executados pelo consumidor (processo dedicado ou threads locais)
+analysis_job_manager.register_runner('market_analysis', _run_market_analysis)
+
+@analysis_bp.route('/analyze/jobs', methods=['GET'])
+def list_analysis_jobs():
+    """Lista jobs de análise recentes"""
+    
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        return jsonify({
+            'success': True,
+            'jobs': analysis_job_manager.list_jobs(limit),
+            'queue': analysis_job_manager.get_stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao listar jobs: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao listar jobs',
+            'message': str(e)
+        }), 500
+
+@analysis_bp.route('/analyze/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Status de um job de análise"""
+    
+    try:
+        job = analysis_job_manager.get_job(job_id)
+        if not job:
+            return jsonify({
+                'error': 'Job não encontrado',
+                'job_id': job_id
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter job: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter job',
+            'message': str(e)
+        }), 500
+
+@analysis_bp.route('/analyze/jobs/<job_id>/result', methods=['GET'])
+def get_analysis_job_result(job_id):
+    """Resultado de um job: 202 enquanto roda, payload da análise quando termina"""
+    
+    try:
+        job = analysis_job_manager.get_job(job_id, include_result=True)
+        if not job:
+            return jsonify({
+                'error': 'Job não encontrado',
+                'job_id': job_id
+            }), 404
+        
+        if job['status'] in ('queued', 'running'):
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': job['status']
+            }), 202, {'Retry-After': '10'}
+        
+        result = job.get('result') or {
+            'error': 'Erro na análise',
+            'message': job.get('error'),
+            'job_id': job_id
+        }
+        return jsonify(result), job.get('http_status') or 500
+        
+    except Exception as e:
+        logger.error(f"Erro ao obter resultado do job: {str(e)}")
+        return jsonify({
+            'error': 'Erro ao obter resultado do job',
+            'message': str(e)
         }), 500
 
 @analysis_bp.route('/status', methods=['GET'])
@@ -421,6 +551,7 @@ def get_extractor_stats():
         return jsonify({
             'success': True,
             'stats': stats,
+            'cache_stats': extraction_cache.get_stats(),
             'timestamp': datetime.now().isoformat()
         })
         
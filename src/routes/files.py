@@ -8,8 +8,9 @@ Endpoints para gerenciamento de arquivos locais das análises
 import os
 import logging
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response
 from services.local_file_manager import local_file_manager
+from services.analysis_exporter import analysis_exporter
 from database import db_manager
 
 logger = logging.getLogger(__name__)
@@ -49,18 +50,8 @@ def get_analysis_files(analysis_id):
         # Busca diretório local
         local_directory = local_file_manager.get_analysis_directory(analysis_id)
         
-        local_files = []
-        if local_directory:
-            for file in os.listdir(local_directory):
-                if analysis_id[:8] in file:
-                    file_path = os.path.join(local_directory, file)
-                    local_files.append({
-                        'name': file,
-                        'path': file_path,
-                        'size': os.path.getsize(file_path),
-                        'type': file.split('_')[-1].split('.')[0] if '_' in file else 'unknown',
-                        'modified': datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
-                    })
+        # Arquivos locais vêm do índice (sem listar diretórios)
+        local_files = local_file_manager.get_analysis_files(analysis_id)
         
         return jsonify({
             'success': True,
@@ -80,10 +71,28 @@ def get_analysis_files(analysis_id):
 
 @files_bp.route('/download_file', methods=['GET'])
 def download_file():
-    """Download de arquivo local"""
+    """Download de arquivo local (ou de uma seção, por analysis_id + section)"""
     
     try:
         file_path = request.args.get('path')
+        analysis_id = request.args.get('analysis_id')
+        section = request.args.get('section')
+        
+        # Seções são lidas pelo gerenciador (funciona para JSON avulso e para container)
+        if analysis_id and section:
+            content = local_file_manager.read_section_bytes(analysis_id, section)
+            if content is None:
+                return jsonify({
+                    'error': 'Seção não encontrada'
+                }), 404
+            
+            return Response(
+                content,
+                mimetype='application/json',
+                headers={
+                    'Content-Disposition': f'attachment; filename="{analysis_id[:8]}_{section}.json"'
+                }
+            )
         
         if not file_path:
             return jsonify({
@@ -148,11 +157,34 @@ def delete_local_analysis(analysis_id):
 
 @files_bp.route('/get_file_content', methods=['GET'])
 def get_file_content():
-    """Obtém conteúdo de um arquivo local"""
+    """Obtém conteúdo de um arquivo local (ou de uma seção, por analysis_id + section)"""
     
     try:
         file_path = request.args.get('path')
         max_chars = int(request.args.get('max_chars', 5000))
+        analysis_id = request.args.get('analysis_id')
+        section = request.args.get('section')
+        
+        if analysis_id and section:
+            raw_content = local_file_manager.read_section_bytes(analysis_id, section)
+            if raw_content is None:
+                return jsonify({
+                    'error': 'Seção não encontrada'
+                }), 404
+            
+            content = raw_content.decode('utf-8')
+            total_chars = len(content)
+            if total_chars > max_chars:
+                content = content[:max_chars] + f"\n\n... [Arquivo truncado - {total_chars} caracteres totais]"
+            
+            return jsonify({
+                'success': True,
+                'analysis_id': analysis_id,
+                'section': section,
+                'content': content,
+                'file_size': len(raw_content),
+                'truncated': total_chars > max_chars
+            })
         
         if not file_path:
             return jsonify({
@@ -196,39 +228,42 @@ def get_file_content():
 
 @files_bp.route('/export_analysis/<analysis_id>', methods=['GET'])
 def export_analysis(analysis_id):
-    """Exporta análise completa como ZIP"""
+    """Exporta análise completa como ZIP (?compression=deflate|store&level=0-9)"""
     
     try:
-        import zipfile
-        import tempfile
-        
-        # Busca diretório da análise
-        analysis_dir = local_file_manager.get_analysis_directory(analysis_id)
+        try:
+            export = analysis_exporter.get_export(
+                analysis_id,
+                compression=request.args.get('compression'),
+                level=request.args.get('level')
+            )
+        except ValueError as e:
+            return jsonify({
+                'error': 'Parâmetros de exportação inválidos',
+                'message': str(e)
+            }), 400
         
-        if not analysis_dir:
+        if not export:
             return jsonify({
                 'error': 'Análise não encontrada'
             }), 404
         
-        # Cria arquivo ZIP temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as tmp_file:
-            zip_path = tmp_file.name
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Adiciona todos os arquivos da análise
-            for root, dirs, files in os.walk(local_file_manager.base_dir):
-                for file in files:
-                    if analysis_id[:8] in file:
-                        file_path = os.path.join(root, file)
-                        # Nome no ZIP será relativo ao diretório base
-                        arcname = os.path.relpath(file_path, local_file_manager.base_dir)
-                        zipf.write(file_path, arcname)
-        
-        return send_file(
-            zip_path,
-            as_attachment=True,
-            download_name=f"analise_{analysis_id[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-            mimetype='application/zip'
+        download_name = f"analise_{analysis_id[:8]}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        
+        if 'cached_path' in export:
+            return send_file(
+                export['cached_path'],
+                as_attachment=True,
+                download_name=download_name,
+                mimetype='application/zip'
+            )
+        
+        # ZIP gerado durante o envio: sem arquivo temporário e sem Content-Length
+        return Response(
+            export['stream'],
+            mimetype='application/zip',
+            headers={'Content-Disposition': f'attachment; filename="{download_name}"'},
+            direct_passthrough=True
         )
         
     except Exception as e:
@@ -243,48 +278,20 @@ def get_storage_stats():
     """Obtém estatísticas de armazenamento"""
     
     try:
-        # Estatísticas do diretório local
-        total_size = 0
-        total_files = 0
-        
-        for root, dirs, files in os.walk(local_file_manager.base_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    total_size += os.path.getsize(file_path)
-                    total_files += 1
-                except:
-                    continue
-        
-        # Estatísticas por tipo
-        type_stats = {}
-        for subdir in ['avatars', 'drivers_mentais', 'provas_visuais', 'anti_objecao', 
-                      'pre_pitch', 'predicoes_futuro', 'posicionamento', 'concorrencia',
-                      'palavras_chave', 'metricas', 'funil_vendas', 'plano_acao', 
-                      'insights', 'pesquisa_web', 'completas', 'metadata']:
-            
-            subdir_path = os.path.join(local_file_manager.base_dir, subdir)
-            if os.path.exists(subdir_path):
-                subdir_files = len([f for f in os.listdir(subdir_path) if os.path.isfile(os.path.join(subdir_path, f))])
-                subdir_size = sum(os.path.getsize(os.path.join(subdir_path, f)) 
-                                for f in os.listdir(subdir_path) 
-                                if os.path.isfile(os.path.join(subdir_path, f)))
-                
-                type_stats[subdir] = {
-                    'files': subdir_files,
-                    'size_bytes': subdir_size,
-                    'size_mb': round(subdir_size / (1024 * 1024), 2)
-                }
+        # Estatísticas agregadas pelo índice local
+        stats = local_file_manager.get_storage_stats()
+        total_size = stats.get('total_size_bytes', 0)
         
         return jsonify({
             'success': True,
             'storage_stats': {
                 'base_directory': local_file_manager.base_dir,
-                'total_files': total_files,
+                'total_analyses': stats.get('total_analyses', 0),
+                'total_files': stats.get('total_files', 0),
                 'total_size_bytes': total_size,
                 'total_size_mb': round(total_size / (1024 * 1024), 2),
                 'total_size_gb': round(total_size / (1024 * 1024 * 1024), 3),
-                'type_breakdown': type_stats
+                'type_breakdown': stats.get('sections', {})
             },
             'supabase_connected': db_manager.supabase.is_connected(),
             'timestamp': datetime.now().isoformat()
@@ -299,7 +306,7 @@ def get_storage_stats():
 
 @files_bp.route('/cleanup_old_files', methods=['POST'])
 def cleanup_old_files():
-    """Remove arquivos antigos (mais de 30 dias)"""
+    """Remove análises antigas (mais de 30 dias)"""
     
     try:
         data = request.get_json() or {}
@@ -312,31 +319,26 @@ def cleanup_old_files():
         files_to_remove = []
         total_size_to_remove = 0
         
-        # Busca arquivos antigos
-        for root, dirs, files in os.walk(local_file_manager.base_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
+        # Busca análises antigas no índice (remoção por análise mantém o índice consistente)
+        for analysis_id in local_file_manager.get_analyses_older_than(cutoff_date):
+            try:
+                analysis_files = local_file_manager.get_analysis_files(analysis_id)
+                for file_info in analysis_files:
+                    files_to_remove.append({
+                        'path': file_info['path'],
+                        'name': file_info['name'],
+                        'size': file_info['size'],
+                        'modified': file_info['modified']
+                    })
+                    total_size_to_remove += file_info['size']
+                
+                # Remove análise se não for dry run
+                if not dry_run:
+                    local_file_manager.delete_local_analysis(analysis_id)
                     
-                    if file_mtime < cutoff_date:
-                        file_size = os.path.getsize(file_path)
-                        files_to_remove.append({
-                            'path': file_path,
-                            'name': file,
-                            'size': file_size,
-                            'modified': file_mtime.isoformat()
-                        })
-                        total_size_to_remove += file_size
-                        
-                        # Remove arquivo se não for dry run
-                        if not dry_run:
-                            os.remove(file_path)
-                            logger.info(f"🗑️ Arquivo removido: {file}")
-                            
-                except Exception as e:
-                    logger.error(f"Erro ao processar arquivo {file}: {str(e)}")
-                    continue
+            except Exception as e:
+                logger.error(f"Erro ao processar análise {analysis_id}: {str(e)}")
+                continue
         
         action = "Simulação de limpeza" if dry_run else "Limpeza executada"
         
@@ -384,20 +386,10 @@ def backup_to_supabase():
                     logger.info(f"⚠️ Análise {analysis_id} já existe no Supabase")
                     continue
                 
-                # Carrega análise completa do arquivo JSON
-                json_file = None
-                for root, dirs, files in os.walk(local_file_manager.base_dir):
-                    for file in files:
-                        if analysis_id[:8] in file and file.endswith('_completa.json'):
-                            json_file = os.path.join(root, file)
-                            break
-                    if json_file:
-                        break
+                # Carrega análise completa pelo índice
+                analysis_data = local_file_manager.load_analysis_section(analysis_id, 'completas')
                 
-                if json_file:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        analysis_data = json.load(f)
-                    
+                if analysis_data:
                     # Salva no Supabase
                     result = db_manager.supabase.create_analysis(analysis_data)
                     if result:
@@ -7,6 +7,10 @@ Endpoints para monitoramento do sistema de extração
 """
 from flask import Blueprint, jsonify, request
 from services.robust_content_extractor import robust_content_extractor
+from services.extraction_cache import extraction_cache
+from services.extraction_pool import extraction_pool
+from services.politeness_scheduler import politeness_scheduler
+from services.fetch_health import fetch_health
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,7 +25,11 @@ def get_extractor_stats():
         stats = robust_content_extractor.get_extractor_stats()
         return jsonify({
             'success': True,
-            'stats': stats
+            'stats': stats,
+            'cache_stats': extraction_cache.get_stats(),
+            'executor_stats': extraction_pool.get_stats(),
+            'politeness_stats': politeness_scheduler.get_stats(),
+            'fetch_health_stats': fetch_health.get_stats()
         })
     except Exception as e:
         logger.error(f"❌ Erro ao obter estatísticas: {str(e)}")
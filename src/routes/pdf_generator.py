@@ -17,7 +17,10 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, Tabl
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from io import BytesIO
-import tempfile
+from typing import Optional
+from services.local_file_manager import local_file_manager
+from services.pdf_render_cache import pdf_render_cache
+from database import db_manager
 
 logger = logging.getLogger(__name__)
 
@@ -741,33 +744,70 @@ class PDFGenerator:
 # Instância global do gerador
 pdf_generator = PDFGenerator()
 
-@pdf_bp.route('/generate_pdf', methods=['POST'])
+def _load_saved_analysis(analysis_id: str) -> Optional[dict]:
+    """Análise salva (arquivos locais; Supabase para IDs numéricos)"""
+    
+    analysis_data = local_file_manager.load_analysis_section(analysis_id, 'completas')
+    if analysis_data is None and analysis_id.isdigit():
+        record = db_manager.get_analysis(int(analysis_id))
+        analysis_data = record or None
+    return analysis_data
+
+@pdf_bp.route('/generate_pdf', methods=['GET', 'POST'])
 def generate_pdf():
-    """Gera PDF da análise"""
+    """Gera PDF da análise (corpo JSON ou ?analysis_id= de uma análise salva)"""
     
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
+        analysis_id = request.args.get('analysis_id') or data.get('analysis_id')
         
-        if not data:
+        pdf = None
+        
+        if analysis_id and len(data) <= 1:
+            analysis_id = str(analysis_id)
+            data = None
+            
+            # Análise local: chave pela assinatura dos arquivos, sem carregar o JSON no cache hit
+            signature = local_file_manager.get_analysis_signature(analysis_id)
+            if signature:
+                cache_key = pdf_render_cache.analysis_key(analysis_id, signature)
+                cached_path = pdf_render_cache.get_cached_path(cache_key)
+                if cached_path:
+                    pdf = {'path': cached_path}
+                else:
+                    data = _load_saved_analysis(analysis_id)
+            else:
+                data = _load_saved_analysis(analysis_id)
+                if data:
+                    cache_key = pdf_render_cache.content_key(data)
+            
+            # Índice pode ter a análise sem a seção 'completas': 404, não erro de renderização
+            if pdf is None and not data:
+                return jsonify({
+                    'error': 'Análise não encontrada',
+                    'message': f'Nenhuma análise salva com ID {analysis_id}'
+                }), 404
+        
+        elif data:
+            cache_key = pdf_render_cache.content_key(data)
+        
+        else:
             return jsonify({
                 'error': 'Dados não fornecidos',
-                'message': 'Envie os dados da análise no corpo da requisição'
+                'message': 'Envie os dados da análise no corpo da requisição ou informe analysis_id'
             }), 400
         
-        # Gera PDF
-        logger.info("Gerando relatório PDF...")
-        pdf_buffer = pdf_generator.generate_analysis_report(data)
+        if pdf is None:
+            logger.info("Gerando relatório PDF...")
+            pdf = pdf_render_cache.get_or_render(cache_key, lambda: pdf_generator.generate_analysis_report(data).getvalue())
         
-        # Salva arquivo temporário
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(pdf_buffer.getvalue())
-            tmp_file_path = tmp_file.name
+        download_name = f"analise_mercado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
         
-        # Retorna arquivo
+        # Direto do cache em disco ou da memória: nada de arquivos temporários
         return send_file(
-            tmp_file_path,
+            pdf['path'] if 'path' in pdf else BytesIO(pdf['data']),
             as_attachment=True,
-            download_name=f"analise_mercado_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+            download_name=download_name,
             mimetype='application/pdf'
         )
         
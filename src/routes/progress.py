@@ -6,58 +6,110 @@ Endpoints para progresso em tempo real da análise
 """
 
 import os
+import sys
 import logging
 import time
 import json
 from datetime import datetime
-from flask import Blueprint, request, jsonify, session
-from flask_socketio import SocketIO, emit, join_room, leave_room
-import threading
-from queue import Queue
+from typing import Dict, List, Optional, Any
+from flask import Blueprint, request, jsonify, session, Response, stream_with_context
+import uuid
+from services.progress_store import progress_store
 
 logger = logging.getLogger(__name__)
 
 # Cria blueprint
 progress_bp = Blueprint('progress', __name__)
 
-# Sistema de progresso global
-progress_sessions = {}
-progress_queues = {}
+# SSE: cada conexão dura menos que o timeout do worker do gunicorn (60s);
+# o EventSource reconecta sozinho com Last-Event-ID e retoma de onde parou
+STREAM_MAX_SECONDS = int(os.getenv('PROGRESS_STREAM_MAX_SECONDS', 45))
+STREAM_KEEPALIVE_SECONDS = 15
+# Servidor de uma requisição por worker (gunicorn sync): segurar o stream travaria o
+# worker inteiro, então cada conexão vira um long-poll curto e o cliente reconecta
+STREAM_BLOCKING_HOLD_SECONDS = float(os.getenv('PROGRESS_STREAM_BLOCKING_HOLD_SECONDS', 2))
 
 class ProgressTracker:
-    """Rastreador de progresso em tempo real"""
+    """
+    Rastreador de progresso em tempo real. O estado e o log de eventos ficam
+    no progress_store, então qualquer worker enxerga a mesma sessão.
+    """
+    
+    STEPS = [
+        "🔍 Coletando dados do formulário",
+        "📊 Processando anexos inteligentes", 
+        "🌐 Realizando pesquisa profunda massiva",
+        "🧠 Analisando com múltiplas IAs",
+        "👤 Criando avatar arqueológico completo",
+        "🧠 Gerando drivers mentais customizados",
+        "🎭 Desenvolvendo provas visuais instantâneas",
+        "🛡️ Construindo sistema anti-objeção",
+        "🎯 Arquitetando pré-pitch invisível",
+        "⚔️ Mapeando concorrência profunda",
+        "📈 Calculando métricas e projeções",
+        "🔮 Predizendo futuro do mercado",
+        "✨ Consolidando insights exclusivos"
+    ]
     
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, create: bool = True):
         self.session_id = session_id
-        self.current_step = 0
         self.total_steps = 13
-        self.start_time = time.time()
-        self.steps = [
-            "🔍 Coletando dados do formulário",
-            "📊 Processando anexos inteligentes", 
-            "🌐 Realizando pesquisa profunda massiva",
-            "🧠 Analisando com múltiplas IAs",
-            "👤 Criando avatar arqueológico completo",
-            "🧠 Gerando drivers mentais customizados",
-            "🎭 Desenvolvendo provas visuais instantâneas",
-            "🛡️ Construindo sistema anti-objeção",
-            "🎯 Arquitetando pré-pitch invisível",
-            "⚔️ Mapeando concorrência profunda",
-            "📈 Calculando métricas e projeções",
-            "🔮 Predizendo futuro do mercado",
-            "✨ Consolidando insights exclusivos"
-        ]
-        self.detailed_logs = []
+        self.steps = self.STEPS
+        
+        if create:
+            # Registra sessão no store (substitui execução anterior com o mesmo id)
+            progress_store.create_session(session_id, {
+                'session_id': session_id,
+                'current_step': 0,
+                'total_steps': self.total_steps,
+                'start_time': time.time(),
+                'last_message': self.steps[0],
+                'is_finished': False
+            })
         
-        # Registra sessão global
-        progress_sessions[session_id] = self
-        progress_queues[session_id] = Queue()
+        progress_store.ensure_reaper()
+    
+    @classmethod
+    def load(cls, session_id: str) -> Optional['ProgressTracker']:
+        """Tracker de uma sessão existente (criada em qualquer worker)"""
+        if progress_store.get_state(session_id) is None:
+            return None
+        return cls(session_id, create=False)
+    
+    @property
+    def state(self) -> Dict[str, Any]:
+        return progress_store.get_state(self.session_id) or {}
+    
+    @property
+    def current_step(self) -> int:
+        return self.state.get('current_step', 0)
+    
+    @property
+    def start_time(self) -> float:
+        return self.state.get('start_time', time.time())
+    
+    @property
+    def is_finished(self) -> bool:
+        return self.state.get('is_finished', False)
+    
+    @property
+    def detailed_logs(self) -> List[Dict[str, Any]]:
+        """Log detalhado derivado dos eventos de progresso (limitados pelo store)"""
+        return [
+            {
+                "step": event['data'].get('current_step'),
+                "message": event['data'].get('current_message'),
+                "details": event['data'].get('details'),
+                "timestamp": event['data'].get('timestamp'),
+                "elapsed": event['data'].get('elapsed_time')
+            }
+            for event in progress_store.get_events_since(self.session_id, 0)
+            if event['event'] == 'progress'
+        ]
     
     def update_progress(self, step: int, message: str, details: str = None):
         """Atualiza progresso da análise"""
-        self.current_step = step
-        current_time = time.time()
-        elapsed = current_time - self.start_time
+        elapsed = time.time() - self.start_time
         
         # Calcula tempo estimado
         if step > 0:
@@ -73,67 +125,61 @@ class ProgressTracker:
             "percentage": (step / self.total_steps) * 100,
             "current_message": message,
             "detailed_message": details or message,
+            "details": details,
             "elapsed_time": elapsed,
             "estimated_remaining": remaining,
             "estimated_total": elapsed + remaining,
             "timestamp": datetime.now().isoformat()
         }
         
-        # Log detalhado
-        log_entry = {
-            "step": step,
-            "message": message,
-            "details": details,
-            "timestamp": datetime.now().isoformat(),
-            "elapsed": elapsed
-        }
-        self.detailed_logs.append(log_entry)
-        
-        # Adiciona à queue para polling
-        if self.session_id in progress_queues:
-            try:
-                progress_queues[self.session_id].put(progress_data)
-            except:
-                pass
+        progress_store.update_state(self.session_id, current_step=step, last_message=message)
+        self.publish_event('progress', progress_data)
         
         logger.info(f"Progress {self.session_id}: Step {step}/{self.total_steps} - {message}")
         
         return progress_data
     
+    def publish_event(self, event_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Adiciona evento ao log da sessão (acorda as conexões de streaming)"""
+        return progress_store.append_event(self.session_id, event_type, data)
+    
+    def get_events_since(self, last_event_id: int, timeout: float = 0) -> List[Dict[str, Any]]:
+        """Eventos com id > last_event_id, esperando até timeout se ainda não houver"""
+        return progress_store.get_events_since(self.session_id, last_event_id, timeout)
+    
     def complete(self):
-        """Marca análise como completa"""
+        """Marca análise como completa (expiração fica a cargo do reaper do store)"""
         self.update_progress(self.total_steps, "🎉 Análise concluída! Preparando resultados...")
-        
-        # Remove da sessão após 5 minutos
-        def cleanup():
-            time.sleep(300)  # 5 minutos
-            if self.session_id in progress_sessions:
-                del progress_sessions[self.session_id]
-            if self.session_id in progress_queues:
-                del progress_queues[self.session_id]
-        
-        threading.Thread(target=cleanup, daemon=True).start()
+        self.publish_event('complete', {'session_id': self.session_id, 'elapsed_time': time.time() - self.start_time})
+        progress_store.update_state(self.session_id, is_finished=True)
+    
+    def fail(self, message: str):
+        """Marca análise como falha e avisa quem acompanha via streaming"""
+        self.publish_event('failed', {'session_id': self.session_id, 'message': message})
+        progress_store.update_state(self.session_id, is_finished=True)
     
     def get_current_status(self):
         """Retorna status atual"""
-        elapsed = time.time() - self.start_time
+        state = self.state
+        current_step = state.get('current_step', 0)
+        elapsed = time.time() - state.get('start_time', time.time())
         
-        if self.current_step > 0:
-            estimated_total = (elapsed / self.current_step) * self.total_steps
+        if current_step > 0:
+            estimated_total = (elapsed / current_step) * self.total_steps
             remaining = max(0, estimated_total - elapsed)
         else:
             remaining = 0
         
         return {
             "session_id": self.session_id,
-            "current_step": self.current_step,
+            "current_step": current_step,
             "total_steps": self.total_steps,
-            "percentage": (self.current_step / self.total_steps) * 100,
-            "current_message": self.steps[min(self.current_step, len(self.steps) - 1)],
+            "percentage": (current_step / self.total_steps) * 100,
+            "current_message": self.steps[min(current_step, len(self.steps) - 1)],
             "elapsed_time": elapsed,
             "estimated_remaining": remaining,
             "detailed_logs": self.detailed_logs[-5:],  # Últimos 5 logs
-            "is_complete": self.current_step >= self.total_steps
+            "is_complete": current_step >= self.total_steps
         }
 
 @progress_bp.route('/start_tracking', methods=['POST'])
@@ -170,13 +216,13 @@ def start_tracking():
 def get_progress(session_id):
     """Obtém progresso atual da análise"""
     try:
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada',
                 'session_id': session_id
             }), 404
         
-        tracker = progress_sessions[session_id]
         status = tracker.get_current_status()
         
         return jsonify({
@@ -191,30 +237,99 @@ def get_progress(session_id):
             'message': str(e)
         }), 500
 
+def _server_handles_concurrent_requests() -> bool:
+    """Threads (gthread, servidor de desenvolvimento) ou greenlets (gevent) por worker"""
+    if request.environ.get('wsgi.multithread'):
+        return True
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        return monkey.is_module_patched('socket')
+    return False
+
+def _format_sse(event: Dict[str, Any]) -> str:
+    """Serializa evento no formato text/event-stream"""
+    payload = json.dumps(event['data'], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {payload}\n\n"
+
+@progress_bp.route('/progress/stream/<session_id>', methods=['GET'])
+def stream_progress(session_id):
+    """
+    Server-Sent Events com progresso e componentes concluídos.
+    Retoma a partir do header Last-Event-ID (ou ?last_event_id=) após reconexão.
+    """
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or 0)
+    except ValueError:
+        last_event_id = 0
+    
+    # Análise já terminou e o cliente tem tudo: 204 faz o EventSource parar de reconectar
+    state = progress_store.get_state(session_id)
+    if state and state.get('is_finished') and not progress_store.get_events_since(session_id, last_event_id):
+        return Response(status=204)
+    
+    # Worker sync: entrega o que houver (esperando pouco) e fecha; o retry maior espaça as reconexões
+    if _server_handles_concurrent_requests():
+        hold_seconds, retry_ms = STREAM_MAX_SECONDS, 1000
+    else:
+        hold_seconds, retry_ms = STREAM_BLOCKING_HOLD_SECONDS, 2000
+    
+    def generate():
+        nonlocal last_event_id
+        deadline = time.time() + hold_seconds
+        
+        yield f"retry: {retry_ms}\n\n"
+        
+        while time.time() < deadline:
+            state = progress_store.get_state(session_id)
+            if not state:
+                # Sessão ainda não criada (ou já expirada): mantém a conexão viva
+                time.sleep(min(1, max(0, deadline - time.time())))
+                yield ": aguardando sessao\n\n"
+                continue
+            
+            wait = min(STREAM_KEEPALIVE_SECONDS, max(0, deadline - time.time()))
+            events = progress_store.get_events_since(session_id, last_event_id, timeout=wait)
+            
+            if not events:
+                if state.get('is_finished'):
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            
+            for event in events:
+                last_event_id = event['id']
+                yield _format_sse(event)
+            
+            if events[-1]['event'] in ('complete', 'failed'):
+                return
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Nginx não deve bufferizar o stream
+        }
+    )
+
 @progress_bp.route('/poll_updates/<session_id>', methods=['GET'])
 def poll_updates(session_id):
-    """Polling para atualizações de progresso"""
+    """Polling para atualizações de progresso (envie ?last_event_id= para receber só as novas)"""
     try:
-        if session_id not in progress_queues:
+        if progress_store.get_state(session_id) is None:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        queue = progress_queues[session_id]
-        updates = []
-        
-        # Coleta todas as atualizações disponíveis
-        while not queue.empty():
-            try:
-                update = queue.get_nowait()
-                updates.append(update)
-            except:
-                break
+        last_event_id = request.args.get('last_event_id', 0, type=int)
+        events = progress_store.get_events_since(session_id, last_event_id)
+        updates = [event['data'] for event in events if event['event'] == 'progress']
         
         return jsonify({
             'success': True,
             'updates': updates,
-            'has_updates': len(updates) > 0
+            'has_updates': len(updates) > 0,
+            'last_event_id': events[-1]['id'] if events else last_event_id
         })
         
     except Exception as e:
@@ -234,12 +349,12 @@ def update_progress():
         message = data.get('message')
         details = data.get('details')
         
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        tracker = progress_sessions[session_id]
         progress_data = tracker.update_progress(step, message, details)
         
         return jsonify({
@@ -261,12 +376,12 @@ def complete_analysis():
         data = request.get_json()
         session_id = data.get('session_id')
         
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        tracker = progress_sessions[session_id]
         tracker.complete()
         
         return jsonify({
@@ -286,18 +401,19 @@ def complete_analysis():
 def get_detailed_logs(session_id):
     """Obtém logs detalhados da análise"""
     try:
-        if session_id not in progress_sessions:
+        tracker = ProgressTracker.load(session_id)
+        if not tracker:
             return jsonify({
                 'error': 'Sessão não encontrada'
             }), 404
         
-        tracker = progress_sessions[session_id]
+        logs = tracker.detailed_logs
         
         return jsonify({
             'success': True,
             'session_id': session_id,
-            'logs': tracker.detailed_logs,
-            'total_logs': len(tracker.detailed_logs),
+            'logs': logs,
+            'total_logs': len(logs),
             'analysis_duration': time.time() - tracker.start_time
         })
         
@@ -315,20 +431,23 @@ def get_active_sessions():
         active = []
         current_time = time.time()
         
-        for session_id, tracker in progress_sessions.items():
+        for state in progress_store.list_sessions():
+            current_step = state.get('current_step', 0)
+            total_steps = state.get('total_steps', len(ProgressTracker.STEPS))
             active.append({
-                'session_id': session_id,
-                'current_step': tracker.current_step,
-                'total_steps': tracker.total_steps,
-                'elapsed_time': current_time - tracker.start_time,
-                'is_complete': tracker.current_step >= tracker.total_steps,
-                'last_message': tracker.steps[min(tracker.current_step, len(tracker.steps) - 1)]
+                'session_id': state.get('session_id'),
+                'current_step': current_step,
+                'total_steps': total_steps,
+                'elapsed_time': current_time - state.get('start_time', current_time),
+                'is_complete': current_step >= total_steps,
+                'last_message': state.get('last_message')
             })
         
         return jsonify({
             'success': True,
             'active_sessions': active,
-            'total_active': len(active)
+            'total_active': len(active),
+            'store_backend': progress_store.backend
         })
         
     except Exception as e:
@@ -340,38 +459,44 @@ def get_active_sessions():
 
 # Função helper para usar em outros módulos
 def get_progress_tracker(session_id: str) -> ProgressTracker:
-    """Obtém tracker de progresso para uma sessão"""
-    if session_id not in progress_sessions:
+    """Obtém tracker de progresso para uma sessão (nova análise substitui tracker finalizado)"""
+    tracker = ProgressTracker.load(session_id)
+    if not tracker or tracker.is_finished:
         return ProgressTracker(session_id)
-    return progress_sessions[session_id]
+    return tracker
+
+def publish_component(session_id: str, component_name: str, payload: Any):
+    """Publica componente concluído para quem acompanha a sessão via streaming"""
+    return progress_store.append_event(session_id, 'component', {
+        'component': component_name,
+        'payload': payload
+    })
 
 def update_analysis_progress(session_id: str, step: int, message: str, details: str = None):
     """Função helper para atualizar progresso de qualquer lugar"""
-    if session_id in progress_sessions:
-        tracker = progress_sessions[session_id]
+    tracker = ProgressTracker.load(session_id)
+    if tracker:
         return tracker.update_progress(step, message, details)
     return None
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-"""
-ARQV30 Enhanced v2.0 - Rotas de Progresso
-Tracking de progresso das análises
-"""
-
-import logging
-from flask import Blueprint, request, jsonify, session
-from datetime import datetime
-import uuid
 
-logger = logging.getLogger(__name__)
+# ROTAS LEGADAS (/progress/*) - antes eram um segundo módulo colado neste arquivo
+# que redefinia progress_bp e escondia todas as rotas acima. O estado fica no
+# progress_store, como o das rotas novas, para que qualquer worker enxergue a sessão
 
-progress_bp = Blueprint('progress', __name__)
+LEGACY_STEPS = [
+    'Validação de dados',
+    'Análise de mercado',
+    'Geração de insights',
+    'Criação de estratégias',
+    'Finalização'
+]
 
-# Armazenamento em memória para progresso (em produção usaria Redis/Database)
-progress_data = {}
+def _legacy_public_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Estado no formato que as rotas legadas sempre devolveram"""
+    return {key: value for key, value in state.items() if key not in ('session_id', 'is_finished')}
 
 @progress_bp.route('/progress/start_tracking', methods=['POST'])
-def start_tracking():
+def legacy_start_tracking():
     """Inicia tracking de progresso"""
     try:
         data = request.get_json() or {}
@@ -383,19 +508,16 @@ def start_tracking():
             session['session_id'] = session_id
         
         # Inicializar progresso
-        progress_data[session_id] = {
+        progress_store.create_session(session_id, {
+            'session_id': session_id,
             'status': 'iniciado',
             'progress': 0,
             'message': 'Preparando análise...',
             'started_at': datetime.now().isoformat(),
-            'steps': [
-                {'name': 'Validação de dados', 'status': 'pending'},
-                {'name': 'Análise de mercado', 'status': 'pending'},
-                {'name': 'Geração de insights', 'status': 'pending'},
-                {'name': 'Criação de estratégias', 'status': 'pending'},
-                {'name': 'Finalização', 'status': 'pending'}
-            ]
-        }
+            'steps': [{'name': name, 'status': 'pending'} for name in LEGACY_STEPS],
+            'is_finished': False
+        })
+        progress_store.ensure_reaper()
         
         logger.info(f"Tracking iniciado para sessão: {session_id}")
         
@@ -413,29 +535,33 @@ def start_tracking():
         }), 500
 
 @progress_bp.route('/progress/update', methods=['POST'])
-def update_progress():
+def legacy_update_progress():
     """Atualiza progresso"""
     try:
         data = request.get_json()
         session_id = data.get('session_id') or session.get('session_id')
         
-        if not session_id or session_id not in progress_data:
+        state = progress_store.get_state(session_id) if session_id else None
+        if not state:
             return jsonify({
                 'success': False,
                 'error': 'Sessão não encontrada'
             }), 404
         
-        # Atualizar progresso
-        progress_data[session_id].update({
-            'progress': data.get('progress', 0),
-            'message': data.get('message', ''),
-            'updated_at': datetime.now().isoformat()
-        })
-        
         # Atualizar step se fornecido
+        steps = state.get('steps', [])
         step_index = data.get('step_index')
-        if step_index is not None and 0 <= step_index < len(progress_data[session_id]['steps']):
-            progress_data[session_id]['steps'][step_index]['status'] = data.get('step_status', 'completed')
+        if step_index is not None and 0 <= step_index < len(steps):
+            steps[step_index]['status'] = data.get('step_status', 'completed')
+        
+        # Atualizar progresso
+        progress_store.update_state(
+            session_id,
+            progress=data.get('progress', 0),
+            message=data.get('message', ''),
+            updated_at=datetime.now().isoformat(),
+            steps=steps
+        )
         
         return jsonify({
             'success': True,
@@ -450,10 +576,11 @@ def update_progress():
         }), 500
 
 @progress_bp.route('/progress/status/<session_id>', methods=['GET'])
-def get_progress(session_id):
+def legacy_get_progress(session_id):
     """Obtém status do progresso"""
     try:
-        if session_id not in progress_data:
+        state = progress_store.get_state(session_id)
+        if not state:
             return jsonify({
                 'success': False,
                 'error': 'Sessão não encontrada'
@@ -461,7 +588,7 @@ def get_progress(session_id):
         
         return jsonify({
             'success': True,
-            'data': progress_data[session_id]
+            'data': _legacy_public_state(state)
         })
         
     except Exception as e:
@@ -472,29 +599,29 @@ def get_progress(session_id):
         }), 500
 
 @progress_bp.route('/progress/complete', methods=['POST'])
-def complete_progress():
+def legacy_complete_progress():
     """Completa progresso"""
     try:
         data = request.get_json()
         session_id = data.get('session_id') or session.get('session_id')
         
-        if not session_id or session_id not in progress_data:
+        state = progress_store.get_state(session_id) if session_id else None
+        if not state:
             return jsonify({
                 'success': False,
                 'error': 'Sessão não encontrada'
             }), 404
         
-        # Completar progresso
-        progress_data[session_id].update({
-            'status': 'concluido',
-            'progress': 100,
-            'message': 'Análise concluída com sucesso!',
-            'completed_at': datetime.now().isoformat()
-        })
-        
-        # Marcar todos os steps como concluídos
-        for step in progress_data[session_id]['steps']:
-            step['status'] = 'completed'
+        # Completar progresso e marcar todos os steps como concluídos
+        progress_store.update_state(
+            session_id,
+            status='concluido',
+            progress=100,
+            message='Análise concluída com sucesso!',
+            completed_at=datetime.now().isoformat(),
+            steps=[dict(step, status='completed') for step in state.get('steps', [])],
+            is_finished=True
+        )
         
         return jsonify({
             'success': True,
@@ -48,18 +48,22 @@ if os.getenv('LOG_FILE_ENABLED', 'true').lower() == 'true':
 
 logger = logging.getLogger(__name__)
 
-# Importa blueprints e serviços
-from routes.analysis import analysis_bp
-from routes.pdf_generator import pdf_bp
-from routes.monitoring import monitoring_bp
-from routes.user import user_bp
-from routes.progress import progress_bp
-from routes.files import files_bp
-from services.production_search_manager import production_search_manager
-from services.production_content_extractor import production_content_extractor
+# Blueprints e serviços são importados dentro das funções: processos filhos criados
+# com spawn (pools de extração e de páginas PDF) reimportam este módulo como
+# __mp_main__ e não devem recriar os singletons de serviço (SQLite, loop de fetch, IA)
 
 def create_app():
     """Cria e configura a aplicação Flask"""
+    from routes.analysis import analysis_bp
+    from routes.pdf_generator import pdf_bp
+    from routes.monitoring import monitoring_bp
+    from routes.user import user_bp
+    from routes.progress import progress_bp
+    from routes.files import files_bp
+    from services.production_search_manager import production_search_manager
+    from services.production_content_extractor import production_content_extractor
+    from services.ai_response_cache import ai_response_cache
+
     app = Flask(__name__)
 
     # Força encoding UTF-8
@@ -192,6 +196,7 @@ def create_app():
         try:
             production_search_manager.clear_cache()
             production_content_extractor.clear_cache()
+            ai_response_cache.clear()
 
             return jsonify({
                 'success': True,
@@ -274,8 +279,14 @@ def cleanup_on_exit():
     """Função de limpeza executada na saída"""
     logger.info("🧹 Executando limpeza final...")
     try:
+        from services.production_search_manager import production_search_manager
+        from services.robust_content_extractor import robust_content_extractor
+        from services.analysis_job_manager import analysis_job_manager
+
         production_search_manager.cache.cleanup_expired()
-        production_content_extractor.clear_cache()
+        # Não usa clear_cache(): o cache de páginas extraídas deve sobreviver ao restart
+        robust_content_extractor.close()
+        analysis_job_manager.shutdown()
     except Exception as e:
         logger.error(f"Erro na limpeza final: {e}")
 def main():
@@ -313,6 +324,7 @@ def main():
             logger.warning(f"⚠️ Configurações ausentes: {', '.join(missing_configs)}")
 
         # Log de provedores de busca
+        from services.production_search_manager import production_search_manager
         search_status = production_search_manager.get_provider_status()
         enabled_providers = [name for name, status in search_status.items() if status['enabled']]
         logger.info(f"🔍 Provedores de busca ativos: {', '.join(enabled_providers)}")
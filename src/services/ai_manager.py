@@ -31,6 +31,8 @@ try:
 except ImportError:
     HAS_GROQ_CLIENT = False
 
+from services.ai_response_cache import ai_response_cache
+
 logger = logging.getLogger(__name__)
 
 class AIManager:
@@ -47,7 +49,9 @@ class AIManager:
                 'model': 'gemini-1.5-flash',
                 'max_errors': 2,
                 'last_success': None,
-                'consecutive_failures': 0
+                'consecutive_failures': 0,
+                'cache_hits': 0,
+                'cache_misses': 0
             },
             'groq': {
                 'client': None,
@@ -57,7 +61,9 @@ class AIManager:
                 'model': 'llama3-70b-8192',
                 'max_errors': 2,
                 'last_success': None,
-                'consecutive_failures': 0
+                'consecutive_failures': 0,
+                'cache_hits': 0,
+                'cache_misses': 0
             },
             'openai': {
                 'client': None,
@@ -67,7 +73,9 @@ class AIManager:
                 'model': 'gpt-3.5-turbo',
                 'max_errors': 2,
                 'last_success': None,
-                'consecutive_failures': 0
+                'consecutive_failures': 0,
+                'cache_hits': 0,
+                'cache_misses': 0
             },
             'huggingface': {
                 'client': None,
@@ -78,7 +86,9 @@ class AIManager:
                 'current_model_index': 0,
                 'max_errors': 3,
                 'last_success': None,
-                'consecutive_failures': 0
+                'consecutive_failures': 0,
+                'cache_hits': 0,
+                'cache_misses': 0
             }
         }
 
@@ -180,17 +190,48 @@ class AIManager:
 
         return None
 
-    def generate_analysis(self, prompt: str, max_tokens: int = 8192, provider: Optional[str] = None) -> Optional[str]:
-        """Gera análise usando um provedor específico ou o melhor disponível com fallback."""
+    def get_candidate_providers(self) -> List[str]:
+        """
+        Provedores que generate_analysis pode usar, na ordem em que seriam tentados:
+        o melhor provedor seguido dos fallbacks disponíveis por prioridade.
+        """
+        best = self.get_best_provider()
+        if not best:
+            return []
+
+        fallbacks = [
+            (name, provider) for name, provider in self.providers.items()
+            if provider['available'] and name != best
+        ]
+        fallbacks.sort(key=lambda x: (x[1]['priority'], x[1]['consecutive_failures']))
+        return [best] + [name for name, _ in fallbacks]
+
+    def generate_analysis(
+        self,
+        prompt: str,
+        max_tokens: int = 8192,
+        provider: Optional[str] = None,
+        use_cache: bool = True
+    ) -> Optional[str]:
+        """
+        Gera análise usando um provedor específico ou o melhor disponível com fallback.
+        Respostas ficam em cache (prompt normalizado + provedor + modelo + max_tokens);
+        use_cache=False força nova chamada e não grava o resultado.
+        """
         
         start_time = time.time()
         
+        if use_cache:
+            cached = self._get_cached_response(prompt, max_tokens, provider)
+            if cached is not None:
+                return cached
+        
         # Se um provedor específico for solicitado
         if provider:
             if self.providers.get(provider) and self.providers[provider]['available']:
                 logger.info(f"🤖 Usando provedor solicitado: {provider.upper()}")
                 try:
-                    result = self._call_provider(provider, prompt, max_tokens)
+                    result = self._call_provider(provider, prompt, max_tokens, use_cache)
                     if result:
                         self._record_success(provider)
                         return result
@@ -210,7 +251,7 @@ class AIManager:
             raise Exception("❌ NENHUM PROVEDOR DE IA DISPONÍVEL: Configure pelo menos uma API de IA (Gemini, Groq, OpenAI ou HuggingFace)")
 
         try:
-            result = self._call_provider(provider_name, prompt, max_tokens)
+            result = self._call_provider(provider_name, prompt, max_tokens, use_cache)
             if result:
                 self._record_success(provider_name)
                 return result
@@ -219,7 +260,32 @@ class AIManager:
         except Exception as e:
             logger.error(f"❌ Erro no provedor {provider_name}: {e}")
             self._record_failure(provider_name, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude=[provider_name])
+            return self._try_fallback(prompt, max_tokens, exclude=[provider_name], use_cache=use_cache)
+
+    def get_provider_model(self, provider_name: str) -> str:
+        """Identificador do modelo (chave do cache e orçamento de contexto)"""
+        provider = self.providers[provider_name]
+        return provider.get('model') or ','.join(provider.get('models', []))
+
+    def _get_cached_response(self, prompt: str, max_tokens: int, provider: Optional[str] = None) -> Optional[str]:
+        """
+        Procura resposta em cache. Sem provedor explícito, aceita a resposta de
+        qualquer provedor (em ordem de prioridade), pois o fallback pode ter
+        respondido com outro provedor na chamada original.
+        """
+        if provider:
+            candidates = [provider] if provider in self.providers else []
+        else:
+            candidates = sorted(self.providers, key=lambda name: self.providers[name]['priority'])
+
+        for name in candidates:
+            cached = ai_response_cache.get(prompt, name, self.get_provider_model(name), max_tokens)
+            if cached is not None:
+                self.providers[name]['cache_hits'] += 1
+                logger.info(f"📦 Resposta de IA em cache ({name}): {len(cached)} caracteres")
+                return cached
+
+        return None
     
     def generate_parallel_analysis(self, prompts: List[Dict[str, Any]], max_tokens: int = 8192) -> Dict[str, Any]:
         """Gera múltiplas análises em paralelo usando diferentes provedores"""
@@ -283,17 +349,25 @@ class AIManager:
             
             logger.error(f"❌ Falha registrada para {provider_name}: {error_msg}")
 
-    def _call_provider(self, provider_name: str, prompt: str, max_tokens: int) -> Optional[str]:
-        """Chama a função de geração do provedor especificado."""
+    def _call_provider(self, provider_name: str, prompt: str, max_tokens: int, use_cache: bool = True) -> Optional[str]:
+        """Chama a função de geração do provedor especificado e grava a resposta no cache."""
         if provider_name == 'gemini':
-            return self._generate_with_gemini(prompt, max_tokens)
+            result = self._generate_with_gemini(prompt, max_tokens)
         elif provider_name == 'groq':
-            return self._generate_with_groq(prompt, max_tokens)
+            result = self._generate_with_groq(prompt, max_tokens)
         elif provider_name == 'openai':
-            return self._generate_with_openai(prompt, max_tokens)
+            result = self._generate_with_openai(prompt, max_tokens)
         elif provider_name == 'huggingface':
-            return self._generate_with_huggingface(prompt, max_tokens)
-        return None
+            result = self._generate_with_huggingface(prompt, max_tokens)
+        else:
+            return None
+
+        if use_cache:
+            self.providers[provider_name]['cache_misses'] += 1
+            if result:
+                ai_response_cache.set(prompt, provider_name, self.get_provider_model(provider_name), max_tokens, result)
+
+        return result
 
     def _generate_with_gemini(self, prompt: str, max_tokens: int) -> Optional[str]:
         """Gera conteúdo usando Gemini."""
@@ -383,7 +457,7 @@ class AIManager:
                     provider['available'] = True
             logger.info("🔄 Reset erros de todos os provedores")
 
-    def _try_fallback(self, prompt: str, max_tokens: int, exclude: List[str]) -> Optional[str]:
+    def _try_fallback(self, prompt: str, max_tokens: int, exclude: List[str], use_cache: bool = True) -> Optional[str]:
         """Tenta usar o próximo provedor disponível como fallback."""
         logger.info(f"🔄 Acionando fallback, excluindo: {', '.join(exclude)}")
         
@@ -406,7 +480,7 @@ class AIManager:
         logger.info(f"🔄 Tentando fallback para: {next_provider.upper()}")
         
         try:
-            result = self._call_provider(next_provider, prompt, max_tokens)
+            result = self._call_provider(next_provider, prompt, max_tokens, use_cache)
             if result:
                 self._record_success(next_provider)
                 return result
@@ -415,7 +489,7 @@ class AIManager:
         except Exception as e:
             logger.error(f"❌ Fallback para {next_provider} também falhou: {e}")
             self._record_failure(next_provider, str(e))
-            return self._try_fallback(prompt, max_tokens, exclude + [next_provider])
+            return self._try_fallback(prompt, max_tokens, exclude + [next_provider], use_cache)
     
     def get_provider_status(self) -> Dict[str, Any]:
         """Retorna status detalhado dos provedores"""
@@ -429,7 +503,9 @@ class AIManager:
                 'consecutive_failures': provider['consecutive_failures'],
                 'last_success': provider.get('last_success'),
                 'max_errors': provider['max_errors'],
-                'model': provider.get('model', 'N/A')
+                'model': provider.get('model', 'N/A'),
+                'cache_hits': provider['cache_hits'],
+                'cache_misses': provider['cache_misses']
             }
         
         return status
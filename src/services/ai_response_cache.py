@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - AI Response Cache
+Cache persistente de respostas das IAs (prompt normalizado + provedor + modelo + max_tokens)
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Any
+
+from services.sqlite_connections import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+
+class AIResponseCache:
+    """Cache em disco (SQLite) de respostas de LLM com TTL e eviction LRU por tamanho"""
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.db_path = os.path.join(cache_dir, "ai_response_cache.db")
+        self.enabled = os.getenv('AI_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ttl = int(os.getenv('AI_CACHE_TTL', 7 * 86400))
+        self.max_size_bytes = int(os.getenv('AI_CACHE_MAX_MB', 100)) * 1024 * 1024
+        self.eviction_check_interval = 20  # Verifica tamanho a cada N gravações
+        # last_access só é regravado se estiver mais velho que isso (evita escrita a cada hit)
+        self.access_update_interval = int(os.getenv('AI_CACHE_ACCESS_UPDATE_INTERVAL', 300))
+
+        self._connections = SQLiteConnections(self.db_path)
+        self._write_lock = threading.Lock()
+        self._writes_since_check = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_database()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Conexão por thread, reaberta em cada processo após fork"""
+        return self._connections.get()
+
+    def _init_database(self):
+        """Inicializa tabela do cache"""
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ai_response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT,
+                    max_tokens INTEGER NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_last_access ON ai_response_cache(last_access)")
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar cache de IA: {e}")
+            self.enabled = False
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Normaliza espaços para que reenvios idênticos gerem a mesma chave"""
+        return re.sub(r'\s+', ' ', prompt or '').strip()
+
+    def make_key(self, prompt: str, provider: str, model: Optional[str], max_tokens: int) -> str:
+        """Chave = hash(provedor, modelo, max_tokens, prompt normalizado)"""
+        raw = f"{provider}\x1f{model or ''}\x1f{max_tokens}\x1f{self.normalize_prompt(prompt)}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, prompt: str, provider: str, model: Optional[str], max_tokens: int) -> Optional[str]:
+        """Retorna resposta em cache ainda válida"""
+        if not self.enabled:
+            return None
+
+        try:
+            cache_key = self.make_key(prompt, provider, model, max_tokens)
+            conn = self._get_connection()
+            row = conn.execute(
+                "SELECT response, created_at, last_access FROM ai_response_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+
+            now = time.time()
+            if not row or now - row[1] >= self.ttl:
+                return None
+
+            if now - row[2] >= self.access_update_interval:
+                with self._write_lock:
+                    conn.execute("UPDATE ai_response_cache SET last_access = ? WHERE cache_key = ?", (now, cache_key))
+                    conn.commit()
+
+            return row[0]
+
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de IA: {e}")
+            return None
+
+    def set(self, prompt: str, provider: str, model: Optional[str], max_tokens: int, response: str):
+        """Armazena resposta"""
+        if not self.enabled or not response:
+            return
+
+        try:
+            now = time.time()
+            cache_key = self.make_key(prompt, provider, model, max_tokens)
+            conn = self._get_connection()
+
+            with self._write_lock:
+                conn.execute("""
+                    INSERT OR REPLACE INTO ai_response_cache
+                    (cache_key, provider, model, max_tokens, response, created_at, last_access, size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, (cache_key, provider, model, max_tokens, response, now, now, len(response.encode('utf-8'))))
+                conn.commit()
+                self._writes_since_check += 1
+                check_size = self._writes_since_check >= self.eviction_check_interval
+                if check_size:
+                    self._writes_since_check = 0
+
+            if check_size:
+                self.evict_if_needed()
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache de IA: {e}")
+
+    def evict_if_needed(self):
+        """Remove expirados e, se ainda acima do limite, os menos acessados"""
+        try:
+            conn = self._get_connection()
+            with self._write_lock:
+                conn.execute("DELETE FROM ai_response_cache WHERE ? - created_at >= ?", (time.time(), self.ttl))
+                conn.commit()
+
+            total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ai_response_cache").fetchone()[0]
+            if total_size <= self.max_size_bytes:
+                return
+
+            to_free = total_size - int(self.max_size_bytes * 0.9)
+            freed = 0
+            keys_to_delete = []
+            for cache_key, size in conn.execute("SELECT cache_key, size FROM ai_response_cache ORDER BY last_access ASC"):
+                keys_to_delete.append((cache_key,))
+                freed += size
+                if freed >= to_free:
+                    break
+
+            with self._write_lock:
+                conn.executemany("DELETE FROM ai_response_cache WHERE cache_key = ?", keys_to_delete)
+                conn.commit()
+
+            logger.info(f"🗑️ Cache de IA: {len(keys_to_delete)} respostas removidas (LRU)")
+
+        except Exception as e:
+            logger.error(f"Erro na eviction do cache de IA: {e}")
+
+    def clear(self):
+        """Remove todas as respostas"""
+        try:
+            conn = self._get_connection()
+            with self._write_lock:
+                conn.execute("DELETE FROM ai_response_cache")
+                conn.commit()
+            logger.info("🗑️ Cache de IA limpo")
+        except Exception as e:
+            logger.error(f"Erro ao limpar cache de IA: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamanho atual do cache"""
+        try:
+            entries, total_size = self._get_connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ai_response_cache"
+            ).fetchone()
+            return {'enabled': self.enabled, 'entries': entries, 'size_mb': round(total_size / 1024 / 1024, 2)}
+        except Exception:
+            return {'enabled': self.enabled}
+
+# Instância global
+ai_response_cache = AIResponseCache()
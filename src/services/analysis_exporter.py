@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Analysis Exporter
+Exportação de análises em ZIP gerado em streaming, com cache dos arquivos prontos
+"""
+
+import os
+import time
+import uuid
+import zipfile
+import hashlib
+import logging
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from services.local_file_manager import local_file_manager
+
+logger = logging.getLogger(__name__)
+
+
+class _ChunkSink:
+    """Destino não-seekable do ZipFile: acumula bytes até o gerador repassá-los"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> List[bytes]:
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+class AnalysisExporter:
+    """
+    Monta o ZIP de uma análise a partir da lista indexada de arquivos enquanto a
+    resposta é enviada. Uma cópia é gravada em cache/exports e só passa a valer
+    quando o arquivo termina de ser gerado; downloads interrompidos não deixam lixo.
+    """
+
+    COMPRESSION_METHODS = {
+        'deflate': zipfile.ZIP_DEFLATED,
+        'store': zipfile.ZIP_STORED
+    }
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.cache_dir = os.path.join(cache_dir, "exports")
+        self.cache_enabled = os.getenv('EXPORT_CACHE_ENABLED', 'true').lower() == 'true'
+        self.max_cache_bytes = int(os.getenv('EXPORT_CACHE_MAX_MB', 200)) * 1024 * 1024
+        self.default_level = int(os.getenv('EXPORT_ZIP_LEVEL', 6))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._cleanup_partial_files()
+
+    def _cleanup_partial_files(self):
+        """Remove gravações incompletas deixadas por processos encerrados"""
+        # Só as antigas: outro worker pode estar gerando uma exportação agora
+        cutoff = time.time() - 3600
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.tmp'):
+                path = os.path.join(self.cache_dir, filename)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def normalize_options(self, compression: Optional[str], level: Optional[Any]) -> Tuple[str, int]:
+        """Valida método ('deflate' ou 'store') e nível (0-9)"""
+        compression = (compression or 'deflate').lower()
+        if compression not in self.COMPRESSION_METHODS:
+            raise ValueError(f"Compressão inválida: {compression} (use 'deflate' ou 'store')")
+
+        level = self.default_level if level in (None, '') else int(level)
+        if not 0 <= level <= 9:
+            raise ValueError(f"Nível de compressão inválido: {level} (use 0-9)")
+
+        return compression, (0 if compression == 'store' else level)
+
+    def _cache_path(self, analysis_id: str, signature: str, compression: str, level: int) -> str:
+        key = hashlib.sha256(f"{analysis_id}\x1f{signature}\x1f{compression}\x1f{level}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.zip")
+
+    def get_export(
+        self,
+        analysis_id: str,
+        compression: Optional[str] = None,
+        level: Optional[Any] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Retorna {'cached_path': caminho} se o ZIP já existe em cache, ou
+        {'stream': gerador de bytes} para gerar durante o envio. None se a análise não existe.
+        """
+        compression, level = self.normalize_options(compression, level)
+
+        signature = local_file_manager.get_analysis_signature(analysis_id)
+        if not signature:
+            return None
+
+        cache_path = self._cache_path(analysis_id, signature, compression, level)
+        if self.cache_enabled and os.path.exists(cache_path):
+            try:
+                os.utime(cache_path)  # Marca uso recente para a eviction
+                logger.info(f"📦 Exportação da análise {analysis_id} servida do cache")
+                return {'cached_path': cache_path}
+            except OSError:
+                pass  # Removido pela eviction entre a checagem e o uso: gera de novo
+
+        entries = local_file_manager.iter_export_entries(analysis_id)
+        return {'stream': self._stream_zip(entries, compression, level, cache_path if self.cache_enabled else None)}
+
+    def _stream_zip(
+        self,
+        entries: List[Tuple[str, Any]],
+        compression: str,
+        level: int,
+        cache_path: Optional[str]
+    ) -> Iterator[bytes]:
+        """Gera o ZIP bloco a bloco, gravando em paralelo a cópia do cache"""
+
+        sink = _ChunkSink()
+        tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp" if cache_path else None
+        cache_file = open(tmp_path, 'wb') if tmp_path else None
+        completed = False
+
+        def emit() -> Iterator[bytes]:
+            for chunk in sink.drain():
+                if cache_file:
+                    cache_file.write(chunk)
+                yield chunk
+
+        try:
+            zip_kwargs = {'compresslevel': level} if compression == 'deflate' else {}
+            with zipfile.ZipFile(sink, 'w', self.COMPRESSION_METHODS[compression], **zip_kwargs) as archive:
+                for arcname, iter_chunks in entries:
+                    with archive.open(arcname, 'w', force_zip64=True) as destination:
+                        for chunk in iter_chunks():
+                            destination.write(chunk)
+                            yield from emit()
+                    yield from emit()
+
+            # Diretório central é escrito no fechamento
+            yield from emit()
+            completed = True
+
+        finally:
+            if cache_file:
+                cache_file.close()
+                if completed:
+                    os.replace(tmp_path, cache_path)
+                    self._evict_if_needed()
+                else:
+                    # Download interrompido ou erro: descarta a cópia parcial
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+
+    def _evict_if_needed(self):
+        """Remove os ZIPs usados há mais tempo quando o cache passa do limite"""
+        try:
+            files = []
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith('.zip'):
+                    path = os.path.join(self.cache_dir, filename)
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total_size <= self.max_cache_bytes:
+                    break
+                os.remove(path)
+                total_size -= size
+                logger.info(f"🗑️ Exportação removida do cache: {os.path.basename(path)}")
+
+        except Exception as e:
+            logger.error(f"Erro na eviction do cache de exportações: {e}")
+
+# Instância global
+analysis_exporter = AnalysisExporter()
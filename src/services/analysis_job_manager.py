@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Analysis Job Manager
+Fila persistida de análises em background, consumida por um processo dedicado (ou threads locais)
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Callable, Tuple
+
+from services.sqlite_connections import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Fila de jobs cheia - cliente deve tentar novamente mais tarde"""
+    pass
+
+
+class AnalysisJobManager:
+    """
+    Fila de análises em SQLite: os workers web só enfileiram e respondem ao
+    polling; quem executa é um consumidor que reivindica jobs da tabela.
+
+    ANALYSIS_JOB_EXECUTION:
+    - 'worker': nenhum worker web executa jobs. Um processo dedicado
+      (src/job_worker.py, iniciado pelo master do gunicorn) consome a fila,
+      então reciclagem por max_requests ou graceful_timeout não mata análises.
+    - 'inline': threads de consumo no próprio processo (servidor de
+      desenvolvimento, processo único).
+
+    Quem executa um job grava um heartbeat periódico; job 'running' sem
+    heartbeat há mais de ANALYSIS_JOB_HEARTBEAT_TIMEOUT é dado como perdido.
+    Não depende de PID, então vale entre hosts e não é enganado por reuso de PID.
+    """
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.db_path = os.path.join(cache_dir, "analysis_jobs.db")
+        self.execution = os.getenv('ANALYSIS_JOB_EXECUTION', 'inline').lower()
+        self.max_workers = int(os.getenv('ANALYSIS_JOB_WORKERS', 2))
+        self.max_pending = int(os.getenv('ANALYSIS_JOB_MAX_PENDING', 20))   # Na fila + rodando, total
+        self.result_ttl = int(os.getenv('ANALYSIS_JOB_RESULT_TTL', 86400))
+        self.heartbeat_interval = float(os.getenv('ANALYSIS_JOB_HEARTBEAT_INTERVAL', 15))
+        self.heartbeat_timeout = float(os.getenv('ANALYSIS_JOB_HEARTBEAT_TIMEOUT', 90))
+        self.poll_interval = float(os.getenv('ANALYSIS_JOB_POLL_INTERVAL', 1.0))
+        # Manutenção feita pelos consumidores, no máximo uma vez por intervalo (não a cada poll)
+        self.stale_check_interval = float(os.getenv('ANALYSIS_JOB_STALE_CHECK_INTERVAL', self.heartbeat_interval))
+        self.cleanup_interval = float(os.getenv('ANALYSIS_JOB_CLEANUP_INTERVAL', 300))
+
+        self._connections = SQLiteConnections(self.db_path)
+        self._write_lock = threading.Lock()
+        self._runners: Dict[str, Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]]] = {}
+        self._consumer_lock = threading.Lock()
+        self._consumer_pid = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._running_lock = threading.Lock()
+        self._running_jobs = 0
+        self._maintenance_lock = threading.Lock()
+        self._last_stale_check = 0.0
+        self._last_cleanup = time.time()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_database()
+        self.cleanup_expired()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Conexão por thread, reaberta em cada processo após fork"""
+        return self._connections.get()
+
+    def _init_database(self):
+        """Inicializa tabela de jobs"""
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    session_id TEXT,
+                    segmento TEXT,
+                    status TEXT NOT NULL,
+                    worker_pid INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    http_status INTEGER,
+                    error TEXT,
+                    result TEXT
+                )
+            """)
+            # Colunas da fila (bancos criados antes dela recebem via ALTER)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(analysis_jobs)")}
+            for name, definition in (('runner', 'TEXT'), ('payload', 'TEXT'),
+                                     ('worker_id', 'TEXT'), ('heartbeat_at', 'REAL')):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE analysis_jobs ADD COLUMN {name} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_created ON analysis_jobs(created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs(status, created_at)")
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar fila de jobs: {e}")
+
+    def _update(self, job_id: str, **fields):
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        conn = self._get_connection()
+        with self._write_lock:
+            conn.execute(f"UPDATE analysis_jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+            conn.commit()
+
+    def register_runner(self, name: str, runner: Callable[[Dict[str, Any]], Tuple[Dict[str, Any], int]]):
+        """Registra a função que executa jobs do tipo `name`; recebe os dados e retorna (payload, status_http)"""
+        self._runners[name] = runner
+
+    def submit(self, data: Dict[str, Any], runner: str) -> Dict[str, Any]:
+        """Enfileira a análise (dados serializados em JSON) e retorna imediatamente o job"""
+        if runner not in self._runners:
+            raise ValueError(f"Runner de job não registrado: {runner}")
+
+        job_id = uuid.uuid4().hex
+        conn = self._get_connection()
+        with self._write_lock:
+            # Limite global (todos os workers web), checado na mesma transação da inserção
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = conn.execute(
+                    "SELECT COUNT(*) FROM analysis_jobs WHERE status IN ('queued', 'running')"
+                ).fetchone()[0]
+                if pending >= self.max_pending:
+                    raise JobQueueFullError(f"Fila de análises cheia ({self.max_pending} jobs pendentes)")
+
+                conn.execute("""
+                    INSERT INTO analysis_jobs (job_id, session_id, segmento, status, created_at, runner, payload)
+                    VALUES (?, ?, ?, 'queued', ?, ?, ?)
+                """, (job_id, data.get('session_id'), data.get('segmento'), time.time(), runner,
+                      json.dumps(data, ensure_ascii=False, default=str)))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        if self.execution == 'inline':
+            self.start_consumers()
+            self._wakeup.set()
+
+        logger.info(f"📥 Job de análise enfileirado: {job_id} ({data.get('segmento')})")
+        return self.get_job(job_id)
+
+    # ------------------------------------------------------------------
+    # Consumo da fila
+    # ------------------------------------------------------------------
+
+    def start_consumers(self, count: Optional[int] = None):
+        """Inicia (uma vez por processo) as threads que consomem a fila"""
+        if self._consumer_pid == os.getpid():
+            return
+
+        with self._consumer_lock:
+            if self._consumer_pid == os.getpid():
+                return
+
+            self._stop.clear()
+            for index in range(count or self.max_workers):
+                threading.Thread(
+                    target=self._consume_loop, name=f'analysis-job-{index}', daemon=True
+                ).start()
+            self._consumer_pid = os.getpid()
+            logger.info(f"⚙️ Consumidores de jobs iniciados: {count or self.max_workers} threads ({self.execution})")
+
+    def stop_consumers(self, timeout: Optional[float] = None) -> bool:
+        """Para de reivindicar jobs e espera os que estão rodando (True se todos terminaram)"""
+        self._stop.set()
+        self._wakeup.set()
+        deadline = time.time() + timeout if timeout else None
+        while self._running_jobs and (deadline is None or time.time() < deadline):
+            time.sleep(0.5)
+        return self._running_jobs == 0
+
+    def _consume_loop(self):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        while not self._stop.is_set():
+            try:
+                self._run_maintenance()
+                job = self._claim_next(worker_id)
+            except Exception as e:
+                logger.error(f"Erro ao reivindicar job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            with self._running_lock:
+                self._running_jobs += 1
+            try:
+                self._run_job(*job)
+            finally:
+                with self._running_lock:
+                    self._running_jobs -= 1
+
+    def _run_maintenance(self):
+        """
+        Jobs perdidos (a cada stale_check_interval) e resultados expirados (a cada
+        cleanup_interval); uma thread por vez faz cada tarefa, as demais só pulam.
+        O job worker fica de pé por dias, então a limpeza não pode depender do restart.
+        """
+        now = time.time()
+        with self._maintenance_lock:
+            check_stale = now - self._last_stale_check >= self.stale_check_interval
+            if check_stale:
+                self._last_stale_check = now
+            cleanup = now - self._last_cleanup >= self.cleanup_interval
+            if cleanup:
+                self._last_cleanup = now
+
+        if check_stale:
+            self.fail_stale_jobs()
+        if cleanup:
+            self.cleanup_expired()
+
+    def _claim_next(self, worker_id: str) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Reivindica atomicamente o job mais antigo da fila (entre processos)"""
+        conn = self._get_connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT job_id, runner, payload FROM analysis_jobs WHERE status = 'queued' "
+                    "ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row:
+                    now = time.time()
+                    conn.execute("""
+                        UPDATE analysis_jobs SET status = 'running', worker_id = ?, worker_pid = ?,
+                            started_at = ?, heartbeat_at = ?
+                        WHERE job_id = ?
+                    """, (worker_id, os.getpid(), now, now, row[0]))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        if not row:
+            return None
+        job_id, runner, payload = row
+        return job_id, runner, json.loads(payload) if payload else {}
+
+    def _run_job(self, job_id: str, runner_name: str, data: Dict[str, Any]):
+        """Executa o job mantendo o heartbeat enquanto roda"""
+        finished = threading.Event()
+
+        def heartbeat():
+            while not finished.wait(self.heartbeat_interval):
+                try:
+                    self._update(job_id, heartbeat_at=time.time())
+                except Exception as e:
+                    logger.warning(f"⚠️ Heartbeat do job {job_id} falhou: {e}")
+
+        threading.Thread(target=heartbeat, name=f'job-heartbeat-{job_id[:8]}', daemon=True).start()
+        try:
+            runner = self._runners.get(runner_name)
+            if runner is None:
+                raise RuntimeError(f"Runner de job não registrado neste processo: {runner_name}")
+
+            logger.info(f"⚙️ Executando job de análise {job_id}")
+            payload, http_status = runner(data)
+            failed = http_status >= 400
+
+            self._update(
+                job_id,
+                status='failed' if failed else 'completed',
+                finished_at=time.time(),
+                http_status=http_status,
+                error=(payload.get('message') or payload.get('error')) if failed else None,
+                result=json.dumps(payload, ensure_ascii=False, default=str),
+                payload=None
+            )
+            logger.info(f"{'❌' if failed else '✅'} Job de análise {job_id} finalizado ({http_status})")
+
+        except Exception as e:
+            logger.error(f"❌ Job de análise {job_id} falhou: {e}", exc_info=True)
+            try:
+                self._update(job_id, status='failed', finished_at=time.time(), http_status=500, error=str(e), payload=None)
+            except Exception as update_error:
+                logger.error(f"Erro ao registrar falha do job {job_id}: {update_error}")
+
+        finally:
+            finished.set()
+
+    def fail_stale_jobs(self) -> int:
+        """Jobs 'running' sem heartbeat recente perderam o processo que os executava"""
+        conn = self._get_connection()
+        with self._write_lock:
+            cursor = conn.execute("""
+                UPDATE analysis_jobs SET status = 'failed', finished_at = ?, http_status = 500,
+                    error = 'Job interrompido: processo que executava a análise parou de responder',
+                    payload = NULL
+                WHERE status = 'running' AND COALESCE(heartbeat_at, started_at, created_at) < ?
+            """, (time.time(), time.time() - self.heartbeat_timeout))
+            conn.commit()
+        if cursor.rowcount:
+            logger.warning(f"⚠️ {cursor.rowcount} jobs sem heartbeat marcados como falhos")
+        return cursor.rowcount
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    def get_job(self, job_id: str, include_result: bool = False) -> Optional[Dict[str, Any]]:
+        """Status do job (e resultado, se pedido e disponível)"""
+        conn = self._get_connection()
+        row = conn.execute("""
+            SELECT job_id, session_id, segmento, status, heartbeat_at, created_at, started_at, finished_at,
+                   http_status, error, CASE WHEN ? THEN result END
+            FROM analysis_jobs WHERE job_id = ?
+        """, (1 if include_result else 0, job_id)).fetchone()
+
+        if not row:
+            return None
+
+        (job_id, session_id, segmento, status, heartbeat_at, created_at, started_at,
+         finished_at, http_status, error, result) = row
+
+        # Consumidor morreu no meio do job: o heartbeat parou
+        if status == 'running' and (heartbeat_at or started_at) < time.time() - self.heartbeat_timeout:
+            self.fail_stale_jobs()
+            return self.get_job(job_id, include_result)
+
+        job = {
+            'job_id': job_id,
+            'session_id': session_id,
+            'segmento': segmento,
+            'status': status,
+            'created_at': created_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+            'http_status': http_status,
+            'error': error,
+            'queue_time': (started_at or time.time()) - created_at,
+            'run_time': ((finished_at or time.time()) - started_at) if started_at else 0
+        }
+        if include_result and result:
+            job['result'] = json.loads(result)
+
+        return job
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Jobs mais recentes (sem resultado)"""
+        rows = self._get_connection().execute(
+            "SELECT job_id FROM analysis_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [job for job in (self.get_job(row[0]) for row in rows) if job]
+
+    def cleanup_expired(self):
+        """Remove jobs finalizados há mais que result_ttl"""
+        try:
+            conn = self._get_connection()
+            with self._write_lock:
+                cursor = conn.execute(
+                    "DELETE FROM analysis_jobs WHERE status IN ('completed', 'failed') AND finished_at < ?",
+                    (time.time() - self.result_ttl,)
+                )
+                conn.commit()
+            if cursor.rowcount:
+                logger.info(f"🗑️ {cursor.rowcount} jobs de análise expirados removidos")
+        except Exception as e:
+            logger.error(f"Erro ao limpar jobs expirados: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resumo da fila"""
+        try:
+            counts = dict(self._get_connection().execute(
+                "SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status"
+            ).fetchall())
+        except Exception:
+            counts = {}
+
+        return {
+            'execution': self.execution,
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'running_in_process': self._running_jobs,
+            'jobs_by_status': counts
+        }
+
+    def shutdown(self):
+        """Para de consumir a fila sem esperar análises em andamento"""
+        self._stop.set()
+        self._wakeup.set()
+
+# Instância global
+analysis_job_manager = AnalysisJobManager()
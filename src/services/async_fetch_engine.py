@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Async Fetch Engine
+Motor de download assíncrono com fachada síncrona, limites por host e retry sem bloqueio.
+Corpos são lidos em streaming com teto de bytes; PDFs vão para arquivo temporário em disco.
+"""
+
+import os
+import re
+import time
+import random
+import asyncio
+import tempfile
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from services.politeness_scheduler import politeness_scheduler, HostRateLimited
+from services.fetch_health import fetch_health
+
+# Imports condicionais para não quebrar se não estiver instalado
+try:
+    import aiohttp
+    HAS_AIOHTTP = True
+except ImportError:
+    HAS_AIOHTTP = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+# Status que valem nova tentativa
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# Tipos tratados como página (o resto é recusado antes de baixar o corpo)
+TEXT_CONTENT_TYPES = ('text/', 'application/xhtml', 'application/xml', 'application/rss', 'application/atom', 'application/json')
+PDF_CONTENT_TYPES = ('application/pdf', 'application/x-pdf')
+# Genéricos: decide pelos primeiros bytes
+AMBIGUOUS_CONTENT_TYPES = ('', 'application/octet-stream', 'binary/octet-stream', 'application/download', 'application/force-download')
+
+META_CHARSET_REGEX = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class FetchResult:
+    """Resultado de um download"""
+    url: str
+    final_url: str = ''
+    status: int = 0
+    text: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+    attempts: int = 0
+    error: Optional[str] = None
+    content_type: str = ''
+    size: int = 0                    # Bytes lidos do corpo
+    file_path: Optional[str] = None  # PDF gravado em disco (quem recebe remove o arquivo)
+    rejected: bool = False           # Recusado pelo tipo/tamanho: não adianta tentar de novo
+
+    @property
+    def ok(self) -> bool:
+        return (
+            self.error is None and 200 <= self.status < 300
+            and (self.text is not None or self.file_path is not None)
+        )
+
+    @property
+    def is_pdf(self) -> bool:
+        return self.file_path is not None
+
+    def discard_file(self):
+        """Remove o PDF temporário (se houver)"""
+        if self.file_path:
+            try:
+                os.remove(self.file_path)
+            except OSError:
+                pass
+            self.file_path = None
+
+
+class BodyRejected(Exception):
+    """Corpo recusado (tipo não suportado ou acima do limite)"""
+
+
+class _BodyReader:
+    """
+    Consome os chunks do corpo com teto de bytes. Texto fica em memória
+    (até FETCH_MAX_BODY_MB); PDF vai direto para disco (até FETCH_MAX_PDF_MB).
+    finish() preenche result.text ou result.file_path; abort() descarta o parcial.
+    """
+
+    def __init__(self, engine: 'AsyncFetchEngine', kind: str, accept_pdf: bool, result: FetchResult):
+        self.engine = engine
+        self.kind = kind
+        self.accept_pdf = accept_pdf
+        self.result = result
+        self.buffer: List[bytes] = []
+        self.spool = None
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        if self.kind == 'sniff':
+            self.kind = self.engine._sniff_kind(chunk, self.accept_pdf)
+
+        self.result.size += len(chunk)
+        limit = self.engine.max_pdf_bytes if self.kind == 'pdf' else self.engine.max_body_bytes
+        if self.result.size > limit:
+            raise BodyRejected(f"corpo excede o limite de {limit // 1024} KB")
+
+        if self.kind == 'pdf':
+            if self.spool is None:
+                self.spool = self.engine._open_spool()
+            # Escrita vai para o cache de páginas do SO; não segura o loop de forma relevante
+            self.spool.write(chunk)
+        else:
+            self.buffer.append(chunk)
+
+    def finish(self):
+        if self.spool is not None:
+            self.spool.close()
+            self.result.file_path = self.spool.name
+            self.engine.stats['pdfs_spooled'] += 1
+        else:
+            self.result.text = self.engine._decode(b''.join(self.buffer), self.result.headers.get('Content-Type', ''))
+        self.buffer = []
+
+    def abort(self):
+        self.buffer = []
+        if self.spool is not None:
+            self.spool.close()
+            try:
+                os.remove(self.spool.name)
+            except OSError:
+                pass
+            self.spool = None
+
+
+class AsyncFetchEngine:
+    """Motor de download assíncrono compartilhado por todos os extratores"""
+
+    def __init__(self):
+        self.max_in_flight = int(os.getenv('FETCH_MAX_IN_FLIGHT', 200))
+        self.per_host_limit = int(os.getenv('FETCH_PER_HOST_LIMIT', 6))
+        self.timeout = int(os.getenv('FETCH_TIMEOUT', 30))
+        self.max_retries = int(os.getenv('FETCH_MAX_RETRIES', 3))
+        self.retry_backoff = float(os.getenv('FETCH_RETRY_BACKOFF', 1.0))
+        self.max_body_bytes = int(os.getenv('FETCH_MAX_BODY_MB', 5)) * 1024 * 1024
+        self.max_pdf_bytes = int(os.getenv('FETCH_MAX_PDF_MB', 50)) * 1024 * 1024
+        self.spool_dir = os.getenv('FETCH_SPOOL_DIR') or tempfile.gettempdir()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[threading.Thread] = None
+        self._loop_lock = threading.Lock()
+
+        # Criados dentro do loop
+        self._session = None
+        self._global_semaphore: Optional[asyncio.Semaphore] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+        # Fallback sem aiohttp: requests em pool de threads
+        self._fallback_executor: Optional[ThreadPoolExecutor] = None
+        self._fallback_local = threading.local()
+
+        self.stats = {
+            'requests': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'rejected': 0,
+            'pdfs_spooled': 0,
+            'bytes_downloaded': 0,
+            'in_flight': 0,
+            'peak_in_flight': 0
+        }
+
+        backend = 'aiohttp' if HAS_AIOHTTP else 'requests (thread fallback)'
+        logger.info(f"🌐 Async Fetch Engine inicializado - backend: {backend}, máx {self.max_in_flight} simultâneos, {self.per_host_limit}/host")
+
+    # ------------------------------------------------------------------
+    # Fachada síncrona
+    # ------------------------------------------------------------------
+
+    def fetch(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        min_length: int = 0,
+        accept_pdf: bool = False
+    ) -> FetchResult:
+        """
+        Baixa uma URL bloqueando apenas a thread chamadora. Com accept_pdf=True,
+        PDFs voltam em result.file_path (o chamador remove com discard_file()).
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.fetch_async(url, headers=headers, min_length=min_length, accept_pdf=accept_pdf),
+            self._ensure_loop()
+        )
+        try:
+            return future.result(timeout=self._overall_timeout())
+        except Exception as e:
+            future.cancel()
+            return FetchResult(url=url, error=f"fachada síncrona: {e}")
+
+    def fetch_many(
+        self,
+        urls: List[str],
+        headers: Optional[Dict[str, str]] = None,
+        min_length: int = 0,
+        headers_by_url: Optional[Dict[str, Optional[Dict[str, str]]]] = None,
+        accept_pdf: bool = False
+    ) -> Dict[str, FetchResult]:
+        """
+        Baixa várias URLs concorrentemente e retorna {url: FetchResult}.
+        headers_by_url permite headers específicos (ex.: requisições condicionais).
+        """
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+
+        per_url_headers = [
+            {**(headers or {}), **((headers_by_url or {}).get(url) or {})} or None
+            for url in unique_urls
+        ]
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._fetch_many_async(unique_urls, per_url_headers, min_length, accept_pdf),
+            self._ensure_loop()
+        )
+        try:
+            results = future.result(timeout=self._batch_timeout(unique_urls))
+        except Exception as e:
+            future.cancel()
+            return {url: FetchResult(url=url, error=f"fachada síncrona: {e}") for url in unique_urls}
+
+        return dict(zip(unique_urls, results))
+
+    # ------------------------------------------------------------------
+    # Núcleo assíncrono
+    # ------------------------------------------------------------------
+
+    async def fetch_async(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        min_length: int = 0,
+        accept_pdf: bool = False
+    ) -> FetchResult:
+        """Baixa uma URL respeitando limite global, limite por host e retry com backoff"""
+        host = urlparse(url).netloc.lower()
+        result = FetchResult(url=url)
+        start_time = time.time()
+        throttled = False
+
+        for attempt in range(1, self.max_retries + 1):
+            # Semáforos só durante a requisição: o backoff abaixo dorme sem ocupar vaga
+            async with self._get_host_semaphore(host):
+                # Ritmo por host (e pausa pedida via Retry-After) antes da vaga global:
+                # quem espera o próprio host não segura a concorrência dos demais
+                try:
+                    await politeness_scheduler.wait_async(url)
+                except HostRateLimited as e:
+                    result = FetchResult(url=url, error=str(e), attempts=attempt)
+                    throttled = True
+                    break
+
+                async with self._global_semaphore:
+                    self._track_in_flight(1)
+                    try:
+                        result = await self._do_request(url, headers, accept_pdf)
+                        result.attempts = attempt
+                        politeness_scheduler.observe(url, result.status, result.headers)
+                    finally:
+                        self._track_in_flight(-1)
+
+            retry_reason = None
+            if result.rejected:
+                break
+            if result.error:
+                retry_reason = result.error
+            elif result.status in RETRYABLE_STATUS:
+                retry_reason = f"status {result.status}"
+            elif result.ok and min_length and result.text is not None and len(result.text) < min_length:
+                retry_reason = f"corpo pequeno ({len(result.text)} caracteres)"
+
+            if not retry_reason or attempt == self.max_retries:
+                break
+
+            logger.warning(f"⚠️ Tentativa {attempt} para {url} falhou ({retry_reason}) - nova tentativa")
+            self.stats['retries'] += 1
+            await asyncio.sleep(self._backoff_delay(attempt, result))
+
+        result.elapsed = time.time() - start_time
+        self.stats['requests'] += 1
+        # Cache negativo da URL e saúde do host (espera por limite do host não conta)
+        if not throttled:
+            fetch_health.record_result(result, min_length)
+        self.stats['bytes_downloaded'] += result.size
+        if result.rejected:
+            self.stats['rejected'] += 1
+            logger.info(f"🚫 Download recusado: {url} ({result.error})")
+        if result.ok:
+            self.stats['successes'] += 1
+        else:
+            self.stats['failures'] += 1
+
+        return result
+
+    async def _fetch_many_async(
+        self,
+        urls: List[str],
+        headers_list: List[Optional[Dict[str, str]]],
+        min_length: int,
+        accept_pdf: bool = False
+    ) -> List[FetchResult]:
+        """Dispara todas as URLs de uma vez; os semáforos controlam a concorrência"""
+        tasks = [
+            self.fetch_async(url, headers=headers, min_length=min_length, accept_pdf=accept_pdf)
+            for url, headers in zip(urls, headers_list)
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        return [
+            result if isinstance(result, FetchResult) else FetchResult(url=url, error=str(result))
+            for url, result in zip(urls, results)
+        ]
+
+    async def _do_request(self, url: str, headers: Optional[Dict[str, str]], accept_pdf: bool = False) -> FetchResult:
+        """Executa uma única requisição no backend disponível"""
+        if HAS_AIOHTTP:
+            return await self._request_with_aiohttp(url, headers, accept_pdf)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._fallback_executor, self._request_with_requests, url, headers, accept_pdf
+        )
+
+    # ------------------------------------------------------------------
+    # Política de corpo: tipo, tamanho e leitura em streaming
+    # ------------------------------------------------------------------
+
+    def _classify_response(self, content_type: str, content_length: Optional[str], accept_pdf: bool) -> str:
+        """
+        Decide pelos headers, antes de ler o corpo: 'text', 'pdf' ou 'sniff'
+        (tipo genérico, decide pelos primeiros bytes). Levanta BodyRejected.
+        """
+        if content_type.startswith(PDF_CONTENT_TYPES):
+            if not accept_pdf:
+                raise BodyRejected(f"PDF não solicitado ({content_type})")
+            kind, limit = 'pdf', self.max_pdf_bytes
+        elif content_type.startswith(TEXT_CONTENT_TYPES):
+            kind, limit = 'text', self.max_body_bytes
+        elif content_type in AMBIGUOUS_CONTENT_TYPES:
+            kind, limit = 'sniff', max(self.max_body_bytes, self.max_pdf_bytes if accept_pdf else 0)
+        else:
+            raise BodyRejected(f"tipo não suportado ({content_type})")
+
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            raise BodyRejected(f"corpo declarado de {int(content_length) // 1024} KB excede o limite de {limit // 1024} KB")
+
+        return kind
+
+    def _sniff_kind(self, first_chunk: bytes, accept_pdf: bool) -> str:
+        """Tipo genérico: PDF pela assinatura, binário se houver bytes nulos"""
+        if first_chunk.lstrip()[:5] == b'%PDF-':
+            if not accept_pdf:
+                raise BodyRejected("PDF não solicitado (assinatura %PDF)")
+            return 'pdf'
+        if b'\x00' in first_chunk[:1024]:
+            raise BodyRejected("conteúdo binário")
+        return 'text'
+
+    def _open_spool(self):
+        return tempfile.NamedTemporaryFile(prefix='fetch_', suffix='.pdf', dir=self.spool_dir, delete=False)
+
+    @staticmethod
+    def _decode(body: bytes, content_type: str) -> str:
+        """Charset do header, senão do <meta>, senão UTF-8 (com fallback cp1252)"""
+        match = re.search(r'charset=["\']?([\w-]+)', content_type or '', re.IGNORECASE)
+        encoding = match.group(1) if match else None
+        if not encoding:
+            meta = META_CHARSET_REGEX.search(body[:4096])
+            encoding = meta.group(1).decode('ascii', 'ignore') if meta else None
+
+        for candidate in (encoding, 'utf-8'):
+            if not candidate:
+                continue
+            try:
+                return body.decode(candidate)
+            except (LookupError, UnicodeDecodeError):
+                continue
+        return body.decode('cp1252', errors='replace')
+
+    async def _request_with_aiohttp(self, url: str, headers: Optional[Dict[str, str]], accept_pdf: bool = False) -> FetchResult:
+        """Requisição nativa assíncrona com leitura do corpo em streaming"""
+        session = self._get_aiohttp_session()
+        result = FetchResult(url=url)
+        try:
+            async with session.get(url, headers=headers, allow_redirects=True) as response:
+                result.final_url = str(response.url)
+                result.status = response.status
+                result.headers = {k: v for k, v in response.headers.items()}
+                result.content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+
+                kind = self._classify_response(result.content_type, response.headers.get('Content-Length'), accept_pdf)
+                reader = _BodyReader(self, kind, accept_pdf, result)
+                try:
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        reader.feed(chunk)
+                    reader.finish()
+                except BaseException:
+                    reader.abort()
+                    raise
+                return result
+
+        except BodyRejected as e:
+            # Sai do "async with" sem ler o resto: a conexão é descartada
+            result.error = str(e)
+            result.rejected = True
+            return result
+        except asyncio.TimeoutError:
+            return FetchResult(url=url, error='timeout')
+        except Exception as e:
+            return FetchResult(url=url, error=str(e) or e.__class__.__name__)
+
+    def _request_with_requests(self, url: str, headers: Optional[Dict[str, str]], accept_pdf: bool = False) -> FetchResult:
+        """Requisição bloqueante executada no pool de fallback (stream=True, mesmo teto de bytes)"""
+        session = getattr(self._fallback_local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            self._fallback_local.session = session
+
+        result = FetchResult(url=url)
+        try:
+            with session.get(url, headers=headers, timeout=self.timeout, verify=False,
+                             allow_redirects=True, stream=True) as response:
+                result.final_url = response.url
+                result.status = response.status_code
+                result.headers = dict(response.headers)
+                result.content_type = (response.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+
+                kind = self._classify_response(result.content_type, response.headers.get('Content-Length'), accept_pdf)
+                reader = _BodyReader(self, kind, accept_pdf, result)
+                try:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        reader.feed(chunk)
+                    reader.finish()
+                except BaseException:
+                    reader.abort()
+                    raise
+                return result
+
+        except BodyRejected as e:
+            result.error = str(e)
+            result.rejected = True
+            return result
+        except requests.exceptions.Timeout:
+            return FetchResult(url=url, error='timeout')
+        except Exception as e:
+            return FetchResult(url=url, error=str(e))
+
+    # ------------------------------------------------------------------
+    # Infraestrutura
+    # ------------------------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Inicia (uma vez) o event loop dedicado em thread daemon"""
+        if self._loop is not None and self._loop.is_running():
+            return self._loop
+
+        with self._loop_lock:
+            if self._loop is not None and self._loop.is_running():
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                self._global_semaphore = asyncio.Semaphore(self.max_in_flight)
+                self._host_semaphores = {}
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            if not HAS_AIOHTTP and self._fallback_executor is None:
+                self._fallback_executor = ThreadPoolExecutor(
+                    max_workers=min(self.max_in_flight, 64),
+                    thread_name_prefix='fetch-fallback'
+                )
+
+            thread = threading.Thread(target=run_loop, name='async-fetch-engine', daemon=True)
+            thread.start()
+            ready.wait()
+
+            self._loop = loop
+            self._loop_thread = thread
+            return loop
+
+    def _get_aiohttp_session(self):
+        """Sessão aiohttp única por loop (pool de conexões compartilhado)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_in_flight,
+                limit_per_host=self.per_host_limit,
+                ssl=False,  # Para evitar problemas de SSL
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=DEFAULT_HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+        return self._session
+
+    def _get_host_semaphore(self, host: str) -> asyncio.Semaphore:
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    def _backoff_delay(self, attempt: int, result: FetchResult) -> float:
+        """Backoff exponencial com jitter (o Retry-After é aplicado ao host pelo politeness_scheduler)"""
+        return self.retry_backoff * (2 ** (attempt - 1)) + random.uniform(0, 0.5)
+
+    def _overall_timeout(self) -> float:
+        """Teto de espera da fachada síncrona para uma URL (todas as tentativas)"""
+        return self.max_retries * (self.timeout + self.retry_backoff * 2 ** self.max_retries) + 5
+
+    def _batch_timeout(self, urls: List[str]) -> float:
+        """
+        Teto de espera da fachada para um lote: uma "rodada" de _overall_timeout por
+        leva de downloads, seja a leva limitada pela vaga global ou pela vaga do host
+        mais repetido (muitas URLs do mesmo host andam per_host_limit por vez)
+        """
+        host_counts = Counter(urlparse(url).netloc.lower() for url in urls)
+        largest_host = max(host_counts.values(), default=0)
+        waves = max(
+            len(urls) // self.max_in_flight + 1,
+            largest_host // self.per_host_limit + 1
+        )
+        return self._overall_timeout() * waves
+
+    def _track_in_flight(self, delta: int):
+        self.stats['in_flight'] += delta
+        if self.stats['in_flight'] > self.stats['peak_in_flight']:
+            self.stats['peak_in_flight'] = self.stats['in_flight']
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do motor"""
+        return {
+            **self.stats,
+            'backend': 'aiohttp' if HAS_AIOHTTP else 'requests',
+            'max_in_flight': self.max_in_flight,
+            'per_host_limit': self.per_host_limit,
+            'hosts_tracked': len(self._host_semaphores)
+        }
+
+    def close(self):
+        """Fecha sessão e encerra o loop dedicado"""
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=10)
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao fechar sessão do fetch engine: {e}")
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._session = None
+
+        if self._fallback_executor is not None:
+            self._fallback_executor.shutdown(wait=False)
+            self._fallback_executor = None
+
+        logger.info("🧹 Async Fetch Engine encerrado")
+
+# Instância global
+async_fetch_engine = AsyncFetchEngine()
@@ -11,11 +11,11 @@ import mimetypes
 import re
 from typing import Dict, List, Optional, Any, Tuple
 from werkzeug.datastructures import FileStorage
-import PyPDF2
 import pandas as pd
 from docx import Document
 import json
 from datetime import datetime
+from services.pdf_text_engine import pdf_text_engine
 
 logger = logging.getLogger(__name__)
 
@@ -173,16 +173,10 @@ class AttachmentService:
             return None
 
     def _extract_pdf_content(self, file_path: str) -> Optional[str]:
-        """Extrai texto de arquivo PDF"""
+        """Extrai o texto completo do arquivo PDF (faixas de páginas em paralelo)"""
         try:
-            content = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
-
+            # Anexos são lidos inteiros: os limites PDF_MAX_CHARS/PDF_MAX_PAGES valem só para a pesquisa web
+            content = pdf_text_engine.extract_text(file_path, backend='pypdf2', max_chars=0, max_pages=0, skip_empty=False)
             return content.strip()
 
         except Exception as e:
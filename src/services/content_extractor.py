@@ -13,6 +13,7 @@ from typing import Optional, Dict, Any
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 import re
+from services.politeness_scheduler import politeness_scheduler
 
 logger = logging.getLogger(__name__)
 
@@ -86,7 +87,7 @@ class ContentExtractor:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 jina_url,
                 headers=headers,
                 timeout=60
@@ -109,7 +110,7 @@ class ContentExtractor:
     def _extract_direct(self, url: str) -> Optional[str]:
         """Extração direta usando BeautifulSoup"""
         try:
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url,
                 headers=self.headers,
                 timeout=20,
@@ -154,7 +155,7 @@ class ContentExtractor:
     def _extract_with_readability(self, url: str) -> Optional[str]:
         """Extração usando algoritmo de readability"""
         try:
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url,
                 headers=self.headers,
                 timeout=20,
@@ -201,7 +202,7 @@ class ContentExtractor:
     def _extract_fallback(self, url: str) -> Optional[str]:
         """Extração de fallback mais agressiva"""
         try:
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url,
                 headers=self.headers,
                 timeout=15,
@@ -267,7 +268,7 @@ class ContentExtractor:
     def extract_metadata(self, url: str) -> Dict[str, Any]:
         """Extrai metadados da página"""
         try:
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url,
                 headers=self.headers,
                 timeout=15,
@@ -342,7 +343,7 @@ class ContentExtractor:
     def extract_links(self, url: str, internal_only: bool = True) -> list:
         """Extrai links da página"""
         try:
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url,
                 headers=self.headers,
                 timeout=15,
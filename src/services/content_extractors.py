@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Content Extractors
+Parsing puro de HTML/PDF já baixados (trafilatura, readability, newspaper, lxml, PDF).
+Sem caches, banco, rede ou estatísticas: é o único código que os workers do
+extraction_pool importam, além de html_document e pdf_text_engine.
+"""
+
+import re
+import time
+import logging
+from typing import Dict, List, Optional, Any, Tuple
+
+# Imports condicionais para não quebrar se não estiver instalado
+try:
+    import trafilatura
+    HAS_TRAFILATURA = True
+except ImportError:
+    HAS_TRAFILATURA = False
+
+try:
+    from readability import Document
+    HAS_READABILITY = True
+except ImportError:
+    HAS_READABILITY = False
+
+try:
+    import newspaper
+    from newspaper import Article
+    HAS_NEWSPAPER = True
+except ImportError:
+    HAS_NEWSPAPER = False
+
+from services.html_document import ParsedDocument, HAS_LXML
+from services.pdf_text_engine import pdf_text_engine, HAS_PYPDF2, HAS_PDFPLUMBER
+
+logger = logging.getLogger(__name__)
+
+MIN_CONTENT_LENGTH = 200  # Reduzido de 500 para 200
+MAX_CONTENT_LENGTH = 50000  # 50K chars max
+
+HTML_EXTRACTORS = ['trafilatura', 'readability', 'newspaper', 'beautifulsoup']
+
+DYNAMIC_INDICATORS = [
+    'react', 'angular', 'vue.js', 'spa-',
+    'document.write', 'innerHTML', 'createElement',
+    'loading...', 'carregando...', 'please enable javascript',
+    'javascript required', 'js-', 'ng-', 'v-'
+]
+
+# Tags ignoradas pelas estratégias de estrutura (antes removidas do soup com decompose)
+STRUCTURE_EXCLUDED_TAGS = frozenset(['script', 'style', 'nav', 'header', 'footer', 'aside', 'form'])
+
+# Disponibilidade por extrator (mesmos nomes das estatísticas do RobustContentExtractor)
+AVAILABLE_EXTRACTORS = {
+    'trafilatura': HAS_TRAFILATURA,
+    'readability': HAS_READABILITY,
+    'newspaper': HAS_NEWSPAPER,
+    # Nome mantido por compatibilidade; as estratégias usam a árvore lxml do ParsedDocument
+    'beautifulsoup': HAS_LXML,
+    'pdf_pypdf2': HAS_PYPDF2,
+    'pdf_pdfplumber': HAS_PDFPLUMBER
+}
+
+
+def run_html_extractors(
+    html_content: str,
+    url: str,
+    ordered_names: List[str],
+    skipped_names: List[str]
+) -> Dict[str, Any]:
+    """
+    Parsing e extração do HTML já baixado, sem efeitos colaterais (pode rodar
+    num worker do extraction_pool). Retorna {'content', 'extractor', 'attempts'},
+    com attempts = [(extrator, sucesso, segundos)] para o processo principal registrar.
+    """
+    attempts: List[Tuple[str, bool, float]] = []
+
+    # Parse único compartilhado por detecção de página dinâmica e estratégias
+    document = ParsedDocument(html_content)
+
+    # 5. Verifica se é página dinâmica (JavaScript-heavy)
+    if 'dynamic' not in skipped_names and _is_dynamic_page(document):
+        logger.warning(f"⚠️ Página dinâmica detectada: {url}")
+        # Tenta extração mais agressiva
+        extractor_start = time.time()
+        content = _extract_dynamic_content(document, url)
+        valid = bool(content) and validate_content(content, url)
+        attempts.append(('dynamic', valid, time.time() - extractor_start))
+        if valid:
+            return {'content': content, 'extractor': 'dynamic', 'attempts': attempts}
+
+    # 6. Tenta extratores na ordem do domínio
+    extractor_funcs = {
+        'trafilatura': _extract_with_trafilatura,
+        'readability': _extract_with_readability,
+        'newspaper': _extract_with_newspaper,
+        'beautifulsoup': _extract_with_beautifulsoup
+    }
+
+    for extractor_name in ordered_names:
+        if extractor_name not in extractor_funcs or not AVAILABLE_EXTRACTORS.get(extractor_name, False):
+            continue
+
+        extractor_start = time.time()
+        try:
+            logger.info(f"🔍 Tentando extração com {extractor_name}...")
+            content = extractor_funcs[extractor_name](document, url)
+            extractor_time = time.time() - extractor_start
+
+            if validate_content(content, url):
+                attempts.append((extractor_name, True, extractor_time))
+                logger.info(f"✅ Extração bem-sucedida com {extractor_name}: {len(content)} caracteres em {extractor_time:.2f}s")
+                return {'content': content, 'extractor': extractor_name, 'attempts': attempts}
+
+            attempts.append((extractor_name, False, extractor_time))
+            logger.warning(f"⚠️ Conteúdo insuficiente com {extractor_name}: {len(content) if content else 0} caracteres")
+
+        except Exception as e:
+            attempts.append((extractor_name, False, time.time() - extractor_start))
+            logger.error(f"❌ Erro com {extractor_name}: {str(e)}")
+
+    # 7. Fallback final - extração agressiva
+    logger.warning(f"⚠️ Todos os extratores padrão falharam, tentando extração agressiva...")
+    content = _aggressive_fallback_extraction(document, url)
+    if content and len(content) >= 100:  # Critério mais flexível para fallback
+        logger.info(f"✅ Extração agressiva bem-sucedida: {len(content)} caracteres")
+        return {'content': content, 'extractor': 'aggressive_fallback', 'attempts': attempts}
+
+    return {'content': None, 'extractor': None, 'attempts': attempts}
+
+
+def is_pdf_url(url: str) -> bool:
+    """Verifica se a URL aponta para um PDF"""
+    return (url.lower().endswith('.pdf') or
+            'pdf' in url.lower() or
+            'application/pdf' in url.lower())
+
+
+def run_pdf_extractors(pdf_path: str) -> Dict[str, Any]:
+    """
+    Extrai o texto de um PDF em disco sem efeitos colaterais (pode rodar num
+    worker do extraction_pool). Retorna {'content', 'extractor', 'attempts'}.
+    """
+    attempts: List[Tuple[str, bool, float]] = []
+
+    # PDFPlumber primeiro (melhor para PDFs complexos), PyPDF2 como fallback
+    pdf_extractors = [
+        ('pdf_pdfplumber', 'PDFPlumber', HAS_PDFPLUMBER, _extract_pdf_with_pdfplumber),
+        ('pdf_pypdf2', 'PyPDF2', HAS_PYPDF2, _extract_pdf_with_pypdf2)
+    ]
+
+    for extractor_name, label, available, extractor_func in pdf_extractors:
+        if not available:
+            continue
+
+        extractor_start = time.time()
+        content = extractor_func(pdf_path)
+        success = bool(content) and len(content) > 100
+        attempts.append((extractor_name, success, time.time() - extractor_start))
+        if success:
+            logger.info(f"✅ PDF extraído com {label}: {len(content)} caracteres")
+            return {'content': content, 'extractor': extractor_name, 'attempts': attempts}
+
+    return {'content': None, 'extractor': None, 'attempts': attempts}
+
+
+def _extract_pdf_with_pdfplumber(pdf_path: str) -> Optional[str]:
+    """Extrai texto usando PDFPlumber (faixas de páginas em paralelo, até o limite de texto)"""
+    try:
+        text = pdf_text_engine.extract_text(pdf_path, backend='pdfplumber')
+        return clean_content(text) if text else None
+
+    except Exception as e:
+        logger.error(f"Erro PDFPlumber: {e}")
+        return None
+
+
+def _extract_pdf_with_pypdf2(pdf_path: str) -> Optional[str]:
+    """Extrai texto usando PyPDF2 (faixas de páginas em paralelo, até o limite de texto)"""
+    try:
+        text = pdf_text_engine.extract_text(pdf_path, backend='pypdf2')
+        return clean_content(text) if text else None
+
+    except Exception as e:
+        logger.error(f"Erro PyPDF2: {e}")
+        return None
+
+
+def _is_dynamic_page(document: ParsedDocument) -> bool:
+    """Verifica se é página dinâmica (JavaScript-heavy)"""
+    html = document.html
+    if not html:
+        return False
+
+    # Indicadores de página dinâmica
+    html_lower = document.lowered
+    js_indicators = sum(1 for indicator in DYNAMIC_INDICATORS if indicator in html_lower)
+    if js_indicators <= 3:
+        return False  # Dispensa calcular o texto
+
+    # Se tem muitos indicadores JS e pouco conteúdo de texto
+    # Texto visível: conteúdo de script/style/template não conta
+    text_content = document.text(exclude=frozenset(['script', 'style', 'template'])) if document.tree is not None else html
+    text_ratio = len(text_content.strip()) / len(html)
+
+    return text_ratio < 0.1
+
+
+def _extract_dynamic_content(document: ParsedDocument, url: str) -> Optional[str]:
+    """Extração especializada para conteúdo dinâmico"""
+
+    if document.tree is None:
+        return None
+
+    try:
+        # Ignora scripts e elementos dinâmicos
+        exclude = frozenset(['script', 'style', 'noscript', 'iframe'])
+
+        # Busca por elementos com conteúdo pré-renderizado
+        content_selectors = [
+            '[data-content]', '[data-text]', '.content-loaded',
+            '.server-rendered', '.static-content', '.preloaded',
+            'main', 'article', '.post-content', '.article-content',
+            '.entry-content', '.page-content', '.text-content'
+        ]
+
+        extracted_content = []
+
+        for selector in content_selectors:
+            for element in document.select(selector, exclude):
+                text = document.text(element, exclude, strip=True)
+                if len(text) > 50:  # Conteúdo substancial
+                    extracted_content.append(text)
+
+        if extracted_content:
+            combined = '\n\n'.join(extracted_content)
+            return clean_content(combined)
+
+        # Fallback: extrai todo texto disponível
+        all_text = document.text(exclude=exclude)
+        return clean_content(all_text) if len(all_text) > 100 else None
+
+    except Exception as e:
+        logger.error(f"Erro na extração dinâmica: {e}")
+        return None
+
+
+def _aggressive_fallback_extraction(document: ParsedDocument, url: str) -> Optional[str]:
+    """Extração agressiva como último recurso"""
+
+    if document.tree is None:
+        return None
+
+    try:
+        # Ignora apenas elementos críticos e coleta todo texto disponível
+        all_text = document.text(exclude=frozenset(['script', 'style']))
+
+        # Filtra linhas com conteúdo significativo
+        lines = all_text.split('\n')
+        meaningful_lines = []
+
+        for line in lines:
+            line = line.strip()
+            if (len(line) > 20 and  # Linha substancial
+                not line.lower().startswith(('menu', 'nav', 'footer', 'header')) and
+                not re.match(r'^[\s\W]*$', line)):  # Não só espaços/símbolos
+                meaningful_lines.append(line)
+
+        if meaningful_lines:
+            content = '\n'.join(meaningful_lines)
+            return clean_content(content)
+
+        return None
+
+    except Exception as e:
+        logger.error(f"Erro na extração agressiva: {e}")
+        return None
+
+
+def _extract_with_trafilatura(document: ParsedDocument, url: str) -> Optional[str]:
+    """Extrai com Trafilatura (prioridade 1) com configurações aprimoradas"""
+    if not HAS_TRAFILATURA:
+        return None
+
+    try:
+        # Configurações mais agressivas para trafilatura
+        content = trafilatura.extract(
+            document.html,
+            include_comments=False,
+            include_tables=True,
+            include_formatting=False,
+            favor_precision=False,  # Mudado para False para ser mais inclusivo
+            favor_recall=True,      # Prioriza recuperar mais conteúdo
+            url=url,
+            config=trafilatura.settings.use_config()
+        )
+
+        if content:
+            content = clean_content(content)
+            return content
+
+        return None
+
+    except Exception as e:
+        logger.error(f"Erro Trafilatura: {e}")
+        return None
+
+
+def _extract_with_readability(document: ParsedDocument, url: str) -> Optional[str]:
+    """Extrai com Readability (prioridade 2) com configurações aprimoradas"""
+    if not HAS_READABILITY:
+        return None
+
+    try:
+        # Configurações mais inclusivas
+        doc = Document(document.html, positive_keywords=['content', 'article', 'post', 'text', 'main'])
+        content = doc.summary()
+
+        if content:
+            # Remove tags HTML
+            if HAS_LXML:
+                content = ParsedDocument(content).text()
+            else:
+                # Remove tags manualmente
+                content = re.sub(r'<[^>]+>', '', content)
+
+            content = clean_content(content)
+            return content
+
+        return None
+
+    except Exception as e:
+        logger.error(f"Erro Readability: {e}")
+        return None
+
+
+def _extract_with_newspaper(document: ParsedDocument, url: str) -> Optional[str]:
+    """Extrai com Newspaper3k (prioridade 3) com configurações aprimoradas"""
+    if not HAS_NEWSPAPER:
+        return None
+
+    try:
+        article = Article(url)
+        article.set_html(document.html)
+        article.parse()
+
+        content = article.text
+        if content:
+            content = clean_content(content)
+            return content
+
+        return None
+
+    except Exception as e:
+        logger.error(f"Erro Newspaper: {e}")
+        return None
+
+
+def _extract_with_beautifulsoup(document: ParsedDocument, url: str) -> Optional[str]:
+    """Extrai pela estrutura do documento (fallback final) com estratégia em camadas"""
+    if document.tree is None:
+        return None
+
+    try:
+        # Estratégia em camadas para encontrar conteúdo
+        content_strategies = [
+            # Estratégia 1: Elementos semânticos
+            lambda: _extract_semantic_content(document),
+            # Estratégia 2: Elementos por classe/ID
+            lambda: _extract_by_selectors(document),
+            # Estratégia 3: Maior bloco de texto
+            lambda: _extract_largest_text_block(document),
+            # Estratégia 4: Todo o body
+            lambda: _extract_full_body(document)
+        ]
+
+        for strategy in content_strategies:
+            try:
+                content = strategy()
+                if content and len(content) > 100:
+                    return clean_content(content)
+            except:
+                continue
+
+        return None
+
+    except Exception as e:
+        logger.error(f"Erro na extração por estrutura: {e}")
+        return None
+
+
+def _extract_semantic_content(document: ParsedDocument) -> Optional[str]:
+    """Extrai usando elementos semânticos HTML5"""
+    exclude = STRUCTURE_EXCLUDED_TAGS
+    lengths = document.block_lengths(exclude)
+
+    content_parts = [
+        document.text(element, exclude)
+        for element in document.iter_elements(['article', 'main', 'section'], exclude)
+        if lengths[element] > 50
+    ]
+
+    if content_parts:
+        return '\n\n'.join(content_parts)
+
+    return None
+
+
+def _extract_by_selectors(document: ParsedDocument) -> Optional[str]:
+    """Extrai usando seletores CSS comuns"""
+    exclude = STRUCTURE_EXCLUDED_TAGS
+    lengths = document.block_lengths(exclude)
+    content_selectors = [
+        '.content', '#content', '.post', '.article',
+        '.entry', '.text', '.body', '.main-content',
+        '.post-content', '.article-content', '.entry-content',
+        '.page-content', '.text-content', '.story-content'
+    ]
+
+    for selector in content_selectors:
+        content_parts = [
+            document.text(element, exclude)
+            for element in document.select(selector, exclude)
+            if lengths[element] > 50
+        ]
+
+        if content_parts:
+            return '\n\n'.join(content_parts)
+
+    return None
+
+
+def _extract_largest_text_block(document: ParsedDocument) -> Optional[str]:
+    """Encontra e extrai o maior bloco de texto (pelos tamanhos pré-calculados)"""
+    exclude = STRUCTURE_EXCLUDED_TAGS
+    lengths = document.block_lengths(exclude)
+
+    largest_element = None
+    largest_size = 0
+
+    for element in document.iter_elements(['div', 'section', 'article'], exclude):
+        if lengths[element] > largest_size:
+            largest_size = lengths[element]
+            largest_element = element
+
+    return document.text(largest_element, exclude) if largest_size > 100 else None
+
+
+def _extract_full_body(document: ParsedDocument) -> Optional[str]:
+    """Extrai todo o conteúdo do body como último recurso"""
+    return document.text(document.body, STRUCTURE_EXCLUDED_TAGS)
+
+
+def clean_content(content: str) -> str:
+    """Limpa e normaliza o conteúdo extraído com melhorias"""
+    if not content:
+        return ""
+
+    # Remove quebras de linha excessivas
+    content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)
+
+    # Remove espaços excessivos
+    content = re.sub(r'[ \t]+', ' ', content)
+
+    # Remove caracteres de controle
+    content = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', content)
+
+    # Remove linhas muito curtas (provavelmente navegação)
+    lines = content.split('\n')
+    meaningful_lines = []
+
+    for line in lines:
+        line = line.strip()
+        if (len(line) > 10 and  # Linha substancial
+            not re.match(r'^[\s\W]*$', line) and  # Não só símbolos
+            not line.lower() in ['menu', 'home', 'contato', 'sobre', 'login']):  # Não navegação
+            meaningful_lines.append(line)
+
+    content = '\n'.join(meaningful_lines)
+
+    # Normaliza
+    content = content.strip()
+
+    # Limita tamanho
+    if len(content) > MAX_CONTENT_LENGTH:
+        content = content[:MAX_CONTENT_LENGTH] + "..."
+
+    return content
+
+
+def validate_content(content: str, url: str) -> bool:
+    """Valida se o conteúdo extraído é válido com critérios aprimorados"""
+    if not content:
+        return False
+
+    # Verifica tamanho mínimo (reduzido para ser mais flexível)
+    if len(content) < MIN_CONTENT_LENGTH:
+        logger.warning(f"⚠️ Conteúdo pequeno para {url}: {len(content)} < {MIN_CONTENT_LENGTH}")
+        # Para PDFs, aceita conteúdo menor
+        if is_pdf_url(url) and len(content) > 100:
+            logger.info(f"✅ PDF aceito com conteúdo menor: {len(content)} caracteres")
+            return True
+        return False
+
+    # Verifica se não é só lixo
+    words = content.split()
+    if len(words) < 20:  # Reduzido de 50 para 20
+        logger.warning(f"⚠️ Poucas palavras para {url}: {len(words)}")
+        return False
+
+    # Verifica densidade de conteúdo real
+    common_words = ['o', 'a', 'de', 'da', 'do', 'e', 'em', 'um', 'uma', 'com', 'não', 'para', 'que', 'se', 'é', 'ou']
+    real_words = sum(1 for word in words if any(common in word.lower() for common in common_words))
+
+    if real_words / len(words) < 0.05:  # Reduzido de 0.1 para 0.05
+        logger.warning(f"⚠️ Conteúdo suspeito para {url}: poucos conectivos ({real_words}/{len(words)})")
+        return False
+
+    # Verifica se não é página de erro
+    error_indicators = ['404', 'not found', 'página não encontrada', 'erro', 'error', 'forbidden', 'access denied']
+    content_lower = content.lower()
+
+    error_count = sum(1 for indicator in error_indicators if indicator in content_lower)
+    if error_count > 2 and len(content) < 1000:  # Muitos indicadores de erro em conteúdo pequeno
+        logger.warning(f"⚠️ Possível página de erro para {url}")
+        return False
+
+    logger.info(f"✅ Conteúdo válido para {url}: {len(content)} caracteres, {len(words)} palavras")
+    return True
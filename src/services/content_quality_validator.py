@@ -9,6 +9,8 @@ import logging
 import re
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from services.text_scanner import MultiPatternScanner, TextScan
+from services.relevance_engine import relevance_engine, RelevanceProfile
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +23,7 @@ class ContentQualityValidator:
         self.min_word_count = 100
         self.max_navigation_ratio = 0.3
         self.min_information_density = 0.1
+        self.relevance_term_weight = 15  # Por termo de contexto; ~2 menções já passam do mínimo (20)
         
         # Indicadores de páginas de erro
         self.error_indicators = [
@@ -56,28 +59,59 @@ class ContentQualityValidator:
             'empresa', 'negócio', 'investimento', 'receita', 'lucro'
         ]
         
+        # Palavras comuns em português
+        self.portuguese_words = [
+            'que', 'não', 'uma', 'para', 'com', 'mais', 'como',
+            'mas', 'foi', 'pelo', 'pela', 'até', 'isso', 'ela',
+            'entre', 'depois', 'sem', 'mesmo', 'aos', 'seus',
+            'quem', 'nas', 'me', 'esse', 'eles', 'você', 'tinha',
+            'foram', 'essa', 'num', 'nem', 'suas', 'meu', 'às',
+            'minha', 'numa', 'pelos', 'elas', 'qual', 'nós', 'deles'
+        ]
+        
+        # Listas compiladas uma vez: cada texto é varrido numa única passada
+        self.scanner = MultiPatternScanner(
+            phrase_lists={'error': self.error_indicators},
+            word_lists={
+                'navigation': self.navigation_words,
+                'quality': self.quality_indicators,
+                'portuguese': self.portuguese_words
+            }
+        )
+        
+        self._number_regex = re.compile(r'\d+(?:\.\d+)?%?')
+        self._money_regex = re.compile(r'R\$\s*[\d,\.]+')
+        
         logger.info("Content Quality Validator inicializado")
     
     def validate_content(self, content: str, url: str = "", context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Valida qualidade do conteúdo extraído"""
         
         if not content:
-            return {
-                'valid': False,
-                'score': 0.0,
-                'reason': 'Conteúdo vazio',
-                'details': {}
-            }
+            return self._empty_result()
+        
+        return self._validate_scan(self.scanner.scan(content), url, context)
+    
+    def _empty_result(self) -> Dict[str, Any]:
+        return {
+            'valid': False,
+            'score': 0.0,
+            'reason': 'Conteúdo vazio',
+            'details': {}
+        }
+    
+    def _validate_scan(self, scan: TextScan, url: str = "", context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Aplica as verificações sobre o resultado da varredura"""
         
         # Executa todas as validações
         validations = {
-            'length_check': self._check_content_length(content),
-            'error_page_check': self._check_error_page(content),
-            'navigation_ratio_check': self._check_navigation_ratio(content),
-            'information_density_check': self._check_information_density(content),
-            'language_check': self._check_language(content),
-            'structure_check': self._check_content_structure(content),
-            'relevance_check': self._check_relevance(content, context or {})
+            'length_check': self._check_content_length(scan),
+            'error_page_check': self._check_error_page(scan),
+            'navigation_ratio_check': self._check_navigation_ratio(scan),
+            'information_density_check': self._check_information_density(scan),
+            'language_check': self._check_language(scan),
+            'structure_check': self._check_content_structure(scan),
+            'relevance_check': self._check_relevance(scan, context or {})
         }
         
         # Calcula score geral
@@ -105,14 +139,14 @@ class ContentQualityValidator:
             'score': round(final_score, 2),
             'reason': main_reason,
             'details': validations,
-            'content_stats': self._get_content_stats(content),
+            'content_stats': self._get_content_stats(scan),
             'url': url,
             'validated_at': datetime.now().isoformat()
         }
     
-    def _check_content_length(self, content: str) -> Dict[str, Any]:
+    def _check_content_length(self, scan: TextScan) -> Dict[str, Any]:
         """Verifica comprimento do conteúdo"""
-        length = len(content)
+        length = scan.char_count
         
         if length >= self.min_content_length:
             score = min(100, (length / 2000) * 100)  # Score baseado em 2000 chars como ideal
@@ -133,14 +167,9 @@ class ContentQualityValidator:
                 'value': length
             }
     
-    def _check_error_page(self, content: str) -> Dict[str, Any]:
+    def _check_error_page(self, scan: TextScan) -> Dict[str, Any]:
         """Verifica se é página de erro"""
-        content_lower = content.lower()
-        
-        found_errors = []
-        for indicator in self.error_indicators:
-            if indicator in content_lower:
-                found_errors.append(indicator)
+        found_errors = scan.phrase_matches['error']
         
         if found_errors:
             return {
@@ -159,11 +188,9 @@ class ContentQualityValidator:
                 'value': []
             }
     
-    def _check_navigation_ratio(self, content: str) -> Dict[str, Any]:
+    def _check_navigation_ratio(self, scan: TextScan) -> Dict[str, Any]:
         """Verifica proporção de palavras de navegação"""
-        words = content.lower().split()
-        
-        if len(words) == 0:
+        if scan.word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -172,8 +199,7 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        navigation_count = sum(1 for word in words if word in self.navigation_words)
-        navigation_ratio = navigation_count / len(words)
+        navigation_ratio = scan.category_counts['navigation'] / scan.word_count
         
         if navigation_ratio <= self.max_navigation_ratio:
             score = (1 - navigation_ratio) * 100
@@ -194,11 +220,9 @@ class ContentQualityValidator:
                 'value': navigation_ratio
             }
     
-    def _check_information_density(self, content: str) -> Dict[str, Any]:
+    def _check_information_density(self, scan: TextScan) -> Dict[str, Any]:
         """Verifica densidade de informação"""
-        words = content.lower().split()
-        
-        if len(words) == 0:
+        if scan.word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -207,9 +231,8 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        # Conta palavras informativas
-        info_count = sum(1 for word in words if word in self.quality_indicators)
-        info_density = info_count / len(words)
+        # Proporção de palavras informativas
+        info_density = scan.category_counts['quality'] / scan.word_count
         
         if info_density >= self.min_information_density:
             score = min(100, info_density * 1000)  # Amplifica score
@@ -230,21 +253,9 @@ class ContentQualityValidator:
                 'value': info_density
             }
     
-    def _check_language(self, content: str) -> Dict[str, Any]:
+    def _check_language(self, scan: TextScan) -> Dict[str, Any]:
         """Verifica se o conteúdo está em português"""
-        # Palavras comuns em português
-        portuguese_words = [
-            'que', 'não', 'uma', 'para', 'com', 'mais', 'como',
-            'mas', 'foi', 'pelo', 'pela', 'até', 'isso', 'ela',
-            'entre', 'depois', 'sem', 'mesmo', 'aos', 'seus',
-            'quem', 'nas', 'me', 'esse', 'eles', 'você', 'tinha',
-            'foram', 'essa', 'num', 'nem', 'suas', 'meu', 'às',
-            'minha', 'numa', 'pelos', 'elas', 'qual', 'nós', 'deles'
-        ]
-        
-        words = content.lower().split()
-        
-        if len(words) == 0:
+        if scan.word_count == 0:
             return {
                 'passed': False,
                 'score': 0,
@@ -253,8 +264,7 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        portuguese_count = sum(1 for word in words if word in portuguese_words)
-        portuguese_ratio = portuguese_count / len(words)
+        portuguese_ratio = scan.category_counts['portuguese'] / scan.word_count
         
         if portuguese_ratio >= 0.05:  # Pelo menos 5% de palavras em português
             score = min(100, portuguese_ratio * 500)
@@ -274,32 +284,31 @@ class ContentQualityValidator:
                 'value': portuguese_ratio
             }
     
-    def _check_content_structure(self, content: str) -> Dict[str, Any]:
+    def _check_content_structure(self, scan: TextScan) -> Dict[str, Any]:
         """Verifica estrutura do conteúdo"""
-        lines = content.split('\n')
-        paragraphs = [line.strip() for line in lines if len(line.strip()) > 50]
+        paragraph_count = scan.paragraph_count
         
         # Verifica se tem parágrafos substanciais
-        if len(paragraphs) >= 3:
-            score = min(100, len(paragraphs) * 10)
+        if paragraph_count >= 3:
+            score = min(100, paragraph_count * 10)
             return {
                 'passed': True,
                 'score': score,
                 'weight': 10,
-                'message': f'Boa estrutura: {len(paragraphs)} parágrafos',
-                'value': len(paragraphs)
+                'message': f'Boa estrutura: {paragraph_count} parágrafos',
+                'value': paragraph_count
             }
         else:
-            score = len(paragraphs) * 33
+            score = paragraph_count * 33
             return {
                 'passed': False,
                 'score': score,
                 'weight': 10,
-                'message': f'Estrutura pobre: {len(paragraphs)} parágrafos',
-                'value': len(paragraphs)
+                'message': f'Estrutura pobre: {paragraph_count} parágrafos',
+                'value': paragraph_count
             }
     
-    def _check_relevance(self, content: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _check_relevance(self, scan: TextScan, context: Dict[str, Any]) -> Dict[str, Any]:
         """Verifica relevância do conteúdo para o contexto"""
         if not context:
             return {
@@ -310,26 +319,9 @@ class ContentQualityValidator:
                 'value': 0
             }
         
-        content_lower = content.lower()
-        relevance_score = 0
-        
-        # Verifica termos do contexto
-        context_terms = []
-        
-        if context.get('segmento'):
-            context_terms.append(str(context['segmento']).lower())
-        
-        if context.get('produto'):
-            context_terms.append(str(context['produto']).lower())
-        
-        if context.get('publico'):
-            context_terms.append(str(context['publico']).lower())
-        
-        # Conta ocorrências dos termos
-        for term in context_terms:
-            if term and len(term) > 2:
-                occurrences = content_lower.count(term)
-                relevance_score += occurrences * 10
+        # Segmento, produto e público pelo motor de relevância compartilhado (BM25)
+        profile = RelevanceProfile.for_research(context=context, context_weight=self.relevance_term_weight)
+        relevance_score = round(relevance_engine.score_text(scan.content, profile), 2)
         
         # Normaliza score
         normalized_score = min(100, relevance_score)
@@ -351,38 +343,38 @@ class ContentQualityValidator:
                 'value': relevance_score
             }
     
-    def _get_content_stats(self, content: str) -> Dict[str, Any]:
+    def _get_content_stats(self, scan: TextScan) -> Dict[str, Any]:
         """Obtém estatísticas do conteúdo"""
-        words = content.split()
-        lines = content.split('\n')
-        paragraphs = [line.strip() for line in lines if len(line.strip()) > 50]
+        content = scan.content
         
         # Conta números e percentuais
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
+        number_count = len(self._number_regex.findall(content))
         
         # Conta valores monetários
-        money_values = re.findall(r'R\$\s*[\d,\.]+', content)
+        money_value_count = len(self._money_regex.findall(content))
         
         return {
-            'character_count': len(content),
-            'word_count': len(words),
-            'line_count': len(lines),
-            'paragraph_count': len(paragraphs),
-            'number_count': len(numbers),
-            'money_value_count': len(money_values),
-            'avg_words_per_paragraph': len(words) / max(len(paragraphs), 1),
-            'avg_chars_per_word': len(content) / max(len(words), 1)
+            'character_count': scan.char_count,
+            'word_count': scan.word_count,
+            'line_count': scan.line_count,
+            'paragraph_count': scan.paragraph_count,
+            'number_count': number_count,
+            'money_value_count': money_value_count,
+            'avg_words_per_paragraph': scan.word_count / max(scan.paragraph_count, 1),
+            'avg_chars_per_word': scan.char_count / max(scan.word_count, 1)
         }
     
     def validate_batch(self, content_list: List[Dict[str, Any]], context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Valida múltiplos conteúdos em lote"""
+        """Valida múltiplos conteúdos em lote (uma varredura para o lote inteiro)"""
         results = []
         
-        for i, content_item in enumerate(content_list):
-            content = content_item.get('content', '')
+        contents = [content_item.get('content', '') or '' for content_item in content_list]
+        scans = iter(self.scanner.scan_batch([content for content in contents if content]))
+        
+        for i, (content_item, content) in enumerate(zip(content_list, contents)):
             url = content_item.get('url', f'item_{i}')
             
-            validation = self.validate_content(content, url, context)
+            validation = self._validate_scan(next(scans), url, context) if content else self._empty_result()
             validation['item_index'] = i
             results.append(validation)
         
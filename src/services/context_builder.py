@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Context Builder
+Montagem do contexto de pesquisa dos prompts dentro de um orçamento de tokens
+"""
+
+import os
+import re
+import math
+import logging
+from typing import Dict, List, Optional, Any
+from services.relevance_engine import relevance_engine, tokenize, RelevanceProfile
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_SPLIT_REGEX = re.compile(r'(?<=[.!?;])\s+')
+
+
+class Passage:
+    """Trecho de uma página candidato a entrar no contexto"""
+
+    __slots__ = ('source', 'position', 'text', 'tokens', 'shingles', 'score')
+
+    def __init__(self, source: int, position: int, text: str):
+        self.source = source
+        self.position = position
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        words = tokenize(text)
+        size = ContextBuilder.SHINGLE_SIZE
+        self.shingles = {tuple(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+        self.score = 0.0
+
+
+class ContextPack:
+    """Contexto montado e as estimativas usadas para montá-lo"""
+
+    def __init__(self, text: str, budget: int, stats: Dict[str, Any]):
+        self.text = text
+        self.budget = budget
+        self.stats = stats
+
+    @property
+    def estimated_tokens(self) -> int:
+        return self.stats['estimated_tokens']
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa de tokens sem tokenizador do provedor: o maior entre ~4 caracteres
+    por token e ~1,3 token por palavra (português quebra mais palavras que inglês)
+    """
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 4 / 3))
+
+
+class ContextBuilder:
+    """
+    Quebra as páginas extraídas em trechos, ordena os trechos por relevância (BM25
+    contra o projeto, com bônus para números e valores), descarta trechos que
+    repetem outros já escolhidos e preenche o orçamento de tokens do modelo de destino.
+    """
+
+    # Janela de contexto (tokens) por modelo; provedores sem modelo conhecido usam DEFAULT_CONTEXT_WINDOW
+    MODEL_CONTEXT_WINDOWS = {
+        'gemini-1.5-flash': 1048576,
+        'llama3-70b-8192': 8192,
+        'gpt-3.5-turbo': 16385,
+        'HuggingFaceH4/zephyr-7b-beta': 4096,
+        'google/flan-t5-base': 512
+    }
+    DEFAULT_CONTEXT_WINDOW = 8192
+
+    PASSAGE_TARGET_CHARS = 600
+    PASSAGE_MIN_CHARS = 80
+    SHINGLE_SIZE = 3
+
+    def __init__(self):
+        # Teto do contexto de pesquisa, mesmo em modelos com janela enorme
+        self.max_tokens = int(os.getenv('CONTEXT_MAX_TOKENS', 2500))
+        self.min_tokens = int(os.getenv('CONTEXT_MIN_TOKENS', 300))
+        # Reservado para a resposta e para o restante do prompt (instruções + JSON de exemplo)
+        self.output_reserve = int(os.getenv('CONTEXT_OUTPUT_RESERVE_TOKENS', 2048))
+        self.prompt_reserve = int(os.getenv('CONTEXT_PROMPT_RESERVE_TOKENS', 800))
+        self.duplicate_threshold = float(os.getenv('CONTEXT_DUPLICATE_THRESHOLD', 0.6))
+        self.max_passages_per_source = int(os.getenv('CONTEXT_MAX_PASSAGES_PER_SOURCE', 4))
+
+    def budget_for(self, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+        """
+        Orçamento de tokens do contexto para o provedor/modelo. CONTEXT_BUDGET_<PROVEDOR>
+        fixa o valor; senão é a janela do modelo menos as reservas, limitado a CONTEXT_MAX_TOKENS.
+        """
+        if provider:
+            override = os.getenv(f'CONTEXT_BUDGET_{provider.upper()}')
+            if override:
+                return int(override)
+
+        # Provedores com vários modelos (fallback interno) ficam com a menor janela
+        windows = [
+            self.MODEL_CONTEXT_WINDOWS[name.strip()]
+            for name in (model or '').split(',')
+            if name.strip() in self.MODEL_CONTEXT_WINDOWS
+        ]
+        window = min(windows) if windows else self.DEFAULT_CONTEXT_WINDOW
+
+        available = window - self.output_reserve - self.prompt_reserve
+        return max(self.min_tokens, min(available, self.max_tokens))
+
+    def split_passages(self, source: int, content: str) -> List[Passage]:
+        """Parágrafos agrupados até ~PASSAGE_TARGET_CHARS; parágrafos longos são quebrados por frase"""
+        pieces: List[str] = []
+        for paragraph in re.split(r'\n\s*\n|\n', content or ''):
+            paragraph = ' '.join(paragraph.split())
+            if not paragraph:
+                continue
+            if len(paragraph) <= self.PASSAGE_TARGET_CHARS:
+                pieces.append(paragraph)
+            else:
+                pieces.extend(SENTENCE_SPLIT_REGEX.split(paragraph))
+
+        passages: List[Passage] = []
+        current = ''
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > self.PASSAGE_TARGET_CHARS:
+                passages.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+        if current:
+            passages.append(current)
+
+        # Sobras curtas (menus, rodapés) não carregam evidência
+        return [
+            Passage(source, position, text)
+            for position, text in enumerate(passages)
+            if len(text) >= self.PASSAGE_MIN_CHARS or len(passages) == 1
+        ]
+
+    def _is_duplicate(self, passage: Passage, selected: List[Passage]) -> bool:
+        """Sobreposição de shingles (relativa ao menor trecho) acima do limite"""
+        for other in selected:
+            smaller = min(len(passage.shingles), len(other.shingles)) or 1
+            if len(passage.shingles & other.shingles) / smaller >= self.duplicate_threshold:
+                return True
+        return False
+
+    def build(
+        self,
+        pages: List[Dict[str, Any]],
+        profile: RelevanceProfile,
+        budget: int,
+        header: str = ''
+    ) -> ContextPack:
+        """
+        Monta o contexto com os melhores trechos que cabem em `budget` tokens.
+        Os trechos aparecem agrupados por fonte (fontes mais relevantes primeiro) e
+        na ordem original dentro de cada fonte.
+        """
+        passages: List[Passage] = []
+        for source, page in enumerate(pages):
+            passages.extend(self.split_passages(source, page.get('content', '')))
+
+        index = relevance_engine.new_index()
+        for passage in passages:
+            index.add(f"{passage.source}:{passage.position}", passage.text)
+        for passage in passages:
+            passage.score = index.score(f"{passage.source}:{passage.position}", profile)
+
+        # Mais relevantes primeiro; empate mantém a ordem de extração
+        ranked = sorted(passages, key=lambda p: -p.score)
+
+        used_tokens = estimate_tokens(header)
+        selected: List[Passage] = []
+        per_source: Dict[int, int] = {}
+        duplicates = 0
+
+        for passage in ranked:
+            if per_source.get(passage.source, 0) >= self.max_passages_per_source:
+                continue
+            if self._is_duplicate(passage, selected):
+                duplicates += 1
+                continue
+
+            # Primeiro trecho da fonte também paga o cabeçalho (título + URL)
+            cost = passage.tokens
+            if passage.source not in per_source:
+                cost += estimate_tokens(self._source_header(0, pages[passage.source]))
+            if used_tokens + cost > budget:
+                continue
+
+            selected.append(passage)
+            per_source[passage.source] = per_source.get(passage.source, 0) + 1
+            used_tokens += cost
+
+        text = header + self._render(pages, selected)
+        stats = {
+            'budget_tokens': budget,
+            'estimated_tokens': estimate_tokens(text),
+            'passages_total': len(passages),
+            'passages_used': len(selected),
+            'duplicates_skipped': duplicates,
+            'sources_total': len(pages),
+            'sources_used': len(per_source),
+            'characters': len(text)
+        }
+
+        logger.info(
+            f"🧩 Contexto montado: ~{stats['estimated_tokens']}/{budget} tokens, "
+            f"{len(selected)}/{len(passages)} trechos de {len(per_source)}/{len(pages)} fontes "
+            f"({duplicates} duplicados descartados)"
+        )
+        return ContextPack(text, budget, stats)
+
+    @staticmethod
+    def _source_header(number: int, page: Dict[str, Any]) -> str:
+        return f"--- FONTE REAL {number}: {page.get('title', '')} ---\nURL: {page.get('url', '')}\n"
+
+    def _render(self, pages: List[Dict[str, Any]], selected: List[Passage]) -> str:
+        # Ordem das fontes = ordem do melhor trecho de cada uma
+        by_source: Dict[int, List[Passage]] = {}
+        for passage in selected:
+            by_source.setdefault(passage.source, []).append(passage)
+
+        blocks = []
+        for number, (source, source_passages) in enumerate(by_source.items(), 1):
+            source_passages.sort(key=lambda p: p.position)
+            excerpts = '\n'.join(f"• {p.text}" for p in source_passages)
+            blocks.append(f"{self._source_header(number, pages[source])}Trechos:\n{excerpts}\n")
+
+        return '\n'.join(blocks)
+
+# Instância global
+context_builder = ContextBuilder()
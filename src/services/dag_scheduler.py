@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - DAG Scheduler
+Agendador de tarefas com dependências declaradas e limites por classe de recurso
+"""
+
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Callable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DAGTask:
+    """Tarefa do DAG: recebe {entrada: valor} das dependências declaradas"""
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    inputs: List[str] = field(default_factory=list)
+    resource: str = 'cpu'
+    timeout: Optional[float] = None  # Sobrescreve o task_timeout padrão
+
+
+class DAGScheduler:
+    """
+    Executa cada tarefa assim que suas entradas ficam prontas, em um pool por
+    classe de recurso (ex.: 'llm', 'cpu'). Tarefas que falham ou estouram o
+    tempo recebem valor de fallback para não travar as dependentes; se on_error
+    levantar exceção, o DAG é abortado e as tarefas não iniciadas, canceladas.
+
+    Uma tarefa abandonada por timeout continua ocupando a thread do pool até
+    terminar, então segue contando no limite da sua classe de recurso.
+    """
+
+    def __init__(self, resource_limits: Dict[str, int]):
+        self.resource_limits = resource_limits
+
+    def run(
+        self,
+        tasks: List[DAGTask],
+        initial: Optional[Dict[str, Any]] = None,
+        on_complete: Optional[Callable[[str, Any], None]] = None,
+        on_error: Optional[Callable[[str, Exception, Dict[str, Any]], Any]] = None,
+        timeout: Optional[float] = None,
+        task_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Executa o DAG e retorna {nome: resultado} (inclui os valores iniciais)"""
+
+        results = dict(initial or {})
+        tasks_by_name = {task.name: task for task in tasks}
+        self._validate(tasks_by_name, results)
+
+        executors = {
+            resource: ThreadPoolExecutor(max_workers=limit, thread_name_prefix=f'dag-{resource}')
+            for resource, limit in self.resource_limits.items()
+        }
+
+        waiting = dict(tasks_by_name)
+        running = {}  # future -> (task, started_at)
+        abandoned = {}  # future -> task (estourou o tempo, mas a thread ainda roda)
+        deadline = time.time() + timeout if timeout else None
+
+        def resolve(task: DAGTask, value: Any):
+            results[task.name] = value
+            if on_complete:
+                on_complete(task.name, value)
+
+        def fail(task: DAGTask, error: Exception):
+            logger.error(f"❌ Tarefa {task.name} falhou: {error}")
+            inputs = {name: results.get(name) for name in task.inputs}
+            resolve(task, on_error(task.name, error, inputs) if on_error else None)
+
+        try:
+            while waiting or running:
+                # Submete o que já tem entradas prontas e vaga na sua classe de recurso
+                # (só entra no pool quando vai rodar, para o timeout contar do início real)
+                in_use = {}
+                for task in [task for task, _ in running.values()] + list(abandoned.values()):
+                    in_use[task.resource] = in_use.get(task.resource, 0) + 1
+
+                for name, task in list(waiting.items()):
+                    if in_use.get(task.resource, 0) >= self.resource_limits[task.resource]:
+                        continue
+                    if all(dep in results for dep in task.inputs):
+                        in_use[task.resource] = in_use.get(task.resource, 0) + 1
+                        inputs = {dep: results[dep] for dep in task.inputs}
+                        future = executors[task.resource].submit(task.func, inputs)
+                        running[future] = (task, time.time())
+                        del waiting[name]
+
+                if not running and not (waiting and abandoned):
+                    break
+
+                now = time.time()
+                wait_timeout = None
+                if deadline:
+                    wait_timeout = max(0.0, deadline - now)
+                task_deadlines = [
+                    started + (task.timeout or task_timeout)
+                    for task, started in running.values()
+                    if task.timeout or task_timeout
+                ]
+                if task_deadlines:
+                    task_remaining = max(0.0, min(task_deadlines) - now)
+                    wait_timeout = task_remaining if wait_timeout is None else min(wait_timeout, task_remaining)
+
+                done, _ = wait(list(running) + list(abandoned), timeout=wait_timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future in abandoned:
+                        # Resultado tardio é descartado; só libera a vaga
+                        del abandoned[future]
+                        continue
+                    task, _ = running.pop(future)
+                    try:
+                        resolve(task, future.result())
+                    except Exception as e:
+                        fail(task, e)
+
+                now = time.time()
+                if deadline and now >= deadline:
+                    logger.error(f"⏰ Timeout global do DAG - {len(running) + len(waiting)} tarefas pendentes")
+                    for future, (task, _) in list(running.items()):
+                        future.cancel()
+                        fail(task, TimeoutError(f"timeout global ({timeout}s)"))
+                    running.clear()
+                    # Tarefas que ainda não começaram recebem fallback
+                    for task in list(waiting.values()):
+                        fail(task, TimeoutError(f"timeout global ({timeout}s)"))
+                    waiting.clear()
+                    break
+
+                for future, (task, started) in list(running.items()):
+                    limit = task.timeout or task_timeout
+                    if limit and now - started >= limit:
+                        future.cancel()
+                        del running[future]
+                        abandoned[future] = task
+                        fail(task, TimeoutError(f"timeout da tarefa ({limit}s)"))
+
+        finally:
+            # Não espera tarefas abandonadas por timeout
+            for executor in executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    def _validate(self, tasks_by_name: Dict[str, DAGTask], initial: Dict[str, Any]):
+        """Garante entradas conhecidas, recursos configurados e ausência de ciclos"""
+        known = set(tasks_by_name) | set(initial)
+
+        for task in tasks_by_name.values():
+            missing = [dep for dep in task.inputs if dep not in known]
+            if missing:
+                raise ValueError(f"Tarefa {task.name} depende de entradas inexistentes: {missing}")
+            if task.resource not in self.resource_limits:
+                raise ValueError(f"Tarefa {task.name} usa recurso sem limite configurado: {task.resource}")
+
+        # Ordenação topológica só para detectar ciclos
+        resolved = set(initial)
+        pending = dict(tasks_by_name)
+        while pending:
+            ready = [name for name, task in pending.items() if all(dep in resolved for dep in task.inputs)]
+            if not ready:
+                raise ValueError(f"Ciclo de dependências entre: {sorted(pending)}")
+            for name in ready:
+                resolved.add(name)
+                del pending[name]
+
+    @staticmethod
+    def critical_path(tasks: List[DAGTask], durations: Dict[str, float]) -> float:
+        """Duração da cadeia de dependências mais longa (para diagnóstico)"""
+        tasks_by_name = {task.name: task for task in tasks}
+        memo = {}
+
+        def finish(name: str) -> float:
+            if name not in tasks_by_name:
+                return 0.0
+            if name not in memo:
+                task = tasks_by_name[name]
+                memo[name] = durations.get(name, 0.0) + max((finish(dep) for dep in task.inputs), default=0.0)
+            return memo[name]
+
+        return max((finish(name) for name in tasks_by_name), default=0.0)
@@ -15,6 +15,9 @@ import json
 from datetime import datetime
 from bs4 import BeautifulSoup
 import re
+from services.relevance_engine import relevance_engine, RelevanceProfile, BM25Index
+from services.politeness_scheduler import politeness_scheduler
+from services.fetch_health import fetch_health
 
 logger = logging.getLogger(__name__)
 
@@ -63,36 +66,42 @@ class DeepSearchService:
                 logger.info("🌐 Executando Google Custom Search REAL...")
                 google_results = self._google_search_real(query, max_results // 2)
                 search_results.extend(google_results)
-                time.sleep(1)  # Rate limiting
             
             # 2. BUSCA REAL COM BING
             logger.info("🔍 Executando Bing Search REAL...")
             bing_results = self._bing_search_real(query, max_results // 3)
             search_results.extend(bing_results)
-            time.sleep(1)
             
             # 3. BUSCA REAL COM DUCKDUCKGO
             logger.info("🦆 Executando DuckDuckGo Search REAL...")
             ddg_results = self._duckduckgo_search_real(query, max_results // 3)
             search_results.extend(ddg_results)
-            time.sleep(1)
             
             # 4. EXTRAI CONTEÚDO REAL DAS PÁGINAS ENCONTRADAS
             content_results = []
+            relevance_index = relevance_engine.new_index()
+            relevance_profile = self._build_relevance_profile(query, context_data)
             logger.info(f"📄 Extraindo conteúdo REAL de {len(search_results)} páginas...")
             
-            for i, result in enumerate(search_results[:15]):  # Top 15 páginas
-                logger.info(f"📖 Extraindo página {i+1}/15: {result.get('title', 'Sem título')}")
+            # Top 15 páginas, sem as que falharam há pouco (a vaga vai para o próximo resultado)
+            fresh_results = fetch_health.take_fresh(search_results, 15)
+            for i, result in enumerate(fresh_results):
+                logger.info(f"📖 Extraindo página {i+1}/{len(fresh_results)}: {result.get('title', 'Sem título')}")
                 content = self._extract_real_page_content(result.get('url', ''))
                 if content and len(content) > 200:  # Só conteúdo substancial
                     content_results.append({
                         'title': result.get('title', ''),
                         'url': result.get('url', ''),
                         'content': content,
-                        'relevance_score': self._calculate_real_relevance(content, query, context_data),
+                        'relevance_score': self._calculate_real_relevance(
+                            content, query, context_data, relevance_index, result.get('url', ''), relevance_profile
+                        ),
                         'source_engine': result.get('source', 'unknown')
                     })
-                    time.sleep(0.5)  # Rate limiting
+            
+            # Recalcula com as estatísticas finais do corpus (IDF de todas as páginas)
+            for result in content_results:
+                result['relevance_score'] = relevance_index.score(result['url'], relevance_profile)
             
             # 5. PROCESSA COM ANÁLISE REAL
             processed_content = self._process_real_content(query, context_data, content_results)
@@ -125,7 +134,7 @@ class DeepSearchService:
                 'sort': 'date'
             }
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 self.google_search_url, 
                 params=params, 
                 headers=self.headers,
@@ -160,7 +169,7 @@ class DeepSearchService:
         try:
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 search_url,
                 headers=self.headers,
                 timeout=15
@@ -205,7 +214,7 @@ class DeepSearchService:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 search_url,
                 headers=self.headers,
                 timeout=15
@@ -247,6 +256,12 @@ class DeepSearchService:
         if not url or not url.startswith("http"):
             return None
         
+        # URL que falhou há pouco ou host instável: não gasta requisição
+        skip_reason = fetch_health.should_skip(url)
+        if skip_reason:
+            logger.info(f"⏭️ Pulando {url}: {skip_reason}")
+            return None
+        
         try:
             # Tenta primeiro com Jina Reader se disponível
             if self.jina_api_key:
@@ -272,7 +287,7 @@ class DeepSearchService:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 jina_url,
                 headers=headers,
                 timeout=30
@@ -298,12 +313,13 @@ class DeepSearchService:
         """Extração REAL direta usando requests + BeautifulSoup"""
         
         try:
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url,
                 headers=self.headers,
                 timeout=20,
                 allow_redirects=True
             )
+            fetch_health.record(url, response.status_code, text_length=len(response.content), min_length=500)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -344,79 +360,52 @@ class DeepSearchService:
                 return None
                 
         except Exception as e:
+            fetch_health.record_exception(url, e)
             logger.error(f"❌ Erro na extração direta REAL para {url}: {str(e)}")
             return None
     
+    # Termos de mercado que reforçam a relevância
+    MARKET_TERMS = [
+        "mercado brasileiro", "brasil", "dados", "estatística", "pesquisa", 
+        "relatório", "análise", "tendência", "oportunidade", "crescimento", 
+        "demanda", "inovação", "tecnologia", "2024", "2025", "investimento",
+        "startup", "empresa", "negócio", "consumidor", "cliente", "vendas"
+    ]
+    
+    def _build_relevance_profile(self, query: str, context: Dict[str, Any]) -> RelevanceProfile:
+        """Perfil de relevância da busca profunda (pesos do DeepSearch)"""
+        
+        return RelevanceProfile.for_research(
+            query, context,
+            query_weight=3.0,
+            context_weight=2.0,
+            market_terms=self.MARKET_TERMS,
+            market_weight=1.0,
+            number_weight=0.5,
+            money_weight=1.0,
+            length_bonuses=[(1000, 5.0), (500, 3.0)]
+        )
+    
     def _calculate_real_relevance(
         self, 
         content: str, 
         query: str, 
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        index: Optional[BM25Index] = None,
+        doc_id: Optional[str] = None,
+        profile: Optional[RelevanceProfile] = None
     ) -> float:
-        """Calcula score de relevância REAL do conteúdo"""
+        """Calcula score de relevância REAL do conteúdo (BM25 do motor compartilhado)"""
         
         if not content or len(content) < 100:
             return 0.0
         
-        content_lower = content.lower()
-        query_lower = query.lower()
-        
-        score = 0.0
-        
-        # Score baseado na query (peso alto)
-        query_words = [w for w in query_lower.split() if len(w) > 2]
-        for word in query_words:
-            occurrences = content_lower.count(word)
-            score += occurrences * 3.0  # Peso aumentado
-        
-        # Score baseado no contexto
-        context_terms = []
-        
-        if context.get("segmento"):
-            context_terms.append(str(context["segmento"]).lower())
-        
-        if context.get("produto"):
-            context_terms.append(str(context["produto"]).lower())
-        
-        if context.get("publico"):
-            context_terms.append(str(context["publico"]).lower())
-        
-        for term in context_terms:
-            if term and len(term) > 2:
-                occurrences = content_lower.count(term)
-                score += occurrences * 2.0
-        
-        # Bonus para termos de mercado específicos REAIS
-        market_terms = [
-            "mercado brasileiro", "brasil", "dados", "estatística", "pesquisa", 
-            "relatório", "análise", "tendência", "oportunidade", "crescimento", 
-            "demanda", "inovação", "tecnologia", "2024", "2025", "investimento",
-            "startup", "empresa", "negócio", "consumidor", "cliente", "vendas"
-        ]
-        
-        for term in market_terms:
-            occurrences = content_lower.count(term)
-            score += occurrences * 1.0
-        
-        # Bonus por densidade de informação REAL
-        word_count = len(content.split())
-        if word_count > 1000:
-            score += 5.0
-        elif word_count > 500:
-            score += 3.0
-        
-        # Bonus por presença de números/percentuais REAIS
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        score += len(numbers) * 0.5
-        
-        # Bonus por presença de valores monetários REAIS
-        money_values = re.findall(r'R\$\s*[\d,\.]+', content)
-        score += len(money_values) * 1.0
-        
-        # Normaliza score baseado no tamanho do conteúdo
-        normalized_score = score / (len(content) / 1000 + 1)
+        profile = profile or self._build_relevance_profile(query, context)
+        if index is None:
+            return relevance_engine.score_text(content, profile)
         
-        return min(normalized_score, 100.0)
+        index.add(doc_id, content)
+        return index.score(doc_id, profile)
     
     def _enhance_query_real(self, query: str) -> str:
         """Melhora a query de busca para pesquisa REAL de mercado"""
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Domain Reputation
+Histórico de sucesso/falha de extração por domínio, usado para ranquear URLs
+e para escolher a ordem dos extratores em cada domínio
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Any, Tuple
+from urllib.parse import urlparse
+
+from services.sqlite_connections import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+
+def get_domain(url: str) -> str:
+    """Domínio normalizado (sem www.) de uma URL"""
+    domain = urlparse(url).netloc.lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+
+class DomainReputation:
+    """Reputação de extração por domínio, em memória com persistência SQLite"""
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.db_path = os.path.join(cache_dir, "domain_reputation.db")
+        self.min_multiplier = 0.5   # Domínio que sempre falha
+        self.max_multiplier = 1.5   # Domínio que sempre funciona
+
+        # Roteamento de extratores
+        self.extractor_skip_failures = int(os.getenv('EXTRACTOR_SKIP_AFTER_FAILURES', 4))
+        self.hopeless_min_failures = int(os.getenv('DOMAIN_HOPELESS_AFTER_FAILURES', 6))
+        self.hopeless_max_success_rate = float(os.getenv('DOMAIN_HOPELESS_MAX_SUCCESS_RATE', 0.05))
+        self.hopeless_retry_after = int(os.getenv('DOMAIN_HOPELESS_RETRY_SECONDS', 86400))
+
+        self._connections = SQLiteConnections(self.db_path, pragmas=('journal_mode=WAL',))
+        self._lock = threading.Lock()
+        self._domains: Dict[str, Dict[str, float]] = {}
+        # domínio -> extrator -> {successes, failures, total_time}
+        self._extractors: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_database()
+        self._load()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _init_database(self):
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS domain_reputation (
+                    domain TEXT PRIMARY KEY,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS domain_extractor_stats (
+                    domain TEXT NOT NULL,
+                    extractor TEXT NOT NULL,
+                    successes INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    total_time REAL NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (domain, extractor)
+                )
+            """)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar reputação de domínios: {e}")
+
+    def _load(self):
+        """Carrega histórico persistido para memória"""
+        try:
+            conn = self._get_connection()
+            rows = conn.execute(
+                "SELECT domain, successes, failures, updated_at FROM domain_reputation"
+            ).fetchall()
+            extractor_rows = conn.execute(
+                "SELECT domain, extractor, successes, failures, total_time FROM domain_extractor_stats"
+            ).fetchall()
+            with self._lock:
+                for domain, successes, failures, updated_at in rows:
+                    self._domains[domain] = {'successes': successes, 'failures': failures, 'updated_at': updated_at}
+                for domain, extractor, successes, failures, total_time in extractor_rows:
+                    self._extractors.setdefault(domain, {})[extractor] = {
+                        'successes': successes, 'failures': failures, 'total_time': total_time
+                    }
+        except Exception as e:
+            logger.error(f"Erro ao carregar reputação de domínios: {e}")
+
+    def _record(self, url: str, success: bool):
+        domain = get_domain(url)
+        if not domain:
+            return
+
+        with self._lock:
+            entry = self._domains.setdefault(domain, {'successes': 0, 'failures': 0})
+            entry['successes' if success else 'failures'] += 1
+            entry['updated_at'] = time.time()
+
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                INSERT INTO domain_reputation (domain, successes, failures, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(domain) DO UPDATE SET
+                    successes = successes + excluded.successes,
+                    failures = failures + excluded.failures,
+                    updated_at = excluded.updated_at
+            """, (domain, 1 if success else 0, 0 if success else 1, time.time()))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao salvar reputação de {domain}: {e}")
+
+    def record_success(self, url: str):
+        """Registra extração bem-sucedida"""
+        self._record(url, True)
+
+    def record_failure(self, url: str):
+        """Registra extração falha"""
+        self._record(url, False)
+
+    def get_multiplier(self, url: str) -> float:
+        """
+        Fator de ranking do domínio: 1.0 sem histórico, até max_multiplier para
+        domínios confiáveis e até min_multiplier para domínios que sempre falham.
+        Usa taxa de sucesso suavizada (Laplace) para não punir/premiar com poucos dados.
+        """
+        with self._lock:
+            entry = self._domains.get(get_domain(url))
+
+        if not entry:
+            return 1.0
+
+        success_rate = (entry['successes'] + 1) / (entry['successes'] + entry['failures'] + 2)
+        return self.min_multiplier + (self.max_multiplier - self.min_multiplier) * success_rate
+
+    def record_extractor(self, url: str, extractor: str, success: bool, elapsed: float = 0.0):
+        """Registra o resultado de um extrator específico no domínio (tempo só conta em sucessos)"""
+        domain = get_domain(url)
+        if not domain:
+            return
+
+        elapsed = elapsed if success else 0.0
+        with self._lock:
+            entry = self._extractors.setdefault(domain, {}).setdefault(
+                extractor, {'successes': 0, 'failures': 0, 'total_time': 0.0}
+            )
+            entry['successes' if success else 'failures'] += 1
+            entry['total_time'] += elapsed
+
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                INSERT INTO domain_extractor_stats (domain, extractor, successes, failures, total_time, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(domain, extractor) DO UPDATE SET
+                    successes = successes + excluded.successes,
+                    failures = failures + excluded.failures,
+                    total_time = total_time + excluded.total_time,
+                    updated_at = excluded.updated_at
+            """, (domain, extractor, 1 if success else 0, 0 if success else 1, elapsed, time.time()))
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao salvar estatística do extrator {extractor} em {domain}: {e}")
+
+    def order_extractors(self, url: str, extractors: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Ordem de tentativa dos extratores no domínio: maior taxa de sucesso suavizada
+        primeiro, depois menor tempo médio; sem histórico mantém a ordem padrão.
+        Extratores que nunca funcionaram no domínio após várias tentativas são pulados.
+        Retorna (ordenados, pulados).
+        """
+        with self._lock:
+            history = dict(self._extractors.get(get_domain(url), {}))
+
+        if not history:
+            return list(extractors), []
+
+        ordered, skipped = [], []
+        for position, name in enumerate(extractors):
+            entry = history.get(name)
+            if not entry:
+                ordered.append((0.5, 0.0, position, name))
+                continue
+            if not entry['successes'] and entry['failures'] >= self.extractor_skip_failures:
+                skipped.append(name)
+                continue
+            success_rate = (entry['successes'] + 1) / (entry['successes'] + entry['failures'] + 2)
+            avg_time = entry['total_time'] / entry['successes'] if entry['successes'] else 0.0
+            ordered.append((success_rate, avg_time, position, name))
+
+        ordered.sort(key=lambda item: (-item[0], item[1], item[2]))
+        return [name for *_, name in ordered], skipped
+
+    def is_hopeless(self, url: str) -> bool:
+        """
+        Domínio em que a extração praticamente nunca funciona: pula sem baixar.
+        Depois de DOMAIN_HOPELESS_RETRY_SECONDS sem tentativas, libera uma nova
+        tentativa (que renova o prazo se falhar de novo).
+        """
+        with self._lock:
+            entry = self._domains.get(get_domain(url))
+            if not entry or entry['failures'] < self.hopeless_min_failures:
+                return False
+
+            total = entry['successes'] + entry['failures']
+            if entry['successes'] / total > self.hopeless_max_success_rate:
+                return False
+
+            now = time.time()
+            if now - entry.get('updated_at', 0) >= self.hopeless_retry_after:
+                entry['updated_at'] = now  # Uma nova tentativa por janela
+                return False
+
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resumo da reputação"""
+        with self._lock:
+            domains = dict(self._domains)
+            routed_domains = len(self._extractors)
+
+        ranked = sorted(
+            domains.items(),
+            key=lambda item: item[1]['successes'] - item[1]['failures']
+        )
+        return {
+            'domains_tracked': len(domains),
+            'worst_domains': [domain for domain, _ in ranked[:10]],
+            'best_domains': [domain for domain, _ in ranked[-10:][::-1]],
+            'domains_with_extractor_history': routed_domains
+        }
+
+# Instância global
+domain_reputation = DomainReputation()
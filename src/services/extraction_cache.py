@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Extraction Cache
+Cache persistente de conteúdo extraído, indexado pela URL já resolvida
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Any
+
+from services.sqlite_connections import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """Cache em disco (SQLite) de páginas extraídas com TTL, LRU por tamanho e revalidação condicional"""
+
+    def __init__(self, cache_dir: str = "cache", ttl: int = None, max_size_mb: int = None):
+        self.cache_dir = cache_dir
+        self.db_path = os.path.join(cache_dir, "extraction_cache.db")
+        self.enabled = os.getenv('EXTRACTION_CACHE_ENABLED', 'true').lower() == 'true'
+        self.ttl = ttl if ttl is not None else int(os.getenv('EXTRACTION_CACHE_TTL', 86400))
+        max_mb = max_size_mb if max_size_mb is not None else int(os.getenv('EXTRACTION_CACHE_MAX_MB', 200))
+        self.max_size_bytes = max_mb * 1024 * 1024
+        self.eviction_check_interval = 50  # Verifica tamanho a cada N gravações
+        # last_access só é regravado se estiver mais velho que isso: o LRU não precisa de
+        # precisão de segundos, e gravar a cada hit levaria o lock de escrita a toda leitura
+        self.access_update_interval = int(os.getenv('EXTRACTION_CACHE_ACCESS_UPDATE_INTERVAL', 300))
+
+        self._connections = SQLiteConnections(self.db_path)
+        self._write_lock = threading.Lock()
+        self._writes_since_check = 0
+
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'revalidated': 0,
+            'stores': 0,
+            'evictions': 0
+        }
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_database()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Conexão por thread, reaberta em cada processo após fork"""
+        return self._connections.get()
+
+    def _init_database(self):
+        """Inicializa tabela do cache"""
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS extraction_cache (
+                    url TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    extractor TEXT,
+                    content_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    size INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_extraction_last_access ON extraction_cache(last_access)")
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar cache de extração: {e}")
+            self.enabled = False
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a entrada do cache (mesmo expirada) com o campo 'fresh'.
+        Entradas expiradas continuam úteis para revalidação condicional.
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            conn = self._get_connection()
+            row = conn.execute(
+                "SELECT content, extractor, content_hash, fetched_at, etag, last_modified, last_access "
+                "FROM extraction_cache WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+            if not row:
+                self.stats['misses'] += 1
+                return None
+
+            content, extractor, content_hash, fetched_at, etag, last_modified, last_access = row
+            now = time.time()
+            fresh = now - fetched_at < self.ttl
+
+            if now - last_access >= self.access_update_interval:
+                with self._write_lock:
+                    conn.execute("UPDATE extraction_cache SET last_access = ? WHERE url = ?", (now, url))
+                    conn.commit()
+
+            if fresh:
+                self.stats['hits'] += 1
+            else:
+                self.stats['stale_hits'] += 1
+
+            return {
+                'url': url,
+                'content': content,
+                'extractor': extractor,
+                'content_hash': content_hash,
+                'fetched_at': fetched_at,
+                'etag': etag,
+                'last_modified': last_modified,
+                'fresh': fresh
+            }
+
+        except Exception as e:
+            logger.error(f"Erro ao ler cache de extração: {e}")
+            return None
+
+    def set(
+        self,
+        url: str,
+        content: str,
+        extractor: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        """Armazena conteúdo extraído"""
+        if not self.enabled or not content:
+            return
+
+        try:
+            now = time.time()
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            size = len(content.encode('utf-8'))
+
+            conn = self._get_connection()
+            with self._write_lock:
+                conn.execute("""
+                    INSERT OR REPLACE INTO extraction_cache
+                    (url, content, extractor, content_hash, fetched_at, last_access, etag, last_modified, size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (url, content, extractor, content_hash, now, now, etag, last_modified, size))
+                conn.commit()
+                self._writes_since_check += 1
+                check_size = self._writes_since_check >= self.eviction_check_interval
+                if check_size:
+                    self._writes_since_check = 0
+
+            self.stats['stores'] += 1
+
+            if check_size:
+                self.evict_if_needed()
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache de extração: {e}")
+
+    def mark_revalidated(self, url: str):
+        """Servidor respondeu 304: renova o TTL sem tocar no conteúdo"""
+        if not self.enabled:
+            return
+
+        try:
+            now = time.time()
+            conn = self._get_connection()
+            with self._write_lock:
+                conn.execute(
+                    "UPDATE extraction_cache SET fetched_at = ?, last_access = ? WHERE url = ?",
+                    (now, now, url)
+                )
+                conn.commit()
+            self.stats['revalidated'] += 1
+
+        except Exception as e:
+            logger.error(f"Erro ao revalidar cache de extração: {e}")
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+        """Headers If-None-Match / If-Modified-Since para uma entrada expirada"""
+        if not entry:
+            return None
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        return headers or None
+
+    def evict_if_needed(self):
+        """Remove entradas menos acessadas até ficar abaixo de 90% do limite"""
+        try:
+            conn = self._get_connection()
+            total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extraction_cache").fetchone()[0]
+
+            if total_size <= self.max_size_bytes:
+                return
+
+            target = int(self.max_size_bytes * 0.9)
+            to_free = total_size - target
+            freed = 0
+            urls_to_delete = []
+
+            for url, size in conn.execute("SELECT url, size FROM extraction_cache ORDER BY last_access ASC"):
+                urls_to_delete.append((url,))
+                freed += size
+                if freed >= to_free:
+                    break
+
+            with self._write_lock:
+                conn.executemany("DELETE FROM extraction_cache WHERE url = ?", urls_to_delete)
+                conn.commit()
+
+            self.stats['evictions'] += len(urls_to_delete)
+            logger.info(f"🗑️ Cache de extração: {len(urls_to_delete)} entradas removidas (LRU, {freed / 1024 / 1024:.1f} MB)")
+
+        except Exception as e:
+            logger.error(f"Erro na eviction do cache de extração: {e}")
+
+    def clear(self):
+        """Remove todas as entradas"""
+        try:
+            conn = self._get_connection()
+            with self._write_lock:
+                conn.execute("DELETE FROM extraction_cache")
+                conn.commit()
+            logger.info("🗑️ Cache de extração limpo")
+        except Exception as e:
+            logger.error(f"Erro ao limpar cache de extração: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache"""
+        stats = dict(self.stats)
+        try:
+            conn = self._get_connection()
+            entries, total_size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extraction_cache"
+            ).fetchone()
+            stats.update({'entries': entries, 'size_mb': round(total_size / 1024 / 1024, 2)})
+        except Exception:
+            pass
+
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['revalidated']) / lookups * 100 if lookups else 0.0
+        stats['enabled'] = self.enabled
+        return stats
+
+# Instância global
+extraction_cache = ExtractionCache()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Extraction Pool
+Execução do parsing de HTML/PDF (CPU) fora das threads de requisição, em processos dedicados
+"""
+
+import os
+import signal
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCPUTimeout(BaseException):
+    """
+    Levantada no worker quando a tarefa estoura o tempo de CPU. Deriva de
+    BaseException para não ser engolida pelos `except Exception` dos extratores.
+    """
+
+
+@contextmanager
+def _cpu_time_limit(seconds: float):
+    """
+    Limita o tempo de CPU da tarefa no processo atual (ITIMER_PROF). O timer
+    continua disparando a cada 0,25s até a exceção sair da tarefa, e se algum
+    `except:` genérico a engolir até o fim, o resultado é descartado do mesmo jeito.
+    Sem setitimer (Windows) não limita: vale só o tempo de espera de quem pediu.
+    """
+    if not seconds or not hasattr(signal, 'setitimer') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    message = f"Tempo de CPU excedido ({seconds:g}s)"
+    fired = []
+
+    def handler(signum, frame):
+        fired.append(True)
+        raise ExtractionCPUTimeout(message)
+
+    previous = signal.signal(signal.SIGPROF, handler)
+    signal.setitimer(signal.ITIMER_PROF, seconds, 0.25)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+
+    if fired:
+        raise ExtractionCPUTimeout(message)
+
+
+# Funções executadas nos workers (nível de módulo para serem serializáveis)
+
+def _init_worker():
+    """
+    Carrega os extratores (trafilatura, readability, newspaper, lxml, pdfplumber) uma vez
+    por processo. Só o módulo de parsing puro: robust_content_extractor criaria caches,
+    SQLite, fetch_health e o loop assíncrono em cada worker sem nunca usá-los.
+
+    PDFs são lidos no caminho serial dentro do worker: um pool de páginas aninhado
+    multiplicaria os processos (pool_size × PDF_PAGE_WORKERS) e escaparia do limite
+    de CPU, que só conta o tempo do próprio worker.
+    """
+    import services.content_extractors  # noqa: F401
+    from services.pdf_text_engine import pdf_text_engine
+    pdf_text_engine.workers = 1
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+def _run_limited(cpu_timeout: float, function: str, *args) -> Any:
+    """Chama uma função de content_extractors sob o limite de CPU"""
+    from services import content_extractors
+    try:
+        with _cpu_time_limit(cpu_timeout):
+            return getattr(content_extractors, function)(*args)
+    except ExtractionCPUTimeout as e:
+        # Volta ao processo principal como exceção comum
+        raise TimeoutError(str(e))
+
+
+class ExtractionPool:
+    """
+    Modo de execução da extração (EXTRACTION_EXECUTOR):
+    - 'thread' (padrão): parsing na própria thread que pediu a extração
+    - 'process': HTML/caminho do PDF vão para um pool de processos já aquecidos
+      (imports carregados no initializer), que devolvem o texto limpo. Cada tarefa
+      tem limite de tempo de CPU no worker e de espera na thread que pediu.
+    """
+
+    def __init__(self):
+        self.mode = os.getenv('EXTRACTION_EXECUTOR', 'thread').lower()
+        self.pool_size = int(os.getenv('EXTRACTION_POOL_SIZE', 2))
+        self.cpu_timeout = float(os.getenv('EXTRACTION_TASK_CPU_TIMEOUT', 20))
+        self.wait_timeout = float(os.getenv('EXTRACTION_TASK_TIMEOUT', 45))
+        # spawn evita herdar locks de threads do processo Flask (fork com threads ativas)
+        self.start_method = os.getenv('EXTRACTION_POOL_START_METHOD', 'spawn')
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {'tasks': 0, 'inline_tasks': 0, 'timeouts': 0, 'errors': 0, 'restarts': 0}
+
+        if self.mode not in ('thread', 'process'):
+            logger.warning(f"⚠️ EXTRACTION_EXECUTOR inválido '{self.mode}', usando 'thread'")
+            self.mode = 'thread'
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.mode == 'process'
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker
+                )
+                # Sobe todos os workers já (o initializer roda na criação de cada processo)
+                for _ in range(self.pool_size):
+                    self._executor.submit(_warmup)
+                logger.info(f"⚙️ Pool de extração iniciado: {self.pool_size} processos ({self.start_method})")
+            return self._executor
+
+    def _restart(self, broken: ProcessPoolExecutor):
+        """Descarta um pool quebrado; o próximo pedido cria outro"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self.stats['restarts'] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, function: str, *args) -> Any:
+        """
+        Executa content_extractors.<function>(*args); as funções desse módulo são
+        puras (sem estatísticas/caches), pois no modo 'process' rodam em outro processo.
+        Estouro de tempo vira TimeoutError.
+        """
+        self.stats['tasks'] += 1
+
+        if not self.uses_processes:
+            self.stats['inline_tasks'] += 1
+            from services import content_extractors
+            return getattr(content_extractors, function)(*args)
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_limited, self.cpu_timeout, function, *args)
+            return future.result(timeout=self.wait_timeout)
+
+        except (TimeoutError, FutureTimeoutError) as e:
+            # Sem resposta a tempo: o worker segue preso no máximo até o limite de CPU
+            future.cancel()
+            self.stats['timeouts'] += 1
+            raise TimeoutError(str(e) or f"Extração excedeu {self.wait_timeout:.0f}s no pool")
+
+        except BrokenProcessPool:
+            self.stats['errors'] += 1
+            logger.error("❌ Pool de extração quebrado (worker encerrado), recriando")
+            self._restart(executor)
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'pool_size': self.pool_size if self.uses_processes else 0,
+            'cpu_timeout': self.cpu_timeout,
+            **self.stats
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Instância global
+extraction_pool = ExtractionPool()
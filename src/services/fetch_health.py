@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Fetch Health
+Cache negativo de URLs (com TTL) e saúde por host, consultados antes de cada download
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+
+import requests
+
+from services.domain_reputation import get_domain
+from services.politeness_scheduler import HostRateLimited
+from services.sqlite_connections import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+# Contadores de saúde por host (valores com decaimento exponencial)
+HOST_COUNTERS = ('requests', 'ok', 'timeouts', 'errors', 'client_errors', 'server_errors', 'small')
+
+# Resultado do download -> contador do host
+OUTCOME_COUNTERS = {
+    'ok': 'ok',
+    'timeout': 'timeouts',
+    'error': 'errors',
+    'not_found': 'client_errors',
+    'forbidden': 'client_errors',
+    'client_error': 'client_errors',
+    'server_error': 'server_errors',
+    'small': 'small',
+    'rejected': None
+}
+
+# Peso de cada contador na pontuação do host. 404 e afins são problema da URL,
+# não do host, e pesam menos; timeouts e recusa de conexão pesam inteiro.
+PENALTY_WEIGHTS = {
+    'timeouts': 1.0,
+    'errors': 1.0,
+    'server_errors': 1.0,
+    'client_errors': 0.5,
+    'small': 0.5
+}
+
+
+class FetchHealth:
+    """
+    Memória de downloads que falharam, compartilhada pela etapa de pesquisa,
+    WebSailorAgent e DeepSearchService:
+
+    - Cache negativo por URL: 404/410, 401/403/451, outros 4xx, 5xx, timeout,
+      erro de conexão, HTML pequeno e conteúdo recusado ficam marcados por um
+      TTL próprio (NEGATIVE_TTL_<RESULTADO>), que dobra a cada falha repetida
+      (até 8x). Um download bem-sucedido limpa a marca.
+    - Saúde por host: contadores com meia-vida (HOST_HEALTH_HALF_LIFE) de
+      timeouts, erros, 4xx, 5xx e respostas pequenas. Hosts com pontuação abaixo
+      de HOST_HEALTH_MIN_SCORE após HOST_HEALTH_MIN_REQUESTS downloads são pulados,
+      com uma tentativa liberada a cada HOST_HEALTH_PROBE_SECONDS.
+
+    429 não entra aqui: a pausa do host é do politeness_scheduler.
+
+    A memória é atualizada na hora; as gravações no SQLite vão para uma fila
+    consumida por uma thread própria, para que record_result (chamado no event
+    loop do async_fetch_engine) nunca espere o disco.
+    """
+
+    DEFAULT_TTLS = {
+        'not_found': 7 * 86400,
+        'rejected': 7 * 86400,
+        'forbidden': 86400,
+        'client_error': 86400,
+        'small': 6 * 3600,
+        'timeout': 3600,
+        'error': 3600,
+        'server_error': 1800
+    }
+    MAX_TTL_MULTIPLIER = 8
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.db_path = os.path.join(cache_dir, "fetch_health.db")
+        self.enabled = os.getenv('FETCH_HEALTH_ENABLED', 'true').lower() == 'true'
+        self.ttls = {
+            outcome: int(os.getenv(f'NEGATIVE_TTL_{outcome.upper()}', ttl))
+            for outcome, ttl in self.DEFAULT_TTLS.items()
+        }
+        self.max_negative_urls = int(os.getenv('NEGATIVE_CACHE_MAX_ITEMS', 50000))
+        self.half_life = float(os.getenv('HOST_HEALTH_HALF_LIFE', 6 * 3600))
+        self.min_requests = float(os.getenv('HOST_HEALTH_MIN_REQUESTS', 5))
+        self.min_score = float(os.getenv('HOST_HEALTH_MIN_SCORE', 0.2))
+        self.probe_interval = int(os.getenv('HOST_HEALTH_PROBE_SECONDS', 600))
+
+        self._connections = SQLiteConnections(self.db_path, pragmas=('journal_mode=WAL',))
+        self._lock = threading.Lock()
+        # url -> {'outcome', 'status', 'failures', 'expires_at'}
+        self._negative: Dict[str, Dict[str, Any]] = {}
+        # host -> contadores + updated_at/probe_at/probe_url
+        self._hosts: Dict[str, Dict[str, float]] = {}
+        self.stats = {'checks': 0, 'skipped_urls': 0, 'skipped_hosts': 0, 'probes': 0, 'write_errors': 0}
+
+        # (sql, parâmetros, descrição para o log) aguardando a thread de gravação
+        self._writes: queue.Queue = queue.Queue()
+        self.write_batch_size = int(os.getenv('FETCH_HEALTH_WRITE_BATCH', 200))
+        self._writer_lock = threading.Lock()
+        self._writer_pid: Optional[int] = None
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_database()
+        self._load()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _init_database(self):
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS negative_urls (
+                    url TEXT PRIMARY KEY,
+                    outcome TEXT NOT NULL,
+                    status INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 1,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_negative_expires ON negative_urls(expires_at)")
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS host_health (
+                    host TEXT PRIMARY KEY,
+                    {', '.join(f'{name} REAL NOT NULL DEFAULT 0' for name in HOST_COUNTERS)},
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar saúde de downloads: {e}")
+
+    def _load(self):
+        """Descarta entradas vencidas e carrega o restante para memória"""
+        try:
+            now = time.time()
+            conn = self._get_connection()
+            conn.execute("DELETE FROM negative_urls WHERE expires_at < ?", (now,))
+            conn.commit()
+            negative_rows = conn.execute(
+                "SELECT url, outcome, status, failures, expires_at FROM negative_urls"
+            ).fetchall()
+            host_rows = conn.execute(
+                f"SELECT host, {', '.join(HOST_COUNTERS)}, updated_at FROM host_health"
+            ).fetchall()
+            with self._lock:
+                for url, outcome, status, failures, expires_at in negative_rows:
+                    self._negative[url] = {
+                        'outcome': outcome, 'status': status, 'failures': failures, 'expires_at': expires_at
+                    }
+                for host, *values in host_rows:
+                    entry = dict(zip(HOST_COUNTERS + ('updated_at',), values))
+                    entry['probe_at'] = 0.0
+                    self._hosts[host] = entry
+        except Exception as e:
+            logger.error(f"Erro ao carregar saúde de downloads: {e}")
+
+    @staticmethod
+    def classify(
+        status: int = 0,
+        error: Optional[str] = None,
+        text_length: Optional[int] = None,
+        min_length: int = 0,
+        rejected: bool = False
+    ) -> Optional[str]:
+        """Resultado de um download; None quando não diz nada sobre a URL (304, 429)"""
+        if rejected:
+            return 'rejected'
+        if status in (304, 429):
+            return None
+        if status in (404, 410):
+            return 'not_found'
+        if status in (401, 403, 451):
+            return 'forbidden'
+        if 400 <= status < 500:
+            return 'client_error'
+        if status >= 500:
+            return 'server_error'
+        if error:
+            return 'timeout' if 'timeout' in error.lower() else 'error'
+        if min_length and text_length is not None and text_length < min_length:
+            return 'small'
+        return 'ok' if 200 <= status < 400 else 'error'
+
+    def record(
+        self,
+        url: str,
+        status: int = 0,
+        error: Optional[str] = None,
+        text_length: Optional[int] = None,
+        min_length: int = 0,
+        rejected: bool = False
+    ) -> Optional[str]:
+        """Registra um download (URL e host) e retorna o resultado classificado"""
+        outcome = self.classify(status, error, text_length, min_length, rejected)
+        if not self.enabled or not outcome or not url:
+            return outcome
+
+        self._update_host(get_domain(url), outcome)
+        if outcome == 'ok':
+            self._clear_url(url)
+        else:
+            self._mark_url(url, outcome, status)
+        return outcome
+
+    def record_result(self, result, min_length: int = 0) -> Optional[str]:
+        """Registra um FetchResult do async_fetch_engine"""
+        return self.record(
+            result.url, result.status, result.error,
+            len(result.text) if result.text is not None else None,
+            min_length, result.rejected
+        )
+
+    def record_exception(self, url: str, error: Exception) -> Optional[str]:
+        """Registra a exceção de um requests.get (espera do politeness_scheduler não conta)"""
+        if isinstance(error, HostRateLimited):
+            return None
+        if isinstance(error, requests.exceptions.Timeout):
+            return self.record(url, error='timeout')
+        return self.record(url, error=str(error) or error.__class__.__name__)
+
+    def _mark_url(self, url: str, outcome: str, status: int):
+        now = time.time()
+        with self._lock:
+            previous = self._negative.get(url)
+            failures = (previous['failures'] + 1) if previous else 1
+            multiplier = min(2 ** (failures - 1), self.MAX_TTL_MULTIPLIER)
+            entry = {
+                'outcome': outcome, 'status': status, 'failures': failures,
+                'expires_at': now + self.ttls[outcome] * multiplier
+            }
+            self._negative[url] = entry
+            if len(self._negative) > self.max_negative_urls:
+                self._evict(now)
+
+        self._enqueue_write("""
+            INSERT INTO negative_urls (url, outcome, status, failures, expires_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                outcome = excluded.outcome,
+                status = excluded.status,
+                failures = excluded.failures,
+                expires_at = excluded.expires_at
+        """, (url, outcome, status, entry['failures'], entry['expires_at']), f"cache negativo de {url}")
+
+    def _evict(self, now: float):
+        """Remove as vencidas; se ainda passar do limite, as que vencem primeiro (chamado com lock)"""
+        for url in [url for url, entry in self._negative.items() if entry['expires_at'] < now]:
+            del self._negative[url]
+        overflow = len(self._negative) - self.max_negative_urls
+        if overflow > 0:
+            for url, _ in sorted(self._negative.items(), key=lambda item: item[1]['expires_at'])[:overflow]:
+                del self._negative[url]
+
+    def _clear_url(self, url: str):
+        with self._lock:
+            if self._negative.pop(url, None) is None:
+                return
+        self._enqueue_write("DELETE FROM negative_urls WHERE url = ?", (url,), f"limpeza do cache negativo de {url}")
+
+    def _decayed(self, entry: Dict[str, float], now: float):
+        """Aplica a meia-vida aos contadores (chamado com lock)"""
+        elapsed = now - entry.get('updated_at', now)
+        if elapsed > 0 and self.half_life > 0:
+            factor = 0.5 ** (elapsed / self.half_life)
+            for name in HOST_COUNTERS:
+                entry[name] *= factor
+        entry['updated_at'] = now
+
+    def _update_host(self, host: str, outcome: str):
+        if not host:
+            return
+
+        now = time.time()
+        with self._lock:
+            entry = self._hosts.get(host)
+            if entry is None:
+                entry = dict.fromkeys(HOST_COUNTERS, 0.0)
+                entry['updated_at'] = now
+                entry['probe_at'] = 0.0
+                self._hosts[host] = entry
+            self._decayed(entry, now)
+            entry['requests'] += 1
+            counter = OUTCOME_COUNTERS.get(outcome)
+            if counter:
+                entry[counter] += 1
+            values = tuple(entry[name] for name in HOST_COUNTERS)
+
+        self._enqueue_write(f"""
+            INSERT OR REPLACE INTO host_health (host, {', '.join(HOST_COUNTERS)}, updated_at)
+            VALUES ({', '.join('?' * (len(HOST_COUNTERS) + 2))})
+        """, (host, *values, now), f"saúde do host {host}")
+
+    def _enqueue_write(self, sql: str, params: Tuple, description: str):
+        """Agenda a gravação no SQLite; quem registra o download não espera o disco"""
+        self._ensure_writer()
+        self._writes.put((sql, params, description))
+
+    def _ensure_writer(self):
+        """
+        Thread de gravação iniciada no primeiro uso em cada processo: threads do
+        master não sobrevivem ao fork dos workers do gunicorn, e a fila herdada
+        é trocada (seus locks podem ter sido copiados no meio de um put/get).
+        """
+        if self._writer_pid == os.getpid():
+            return
+
+        with self._writer_lock:
+            if self._writer_pid == os.getpid():
+                return
+
+            if self._writer_pid is not None:
+                self._writes = queue.Queue()
+            writes = self._writes
+            threading.Thread(
+                target=self._write_loop, args=(writes,), name='fetch-health-writer', daemon=True
+            ).start()
+            self._writer_pid = os.getpid()
+
+    def _write_loop(self, writes: queue.Queue):
+        """Grava em lotes: o que chegou enquanto o disco estava ocupado vai numa transação só"""
+        while True:
+            batch = [writes.get()]
+            while len(batch) < self.write_batch_size:
+                try:
+                    batch.append(writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                conn = self._get_connection()
+                for sql, params, description in batch:
+                    try:
+                        conn.execute(sql, params)
+                    except Exception as e:
+                        self.stats['write_errors'] += 1
+                        logger.error(f"Erro ao salvar {description}: {e}")
+                conn.commit()
+            except Exception as e:
+                self.stats['write_errors'] += len(batch)
+                logger.error(f"Erro ao gravar saúde de downloads ({len(batch)} alterações): {e}")
+            finally:
+                for _ in batch:
+                    writes.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a fila de gravação esvaziar (encerramento e testes); False se o tempo acabar"""
+        deadline = time.time() + timeout
+        while self._writes.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.01)
+        return not self._writes.unfinished_tasks
+
+    @staticmethod
+    def _score(entry: Dict[str, float]) -> float:
+        """Pontuação 0-1 do host (suavizada: poucos downloads ficam perto de 0,5)"""
+        penalty = sum(entry[name] * weight for name, weight in PENALTY_WEIGHTS.items())
+        return max(0.0, (entry['requests'] - penalty + 1) / (entry['requests'] + 2))
+
+    def host_score(self, url: str) -> float:
+        with self._lock:
+            entry = self._hosts.get(get_domain(url))
+            if not entry:
+                return 1.0
+            self._decayed(entry, time.time())
+            return self._score(entry)
+
+    def should_skip(self, url: str) -> Optional[str]:
+        """
+        Motivo para não baixar a URL agora (cache negativo ou host doente), ou None.
+        Host doente libera uma tentativa por janela de HOST_HEALTH_PROBE_SECONDS.
+        """
+        if not self.enabled or not url:
+            return None
+
+        self.stats['checks'] += 1
+        now = time.time()
+        with self._lock:
+            entry = self._negative.get(url)
+            if entry:
+                if entry['expires_at'] > now:
+                    self.stats['skipped_urls'] += 1
+                    remaining = (entry['expires_at'] - now) / 60
+                    status = f" {entry['status']}" if entry['status'] else ''
+                    return f"falhou recentemente ({entry['outcome']}{status}), nova tentativa em {remaining:.0f} min"
+                # Vencida: fica na memória só para o TTL dobrar se falhar de novo
+
+            host = get_domain(url)
+            health = self._hosts.get(host)
+            if not health:
+                return None
+            self._decayed(health, now)
+            if health['requests'] < self.min_requests:
+                return None
+            score = self._score(health)
+            if score >= self.min_score:
+                return None
+            # A URL escolhida como sonda continua liberada durante a janela (consultas repetidas)
+            in_window = now - health.get('probe_at', 0.0) < self.probe_interval
+            if in_window and health.get('probe_url') == url:
+                return None
+            if not in_window:
+                health['probe_at'] = now
+                health['probe_url'] = url
+                self.stats['probes'] += 1
+                return None
+
+            self.stats['skipped_hosts'] += 1
+            return f"host {host} instável (saúde {score:.2f})"
+
+    def filter_urls(self, urls: Iterable[str]) -> Tuple[List[str], Dict[str, str]]:
+        """Separa as URLs em (para baixar, {url: motivo do pulo})"""
+        allowed, skipped = [], {}
+        for url in urls:
+            reason = self.should_skip(url)
+            if reason:
+                skipped[url] = reason
+            else:
+                allowed.append(url)
+        return allowed, skipped
+
+    def take_fresh(self, items: Iterable[Dict[str, Any]], limit: int, key: str = 'url') -> List[Dict[str, Any]]:
+        """
+        Até `limit` resultados de busca cujas URLs não estão marcadas; os marcados
+        cedem a vaga para os próximos da lista (consulta só o necessário)
+        """
+        fresh = []
+        for item in items:
+            if len(fresh) >= limit:
+                break
+            reason = self.should_skip(item.get(key, ''))
+            if reason:
+                logger.info(f"⏭️ Pulando {item.get(key)}: {reason}")
+                continue
+            fresh.append(item)
+        return fresh
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            active = [entry for entry in self._negative.values() if entry['expires_at'] > now]
+            scores = {host: self._score(entry) for host, entry in self._hosts.items()}
+            unhealthy = sum(
+                1 for host, entry in self._hosts.items()
+                if entry['requests'] >= self.min_requests and scores[host] < self.min_score
+            )
+
+        by_outcome: Dict[str, int] = {}
+        for entry in active:
+            by_outcome[entry['outcome']] = by_outcome.get(entry['outcome'], 0) + 1
+
+        worst = sorted(scores.items(), key=lambda item: item[1])[:10]
+        return {
+            'enabled': self.enabled,
+            'negative_urls': len(active),
+            'negative_by_outcome': by_outcome,
+            'hosts_tracked': len(scores),
+            'unhealthy_hosts': unhealthy,
+            'worst_hosts': {host: round(score, 2) for host, score in worst},
+            'pending_writes': self._writes.qsize(),
+            **self.stats
+        }
+
+# Instância global
+fetch_health = FetchHealth()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - HTML Document
+Documento HTML parseado uma única vez por download e compartilhado pelas estratégias de extração
+"""
+
+import logging
+from typing import Dict, List, Optional, Iterable, FrozenSet, Tuple
+
+try:
+    import lxml.html
+    from lxml import etree
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+NO_EXCLUSION: FrozenSet[str] = frozenset()
+
+
+class ParsedDocument:
+    """
+    Árvore lxml construída uma vez (sob demanda) para o HTML baixado.
+
+    As estratégias que antes criavam e "limpavam" um BeautifulSoup próprio
+    (decompose de script/style/nav...) agora só informam quais tags ignorar:
+    a árvore não é alterada, e para cada conjunto de tags ignoradas o tamanho
+    do texto de todos os elementos é calculado numa única passada (estatística
+    de blocos de texto), reaproveitada por todas as estratégias.
+    """
+
+    def __init__(self, html: str):
+        self.html = html or ''
+        self._tree = None
+        self._parsed = False
+        self._lowered: Optional[str] = None
+        self._block_lengths: Dict[FrozenSet[str], Dict[object, int]] = {}
+        self._texts: Dict[Tuple[object, FrozenSet[str], bool], str] = {}
+
+    @property
+    def lowered(self) -> str:
+        """HTML em minúsculas (indicadores de página dinâmica)"""
+        if self._lowered is None:
+            self._lowered = self.html.lower()
+        return self._lowered
+
+    @property
+    def tree(self):
+        """Raiz lxml do documento (None se o HTML não puder ser parseado)"""
+        if not self._parsed:
+            self._parsed = True
+            if HAS_LXML and self.html.strip():
+                try:
+                    self._tree = lxml.html.document_fromstring(self.html)
+                except (etree.ParserError, ValueError) as e:
+                    logger.warning(f"⚠️ HTML não parseável: {e}")
+        return self._tree
+
+    @property
+    def body(self):
+        """Elemento <body>, ou a raiz se não houver"""
+        tree = self.tree
+        if tree is None:
+            return None
+        body = tree.find('body')
+        return body if body is not None else tree
+
+    def block_lengths(self, exclude: FrozenSet[str] = NO_EXCLUSION) -> Dict[object, int]:
+        """
+        Tamanho do texto de cada elemento, ignorando as subárvores das tags em
+        `exclude`. Elementos dentro dessas subárvores não aparecem no resultado.
+        """
+        lengths = self._block_lengths.get(exclude)
+        if lengths is not None:
+            return lengths
+
+        lengths = {}
+        tree = self.tree
+        if tree is not None:
+            self._measure(tree, exclude, lengths)
+        self._block_lengths[exclude] = lengths
+        return lengths
+
+    def _measure(self, element, exclude: FrozenSet[str], lengths: Dict[object, int]) -> int:
+        total = len(element.text or '')
+        for child in element:
+            if isinstance(child.tag, str) and child.tag not in exclude:
+                total += self._measure(child, exclude, lengths)
+            total += len(child.tail or '')
+        lengths[element] = total
+        return total
+
+    def text(self, element=None, exclude: FrozenSet[str] = NO_EXCLUSION, strip: bool = False) -> str:
+        """
+        Texto do elemento (ou do documento) como no get_text() do BeautifulSoup:
+        comentários ficam de fora; strip=True remove espaços de cada trecho e junta sem separador.
+        """
+        if element is None:
+            element = self.tree
+            if element is None:
+                return ''
+
+        key = (element, exclude, strip)
+        cached = self._texts.get(key)
+        if cached is not None:
+            return cached
+
+        parts: List[str] = []
+        self._collect_text(element, exclude, parts)
+        if strip:
+            text = ''.join(part.strip() for part in parts)
+        else:
+            text = ''.join(parts)
+
+        self._texts[key] = text
+        return text
+
+    def _collect_text(self, element, exclude: FrozenSet[str], parts: List[str]):
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            if isinstance(child.tag, str) and child.tag not in exclude:
+                self._collect_text(child, exclude, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+    def iter_elements(self, tags: Iterable[str], exclude: FrozenSet[str] = NO_EXCLUSION) -> List[object]:
+        """Elementos com as tags pedidas, em ordem do documento, fora das subárvores ignoradas"""
+        lengths = self.block_lengths(exclude)
+        tree = self.tree
+        if tree is None:
+            return []
+        return [element for element in tree.iter(*tags) if element in lengths]
+
+    def select(self, selector: str, exclude: FrozenSet[str] = NO_EXCLUSION) -> List[object]:
+        """
+        Seletores simples usados pelos extratores: 'tag', '.classe', '#id' e '[atributo]'
+        """
+        lengths = self.block_lengths(exclude)
+        tree = self.tree
+        if tree is None:
+            return []
+
+        if selector.startswith('.'):
+            name = selector[1:]
+            candidates = tree.xpath('//*[@class]')
+            return [e for e in candidates if e in lengths and name in e.get('class', '').split()]
+        if selector.startswith('#'):
+            name = selector[1:]
+            return [e for e in tree.xpath('//*[@id]') if e in lengths and e.get('id') == name]
+        if selector.startswith('[') and selector.endswith(']'):
+            name = selector[1:-1]
+            return [e for e in tree.iter() if isinstance(e.tag, str) and e in lengths and e.get(name) is not None]
+        return [e for e in tree.iter(selector) if e in lengths]
@@ -9,22 +9,229 @@ import os
 import logging
 import json
 import time
+import sqlite3
+import hashlib
+import zipfile
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Callable, Iterator
 import uuid
+from functools import partial
+
+from services.sqlite_connections import SQLiteConnections
 
 logger = logging.getLogger(__name__)
 
 class LocalFileManager:
     """Gerenciador de arquivos locais para análises"""
     
-    def __init__(self):
+    # Seção (subdiretório/entrada) -> campo da análise
+    SECTION_KEYS = {
+        'avatars': 'avatar_ultra_detalhado',
+        'drivers_mentais': 'drivers_mentais_customizados',
+        'provas_visuais': 'provas_visuais_sugeridas',
+        'anti_objecao': 'sistema_anti_objecao',
+        'pre_pitch': 'pre_pitch_invisivel',
+        'predicoes_futuro': 'predicoes_futuro_completas',
+        'posicionamento': 'escopo_posicionamento',
+        'concorrencia': 'analise_concorrencia_detalhada',
+        'palavras_chave': 'estrategia_palavras_chave',
+        'metricas': 'metricas_performance_detalhadas',
+        'funil_vendas': 'funil_vendas_detalhado',
+        'plano_acao': 'plano_acao_detalhado',
+        'insights': 'insights_exclusivos',
+        'pesquisa_web': 'pesquisa_web_massiva'
+    }
+    
+    CONTAINER_MANIFEST = 'manifest.json'
+    
+    def __init__(self, base_dir: Optional[str] = None):
         """Inicializa o gerenciador de arquivos locais"""
-        self.base_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'analyses_data')
+        self.base_dir = base_dir or os.path.join(os.path.dirname(__file__), '..', '..', 'analyses_data')
         self._ensure_directory_structure()
         
+        # 'container': um ZIP por análise (seções compactas, comprimidas e deduplicadas)
+        # 'json': um arquivo JSON indentado por seção (formato legado)
+        self.storage_format = os.getenv('LOCAL_STORAGE_FORMAT', 'container').lower()
+        self.compression_level = int(os.getenv('LOCAL_STORAGE_COMPRESSION_LEVEL', 6))
+        
+        # Índice SQLite: listagem, busca e estatísticas sem varrer o diretório
+        self.index_path = os.path.join(self.base_dir, 'analyses_index.db')
+        self._connections = SQLiteConnections(self.index_path, pragmas=('journal_mode=WAL', 'foreign_keys=ON'))
+        self._write_lock = threading.Lock()
+        self._init_index()
+        
         logger.info(f"Local File Manager inicializado: {self.base_dir}")
     
+    def _get_connection(self) -> sqlite3.Connection:
+        """Conexão por thread, reaberta em cada processo após fork"""
+        return self._connections.get()
+    
+    def _init_index(self):
+        """Cria tabelas do índice e reconstrói a partir do disco se estiver vazio"""
+        
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    analysis_id TEXT PRIMARY KEY,
+                    short_id TEXT NOT NULL,
+                    timestamp TEXT,
+                    created_at TEXT,
+                    created_ts REAL,
+                    segmento TEXT,
+                    produto TEXT,
+                    quality_score REAL,
+                    processing_time REAL,
+                    total_files INTEGER NOT NULL DEFAULT 0,
+                    total_size INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_files (
+                    analysis_id TEXT NOT NULL REFERENCES analyses(analysis_id) ON DELETE CASCADE,
+                    section TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    rel_path TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    modified REAL NOT NULL,
+                    entry TEXT,
+                    PRIMARY KEY (analysis_id, section)
+                )
+            """)
+            # Índices criados antes do formato container não têm a coluna entry
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(analysis_files)")]
+            if 'entry' not in columns:
+                conn.execute("ALTER TABLE analysis_files ADD COLUMN entry TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_short_id ON analyses(short_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses(created_ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_files_section ON analysis_files(section)")
+            conn.commit()
+            
+            indexed = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            if indexed == 0 and any(
+                os.listdir(os.path.join(self.base_dir, subdir)) for subdir in ('metadata', 'containers')
+            ):
+                self.rebuild_index()
+                
+        except Exception as e:
+            logger.error(f"❌ Erro ao inicializar índice de análises: {str(e)}")
+    
+    def rebuild_index(self) -> int:
+        """Reconstrói o índice varrendo o diretório (uso pontual: migração ou reparo)"""
+        
+        try:
+            # Agrupa arquivos por prefixo do ID (nome: <id8>_<data>_<hora>_<seção>.json)
+            files_by_short_id: Dict[str, List[Dict[str, Any]]] = {}
+            for root, dirs, filenames in os.walk(self.base_dir):
+                section = os.path.basename(root)
+                if section == 'containers':
+                    continue
+                for filename in filenames:
+                    if not filename.endswith('.json') or '_' not in filename:
+                        continue
+                    file_path = os.path.join(root, filename)
+                    stat = os.stat(file_path)
+                    files_by_short_id.setdefault(filename[:8], []).append({
+                        'section': section,
+                        'name': filename,
+                        'rel_path': os.path.relpath(file_path, self.base_dir),
+                        'size': stat.st_size,
+                        'modified': stat.st_mtime
+                    })
+            
+            analyses = []
+            metadata_dir = os.path.join(self.base_dir, 'metadata')
+            for filename in os.listdir(metadata_dir) if os.path.isdir(metadata_dir) else []:
+                if not filename.endswith('_metadata.json'):
+                    continue
+                try:
+                    with open(os.path.join(metadata_dir, filename), 'r', encoding='utf-8') as f:
+                        metadata = json.load(f)
+                    analysis_id = metadata.get('analysis_id')
+                    if analysis_id:
+                        analyses.append((metadata, files_by_short_id.get(analysis_id[:8], [])))
+                except Exception as e:
+                    logger.error(f"❌ Erro ao ler metadata {filename}: {str(e)}")
+            
+            containers_dir = os.path.join(self.base_dir, 'containers')
+            for filename in os.listdir(containers_dir) if os.path.isdir(containers_dir) else []:
+                if not filename.endswith('.zip'):
+                    continue
+                try:
+                    container_path = os.path.join(containers_dir, filename)
+                    with zipfile.ZipFile(container_path) as container:
+                        manifest = json.loads(container.read(self.CONTAINER_MANIFEST))
+                        files = self._container_file_entries(container, manifest, container_path)
+                    analyses.append((manifest['metadata'], files))
+                except Exception as e:
+                    logger.error(f"❌ Erro ao ler container {filename}: {str(e)}")
+            
+            conn = self._get_connection()
+            with self._write_lock:
+                with conn:
+                    conn.execute("DELETE FROM analysis_files")
+                    conn.execute("DELETE FROM analyses")
+                    for metadata, files in analyses:
+                        self._index_analysis(conn, metadata, files)
+            
+            logger.info(f"✅ Índice de análises reconstruído: {len(analyses)} análises")
+            return len(analyses)
+            
+        except Exception as e:
+            logger.error(f"❌ Erro ao reconstruir índice: {str(e)}")
+            return 0
+    
+    def _index_analysis(self, conn: sqlite3.Connection, metadata: Dict[str, Any], files: List[Dict[str, Any]]):
+        """Insere análise e arquivos no índice (dentro da transação do chamador)"""
+        
+        analysis_id = metadata['analysis_id']
+        created_at = metadata.get('created_at')
+        try:
+            created_ts = datetime.fromisoformat(created_at).timestamp() if created_at else None
+        except ValueError:
+            created_ts = None
+        
+        project_data = metadata.get('project_data', {})
+        conn.execute("""
+            INSERT OR REPLACE INTO analyses
+            (analysis_id, short_id, timestamp, created_at, created_ts, segmento, produto,
+             quality_score, processing_time, total_files, total_size)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            analysis_id, analysis_id[:8], metadata.get('timestamp'), created_at, created_ts,
+            project_data.get('segmento'), project_data.get('produto'),
+            metadata.get('quality_score', 0), metadata.get('processing_time', 0),
+            len(files), self._disk_usage(files)
+        ))
+        conn.executemany("""
+            INSERT OR REPLACE INTO analysis_files (analysis_id, section, name, rel_path, size, modified, entry)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (analysis_id, f['section'], f['name'], f['rel_path'], f['size'], f['modified'], f.get('entry'))
+            for f in files
+        ])
+    
+    def _disk_usage(self, files: List[Dict[str, Any]]) -> int:
+        """Tamanho real em disco (seções de um container compartilham o mesmo arquivo)"""
+        
+        total = 0
+        for rel_path in {f['rel_path'] for f in files}:
+            try:
+                total += os.path.getsize(os.path.join(self.base_dir, rel_path))
+            except OSError:
+                pass
+        return total
+    
+    def _resolve_analysis_id(self, analysis_id: str) -> Optional[str]:
+        """Aceita ID completo ou prefixo de 8 caracteres (como nos nomes de arquivo)"""
+        
+        row = self._get_connection().execute(
+            "SELECT analysis_id FROM analyses WHERE analysis_id = ? OR short_id = ? LIMIT 1",
+            (analysis_id, analysis_id[:8])
+        ).fetchone()
+        return row[0] if row else None
+    
     def _ensure_directory_structure(self):
         """Garante que a estrutura de diretórios existe"""
         
@@ -32,7 +239,7 @@ class LocalFileManager:
             'avatars', 'drivers_mentais', 'provas_visuais', 'anti_objecao',
             'pre_pitch', 'predicoes_futuro', 'posicionamento', 'concorrencia',
             'palavras_chave', 'metricas', 'funil_vendas', 'plano_acao',
-            'insights', 'pesquisa_web', 'completas', 'metadata'
+            'insights', 'pesquisa_web', 'completas', 'metadata', 'containers'
         ]
         
         # Cria diretório base
@@ -50,24 +257,28 @@ class LocalFileManager:
             analysis_id = str(uuid.uuid4())
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             
+            if self.storage_format == 'container':
+                saved_files, index_files = self._save_container(analysis_data, analysis_id, timestamp)
+                
+                # Atualiza índice numa única transação
+                self._index_saved_analysis(analysis_data, analysis_id, timestamp, saved_files, index_files)
+                
+                logger.info(f"✅ Análise salva localmente: container com {len(saved_files)} seções")
+                
+                return {
+                    'success': True,
+                    'analysis_id': analysis_id,
+                    'base_directory': self.base_dir,
+                    'files': saved_files,
+                    'total_files': len(saved_files),
+                    'timestamp': timestamp
+                }
+            
             saved_files = []
             
             # Salva cada seção em arquivo separado
             sections_to_save = {
-                'avatars': analysis_data.get('avatar_ultra_detalhado'),
-                'drivers_mentais': analysis_data.get('drivers_mentais_customizados'),
-                'provas_visuais': analysis_data.get('provas_visuais_sugeridas'),
-                'anti_objecao': analysis_data.get('sistema_anti_objecao'),
-                'pre_pitch': analysis_data.get('pre_pitch_invisivel'),
-                'predicoes_futuro': analysis_data.get('predicoes_futuro_completas'),
-                'posicionamento': analysis_data.get('escopo_posicionamento'),
-                'concorrencia': analysis_data.get('analise_concorrencia_detalhada'),
-                'palavras_chave': analysis_data.get('estrategia_palavras_chave'),
-                'metricas': analysis_data.get('metricas_performance_detalhadas'),
-                'funil_vendas': analysis_data.get('funil_vendas_detalhado'),
-                'plano_acao': analysis_data.get('plano_acao_detalhado'),
-                'insights': analysis_data.get('insights_exclusivos'),
-                'pesquisa_web': analysis_data.get('pesquisa_web_massiva')
+                section_name: analysis_data.get(key) for section_name, key in self.SECTION_KEYS.items()
             }
             
             # Salva cada seção
@@ -104,6 +315,9 @@ class LocalFileManager:
                     'size': os.path.getsize(metadata_file_path)
                 })
             
+            # Atualiza índice numa única transação
+            self._index_saved_analysis(analysis_data, analysis_id, timestamp, saved_files)
+            
             logger.info(f"✅ Análise salva localmente: {len(saved_files)} arquivos")
             
             return {
@@ -122,6 +336,168 @@ class LocalFileManager:
                 'error': str(e)
             }
     
+    def _index_saved_analysis(
+        self,
+        analysis_data: Dict[str, Any],
+        analysis_id: str,
+        timestamp: str,
+        saved_files: List[Dict[str, Any]],
+        files: Optional[List[Dict[str, Any]]] = None
+    ):
+        """Registra análise recém-salva no índice"""
+        
+        try:
+            metadata = self._build_metadata(analysis_data, analysis_id, timestamp, saved_files)
+            if files is None:
+                files = [
+                    {
+                        'section': f['type'],
+                        'name': f['name'],
+                        'rel_path': os.path.relpath(f['path'], self.base_dir),
+                        'size': f['size'],
+                        'modified': os.path.getmtime(f['path'])
+                    }
+                    for f in saved_files
+                ]
+            
+            conn = self._get_connection()
+            with self._write_lock:
+                with conn:
+                    self._index_analysis(conn, metadata, files)
+                    
+        except Exception as e:
+            # Arquivos já estão no disco: rebuild_index() recupera o índice depois
+            logger.error(f"❌ Erro ao indexar análise {analysis_id}: {str(e)}")
+    
+    def _save_container(
+        self,
+        analysis_data: Dict[str, Any],
+        analysis_id: str,
+        timestamp: str
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Salva a análise em um único ZIP: cada campo de primeiro nível vira um blob
+        JSON compacto endereçado por hash (gravado uma vez só), as seções apontam
+        para os blobs e a análise completa é remontada a partir do manifesto.
+        """
+        
+        filename = f"{analysis_id[:8]}_{timestamp}.zip"
+        container_path = os.path.join(self.base_dir, 'containers', filename)
+        tmp_path = container_path + '.tmp'
+        
+        fields = {}
+        blobs = {}
+        for key, value in analysis_data.items():
+            payload = json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+            blob_name = f"blobs/{hashlib.sha256(payload).hexdigest()}.json"
+            blobs.setdefault(blob_name, payload)
+            fields[key] = blob_name
+        
+        sections = {
+            section_name: fields[key]
+            for section_name, key in self.SECTION_KEYS.items()
+            if analysis_data.get(key)
+        }
+        
+        try:
+            with zipfile.ZipFile(
+                tmp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=self.compression_level
+            ) as container:
+                for blob_name, payload in blobs.items():
+                    container.writestr(blob_name, payload)
+                
+                saved_files = [
+                    {
+                        'type': section_name,
+                        'name': f"{analysis_id[:8]}_{timestamp}_{section_name}.json",
+                        'path': container_path,
+                        'entry': blob_name,
+                        'size': container.getinfo(blob_name).compress_size
+                    }
+                    for section_name, blob_name in sections.items()
+                ]
+                
+                manifest = {
+                    'format': 'arqv30-container',
+                    'version': 1,
+                    'metadata': self._build_metadata(analysis_data, analysis_id, timestamp, saved_files),
+                    'sections': sections,
+                    'fields': fields
+                }
+                container.writestr(
+                    self.CONTAINER_MANIFEST,
+                    json.dumps(manifest, ensure_ascii=False, separators=(',', ':'), default=str)
+                )
+                index_files = self._container_file_entries(container, manifest, container_path)
+            
+            os.replace(tmp_path, container_path)
+            
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        for file_info in index_files:
+            file_info['modified'] = os.path.getmtime(container_path)
+        
+        return saved_files, index_files
+    
+    def _container_file_entries(
+        self,
+        container: zipfile.ZipFile,
+        manifest: Dict[str, Any],
+        container_path: str
+    ) -> List[Dict[str, Any]]:
+        """Linhas do índice para as seções de um container"""
+        
+        metadata = manifest['metadata']
+        prefix = f"{metadata['analysis_id'][:8]}_{metadata['timestamp']}"
+        rel_path = os.path.relpath(container_path, self.base_dir)
+        modified = os.path.getmtime(container_path) if os.path.exists(container_path) else time.time()
+        
+        def entry(section: str, entry_name: str, size: int) -> Dict[str, Any]:
+            suffix = 'completa' if section == 'completas' else section  # Mesmo nome do formato JSON
+            return {
+                'section': section,
+                'name': f"{prefix}_{suffix}.json",
+                'rel_path': rel_path,
+                'size': size,
+                'modified': modified,
+                'entry': entry_name
+            }
+        
+        files = [
+            entry(section, blob_name, container.getinfo(blob_name).compress_size)
+            for section, blob_name in manifest['sections'].items()
+        ]
+        
+        manifest_size = container.getinfo(self.CONTAINER_MANIFEST).compress_size
+        all_blobs_size = sum(container.getinfo(name).compress_size for name in set(manifest['fields'].values()))
+        files.append(entry('completas', self.CONTAINER_MANIFEST, all_blobs_size))
+        files.append(entry('metadata', self.CONTAINER_MANIFEST, manifest_size))
+        
+        return files
+    
+    def _read_container_section(self, container_path: str, section_name: str, entry: str) -> Any:
+        """Lê uma seção do container sem descompactar o restante"""
+        
+        with zipfile.ZipFile(container_path) as container:
+            if entry != self.CONTAINER_MANIFEST:
+                return json.loads(container.read(entry))
+            
+            manifest = json.loads(container.read(self.CONTAINER_MANIFEST))
+            if section_name == 'metadata':
+                return manifest['metadata']
+            
+            # Análise completa: cada blob é lido uma vez, mesmo se referenciado por vários campos
+            loaded = {}
+            analysis = {}
+            for key, blob_name in manifest['fields'].items():
+                if blob_name not in loaded:
+                    loaded[blob_name] = json.loads(container.read(blob_name))
+                analysis[key] = loaded[blob_name]
+            return analysis
+    
     def _save_section_file(
         self, 
         section_name: str, 
@@ -175,22 +551,7 @@ class LocalFileManager:
         """Salva metadados da análise"""
         
         try:
-            metadata = {
-                'analysis_id': analysis_id,
-                'timestamp': timestamp,
-                'created_at': datetime.now().isoformat(),
-                'project_data': {
-                    'segmento': analysis_data.get('segmento'),
-                    'produto': analysis_data.get('produto'),
-                    'publico': analysis_data.get('publico'),
-                    'preco': analysis_data.get('preco')
-                },
-                'files_saved': saved_files,
-                'total_files': len(saved_files),
-                'analysis_metadata': analysis_data.get('metadata', {}),
-                'quality_score': analysis_data.get('metadata', {}).get('quality_score', 0),
-                'processing_time': analysis_data.get('metadata', {}).get('processing_time_seconds', 0)
-            }
+            metadata = self._build_metadata(analysis_data, analysis_id, timestamp, saved_files)
             
             filename = f"{analysis_id[:8]}_{timestamp}_metadata.json"
             file_path = os.path.join(self.base_dir, 'metadata', filename)
@@ -204,82 +565,103 @@ class LocalFileManager:
             logger.error(f"❌ Erro ao salvar metadados: {str(e)}")
             return None
     
+    def _build_metadata(
+        self,
+        analysis_data: Dict[str, Any],
+        analysis_id: str,
+        timestamp: str,
+        saved_files: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Monta metadados da análise"""
+        
+        return {
+            'analysis_id': analysis_id,
+            'timestamp': timestamp,
+            'created_at': datetime.strptime(timestamp, '%Y%m%d_%H%M%S').isoformat(),
+            'project_data': {
+                'segmento': analysis_data.get('segmento'),
+                'produto': analysis_data.get('produto'),
+                'publico': analysis_data.get('publico'),
+                'preco': analysis_data.get('preco')
+            },
+            'files_saved': saved_files,
+            'total_files': len(saved_files),
+            'analysis_metadata': analysis_data.get('metadata', {}),
+            'quality_score': analysis_data.get('metadata', {}).get('quality_score', 0),
+            'processing_time': analysis_data.get('metadata', {}).get('processing_time_seconds', 0)
+        }
+    
     def list_local_analyses(self) -> List[Dict[str, Any]]:
         """Lista análises salvas localmente"""
         
         try:
-            analyses = []
-            metadata_dir = os.path.join(self.base_dir, 'metadata')
-            
-            if not os.path.exists(metadata_dir):
-                return []
-            
-            for filename in os.listdir(metadata_dir):
-                if filename.endswith('_metadata.json'):
-                    file_path = os.path.join(metadata_dir, filename)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                        
-                        analyses.append({
-                            'analysis_id': metadata.get('analysis_id'),
-                            'timestamp': metadata.get('timestamp'),
-                            'created_at': metadata.get('created_at'),
-                            'segmento': metadata.get('project_data', {}).get('segmento'),
-                            'produto': metadata.get('project_data', {}).get('produto'),
-                            'total_files': metadata.get('total_files', 0),
-                            'quality_score': metadata.get('quality_score', 0),
-                            'processing_time': metadata.get('processing_time', 0)
-                        })
-                        
-                    except Exception as e:
-                        logger.error(f"❌ Erro ao ler metadata {filename}: {str(e)}")
-                        continue
-            
-            # Ordena por data de criação (mais recente primeiro)
-            analyses.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
-            return analyses
+            rows = self._get_connection().execute("""
+                SELECT analysis_id, timestamp, created_at, segmento, produto, total_files, quality_score, processing_time
+                FROM analyses ORDER BY created_at DESC
+            """).fetchall()
+            
+            return [
+                {
+                    'analysis_id': analysis_id,
+                    'timestamp': timestamp,
+                    'created_at': created_at,
+                    'segmento': segmento,
+                    'produto': produto,
+                    'total_files': total_files,
+                    'quality_score': quality_score,
+                    'processing_time': processing_time
+                }
+                for analysis_id, timestamp, created_at, segmento, produto, total_files, quality_score, processing_time in rows
+            ]
             
         except Exception as e:
             logger.error(f"❌ Erro ao listar análises locais: {str(e)}")
             return []
     
     def get_analysis_directory(self, analysis_id: str) -> Optional[str]:
-        """Obtém diretório de uma análise específica"""
+        """Obtém diretório de uma análise específica (onde estão seus metadados)"""
         
-        # Busca por arquivos que contenham o ID da análise
-        for root, dirs, files in os.walk(self.base_dir):
-            for file in files:
-                if analysis_id[:8] in file:
-                    return root
+        files = self.get_analysis_files(analysis_id)
+        if not files:
+            return None
         
-        return None
+        by_type = {f['type']: f for f in files}
+        chosen = by_type.get('metadata') or files[0]
+        return os.path.dirname(chosen['path'])
     
     def delete_local_analysis(self, analysis_id: str) -> bool:
         """Remove análise local por ID"""
         
         try:
-            deleted_files = 0
-            
-            # Busca e remove todos os arquivos relacionados
-            for root, dirs, files in os.walk(self.base_dir):
-                for file in files:
-                    if analysis_id[:8] in file:
-                        file_path = os.path.join(root, file)
-                        try:
-                            os.remove(file_path)
-                            deleted_files += 1
-                            logger.info(f"🗑️ Arquivo removido: {file}")
-                        except Exception as e:
-                            logger.error(f"❌ Erro ao remover {file}: {str(e)}")
-            
-            if deleted_files > 0:
-                logger.info(f"✅ Análise {analysis_id} removida: {deleted_files} arquivos")
-                return True
-            else:
+            resolved_id = self._resolve_analysis_id(analysis_id)
+            if not resolved_id:
                 logger.warning(f"⚠️ Nenhum arquivo encontrado para análise {analysis_id}")
                 return False
+            
+            deleted_files = 0
+            removed_paths = set()
+            for file_info in self.get_analysis_files(resolved_id):
+                # Seções de um container compartilham o mesmo arquivo
+                if file_info['path'] in removed_paths:
+                    continue
+                removed_paths.add(file_info['path'])
+                try:
+                    os.remove(file_info['path'])
+                    deleted_files += 1
+                    logger.info(f"🗑️ Arquivo removido: {file_info['name']}")
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.error(f"❌ Erro ao remover {file_info['name']}: {str(e)}")
+            
+            conn = self._get_connection()
+            with self._write_lock:
+                with conn:
+                    conn.execute("DELETE FROM analysis_files WHERE analysis_id = ?", (resolved_id,))
+                    conn.execute("DELETE FROM analyses WHERE analysis_id = ?", (resolved_id,))
+            
+            logger.info(f"✅ Análise {resolved_id} removida: {deleted_files} arquivos")
+            return True
                 
         except Exception as e:
             logger.error(f"❌ Erro ao deletar análise {analysis_id}: {str(e)}")
@@ -289,25 +671,26 @@ class LocalFileManager:
         """Obtém lista de arquivos de uma análise"""
         
         try:
-            files = []
+            rows = self._get_connection().execute("""
+                SELECT f.name, f.rel_path, f.section, f.size, f.modified, f.entry
+                FROM analysis_files f JOIN analyses a ON a.analysis_id = f.analysis_id
+                WHERE a.analysis_id = ? OR a.short_id = ?
+                ORDER BY f.section
+            """, (analysis_id, analysis_id[:8])).fetchall()
             
-            for root, dirs, filenames in os.walk(self.base_dir):
-                for filename in filenames:
-                    if analysis_id[:8] in filename:
-                        file_path = os.path.join(root, filename)
-                        
-                        # Determina tipo baseado no diretório
-                        section_type = os.path.basename(root)
-                        
-                        files.append({
-                            'name': filename,
-                            'path': file_path,
-                            'type': section_type,
-                            'size': os.path.getsize(file_path),
-                            'modified': datetime.fromtimestamp(
-                                os.path.getmtime(file_path)
-                            ).isoformat()
-                        })
+            files = []
+            for name, rel_path, section, size, modified, entry in rows:
+                file_info = {
+                    'name': name,
+                    'path': os.path.join(self.base_dir, rel_path),
+                    'type': section,
+                    'size': size,
+                    'modified': datetime.fromtimestamp(modified).isoformat()
+                }
+                if entry:
+                    # Seção dentro de container: ler via load_analysis_section / read_section_bytes
+                    file_info['container_entry'] = entry
+                files.append(file_info)
             
             return files
             
@@ -315,66 +698,172 @@ class LocalFileManager:
             logger.error(f"❌ Erro ao obter arquivos da análise {analysis_id}: {str(e)}")
             return []
     
+    def get_analyses_older_than(self, cutoff: datetime) -> List[str]:
+        """IDs das análises criadas antes da data de corte"""
+        
+        rows = self._get_connection().execute(
+            "SELECT analysis_id FROM analyses WHERE created_ts < ?", (cutoff.timestamp(),)
+        ).fetchall()
+        return [row[0] for row in rows]
+    
     def load_analysis_section(self, analysis_id: str, section_name: str) -> Optional[Dict[str, Any]]:
         """Carrega uma seção específica da análise"""
         
         try:
-            section_dir = os.path.join(self.base_dir, section_name)
-            
-            if not os.path.exists(section_dir):
+            row = self._find_section(analysis_id, section_name)
+            if not row:
                 return None
             
-            # Busca arquivo da seção
-            for filename in os.listdir(section_dir):
-                if analysis_id[:8] in filename and filename.endswith('.json'):
-                    file_path = os.path.join(section_dir, filename)
-                    
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        return json.load(f)
+            rel_path, entry = row
+            file_path = os.path.join(self.base_dir, rel_path)
+            if entry:
+                return self._read_container_section(file_path, section_name, entry)
             
-            return None
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
             
         except Exception as e:
             logger.error(f"❌ Erro ao carregar seção {section_name} da análise {analysis_id}: {str(e)}")
             return None
     
+    def read_section_bytes(self, analysis_id: str, section_name: str) -> Optional[bytes]:
+        """Conteúdo JSON de uma seção, qualquer que seja o formato de armazenamento"""
+        
+        row = self._find_section(analysis_id, section_name)
+        if not row:
+            return None
+        
+        rel_path, entry = row
+        file_path = os.path.join(self.base_dir, rel_path)
+        if not entry:
+            with open(file_path, 'rb') as f:
+                return f.read()
+        
+        if entry != self.CONTAINER_MANIFEST:
+            with zipfile.ZipFile(file_path) as container:
+                return container.read(entry)
+        
+        section_data = self._read_container_section(file_path, section_name, entry)
+        return json.dumps(section_data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+    
+    def iter_export_entries(self, analysis_id: str) -> List[Tuple[str, Callable[[], Iterator[bytes]]]]:
+        """
+        Entradas para exportação: (nome no arquivo, gerador de blocos).
+        O conteúdo é lido em blocos na hora da exportação, nunca inteiro em memória.
+        """
+        
+        entries = []
+        for file_info in self.get_analysis_files(analysis_id):
+            entry = file_info.get('container_entry')
+            if not entry:
+                # Nome relativo ao diretório base, como no layout em disco
+                arcname = os.path.relpath(file_info['path'], self.base_dir)
+                entries.append((arcname, partial(self._iter_file_chunks, file_info['path'])))
+            else:
+                arcname = f"{file_info['type']}/{file_info['name']}"
+                entries.append((arcname, partial(
+                    self._iter_container_chunks, file_info['path'], file_info['type'], entry
+                )))
+        return entries
+    
+    @staticmethod
+    def _iter_file_chunks(file_path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    def _iter_container_chunks(
+        self,
+        container_path: str,
+        section_name: str,
+        entry: str,
+        chunk_size: int = 64 * 1024
+    ) -> Iterator[bytes]:
+        """Blocos de uma seção do container; a análise completa é montada blob a blob"""
+        
+        with zipfile.ZipFile(container_path) as container:
+            if entry != self.CONTAINER_MANIFEST:
+                blob_names = [entry]
+                keys = None
+            else:
+                manifest = json.loads(container.read(self.CONTAINER_MANIFEST))
+                if section_name == 'metadata':
+                    yield json.dumps(manifest['metadata'], ensure_ascii=False, indent=2, default=str).encode('utf-8')
+                    return
+                keys = list(manifest['fields'])
+                blob_names = [manifest['fields'][key] for key in keys]
+            
+            if keys is not None:
+                yield b'{'
+            
+            for position, blob_name in enumerate(blob_names):
+                if keys is not None:
+                    prefix = ',' if position else ''
+                    yield (prefix + json.dumps(keys[position], ensure_ascii=False) + ':').encode('utf-8')
+                
+                # Blobs são JSON compacto: concatenados formam JSON válido
+                with container.open(blob_name) as blob:
+                    while True:
+                        chunk = blob.read(chunk_size)
+                        if not chunk:
+                            break
+                        yield chunk
+            
+            if keys is not None:
+                yield b'}'
+    
+    def get_analysis_signature(self, analysis_id: str) -> Optional[str]:
+        """Identifica a versão atual dos arquivos de uma análise (para caches derivados)"""
+        
+        files = self.get_analysis_files(analysis_id)
+        if not files:
+            return None
+        
+        raw = '|'.join(f"{f['path']}:{f['size']}:{f['modified']}:{f.get('container_entry', '')}" for f in files)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+    
+    def _find_section(self, analysis_id: str, section_name: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(caminho relativo, entrada no container) de uma seção"""
+        
+        return self._get_connection().execute("""
+            SELECT f.rel_path, f.entry FROM analysis_files f JOIN analyses a ON a.analysis_id = f.analysis_id
+            WHERE (a.analysis_id = ? OR a.short_id = ?) AND f.section = ?
+        """, (analysis_id, analysis_id[:8], section_name)).fetchone()
+    
     def get_storage_stats(self) -> Dict[str, Any]:
         """Obtém estatísticas de armazenamento"""
         
         try:
+            conn = self._get_connection()
             stats = {
                 'base_directory': self.base_dir,
+                'total_analyses': conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0],
                 'total_files': 0,
                 'total_size_bytes': 0,
                 'sections': {}
             }
             
-            for root, dirs, files in os.walk(self.base_dir):
-                section_name = os.path.basename(root)
-                
-                if section_name not in stats['sections']:
-                    stats['sections'][section_name] = {
-                        'files': 0,
-                        'size_bytes': 0
-                    }
-                
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    try:
-                        file_size = os.path.getsize(file_path)
-                        stats['total_files'] += 1
-                        stats['total_size_bytes'] += file_size
-                        stats['sections'][section_name]['files'] += 1
-                        stats['sections'][section_name]['size_bytes'] += file_size
-                    except:
-                        continue
+            for section, files, size_bytes in conn.execute(
+                "SELECT section, COUNT(*), COALESCE(SUM(size), 0) FROM analysis_files GROUP BY section"
+            ):
+                stats['sections'][section] = {
+                    'files': files,
+                    'size_bytes': size_bytes,
+                    'size_mb': round(size_bytes / (1024 * 1024), 2)
+                }
+                stats['total_files'] += files
+            
+            # Tamanho real em disco (no container as seções compartilham o arquivo)
+            stats['total_size_bytes'] = conn.execute(
+                "SELECT COALESCE(SUM(total_size), 0) FROM analyses"
+            ).fetchone()[0]
             
             # Converte bytes para MB
             stats['total_size_mb'] = round(stats['total_size_bytes'] / (1024 * 1024), 2)
             
-            for section in stats['sections'].values():
-                section['size_mb'] = round(section['size_bytes'] / (1024 * 1024), 2)
-            
             return stats
             
         except Exception as e:
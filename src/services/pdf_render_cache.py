@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - PDF Render Cache
+Cache em disco de relatórios PDF renderizados, com renderizações idênticas agrupadas
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PDFRenderCache:
+    """
+    Guarda PDFs em cache/pdf_reports/<chave>.pdf. A chave é o hash do conteúdo da
+    análise (ou a assinatura dos arquivos locais, quando o cliente manda só o ID).
+    Pedidos simultâneos da mesma chave esperam uma única renderização.
+    """
+
+    RENDER_VERSION = 1  # Incrementar quando o layout do relatório mudar
+
+    def __init__(self, cache_dir: str = "cache"):
+        self.cache_dir = os.path.join(cache_dir, "pdf_reports")
+        self.enabled = os.getenv('PDF_CACHE_ENABLED', 'true').lower() == 'true'
+        self.max_size_bytes = int(os.getenv('PDF_CACHE_MAX_MB', 200)) * 1024 * 1024
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.stats = {'hits': 0, 'renders': 0, 'coalesced': 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def content_key(self, analysis_data: Dict[str, Any]) -> str:
+        """Chave pelo conteúdo (JSON canônico)"""
+        canonical = json.dumps(analysis_data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+        return self._key(f"content\x1f{canonical}")
+
+    def analysis_key(self, analysis_id: str, signature: str) -> str:
+        """Chave por análise salva: muda quando os arquivos da análise mudam"""
+        return self._key(f"analysis\x1f{analysis_id}\x1f{signature}")
+
+    def _key(self, raw: str) -> str:
+        return hashlib.sha256(f"v{self.RENDER_VERSION}\x1f{raw}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pdf")
+
+    def get_cached_path(self, key: str) -> Optional[str]:
+        """Caminho do PDF em cache, se existir"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            os.utime(path)  # Marca uso recente para a eviction
+            self.stats['hits'] += 1
+            return path
+        except OSError:
+            return None
+
+    def get_or_render(self, key: str, render: Callable[[], bytes]) -> Dict[str, Any]:
+        """
+        Retorna {'path': arquivo em cache} ou {'data': bytes do PDF}.
+        Só uma thread renderiza cada chave; as demais aguardam o mesmo resultado.
+        """
+        cached_path = self.get_cached_path(key)
+        if cached_path:
+            return {'path': cached_path}
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            logger.info(f"⏳ Aguardando renderização em andamento do PDF {key[:12]}")
+            return {'data': future.result()}
+
+        try:
+            # Outro processo pode ter terminado enquanto esta thread assumia a renderização
+            cached_path = self.get_cached_path(key)
+            if cached_path:
+                with open(cached_path, 'rb') as f:
+                    pdf_bytes = f.read()
+                future.set_result(pdf_bytes)
+                return {'path': cached_path}
+
+            started = time.time()
+            pdf_bytes = render()
+            self.stats['renders'] += 1
+            logger.info(f"📄 PDF renderizado em {time.time() - started:.2f}s ({len(pdf_bytes) // 1024} KB)")
+
+            self._store(key, pdf_bytes)
+            future.set_result(pdf_bytes)
+            return {'data': pdf_bytes}
+
+        except Exception as e:
+            future.set_exception(e)
+            raise
+
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _store(self, key: str, pdf_bytes: bytes):
+        """Grava de forma atômica (arquivo temporário + rename no mesmo diretório)"""
+        if not self.enabled:
+            return
+
+        tmp_path = f"{self._path(key)}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, self._path(key))
+            self.evict_if_needed()
+        except Exception as e:
+            logger.error(f"Erro ao salvar PDF em cache: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def evict_if_needed(self):
+        """Remove os PDFs usados há mais tempo quando o cache passa do limite"""
+        try:
+            files = []
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith('.pdf'):
+                    path = os.path.join(self.cache_dir, filename)
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total_size <= self.max_size_bytes:
+                    break
+                os.remove(path)
+                total_size -= size
+                logger.info(f"🗑️ PDF removido do cache: {os.path.basename(path)}")
+
+        except Exception as e:
+            logger.error(f"Erro na eviction do cache de PDFs: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores do processo atual"""
+        return {'enabled': self.enabled, **self.stats}
+
+# Instância global
+pdf_render_cache = PDFRenderCache()
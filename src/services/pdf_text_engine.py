@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - PDF Text Engine
+Extração de texto de PDF por faixas de páginas em paralelo, entregue em ordem e com parada antecipada
+"""
+
+import os
+import mmap
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Iterator, Tuple, Any
+
+try:
+    import PyPDF2
+    HAS_PYPDF2 = True
+except ImportError:
+    HAS_PYPDF2 = False
+
+try:
+    import pdfplumber
+    HAS_PDFPLUMBER = True
+except ImportError:
+    HAS_PDFPLUMBER = False
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('pdfplumber', 'pypdf2')
+
+
+class _MappedPDF:
+    """
+    PDF aberto sobre um mmap do arquivo (somente leitura): o parser lê direto
+    do cache de páginas do SO, e cada processo que mapeia o mesmo arquivo
+    compartilha essas páginas em vez de carregar uma cópia própria.
+    """
+
+    def __init__(self, path: str, backend: str):
+        self.path = path
+        self.backend = backend
+        self._file = None
+        self._map = None
+        self._reader = None
+
+    def __enter__(self) -> '_MappedPDF':
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Arquivo vazio não pode ser mapeado
+            self.close()
+            raise ValueError(f"PDF vazio: {self.path}")
+        if self.backend == 'pypdf2':
+            self._reader = PyPDF2.PdfReader(self._map)
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for resource in (self._map, self._file):
+            if resource is not None:
+                resource.close()
+        self._map = self._file = self._reader = None
+
+    def page_count(self) -> int:
+        if self.backend == 'pypdf2':
+            return len(self._reader.pages)
+        with pdfplumber.open(self._map) as pdf:
+            return len(pdf.pages)
+
+    def extract_range(self, start: int, end: int) -> List[str]:
+        """Texto das páginas [start, end) (índices a partir de 0); página ilegível vira ''"""
+        if self.backend == 'pypdf2':
+            return [self._page_text(self._reader.pages[index], index) for index in range(start, end)]
+
+        # pdfplumber só monta os objetos das páginas pedidas (numeração a partir de 1)
+        with pdfplumber.open(self._map, pages=list(range(start + 1, end + 1))) as pdf:
+            texts = []
+            for offset, page in enumerate(pdf.pages):
+                texts.append(self._page_text(page, start + offset))
+                # Libera os objetos de layout da página já lida
+                page.close()
+            return texts
+
+    def _page_text(self, page, index: int) -> str:
+        try:
+            return page.extract_text() or ''
+        except Exception as e:
+            logger.debug(f"Página {index + 1} ilegível em {self.path}: {e}")
+            return ''
+
+
+# Funções executadas nos workers (nível de módulo para serem serializáveis)
+
+def _init_worker():
+    """Carrega os parsers de PDF uma vez por processo"""
+    import services.pdf_text_engine  # noqa: F401
+
+
+def _extract_range(path: str, backend: str, start: int, end: int) -> List[str]:
+    with _MappedPDF(path, backend) as document:
+        return document.extract_range(start, end)
+
+
+class PDFTextEngine:
+    """
+    Motor de texto de PDF compartilhado pela pesquisa web e pelos anexos.
+
+    As páginas são divididas em faixas (PDF_PAGE_BATCH) extraídas por processos
+    (PDF_PAGE_WORKERS), com poucas faixas adiantadas por vez; o texto sai página
+    a página, na ordem do documento, assim que a faixa fica pronta. Quem consome
+    para ao atingir o limite de caracteres e as faixas ainda não iniciadas são
+    canceladas. Documentos pequenos ou um só worker (caso dos processos do
+    extraction_pool, que zeram o paralelismo no initializer) usam o caminho
+    serial, com o mesmo streaming e a mesma parada antecipada.
+    """
+
+    def __init__(self):
+        self.max_pages = int(os.getenv('PDF_MAX_PAGES', 500))
+        # Texto bruto; a limpeza do extrator corta o resultado em 50K caracteres
+        self.max_chars = int(os.getenv('PDF_MAX_CHARS', 80000))
+        self.workers = int(os.getenv('PDF_PAGE_WORKERS', min(4, os.cpu_count() or 1)))
+        self.batch_size = max(1, int(os.getenv('PDF_PAGE_BATCH', 8)))
+        self.parallel_min_pages = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 24))
+        self.range_timeout = float(os.getenv('PDF_RANGE_TIMEOUT', 60))
+        self.start_method = os.getenv('PDF_POOL_START_METHOD', 'spawn')
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {
+            'documents': 0, 'parallel_documents': 0, 'pages_read': 0,
+            'early_stops': 0, 'range_timeouts': 0, 'errors': 0
+        }
+
+    def is_available(self, backend: str) -> bool:
+        return {'pdfplumber': HAS_PDFPLUMBER, 'pypdf2': HAS_PYPDF2}.get(backend, False)
+
+    def _can_fork_workers(self) -> bool:
+        return self.workers > 1
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker
+                )
+                logger.info(f"⚙️ Pool de páginas PDF iniciado: {self.workers} processos ({self.start_method})")
+            return self._executor
+
+    def _discard_executor(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        return [
+            (start, min(start + self.batch_size, page_count))
+            for start in range(0, page_count, self.batch_size)
+        ]
+
+    def iter_pages(self, path: str, backend: str = 'pdfplumber', max_pages: Optional[int] = None) -> Iterator[str]:
+        """
+        Texto de cada página, em ordem, à medida que as faixas ficam prontas.
+        Interromper a iteração (break/close) cancela as faixas pendentes.
+        """
+        if not self.is_available(backend):
+            raise RuntimeError(f"Backend de PDF indisponível: {backend}")
+
+        max_pages = self.max_pages if max_pages is None else max_pages
+        with _MappedPDF(path, backend) as document:
+            page_count = document.page_count()
+            if max_pages:
+                page_count = min(page_count, max_pages)
+            ranges = self._ranges(page_count)
+
+            self.stats['documents'] += 1
+            if page_count < self.parallel_min_pages or not self._can_fork_workers():
+                for start, end in ranges:
+                    for text in document.extract_range(start, end):
+                        self.stats['pages_read'] += 1
+                        yield text
+                return
+
+        # Caminho paralelo: cada worker mapeia o arquivo e abre só a sua faixa
+        self.stats['parallel_documents'] += 1
+        executor = self._get_executor()
+        pending_ranges = deque(ranges)
+        in_flight = deque()
+        # Poucas faixas adiantadas: parar cedo não deixa o documento inteiro sendo parseado
+        window = self.workers * 2
+
+        try:
+            while pending_ranges or in_flight:
+                while pending_ranges and len(in_flight) < window:
+                    start, end = pending_ranges.popleft()
+                    in_flight.append(executor.submit(_extract_range, path, backend, start, end))
+
+                future = in_flight.popleft()
+                try:
+                    texts = future.result(timeout=self.range_timeout)
+                except FutureTimeoutError:
+                    self.stats['range_timeouts'] += 1
+                    logger.warning(f"⚠️ Faixa de páginas excedeu {self.range_timeout:g}s em {path}, texto parcial")
+                    return
+                except BrokenProcessPool:
+                    self.stats['errors'] += 1
+                    logger.error("❌ Pool de páginas PDF quebrado (worker encerrado), recriando")
+                    self._discard_executor(executor)
+                    raise
+
+                for text in texts:
+                    self.stats['pages_read'] += 1
+                    yield text
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def extract_text(
+        self,
+        path: str,
+        backend: str = 'pdfplumber',
+        max_chars: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        skip_empty: bool = True
+    ) -> str:
+        """
+        Texto do PDF (páginas separadas por quebra de linha) até `max_chars`
+        caracteres (0 = sem limite); a leitura para assim que o limite é atingido.
+        """
+        max_chars = self.max_chars if max_chars is None else max_chars
+        start_time = time.time()
+
+        parts: List[str] = []
+        total_chars = 0
+        pages = 0
+        stopped_early = False
+
+        page_iterator = self.iter_pages(path, backend, max_pages)
+        try:
+            for text in page_iterator:
+                pages += 1
+                if skip_empty and not text:
+                    continue
+                parts.append(text)
+                total_chars += len(text) + 1
+                if max_chars and total_chars >= max_chars:
+                    stopped_early = True
+                    break
+        finally:
+            page_iterator.close()
+
+        if stopped_early:
+            self.stats['early_stops'] += 1
+        logger.info(
+            f"📄 PDF ({backend}): {pages} páginas lidas, {total_chars} caracteres em "
+            f"{time.time() - start_time:.2f}s{' (limite de texto atingido)' if stopped_early else ''}"
+        )
+
+        text = '\n'.join(parts)
+        return text[:max_chars] if max_chars else text
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers if self._can_fork_workers() else 1,
+            'batch_size': self.batch_size,
+            'max_pages': self.max_pages,
+            'max_chars': self.max_chars,
+            **self.stats
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Instância global
+pdf_text_engine = PDFTextEngine()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Politeness Scheduler
+Ritmo de requisições por host (token bucket) compartilhado por todo o HTTP de saída
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Any, Tuple, Mapping
+from urllib.parse import urlparse
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimited(requests.exceptions.RequestException):
+    """O host pediu para esperar (429/Retry-After) mais do que vale bloquear a requisição"""
+
+    def __init__(self, host: str, delay: float):
+        super().__init__(f"{host} em espera por limite de requisições ({delay:.0f}s)")
+        self.host = host
+        self.delay = delay
+
+
+class _HostBucket:
+    """
+    Balde de tokens de um host. `tokens` fica negativo quando já há requisições
+    agendadas à frente; `updated` no futuro marca um bloqueio pedido pelo servidor
+    (a recarga só recomeça nesse instante).
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'waits', 'waited', 'blocks')
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.waits = 0
+        self.waited = 0.0
+        self.blocks = 0
+
+
+class PolitenessScheduler:
+    """
+    Cada host tem o seu balde (taxa em req/s + rajada), então requisições a hosts
+    diferentes nunca esperam umas pelas outras; só a N-ésima requisição seguida
+    ao mesmo host é espaçada. Quem chama reserva a vez sob lock e dorme fora dele.
+
+    Limites: DEFAULT_HOST_RATES (provedores de busca/APIs) e POLITENESS_HOST_RATES
+    ("host=taxa:rajada,..."), casados pelo sufixo do domínio. Respostas 429/503
+    com Retry-After (segundos ou data HTTP) suspendem o host até o prazo; 429 sem
+    Retry-After suspende por POLITENESS_429_COOLDOWN. Esperas maiores que
+    POLITENESS_MAX_WAIT falham na hora com HostRateLimited.
+    """
+
+    # Sufixo do domínio -> (req/s, rajada)
+    DEFAULT_HOST_RATES = {
+        'bing.com': (0.5, 1),           # Scraping: uma busca a cada ~2s
+        'duckduckgo.com': (0.5, 1),
+        'search.yahoo.com': (0.5, 1),
+        'googleapis.com': (1.5, 3),     # Custom Search: 100 req/min por usuário
+        'google.serper.dev': (5.0, 5),
+        'r.jina.ai': (0.3, 2)           # Reader sem chave: 20 req/min
+    }
+
+    def __init__(self):
+        self.enabled = os.getenv('POLITENESS_ENABLED', 'true').lower() == 'true'
+        self.default_rate = float(os.getenv('POLITENESS_DEFAULT_RATE', 2.0))
+        self.default_burst = int(os.getenv('POLITENESS_DEFAULT_BURST', 4))
+        self.max_wait = float(os.getenv('POLITENESS_MAX_WAIT', 30))
+        self.cooldown_429 = float(os.getenv('POLITENESS_429_COOLDOWN', 10))
+        self.max_retry_after = float(os.getenv('POLITENESS_MAX_RETRY_AFTER', 600))
+
+        self.host_rates: Dict[str, Tuple[float, int]] = dict(self.DEFAULT_HOST_RATES)
+        self.host_rates.update(self._parse_host_rates(os.getenv('POLITENESS_HOST_RATES', '')))
+
+        self._buckets: Dict[str, _HostBucket] = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'delayed': 0, 'total_wait': 0.0, 'blocks': 0, 'rate_limited': 0}
+
+    @staticmethod
+    def _parse_host_rates(raw: str) -> Dict[str, Tuple[float, int]]:
+        rates = {}
+        for item in raw.split(','):
+            if '=' not in item:
+                continue
+            host, _, spec = item.partition('=')
+            rate, _, burst = spec.partition(':')
+            try:
+                rates[host.strip().lower()] = (float(rate), int(burst or 1))
+            except ValueError:
+                logger.warning(f"⚠️ POLITENESS_HOST_RATES inválido: '{item.strip()}'")
+        return rates
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return (urlparse(url).hostname or '').lower()
+
+    def rule_for(self, host: str) -> Tuple[float, int]:
+        """Limite do host: regra do sufixo mais específico, senão o padrão"""
+        labels = host.split('.')
+        for start in range(len(labels)):
+            rule = self.host_rates.get('.'.join(labels[start:]))
+            if rule:
+                return rule
+        return self.default_rate, self.default_burst
+
+    def _bucket(self, host: str, now: float) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.rule_for(host)
+            bucket = _HostBucket(rate, burst, now)
+            self._buckets[host] = bucket
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """
+        Reserva a próxima vez do host e retorna quantos segundos esperar.
+        Espera acima de max_wait devolve a reserva e levanta HostRateLimited.
+        """
+        self.stats['requests'] += 1
+        host = self.host_of(url)
+        if not self.enabled or not host:
+            return 0.0
+
+        with self._lock:
+            now = time.time()
+            bucket = self._bucket(host, now)
+            if now > bucket.updated:
+                bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+                bucket.updated = now
+
+            bucket.tokens -= 1
+            delay = (bucket.updated - now) + max(0.0, -bucket.tokens) / bucket.rate
+
+            if delay > self.max_wait:
+                bucket.tokens += 1
+                self.stats['rate_limited'] += 1
+                raise HostRateLimited(host, delay)
+
+            if delay > 0:
+                bucket.waits += 1
+                bucket.waited += delay
+                self.stats['delayed'] += 1
+                self.stats['total_wait'] += delay
+        return delay
+
+    def wait(self, url: str) -> float:
+        """Bloqueia a thread até a vez do host"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, url: str) -> float:
+        """Versão para o event loop do fetch engine"""
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def observe(self, url: str, status: int, headers: Optional[Mapping[str, str]] = None):
+        """Aplica o Retry-After (ou a pausa padrão de 429) da resposta ao host"""
+        if not self.enabled or status not in (429, 503):
+            return
+
+        pause = self._retry_after_seconds(headers)
+        if pause is None:
+            if status != 429:
+                return
+            pause = self.cooldown_429
+        pause = min(pause, self.max_retry_after)
+
+        host = self.host_of(url)
+        with self._lock:
+            now = time.time()
+            bucket = self._bucket(host, now)
+            until = now + pause
+            if until > bucket.updated:
+                if now > bucket.updated:
+                    bucket.tokens = min(bucket.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+                # Depois da pausa volta com um token só (sem rajada); reservas já feitas continuam na fila
+                bucket.tokens = min(bucket.tokens, 1.0)
+                bucket.updated = until
+                bucket.blocks += 1
+                self.stats['blocks'] += 1
+        logger.warning(f"⏳ {host} pediu pausa (status {status}): próximas requisições em {pause:.0f}s")
+
+    @staticmethod
+    def _retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+        if not headers:
+            return None
+        value = headers.get('Retry-After') or headers.get('retry-after')
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+    def request(self, method: str, url: str, session: Optional[requests.Session] = None, **kwargs) -> requests.Response:
+        """requests.request (ou session.request) no ritmo do host, registrando o Retry-After da resposta"""
+        self.wait(url)
+        response = (session or requests).request(method, url, **kwargs)
+        self.observe(url, response.status_code, response.headers)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            blocked = sorted(host for host, bucket in self._buckets.items() if bucket.updated > now)
+            busiest = sorted(self._buckets.items(), key=lambda item: item[1].waited, reverse=True)[:10]
+            return {
+                'enabled': self.enabled,
+                'hosts_tracked': len(self._buckets),
+                'blocked_hosts': blocked,
+                'most_delayed_hosts': {
+                    host: {'waits': bucket.waits, 'waited': round(bucket.waited, 2), 'blocks': bucket.blocks}
+                    for host, bucket in busiest if bucket.waits or bucket.blocks
+                },
+                **self.stats,
+                'total_wait': round(self.stats['total_wait'], 2)
+            }
+
+# Instância global
+politeness_scheduler = PolitenessScheduler()
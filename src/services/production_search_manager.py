@@ -17,13 +17,17 @@ from urllib.parse import quote_plus, urljoin
 from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import pickle
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import zlib
 import sqlite3
+from collections import OrderedDict
 from dataclasses import dataclass
 from services.robust_content_extractor import robust_content_extractor
 from services.url_resolver import resolve_url
 from services.content_quality_validator import content_quality_validator
+from services.domain_reputation import domain_reputation
+from services.politeness_scheduler import politeness_scheduler, HostRateLimited
+from services.sqlite_connections import SQLiteConnections
 
 logger = logging.getLogger(__name__)
 
@@ -41,33 +45,68 @@ class SearchResult:
         if self.timestamp is None:
             self.timestamp = datetime.now()
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato canônico (dict) entregue aos chamadores"""
+        return {
+            'title': self.title,
+            'url': self.url,
+            'snippet': self.snippet,
+            'source': self.source,
+            'relevance_score': self.relevance_score,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else datetime.now().isoformat()
+        }
+
 class ProductionSearchCache:
-    """Sistema de cache robusto para produção"""
+    """
+    Sistema de cache robusto para produção.
+    Camada LRU em memória na frente do SQLite (conexão por thread, modo WAL),
+    serialização JSON compactada e versionada, expiração em lote em background.
+    """
+
+    FORMAT_VERSION = 1
 
     def __init__(self, cache_dir: str = "cache", ttl: int = 3600):
         self.cache_dir = cache_dir
         self.ttl = ttl
         self.db_path = os.path.join(cache_dir, "search_cache.db")
+        self.memory_max_items = int(os.getenv('SEARCH_CACHE_MEMORY_ITEMS', 512))
+        self.cleanup_interval = int(os.getenv('SEARCH_CACHE_CLEANUP_INTERVAL', 600))
+
+        self._connections = SQLiteConnections(self.db_path)
+        self._memory = OrderedDict()  # query_hash -> (expires_at, results)
+        self._memory_lock = threading.Lock()
+        self._cleanup_lock = threading.Lock()
+        self._cleanup_pid = None
+
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+
         os.makedirs(cache_dir, exist_ok=True)
         self._init_database()
 
+    def _is_enabled(self) -> bool:
+        return os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true'
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Conexão por thread, reaberta em cada processo após fork"""
+        return self._connections.get()
+
     def _init_database(self):
         """Inicializa banco de dados SQLite para cache"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    CREATE TABLE IF NOT EXISTS search_cache (
-                        query_hash TEXT PRIMARY KEY,
-                        query TEXT NOT NULL,
-                        results BLOB NOT NULL,
-                        timestamp REAL NOT NULL,
-                        ttl INTEGER NOT NULL
-                    )
-                """)
-                conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_timestamp ON search_cache(timestamp)
-                """)
-                conn.commit()
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    query_hash TEXT PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    results BLOB NOT NULL,
+                    timestamp REAL NOT NULL,
+                    ttl INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_timestamp ON search_cache(timestamp)
+            """)
+            conn.commit()
         except Exception as e:
             logger.error(f"Erro ao inicializar cache: {e}")
 
@@ -76,59 +115,117 @@ class ProductionSearchCache:
         combined = f"{query}:{provider}".encode('utf-8')
         return hashlib.sha256(combined).hexdigest()
 
-    def get(self, query: str, provider: str = "") -> Optional[List[SearchResult]]:
-        """Recupera resultados do cache"""
-        if not os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true':
+    def _serialize(self, results: List[Dict[str, Any]]) -> bytes:
+        """JSON compacto + zlib, com versão do formato"""
+        payload = json.dumps(
+            {'v': self.FORMAT_VERSION, 'results': results},
+            ensure_ascii=False,
+            separators=(',', ':')
+        )
+        return zlib.compress(payload.encode('utf-8'))
+
+    def _deserialize(self, blob: bytes) -> Optional[List[Dict[str, Any]]]:
+        """Retorna None para formatos desconhecidos (ex.: entradas antigas em pickle)"""
+        try:
+            payload = json.loads(zlib.decompress(blob).decode('utf-8'))
+        except Exception:
             return None
 
-        try:
-            query_hash = self._get_query_hash(query, provider)
+        if not isinstance(payload, dict) or payload.get('v') != self.FORMAT_VERSION:
+            return None
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT results, timestamp, ttl FROM search_cache WHERE query_hash = ?",
-                    (query_hash,)
-                )
-                row = cursor.fetchone()
+        return payload.get('results')
+
+    def _memory_get(self, query_hash: str) -> Optional[List[Dict[str, Any]]]:
+        with self._memory_lock:
+            entry = self._memory.get(query_hash)
+            if entry is None:
+                return None
+
+            expires_at, results = entry
+            if time.time() >= expires_at:
+                del self._memory[query_hash]
+                return None
+
+            self._memory.move_to_end(query_hash)
+            return results
+
+    def _memory_set(self, query_hash: str, results: List[Dict[str, Any]], expires_at: float):
+        with self._memory_lock:
+            self._memory[query_hash] = (expires_at, results)
+            self._memory.move_to_end(query_hash)
+            while len(self._memory) > self.memory_max_items:
+                self._memory.popitem(last=False)
+
+    def _count(self, stat: str):
+        # Threads do modo hedged e das requisições contam ao mesmo tempo
+        with self._memory_lock:
+            self.stats[stat] += 1
+
+    def get(self, query: str, provider: str = "") -> Optional[List[Dict[str, Any]]]:
+        """Recupera resultados do cache (sempre no formato canônico de dicts)"""
+        if not self._is_enabled():
+            return None
 
-                if row:
-                    results_blob, timestamp, ttl = row
+        self._ensure_cleanup_thread()
+        try:
+            query_hash = self._get_query_hash(query, provider)
 
-                    # Verifica se não expirou
-                    if time.time() - timestamp < ttl:
-                        results = pickle.loads(results_blob)
+            results = self._memory_get(query_hash)
+            if results is not None:
+                self._count('memory_hits')
+                logger.info(f"✅ Cache hit (memória) para query: {query[:50]}...")
+                return [dict(result) for result in results]
+
+            row = self._get_connection().execute(
+                "SELECT results, timestamp, ttl FROM search_cache WHERE query_hash = ?",
+                (query_hash,)
+            ).fetchone()
+
+            if row:
+                results_blob, timestamp, ttl = row
+                expires_at = timestamp + ttl
+
+                # Expirados ficam para a limpeza em lote
+                if time.time() < expires_at:
+                    results = self._deserialize(results_blob)
+                    if results is not None:
+                        self._memory_set(query_hash, results, expires_at)
+                        self._count('disk_hits')
                         logger.info(f"✅ Cache hit para query: {query[:50]}...")
-                        return results
-                    else:
-                        # Remove entrada expirada
-                        conn.execute("DELETE FROM search_cache WHERE query_hash = ?", (query_hash,))
-                        conn.commit()
-                        logger.info(f"🗑️ Cache expirado removido para: {query[:50]}...")
+                        return [dict(result) for result in results]
 
-                return None
+            self._count('misses')
+            return None
 
         except Exception as e:
             logger.error(f"Erro ao recuperar cache: {e}")
             return None
 
-    def set(self, query: str, results: List[SearchResult], provider: str = ""):
-        """Armazena resultados no cache"""
-        if not os.getenv('SEARCH_CACHE_ENABLED', 'true').lower() == 'true':
+    def set(self, query: str, results: List[Any], provider: str = ""):
+        """Armazena resultados no cache (aceita dicts ou SearchResult)"""
+        if not self._is_enabled():
             return
 
+        self._ensure_cleanup_thread()
         try:
+            canonical = [
+                result.to_dict() if isinstance(result, SearchResult) else dict(result)
+                for result in results
+            ]
             query_hash = self._get_query_hash(query, provider)
-            results_blob = pickle.dumps(results)
             timestamp = time.time()
             ttl = int(os.getenv('SEARCH_CACHE_TTL', self.ttl))
 
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO search_cache 
-                    (query_hash, query, results, timestamp, ttl) 
-                    VALUES (?, ?, ?, ?, ?)
-                """, (query_hash, query, results_blob, timestamp, ttl))
-                conn.commit()
+            self._memory_set(query_hash, canonical, timestamp + ttl)
+
+            conn = self._get_connection()
+            conn.execute("""
+                INSERT OR REPLACE INTO search_cache 
+                (query_hash, query, results, timestamp, ttl) 
+                VALUES (?, ?, ?, ?, ?)
+            """, (query_hash, query, self._serialize(canonical), timestamp, ttl))
+            conn.commit()
 
             logger.info(f"💾 Cache salvo para query: {query[:50]}...")
 
@@ -136,25 +233,62 @@ class ProductionSearchCache:
             logger.error(f"Erro ao salvar cache: {e}")
 
     def cleanup_expired(self):
-        """Remove entradas expiradas do cache"""
+        """Remove entradas expiradas do cache (em lote)"""
         try:
             current_time = time.time()
 
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    "SELECT COUNT(*) FROM search_cache WHERE ? - timestamp > ttl",
-                    (current_time,)
-                )
-                expired_count = cursor.fetchone()[0]
+            with self._memory_lock:
+                expired_keys = [key for key, (expires_at, _) in self._memory.items() if current_time >= expires_at]
+                for key in expired_keys:
+                    del self._memory[key]
+
+            conn = self._get_connection()
+            cursor = conn.execute("DELETE FROM search_cache WHERE ? - timestamp > ttl", (current_time,))
+            conn.commit()
 
-                if expired_count > 0:
-                    conn.execute("DELETE FROM search_cache WHERE ? - timestamp > ttl", (current_time,))
-                    conn.commit()
-                    logger.info(f"🗑️ {expired_count} entradas expiradas removidas do cache")
+            if cursor.rowcount > 0:
+                logger.info(f"🗑️ {cursor.rowcount} entradas expiradas removidas do cache")
 
         except Exception as e:
             logger.error(f"Erro na limpeza do cache: {e}")
 
+    def clear(self):
+        """Remove todas as entradas (memória e disco)"""
+        with self._memory_lock:
+            self._memory.clear()
+
+        conn = self._get_connection()
+        conn.execute("DELETE FROM search_cache")
+        conn.commit()
+
+    def _ensure_cleanup_thread(self):
+        """
+        Thread daemon que expira entradas periodicamente, fora do caminho de leitura.
+        Iniciada no primeiro uso em cada processo: threads do master não sobrevivem
+        ao fork dos workers do gunicorn.
+        """
+        if self._cleanup_pid == os.getpid():
+            return
+
+        with self._cleanup_lock:
+            if self._cleanup_pid == os.getpid():
+                return
+
+            def cleanup_loop():
+                while True:
+                    time.sleep(self.cleanup_interval)
+                    self.cleanup_expired()
+
+            threading.Thread(target=cleanup_loop, name='search-cache-cleanup', daemon=True).start()
+            self._cleanup_pid = os.getpid()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estatísticas do cache"""
+        with self._memory_lock:
+            memory_items = len(self._memory)
+            stats = dict(self.stats)
+        return {**stats, 'memory_items': memory_items, 'memory_max_items': self.memory_max_items}
+
 class ProductionSearchManager:
     """Gerenciador de busca robusto para produção"""
 
@@ -163,7 +297,6 @@ class ProductionSearchManager:
         self.cache = ProductionSearchCache()
         self.rate_limiter = {}
         self.error_counts = {}
-        self.last_cleanup = time.time()
         self.content_extractor = robust_content_extractor
 
         # Configurações de produção
@@ -172,6 +305,19 @@ class ProductionSearchManager:
         self.rate_limit_delay = float(os.getenv('SEARCH_RATE_LIMIT_DELAY', 1.5))
         self.request_timeout = int(os.getenv('REQUEST_TIMEOUT', 30))
 
+        # Busca hedged: retorna no primeiro conjunto suficiente de resultados
+        self.hedged_mode = os.getenv('SEARCH_HEDGED_MODE', 'true').lower() == 'true'
+        self.hedge_delay = float(os.getenv('SEARCH_HEDGE_DELAY', 1.5))
+        self.hedge_timeout = float(os.getenv('SEARCH_HEDGE_TIMEOUT', 20))
+        self.provider_latency = {}
+        self._latency_lock = threading.Lock()
+        self.rrf_k = int(os.getenv('SEARCH_RRF_K', 60))  # Constante do Reciprocal Rank Fusion
+        # Executor compartilhado: buscas abandonadas terminam sem bloquear quem chamou
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('SEARCH_MAX_CONCURRENT', 24)),
+            thread_name_prefix='search-provider'
+        )
+
         # User agents rotativos para evitar detecção
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -365,7 +511,7 @@ class ProductionSearchManager:
 
             self._record_request(provider)
 
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url, 
                 params=params, 
                 headers=headers, 
@@ -424,6 +570,9 @@ class ProductionSearchManager:
         except requests.exceptions.Timeout:
             logger.error(f"⏰ Timeout na requisição Google Search")
             return []
+        except HostRateLimited as e:
+            logger.warning(f"⏳ Google Search adiado: {e}")
+            return []
         except requests.exceptions.RequestException as e:
             logger.error(f"❌ Erro de rede Google Search: {e}")
             self._handle_provider_error(provider, e)
@@ -471,7 +620,7 @@ class ProductionSearchManager:
 
             self._record_request(provider)
 
-            response = requests.post(
+            response = politeness_scheduler.post(
                 url, 
                 json=payload, 
                 headers=headers, 
@@ -505,6 +654,10 @@ class ProductionSearchManager:
                 logger.error(f"❌ Serper API: Status {response.status_code}")
                 return []
 
+        except HostRateLimited as e:
+            # Espera pedida pelo host: não conta como erro do provedor
+            logger.warning(f"⏳ Serper Search adiado: {e}")
+            return []
         except Exception as e:
             logger.error(f"❌ Erro Serper Search: {e}")
             self._handle_provider_error(provider, e)
@@ -533,12 +686,10 @@ class ProductionSearchManager:
 
             headers = self._get_headers('bing')
 
-            # Adiciona delay para evitar detecção
-            time.sleep(random.uniform(1.0, 2.0))
-
+            # Espaçamento entre buscas no Bing fica com o politeness_scheduler (por host)
             self._record_request(provider)
 
-            response = requests.get(
+            response = politeness_scheduler.get(
                 search_url,
                 params=params,
                 headers=headers,
@@ -607,14 +758,18 @@ class ProductionSearchManager:
                 return results
 
             elif response.status_code == 429:
+                # A pausa do host (Retry-After ou padrão) já foi registrada no scheduler
                 logger.warning("⚠️ Bing: Rate limit detectado")
-                time.sleep(5)
                 return []
 
             else:
                 logger.warning(f"⚠️ Bing retornou status {response.status_code}")
                 return []
 
+        except HostRateLimited as e:
+            # Espera pedida pelo host: não conta como erro do provedor
+            logger.warning(f"⏳ Bing Scraping adiado: {e}")
+            return []
         except Exception as e:
             logger.error(f"❌ Erro Bing Scraping: {e}")
             self._handle_provider_error(provider, e)
@@ -634,12 +789,9 @@ class ProductionSearchManager:
             session = requests.Session()
             session.headers.update(self._get_headers('duckduckgo'))
 
-            # Delay anti-detecção
-            time.sleep(random.uniform(1.5, 3.0))
-
             # Primeira requisição
             initial_url = "https://duckduckgo.com/"
-            session.get(initial_url, timeout=self.request_timeout)
+            politeness_scheduler.get(initial_url, session=session, timeout=self.request_timeout)
 
             # Segunda requisição com busca
             search_url = "https://html.duckduckgo.com/html/"
@@ -652,8 +804,9 @@ class ProductionSearchManager:
 
             self._record_request(provider)
 
-            response = session.get(
+            response = politeness_scheduler.get(
                 search_url,
+                session=session,
                 params=params,
                 timeout=self.request_timeout
             )
@@ -733,13 +886,54 @@ class ProductionSearchManager:
                 logger.warning(f"⚠️ DuckDuckGo retornou status {response.status_code}")
                 return []
 
+        except HostRateLimited as e:
+            # Espera pedida pelo host: não conta como erro do provedor
+            logger.warning(f"⏳ DuckDuckGo Scraping adiado: {e}")
+            return []
         except Exception as e:
             logger.error(f"❌ Erro DuckDuckGo Scraping: {e}")
             self._handle_provider_error(provider, e)
             return []
 
-    def search_with_fallback(self, query: str, max_results: int = 10) -> List[SearchResult]:
-        """Busca com sistema de fallback robusto"""
+    def _get_available_providers(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Provedores habilitados e saudáveis, ordenados por prioridade"""
+        available_providers = [
+            (name, config) for name, config in self.providers.items()
+            if config['enabled'] and config['error_count'] < 5 and name != 'duckduckgo'  # Exclui DuckDuckGo
+        ]
+        available_providers.sort(key=lambda x: x[1]['priority'])
+        return available_providers
+
+    def _get_provider_search_func(self, provider_name: str):
+        """Função de busca de cada provedor"""
+        return {
+            'google': self.search_google_custom,
+            'serper': self.search_serper,
+            'bing': self.search_bing_scraping
+            # DuckDuckGo removido temporariamente
+        }.get(provider_name)
+
+    def _record_provider_latency(self, provider_name: str, started_at: float, future):
+        """Atualiza latência média (EWMA) do provedor, inclusive de buscas abandonadas"""
+        try:
+            healthy = bool(future.result())
+        except Exception:
+            healthy = False
+
+        latency = time.time() - started_at
+        if not healthy:
+            latency = max(latency, self.hedge_timeout)  # Falha conta como lenta
+
+        with self._latency_lock:
+            previous = self.provider_latency.get(provider_name)
+            self.provider_latency[provider_name] = latency if previous is None else 0.7 * previous + 0.3 * latency
+
+    def search_with_fallback(self, query: str, max_results: int = 10, hedged: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Busca com sistema de fallback robusto.
+        No modo hedged (padrão, SEARCH_HEDGED_MODE) retorna assim que houver
+        resultados únicos suficientes, sem esperar provedores lentos.
+        """
 
         # Verifica cache primeiro
         cached_results = self.cache.get(query, "combined")
@@ -747,31 +941,93 @@ class ProductionSearchManager:
             logger.info(f"📦 Usando resultados do cache para: {query[:50]}...")
             return cached_results
 
-        all_results = []
-        successful_providers = []
+        if hedged is None:
+            hedged = self.hedged_mode
 
-        # Ordena provedores por prioridade e disponibilidade
-        available_providers = [
-            (name, config) for name, config in self.providers.items()
-            if config['enabled'] and config['error_count'] < 5 and name != 'duckduckgo'  # Exclui DuckDuckGo
+        available_providers = self._get_available_providers()
+
+        if hedged:
+            provider_results = self._search_hedged(query, max_results, available_providers)
+        else:
+            provider_results = self._search_all_providers(query, max_results, available_providers)
+
+        successful_providers = [provider_name for provider_name, _ in provider_results]
+
+        # Funde rankings dos provedores + reputação de extração dos domínios
+        final_results = self._merge_ranked_results(provider_results, max_results)
+
+        # Formato canônico: mesmo shape em hit e miss
+        dict_results = [
+            result.to_dict() if isinstance(result, SearchResult) else result
+            for result in final_results
         ]
-        available_providers.sort(key=lambda x: x[1]['priority'])
+
+        # Salva no cache se obteve resultados
+        if dict_results:
+            self.cache.set(query, dict_results, "combined")
+
+        logger.info(f"🎯 Busca final: {len(dict_results)} resultados únicos de {len(successful_providers)} provedores")
+
+        return dict_results
+
+    def _normalize_url_key(self, url: str) -> str:
+        """Chave de deduplicação: sem fragmento e sem barra final"""
+        return url.split('#', 1)[0].rstrip('/')
+
+    def _merge_ranked_results(
+        self,
+        provider_results: List[Tuple[str, List[SearchResult]]],
+        max_results: int
+    ) -> List[SearchResult]:
+        """
+        Reciprocal Rank Fusion: score(url) = Σ 1 / (k + posição) em cada provedor,
+        multiplicado pela reputação de extração do domínio. URLs citadas por
+        vários provedores e de domínios que extraem bem sobem; domínios que
+        falham sempre descem.
+        """
+        fused = {}
+
+        for provider_name, results in provider_results:
+            for rank, result in enumerate(results, 1):
+                if not result.url:
+                    continue
+
+                key = self._normalize_url_key(result.url)
+                entry = fused.get(key)
+                if entry is None:
+                    fused[key] = entry = {'result': result, 'score': 0.0}
+                elif len(result.snippet or '') > len(entry['result'].snippet or ''):
+                    # Mantém o snippet mais informativo entre provedores
+                    entry['result'].snippet = result.snippet
+
+                entry['score'] += 1.0 / (self.rrf_k + rank)
+
+        for entry in fused.values():
+            entry['score'] *= domain_reputation.get_multiplier(entry['result'].url)
+            entry['result'].relevance_score = round(entry['score'], 6)
+
+        ranked = sorted(fused.values(), key=lambda entry: entry['score'], reverse=True)
+        return [entry['result'] for entry in ranked[:max_results]]
+
+    def _search_all_providers(
+        self,
+        query: str,
+        max_results: int,
+        available_providers: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Tuple[str, List[SearchResult]]]:
+        """Modo completo: consulta todos os provedores e espera todos responderem"""
+        provider_results = []
 
         # Executa busca em paralelo para otimização
         with ThreadPoolExecutor(max_workers=3) as executor:  # Reduz workers
             future_to_provider = {}
 
             for provider_name, config in available_providers:
-                if provider_name == 'google':
-                    future = executor.submit(self.search_google_custom, query, max_results // 2)
-                elif provider_name == 'serper':
-                    future = executor.submit(self.search_serper, query, max_results // 2)
-                elif provider_name == 'bing':
-                    future = executor.submit(self.search_bing_scraping, query, max_results // 2)
-                # DuckDuckGo removido temporariamente
-                else:
+                search_func = self._get_provider_search_func(provider_name)
+                if not search_func:
                     continue
 
+                future = executor.submit(search_func, query, max_results // 2)
                 future_to_provider[future] = provider_name
 
             # Coleta resultados conforme completam
@@ -780,8 +1036,7 @@ class ProductionSearchManager:
                 try:
                     results = future.result()
                     if results:
-                        all_results.extend(results)
-                        successful_providers.append(provider_name)
+                        provider_results.append((provider_name, results))
                         logger.info(f"✅ {provider_name}: {len(results)} resultados")
                     else:
                         logger.warning(f"⚠️ {provider_name}: 0 resultados")
@@ -790,58 +1045,91 @@ class ProductionSearchManager:
                     logger.error(f"❌ Erro em {provider_name}: {e}")
                     self._handle_provider_error(provider_name, e)
 
-        # Remove duplicatas baseado na URL
-        unique_results = []
-        seen_urls = set()
-
-        for result in all_results:
-            if result.url not in seen_urls:
-                seen_urls.add(result.url)
-                unique_results.append(result)
-
-        # Ordena por relevância (pode ser implementado)
-        unique_results.sort(key=lambda x: x.timestamp, reverse=True)
-
-        # Limita resultados
-        final_results = unique_results[:max_results]
-
-        # Converte SearchResult para dict se necessário
-        dict_results = []
-        for result in final_results:
-            if hasattr(result, '__dict__'):
-                dict_results.append({
-                    'title': result.title,
-                    'url': result.url,
-                    'snippet': result.snippet,
-                    'source': result.source,
-                    'relevance_score': getattr(result, 'relevance_score', 0.0),
-                    'timestamp': result.timestamp.isoformat() if hasattr(result, 'timestamp') and result.timestamp else datetime.now().isoformat()
-                })
-            else:
-                dict_results.append(result)
+        return provider_results
+
+    def _search_hedged(
+        self,
+        query: str,
+        max_results: int,
+        available_providers: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Tuple[str, List[SearchResult]]]:
+        """
+        Modo hedged: dispara o provedor mais rápido, aciona o próximo só se não
+        houver resposta suficiente em hedge_delay (ou imediatamente em caso de falha)
+        e abandona os retardatários assim que max_results URLs únicas chegam.
+        """
+        # Mais rápidos primeiro (latência observada), prioridade como desempate;
+        # provedores ainda sem medição assumem latência igual ao hedge_delay
+        with self._latency_lock:
+            latencies = dict(self.provider_latency)
+        providers = [
+            name for name, config in sorted(
+                available_providers,
+                key=lambda item: (latencies.get(item[0], self.hedge_delay), item[1]['priority'])
+            )
+            if self._get_provider_search_func(name)
+        ]
 
-        # Salva no cache se obteve resultados
-        if dict_results:
-            # Converte para SearchResult para cache
-            cache_results = []
-            for result_dict in dict_results:
-                cache_result = SearchResult(
-                    title=result_dict['title'],
-                    url=result_dict['url'],
-                    snippet=result_dict['snippet'],
-                    source=result_dict['source']
+        provider_results = []
+        unique_urls = set()
+        pending = {}
+        launched = 0
+        start_time = time.time()
+        deadline = start_time + self.hedge_timeout
+        next_launch = start_time
+
+        while True:
+            now = time.time()
+
+            # Aciona próximo provedor (hedge) se chegou a hora ou nada está em andamento
+            if launched < len(providers) and (now >= next_launch or not pending):
+                provider_name = providers[launched]
+                launched += 1
+                future = self._search_executor.submit(
+                    self._get_provider_search_func(provider_name), query, max_results
+                )
+                future.add_done_callback(
+                    lambda f, name=provider_name, started=now: self._record_provider_latency(name, started, f)
                 )
-                cache_results.append(cache_result)
-            self.cache.set(query, cache_results, "combined")
+                pending[future] = provider_name
+                next_launch = now + self.hedge_delay
+                if launched > 1:
+                    logger.info(f"🔀 Hedge: acionando {provider_name} após {now - start_time:.1f}s")
+                continue
 
-        logger.info(f"🎯 Busca final: {len(dict_results)} resultados únicos de {len(successful_providers)} provedores")
+            if not pending or now >= deadline:
+                break
 
-        # Limpeza periódica do cache
-        if time.time() - self.last_cleanup > 3600:  # 1 hora
-            self.cache.cleanup_expired()
-            self.last_cleanup = time.time()
+            wait_until = deadline if launched >= len(providers) else min(next_launch, deadline)
+            done, _ = wait(list(pending), timeout=max(0.0, wait_until - now), return_when=FIRST_COMPLETED)
 
-        return dict_results
+            for future in done:
+                provider_name = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Erro em {provider_name}: {e}")
+                    self._handle_provider_error(provider_name, e)
+                    results = []
+
+                if results:
+                    provider_results.append((provider_name, results))
+                    unique_urls.update(result.url for result in results)
+                    logger.info(f"✅ {provider_name}: {len(results)} resultados em {time.time() - start_time:.1f}s")
+                else:
+                    logger.warning(f"⚠️ {provider_name}: 0 resultados - acionando próximo provedor")
+                    next_launch = time.time()
+
+            if len(unique_urls) >= max_results:
+                break
+
+        if pending:
+            abandoned = ', '.join(pending.values())
+            logger.info(f"✂️ Hedge: {len(unique_urls)} resultados suficientes, abandonando {abandoned}")
+            for future in pending:
+                future.cancel()  # Só cancela se ainda não começou; os demais são ignorados
+
+        return provider_results
 
     def get_provider_status(self) -> Dict[str, Any]:
         """Retorna status detalhado dos provedores"""
@@ -855,7 +1143,8 @@ class ProductionSearchManager:
                 'last_error': config.get('last_error'),
                 'rate_limited': (config.get('quota_reset') or 0) > time.time(),
                 'requests_today': len(self.rate_limiter.get(name, [])),
-                'rate_limit': config['rate_limit']
+                'rate_limit': config['rate_limit'],
+                'avg_latency': round(self.provider_latency.get(name, 0.0), 2)
             }
 
         return status
@@ -880,11 +1169,8 @@ class ProductionSearchManager:
     def clear_cache(self):
         """Limpa todo o cache"""
         try:
-            if os.path.exists(self.cache.db_path):
-                with sqlite3.connect(self.cache.db_path) as conn:
-                    conn.execute("DELETE FROM search_cache")
-                    conn.commit()
-                logger.info("🗑️ Cache limpo completamente")
+            self.cache.clear()
+            logger.info("🗑️ Cache limpo completamente")
         except Exception as e:
             logger.error(f"Erro ao limpar cache: {e}")
 
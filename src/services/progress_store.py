@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Progress Store
+Armazenamento de progresso das análises: em memória ou compartilhado entre workers (SQLite/Redis)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List, Optional, Any
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+from services.sqlite_connections import SQLiteConnections
+
+logger = logging.getLogger(__name__)
+
+
+class BaseProgressStore(ABC):
+    """
+    Interface comum: estado da sessão (dict JSON) + log de eventos com ids
+    crescentes, limitado aos últimos max_events. Um único reaper por processo
+    remove sessões sem atividade há mais de session_ttl.
+    """
+
+    backend = 'base'
+
+    def __init__(self):
+        self.max_events = int(os.getenv('PROGRESS_MAX_EVENTS', 500))
+        self.session_ttl = int(os.getenv('PROGRESS_SESSION_TTL', 3600))
+        self.reaper_interval = int(os.getenv('PROGRESS_REAPER_INTERVAL', 60))
+        self.poll_interval = 0.5  # Espera por eventos entre processos
+        self._reaper_pid = None
+        self._reaper_lock = threading.Lock()
+
+    @abstractmethod
+    def create_session(self, session_id: str, state: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def update_state(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def append_event(self, session_id: str, event_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def _read_events(self, session_id: str, last_event_id: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def delete_session(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def reap_expired(self) -> int:
+        ...
+
+    def get_events_since(self, session_id: str, last_event_id: int, timeout: float = 0) -> List[Dict[str, Any]]:
+        """Eventos com id > last_event_id, esperando até timeout se ainda não houver"""
+        deadline = time.time() + timeout
+        while True:
+            events = self._read_events(session_id, last_event_id)
+            if events or time.time() >= deadline:
+                return events
+
+            state = self.get_state(session_id)
+            if not state or state.get('is_finished'):
+                return events
+
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.time())))
+
+    def ensure_reaper(self):
+        """Inicia (uma vez por processo) a thread que expira sessões antigas"""
+        if self._reaper_pid == os.getpid():
+            return
+
+        with self._reaper_lock:
+            if self._reaper_pid == os.getpid():
+                return
+
+            def reaper_loop():
+                while True:
+                    time.sleep(self.reaper_interval)
+                    try:
+                        removed = self.reap_expired()
+                        if removed:
+                            logger.info(f"🗑️ {removed} sessões de progresso expiradas removidas")
+                    except Exception as e:
+                        logger.error(f"Erro no reaper de progresso: {e}")
+
+            threading.Thread(target=reaper_loop, daemon=True, name='progress-reaper').start()
+            self._reaper_pid = os.getpid()
+
+
+class MemoryProgressStore(BaseProgressStore):
+    """Progresso em memória do processo (um único worker)"""
+
+    backend = 'memory'
+
+    def __init__(self):
+        super().__init__()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._condition = threading.Condition()
+
+    def create_session(self, session_id: str, state: Dict[str, Any]):
+        with self._condition:
+            self._sessions[session_id] = {
+                'state': dict(state),
+                'events': deque(maxlen=self.max_events),
+                'next_event_id': 1,
+                'updated_at': time.time()
+            }
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            session = self._sessions.get(session_id)
+            return dict(session['state']) if session else None
+
+    def update_state(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            session = self._sessions.get(session_id)
+            if not session:
+                return None
+            session['state'].update(fields)
+            session['updated_at'] = time.time()
+            self._condition.notify_all()
+            return dict(session['state'])
+
+    def append_event(self, session_id: str, event_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            session = self._sessions.get(session_id)
+            if not session:
+                return None
+            event = {'id': session['next_event_id'], 'event': event_type, 'data': data}
+            session['next_event_id'] += 1
+            session['events'].append(event)
+            session['updated_at'] = time.time()
+            self._condition.notify_all()
+            return event
+
+    def _read_events(self, session_id: str, last_event_id: int) -> List[Dict[str, Any]]:
+        session = self._sessions.get(session_id)
+        if not session:
+            return []
+        return [event for event in session['events'] if event['id'] > last_event_id]
+
+    def get_events_since(self, session_id: str, last_event_id: int, timeout: float = 0) -> List[Dict[str, Any]]:
+        """No mesmo processo espera pela Condition em vez de consultar periodicamente"""
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                events = self._read_events(session_id, last_event_id)
+                session = self._sessions.get(session_id)
+                remaining = deadline - time.time()
+                if events or remaining <= 0 or not session or session['state'].get('is_finished'):
+                    return events
+                self._condition.wait(remaining)
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        with self._condition:
+            return [dict(session['state']) for session in self._sessions.values()]
+
+    def delete_session(self, session_id: str):
+        with self._condition:
+            self._sessions.pop(session_id, None)
+
+    def reap_expired(self) -> int:
+        cutoff = time.time() - self.session_ttl
+        with self._condition:
+            expired = [sid for sid, session in self._sessions.items() if session['updated_at'] < cutoff]
+            for session_id in expired:
+                del self._sessions[session_id]
+        return len(expired)
+
+
+class SQLiteProgressStore(BaseProgressStore):
+    """Progresso em SQLite compartilhado por todos os workers da mesma máquina"""
+
+    backend = 'sqlite'
+
+    def __init__(self, cache_dir: str = "cache"):
+        super().__init__()
+        self.db_path = os.path.join(cache_dir, "progress_store.db")
+        self._connections = SQLiteConnections(self.db_path)
+        self._write_lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._init_database()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Conexão por thread, reaberta em cada processo após fork"""
+        return self._connections.get()
+
+    def _init_database(self):
+        try:
+            conn = self._get_connection()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS progress_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    next_event_id INTEGER NOT NULL DEFAULT 1,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS progress_events (
+                    session_id TEXT NOT NULL,
+                    event_id INTEGER NOT NULL,
+                    event_type TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (session_id, event_id)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_progress_sessions_updated ON progress_sessions(updated_at)")
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Erro ao inicializar store de progresso: {e}")
+
+    def create_session(self, session_id: str, state: Dict[str, Any]):
+        conn = self._get_connection()
+        with self._write_lock:
+            conn.execute("DELETE FROM progress_events WHERE session_id = ?", (session_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO progress_sessions (session_id, state, next_event_id, updated_at) VALUES (?, ?, 1, ?)",
+                (session_id, json.dumps(state, ensure_ascii=False, default=str), time.time())
+            )
+            conn.commit()
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._get_connection().execute(
+            "SELECT state FROM progress_sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_state(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        conn = self._get_connection()
+        with self._write_lock:
+            # BEGIN IMMEDIATE serializa leitura+escrita entre processos
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT state FROM progress_sessions WHERE session_id = ?", (session_id,)).fetchone()
+                if not row:
+                    conn.rollback()
+                    return None
+                state = json.loads(row[0])
+                state.update(fields)
+                conn.execute(
+                    "UPDATE progress_sessions SET state = ?, updated_at = ? WHERE session_id = ?",
+                    (json.dumps(state, ensure_ascii=False, default=str), time.time(), session_id)
+                )
+                conn.commit()
+                return state
+            except Exception:
+                conn.rollback()
+                raise
+
+    def append_event(self, session_id: str, event_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        conn = self._get_connection()
+        payload = json.dumps(data, ensure_ascii=False, default=str)
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT next_event_id FROM progress_sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if not row:
+                    conn.rollback()
+                    return None
+
+                event_id = row[0]
+                conn.execute(
+                    "INSERT INTO progress_events (session_id, event_id, event_type, data) VALUES (?, ?, ?, ?)",
+                    (session_id, event_id, event_type, payload)
+                )
+                conn.execute(
+                    "UPDATE progress_sessions SET next_event_id = ?, updated_at = ? WHERE session_id = ?",
+                    (event_id + 1, time.time(), session_id)
+                )
+                # Log limitado: mantém só os últimos max_events
+                conn.execute(
+                    "DELETE FROM progress_events WHERE session_id = ? AND event_id <= ?",
+                    (session_id, event_id - self.max_events)
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        return {'id': event_id, 'event': event_type, 'data': data}
+
+    def _read_events(self, session_id: str, last_event_id: int) -> List[Dict[str, Any]]:
+        rows = self._get_connection().execute(
+            "SELECT event_id, event_type, data FROM progress_events WHERE session_id = ? AND event_id > ? ORDER BY event_id",
+            (session_id, last_event_id)
+        ).fetchall()
+        return [{'id': event_id, 'event': event_type, 'data': json.loads(data)} for event_id, event_type, data in rows]
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        rows = self._get_connection().execute("SELECT state FROM progress_sessions").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_session(self, session_id: str):
+        conn = self._get_connection()
+        with self._write_lock:
+            conn.execute("DELETE FROM progress_events WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM progress_sessions WHERE session_id = ?", (session_id,))
+            conn.commit()
+
+    def reap_expired(self) -> int:
+        cutoff = time.time() - self.session_ttl
+        conn = self._get_connection()
+        with self._write_lock:
+            conn.execute(
+                "DELETE FROM progress_events WHERE session_id IN "
+                "(SELECT session_id FROM progress_sessions WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            cursor = conn.execute("DELETE FROM progress_sessions WHERE updated_at < ?", (cutoff,))
+            conn.commit()
+        return cursor.rowcount
+
+
+class RedisProgressStore(BaseProgressStore):
+    """Progresso em Redis, compartilhado entre máquinas; expiração via TTL das chaves"""
+
+    backend = 'redis'
+
+    # Reserva o id e grava o evento no mesmo passo atômico: com INCR e RPUSH
+    # separados, dois publicadores podiam gravar o id 6 antes do 5, e quem já
+    # tinha visto o 6 (filtro id > last_event_id) nunca recebia o 5.
+    # KEYS: estado, eventos, contador; ARGV: tipo (JSON), dados (JSON), max_events, TTL
+    APPEND_EVENT_SCRIPT = """
+        if redis.call('EXISTS', KEYS[1]) == 0 then
+            return false
+        end
+        local event_id = redis.call('INCR', KEYS[3])
+        redis.call('RPUSH', KEYS[2], '{"id": ' .. event_id .. ', "event": ' .. ARGV[1] .. ', "data": ' .. ARGV[2] .. '}')
+        redis.call('LTRIM', KEYS[2], -tonumber(ARGV[3]), -1)
+        for _, key in ipairs(KEYS) do
+            redis.call('EXPIRE', key, ARGV[4])
+        end
+        return event_id
+    """
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        self.client = redis.Redis.from_url(redis_url, decode_responses=True)
+        self.prefix = 'arqv30:progress'
+        self._append_event_script = self.client.register_script(self.APPEND_EVENT_SCRIPT)
+
+    def _state_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:state"
+
+    def _events_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:events"
+
+    def _counter_key(self, session_id: str) -> str:
+        return f"{self.prefix}:{session_id}:next_id"
+
+    def _touch(self, pipe, session_id: str):
+        for key in (self._state_key(session_id), self._events_key(session_id), self._counter_key(session_id)):
+            pipe.expire(key, self.session_ttl)
+
+    def create_session(self, session_id: str, state: Dict[str, Any]):
+        pipe = self.client.pipeline()
+        pipe.delete(self._events_key(session_id), self._counter_key(session_id))
+        pipe.set(self._state_key(session_id), json.dumps(state, ensure_ascii=False, default=str))
+        pipe.sadd(f"{self.prefix}:sessions", session_id)
+        self._touch(pipe, session_id)
+        pipe.execute()
+
+    def get_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self._state_key(session_id))
+        return json.loads(raw) if raw else None
+
+    def update_state(self, session_id: str, **fields) -> Optional[Dict[str, Any]]:
+        key = self._state_key(session_id)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    if not raw:
+                        pipe.unwatch()
+                        return None
+                    state = json.loads(raw)
+                    state.update(fields)
+                    pipe.multi()
+                    pipe.set(key, json.dumps(state, ensure_ascii=False, default=str))
+                    self._touch(pipe, session_id)
+                    pipe.execute()
+                    return state
+                except redis.WatchError:
+                    continue
+
+    def append_event(self, session_id: str, event_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        event_id = self._append_event_script(
+            keys=[self._state_key(session_id), self._events_key(session_id), self._counter_key(session_id)],
+            args=[
+                json.dumps(event_type),
+                json.dumps(data, ensure_ascii=False, default=str),
+                self.max_events,
+                self.session_ttl
+            ]
+        )
+        if event_id is None:
+            return None
+        return {'id': int(event_id), 'event': event_type, 'data': data}
+
+    def _read_events(self, session_id: str, last_event_id: int) -> List[Dict[str, Any]]:
+        events = (json.loads(raw) for raw in self.client.lrange(self._events_key(session_id), 0, -1))
+        return [event for event in events if event['id'] > last_event_id]
+
+    def list_sessions(self) -> List[Dict[str, Any]]:
+        sessions = []
+        for session_id in self.client.smembers(f"{self.prefix}:sessions"):
+            state = self.get_state(session_id)
+            if state:
+                sessions.append(state)
+        return sessions
+
+    def delete_session(self, session_id: str):
+        self.client.delete(self._state_key(session_id), self._events_key(session_id), self._counter_key(session_id))
+        self.client.srem(f"{self.prefix}:sessions", session_id)
+
+    def reap_expired(self) -> int:
+        """Chaves expiram sozinhas; remove apenas os ids órfãos do índice de sessões"""
+        removed = 0
+        for session_id in self.client.smembers(f"{self.prefix}:sessions"):
+            if not self.client.exists(self._state_key(session_id)):
+                self.client.srem(f"{self.prefix}:sessions", session_id)
+                removed += 1
+        return removed
+
+
+def create_progress_store() -> BaseProgressStore:
+    """Escolhe o backend por PROGRESS_STORE (memory | sqlite | redis)"""
+    backend = os.getenv('PROGRESS_STORE', 'sqlite').lower()
+
+    if backend == 'redis':
+        redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        if not HAS_REDIS:
+            logger.warning("⚠️ PROGRESS_STORE=redis mas o pacote redis não está instalado - usando SQLite")
+        else:
+            try:
+                store = RedisProgressStore(redis_url)
+                store.client.ping()
+                logger.info("✅ Progresso compartilhado via Redis")
+                return store
+            except Exception as e:
+                logger.warning(f"⚠️ Redis indisponível ({e}) - usando SQLite")
+        backend = 'sqlite'
+
+    if backend == 'memory':
+        logger.info("✅ Progresso em memória (apenas um worker)")
+        return MemoryProgressStore()
+
+    logger.info("✅ Progresso compartilhado via SQLite")
+    return SQLiteProgressStore()
+
+# Instância global
+progress_store = create_progress_store()
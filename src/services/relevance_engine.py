@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Relevance Engine
+Motor único de relevância: tokenização única por documento e ranking BM25 por análise
+"""
+
+import re
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+TOKEN_REGEX = re.compile(r'\w+')
+NUMBER_REGEX = re.compile(r'\d+(?:\.\d+)?%?')
+MONEY_REGEX = re.compile(r'R\$\s*[\d,\.]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens em minúsculas (palavras e números)"""
+    return TOKEN_REGEX.findall(text.lower())
+
+
+class AnalyzedDocument:
+    """Documento tokenizado uma única vez: frequências e contagens usadas nos bônus"""
+
+    __slots__ = ('term_freqs', 'length', 'char_count', 'number_count', 'money_count')
+
+    def __init__(self, text: str):
+        tokens = tokenize(text)
+        self.term_freqs = Counter(tokens)
+        self.length = len(tokens)
+        self.char_count = len(text)
+        self.number_count = len(NUMBER_REGEX.findall(text))
+        self.money_count = len(MONEY_REGEX.findall(text))
+
+
+class RelevanceProfile:
+    """
+    Consulta compilada: grupos de termos com peso (query, contexto, termos de
+    mercado...) e bônus por números, valores monetários e tamanho do texto.
+    Termos com várias palavras valem pela palavra menos presente (todas precisam aparecer).
+    """
+
+    def __init__(
+        self,
+        term_groups: Iterable[Tuple[Iterable[str], float]],
+        number_weight: float = 0.0,
+        money_weight: float = 0.0,
+        length_bonuses: Iterable[Tuple[int, float]] = ()
+    ):
+        self.term_groups: List[Tuple[List[Tuple[str, ...]], float]] = []
+        for terms, weight in term_groups:
+            compiled = []
+            for term in terms:
+                tokens = tuple(tokenize(str(term)))
+                if tokens and tokens not in compiled:
+                    compiled.append(tokens)
+            if compiled and weight:
+                self.term_groups.append((compiled, weight))
+
+        self.number_weight = number_weight
+        self.money_weight = money_weight
+        # Maior limite primeiro: vale só o primeiro bônus atingido
+        self.length_bonuses = sorted(length_bonuses, reverse=True)
+
+    @property
+    def vocabulary(self) -> set:
+        return {token for terms, _ in self.term_groups for phrase in terms for token in phrase}
+
+    @classmethod
+    def for_research(
+        cls,
+        query: str = '',
+        context: Optional[Dict[str, Any]] = None,
+        query_weight: float = 0.0,
+        context_weight: float = 0.0,
+        market_terms: Iterable[str] = (),
+        market_weight: float = 0.0,
+        **bonuses
+    ) -> 'RelevanceProfile':
+        """Perfil padrão das pesquisas: palavras da query, segmento/produto/público e termos de mercado"""
+        context = context or {}
+        query_words = [word for word in (query or '').lower().split() if len(word) > 2]
+        context_terms = [
+            str(context[key]) for key in ('segmento', 'produto', 'publico')
+            if context.get(key) and len(str(context[key])) > 2
+        ]
+        return cls(
+            [(query_words, query_weight), (context_terms, context_weight), (market_terms, market_weight)],
+            **bonuses
+        )
+
+
+class BM25Index:
+    """
+    Índice em memória de uma análise. Cada documento é tokenizado ao entrar;
+    o score é BM25 (saturação de frequência e normalização por tamanho) ponderado
+    pelos grupos do perfil. Com poucos documentos o IDF não é confiável e vale 1.
+
+    O IDF tem piso 1 (o mesmo valor de um texto pontuado sozinho): termo presente
+    em todas as páginas não zera o score, só termos raros ganham peso extra. Assim
+    os scores do índice ficam na mesma escala de score_text e limiares absolutos
+    continuam válidos mesmo quando todo o corpus fala do assunto pesquisado.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, min_docs_for_idf: int = 3):
+        self.k1 = k1
+        self.b = b
+        self.min_docs_for_idf = min_docs_for_idf
+
+        self._documents: Dict[str, AnalyzedDocument] = {}
+        self._document_freqs: Counter = Counter()
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._documents
+
+    def add(self, doc_id: str, text: str) -> AnalyzedDocument:
+        """Indexa o documento (uma vez por doc_id)"""
+        existing = self._documents.get(doc_id)
+        if existing is not None:
+            return existing
+
+        document = AnalyzedDocument(text or '')
+        with self._lock:
+            if doc_id in self._documents:
+                return self._documents[doc_id]
+            self._documents[doc_id] = document
+            self._document_freqs.update(document.term_freqs.keys())
+            self._total_length += document.length
+        return document
+
+    def get(self, doc_id: str) -> Optional[AnalyzedDocument]:
+        return self._documents.get(doc_id)
+
+    @property
+    def average_length(self) -> float:
+        return self._total_length / len(self._documents) if self._documents else 0.0
+
+    def idf(self, token: str) -> float:
+        total_docs = len(self._documents)
+        if total_docs < self.min_docs_for_idf:
+            return 1.0
+        doc_freq = self._document_freqs.get(token, 0)
+        return max(1.0, math.log(1 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5)))
+
+    def _token_score(self, document: AnalyzedDocument, token: str, length_norm: float) -> float:
+        freq = document.term_freqs.get(token, 0)
+        if not freq:
+            return 0.0
+        return self.idf(token) * freq * (self.k1 + 1) / (freq + self.k1 * length_norm)
+
+    def score_document(self, document: AnalyzedDocument, profile: RelevanceProfile) -> float:
+        """Score do documento para o perfil (0-100)"""
+        average_length = self.average_length or document.length or 1
+        length_norm = 1 - self.b + self.b * (document.length / average_length)
+
+        score = 0.0
+        for phrases, weight in profile.term_groups:
+            for phrase in phrases:
+                score += weight * min(self._token_score(document, token, length_norm) for token in phrase)
+
+        if profile.number_weight and document.number_count:
+            score += profile.number_weight * math.log1p(document.number_count)
+        if profile.money_weight and document.money_count:
+            score += profile.money_weight * math.log1p(document.money_count)
+        for min_words, bonus in profile.length_bonuses:
+            if document.length > min_words:
+                score += bonus
+                break
+
+        return min(score, 100.0)
+
+    def score(self, doc_id: str, profile: RelevanceProfile) -> float:
+        document = self._documents.get(doc_id)
+        return self.score_document(document, profile) if document else 0.0
+
+    def rank(self, profile: RelevanceProfile, doc_ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """(doc_id, score) do mais relevante para o menos relevante"""
+        ids = list(doc_ids) if doc_ids is not None else list(self._documents)
+        scored = [(doc_id, self.score(doc_id, profile)) for doc_id in ids]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+
+class RelevanceEngine:
+    """Ponto de entrada compartilhado pelos serviços de pesquisa e validação"""
+
+    def new_index(self, **params) -> BM25Index:
+        """Índice novo para uma análise/pesquisa"""
+        return BM25Index(**params)
+
+    def score_text(self, text: str, profile: RelevanceProfile) -> float:
+        """Score de um texto isolado (sem corpus: só frequência saturada)"""
+        return BM25Index().score_document(AnalyzedDocument(text or ''), profile)
+
+    def rank_items(
+        self,
+        items: List[Dict[str, Any]],
+        profile: RelevanceProfile,
+        text_key: str = 'content',
+        id_key: str = 'url'
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Indexa uma lista de páginas e retorna (página, score) ordenado"""
+        index = self.new_index()
+        ids = []
+        for position, item in enumerate(items):
+            doc_id = str(item.get(id_key) or position)
+            if doc_id in index:
+                doc_id = f"{doc_id}#{position}"
+            index.add(doc_id, item.get(text_key, ''))
+            ids.append(doc_id)
+
+        by_id = dict(zip(ids, items))
+        return [(by_id[doc_id], score) for doc_id, score in index.rank(profile, ids)]
+
+# Instância global
+relevance_engine = RelevanceEngine()
@@ -5,55 +5,22 @@ ARQV30 Enhanced v2.0 - Robust Content Extractor
 Extrator multicamadas aprimorado com suporte a PDF e fallback robusto
 """
 
-import os
 import logging
 import time
-import requests
 from typing import Dict, List, Optional, Any, Tuple
-from urllib.parse import urljoin, urlparse
-import re
-import tempfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Imports condicionais para não quebrar se não estiver instalado
-try:
-    import trafilatura
-    HAS_TRAFILATURA = True
-except ImportError:
-    HAS_TRAFILATURA = False
-
-try:
-    from readability import Document
-    HAS_READABILITY = True
-except ImportError:
-    HAS_READABILITY = False
-
-try:
-    import newspaper
-    from newspaper import Article
-    HAS_NEWSPAPER = True
-except ImportError:
-    HAS_NEWSPAPER = False
-
-try:
-    from bs4 import BeautifulSoup
-    HAS_BEAUTIFULSOUP = True
-except ImportError:
-    HAS_BEAUTIFULSOUP = False
-
-try:
-    import PyPDF2
-    HAS_PYPDF2 = True
-except ImportError:
-    HAS_PYPDF2 = False
-
-try:
-    import pdfplumber
-    HAS_PDFPLUMBER = True
-except ImportError:
-    HAS_PDFPLUMBER = False
-
 from services.url_resolver import url_resolver
+from services.async_fetch_engine import async_fetch_engine, FetchResult
+from services.extraction_cache import extraction_cache
+from services.domain_reputation import domain_reputation
+from services.content_extractors import (
+    HAS_TRAFILATURA, HAS_READABILITY, HAS_NEWSPAPER, HAS_LXML, HAS_PYPDF2, HAS_PDFPLUMBER,
+    HTML_EXTRACTORS, validate_content
+)
+from services.extraction_pool import extraction_pool
+from services.pdf_text_engine import pdf_text_engine
+from services.fetch_health import fetch_health
 
 logger = logging.getLogger(__name__)
 
@@ -61,26 +28,15 @@ class RobustContentExtractor:
     """Extrator de conteúdo multicamadas e robusto com suporte aprimorado a PDF"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        })
-        
         self.timeout = 30
-        self.min_content_length = 200  # Reduzido de 500 para 200
-        self.max_content_length = 50000  # 50K chars max
         
         # Estatísticas dos extratores
         self.stats = {
             'trafilatura': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_TRAFILATURA},
             'readability': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_READABILITY},
             'newspaper': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_NEWSPAPER},
-            'beautifulsoup': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_BEAUTIFULSOUP},
+            # Nome mantido por compatibilidade; as estratégias usam a árvore lxml do ParsedDocument
+            'beautifulsoup': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_LXML},
             'pdf_pypdf2': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_PYPDF2},
             'pdf_pdfplumber': {'success': 0, 'failed': 0, 'total_time': 0, 'usage_count': 0, 'available': HAS_PDFPLUMBER},
             'global': {
@@ -99,8 +55,21 @@ class RobustContentExtractor:
         Extrai conteúdo usando múltiplos extratores em ordem de prioridade
         Agora com suporte aprimorado a PDF e melhor fallback
         """
+        return self._extract_content(url)
+
+    def _extract_content(
+        self,
+        url: str,
+        prefetched: Optional[FetchResult] = None,
+        check_domain: bool = True
+    ) -> Optional[str]:
+        """
+        Pipeline de extração; aceita download já feito (ex.: por batch_extract).
+        check_domain=False quando quem chamou já consultou o histórico do domínio
+        e a saúde da URL/host (fetch_health).
+        """
+        fetch_result = prefetched
         try:
-            start_time = time.time()
             self.stats['global']['total_extractions'] += 1
             
             logger.info(f"🔍 Iniciando extração de: {url}")
@@ -111,589 +80,173 @@ class RobustContentExtractor:
                 logger.info(f"🔄 URL resolvida: {url} -> {resolved_url}")
                 url = resolved_url
             
-            # 2. Verifica se é PDF
-            if self._is_pdf_url(url):
-                logger.info("📄 Detectado PDF - usando extratores especializados")
-                content = self._extract_pdf_content(url)
-                if content and self._validate_content(content, url):
-                    self.stats['global']['total_successes'] += 1
-                    self._update_global_stats()
-                    return content
+            # 2. Cache persistente (chave = URL resolvida)
+            cached = extraction_cache.get(url)
+            if cached and cached['fresh']:
+                logger.info(f"📦 Cache de extração: {url} ({cached['extractor']})")
+                self._record_success()
+                return cached['content']
             
-            # 3. Baixa conteúdo HTML
-            html_content = self._fetch_html(url)
-            if not html_content:
-                logger.error(f"❌ Falha ao baixar HTML para {url}")
+            # Domínio onde a extração nunca funciona: nem baixa
+            if check_domain and domain_reputation.is_hopeless(url):
+                logger.warning(f"⏭️ Domínio sem extrações bem-sucedidas no histórico, pulando: {url}")
                 self.stats['global']['total_failures'] += 1
                 self._update_global_stats()
                 return None
             
-            logger.info(f"📥 HTML baixado: {len(html_content)} caracteres")
-            
-            # 4. Verifica se é página dinâmica (JavaScript-heavy)
-            if self._is_dynamic_page(html_content):
-                logger.warning(f"⚠️ Página dinâmica detectada: {url}")
-                # Tenta extração mais agressiva
-                content = self._extract_dynamic_content(html_content, url)
-                if content and self._validate_content(content, url):
-                    self.stats['global']['total_successes'] += 1
-                    self._update_global_stats()
-                    return content
-            
-            # 5. Tenta extratores em ordem de prioridade
-            extractors = [
-                ('trafilatura', self._extract_with_trafilatura),
-                ('readability', self._extract_with_readability),
-                ('newspaper', self._extract_with_newspaper),
-                ('beautifulsoup', self._extract_with_beautifulsoup)
-            ]
-            
-            for extractor_name, extractor_func in extractors:
-                if not self._is_extractor_available(extractor_name):
-                    continue
-                
-                try:
-                    logger.info(f"🔍 Tentando extração com {extractor_name}...")
-                    extractor_start = time.time()
-                    self.stats[extractor_name]['usage_count'] += 1
-                    
-                    content = extractor_func(html_content, url)
-                    extractor_time = time.time() - extractor_start
-                    
-                    if self._validate_content(content, url):
-                        self.stats[extractor_name]['success'] += 1
-                        self.stats[extractor_name]['total_time'] += extractor_time
-                        self.stats['global']['total_successes'] += 1
-                        self._update_global_stats()
-                        
-                        logger.info(f"✅ Extração bem-sucedida com {extractor_name}: {len(content)} caracteres em {extractor_time:.2f}s")
-                        return content
-                    else:
-                        self.stats[extractor_name]['failed'] += 1
-                        logger.warning(f"⚠️ Conteúdo insuficiente com {extractor_name}: {len(content) if content else 0} caracteres")
-                        
-                except Exception as e:
-                    self.stats[extractor_name]['failed'] += 1
-                    logger.error(f"❌ Erro com {extractor_name}: {str(e)}")
-                    continue
-            
-            # 6. Fallback final - extração agressiva
-            logger.warning(f"⚠️ Todos os extratores padrão falharam, tentando extração agressiva...")
-            content = self._aggressive_fallback_extraction(html_content, url)
-            if content and len(content) >= 100:  # Critério mais flexível para fallback
-                logger.info(f"✅ Extração agressiva bem-sucedida: {len(content)} caracteres")
-                self.stats['global']['total_successes'] += 1
+            # URL que falhou há pouco ou host instável: nem baixa (cópia vencida do cache ainda serve)
+            skip_reason = fetch_health.should_skip(url) if check_domain else None
+            if skip_reason:
+                if cached:
+                    logger.info(f"📦 Download pulado ({skip_reason}), usando cache vencido: {url}")
+                    self._record_success()
+                    return cached['content']
+                logger.warning(f"⏭️ Pulando {url}: {skip_reason}")
+                self.stats['global']['total_failures'] += 1
                 self._update_global_stats()
-                return content
-            
-            # Todos os extratores falharam
-            logger.error(f"❌ FALHA CRÍTICA: Todos os extratores falharam para {url}")
-            self.stats['global']['total_failures'] += 1
-            self._update_global_stats()
-            return None
-            
-        except Exception as e:
-            logger.error(f"❌ Erro crítico na extração de {url}: {str(e)}")
-            self.stats['global']['total_failures'] += 1
-            self._update_global_stats()
-            return None
-    
-    def _is_pdf_url(self, url: str) -> bool:
-        """Verifica se a URL aponta para um PDF"""
-        return (url.lower().endswith('.pdf') or 
-                'pdf' in url.lower() or 
-                'application/pdf' in url.lower())
-    
-    def _extract_pdf_content(self, url: str) -> Optional[str]:
-        """Extrai conteúdo de PDF usando múltiplas estratégias"""
-        
-        try:
-            # Baixa o PDF
-            response = self.session.get(url, timeout=self.timeout)
-            response.raise_for_status()
-            
-            # Salva temporariamente
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_file:
-                temp_file.write(response.content)
-                temp_path = temp_file.name
-            
-            try:
-                # Tenta PDFPlumber primeiro (melhor para PDFs complexos)
-                if HAS_PDFPLUMBER:
-                    content = self._extract_pdf_with_pdfplumber(temp_path)
-                    if content and len(content) > 100:
-                        self.stats['pdf_pdfplumber']['success'] += 1
-                        logger.info(f"✅ PDF extraído com PDFPlumber: {len(content)} caracteres")
-                        return content
-                    else:
-                        self.stats['pdf_pdfplumber']['failed'] += 1
-                
-                # Fallback para PyPDF2
-                if HAS_PYPDF2:
-                    content = self._extract_pdf_with_pypdf2(temp_path)
-                    if content and len(content) > 100:
-                        self.stats['pdf_pypdf2']['success'] += 1
-                        logger.info(f"✅ PDF extraído com PyPDF2: {len(content)} caracteres")
-                        return content
-                    else:
-                        self.stats['pdf_pypdf2']['failed'] += 1
-                
-                logger.error(f"❌ Falha na extração de PDF: {url}")
                 return None
-                
-            finally:
-                # Remove arquivo temporário
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
-                    
-        except Exception as e:
-            logger.error(f"❌ Erro ao processar PDF {url}: {str(e)}")
-            return None
-    
-    def _extract_pdf_with_pdfplumber(self, pdf_path: str) -> Optional[str]:
-        """Extrai texto usando PDFPlumber"""
-        try:
-            import pdfplumber
-            
-            text = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            
-            return self._clean_content(text) if text else None
-            
-        except Exception as e:
-            logger.error(f"Erro PDFPlumber: {e}")
-            return None
-    
-    def _extract_pdf_with_pypdf2(self, pdf_path: str) -> Optional[str]:
-        """Extrai texto usando PyPDF2"""
-        try:
-            import PyPDF2
-            
-            text = ""
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            
-            return self._clean_content(text) if text else None
-            
-        except Exception as e:
-            logger.error(f"Erro PyPDF2: {e}")
-            return None
-    
-    def _is_dynamic_page(self, html: str) -> bool:
-        """Verifica se é página dinâmica (JavaScript-heavy)"""
-        if not html:
-            return False
-        
-        # Indicadores de página dinâmica
-        dynamic_indicators = [
-            'react', 'angular', 'vue.js', 'spa-',
-            'document.write', 'innerHTML', 'createElement',
-            'loading...', 'carregando...', 'please enable javascript',
-            'javascript required', 'js-', 'ng-', 'v-'
-        ]
-        
-        html_lower = html.lower()
-        js_indicators = sum(1 for indicator in dynamic_indicators if indicator in html_lower)
-        
-        # Se tem muitos indicadores JS e pouco conteúdo de texto
-        text_content = BeautifulSoup(html, 'html.parser').get_text() if HAS_BEAUTIFULSOUP else html
-        text_ratio = len(text_content.strip()) / len(html) if html else 0
-        
-        return js_indicators > 3 and text_ratio < 0.1
-    
-    def _extract_dynamic_content(self, html: str, url: str) -> Optional[str]:
-        """Extração especializada para conteúdo dinâmico"""
-        
-        if not HAS_BEAUTIFULSOUP:
-            return None
-        
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove scripts e elementos dinâmicos
-            for element in soup(['script', 'style', 'noscript', 'iframe']):
-                element.decompose()
-            
-            # Busca por elementos com conteúdo pré-renderizado
-            content_selectors = [
-                '[data-content]', '[data-text]', '.content-loaded',
-                '.server-rendered', '.static-content', '.preloaded',
-                'main', 'article', '.post-content', '.article-content',
-                '.entry-content', '.page-content', '.text-content'
-            ]
-            
-            extracted_content = []
-            
-            for selector in content_selectors:
-                try:
-                    elements = soup.select(selector)
-                    for element in elements:
-                        text = element.get_text(strip=True)
-                        if len(text) > 50:  # Conteúdo substancial
-                            extracted_content.append(text)
-                except:
-                    continue
-            
-            if extracted_content:
-                combined = '\n\n'.join(extracted_content)
-                return self._clean_content(combined)
-            
-            # Fallback: extrai todo texto disponível
-            all_text = soup.get_text()
-            return self._clean_content(all_text) if len(all_text) > 100 else None
-            
-        except Exception as e:
-            logger.error(f"Erro na extração dinâmica: {e}")
-            return None
-    
-    def _aggressive_fallback_extraction(self, html: str, url: str) -> Optional[str]:
-        """Extração agressiva como último recurso"""
-        
-        if not HAS_BEAUTIFULSOUP:
-            return None
-        
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
             
-            # Remove apenas elementos críticos
-            for element in soup(['script', 'style']):
-                element.decompose()
-            
-            # Coleta todo texto disponível
-            all_text = soup.get_text()
-            
-            # Filtra linhas com conteúdo significativo
-            lines = all_text.split('\n')
-            meaningful_lines = []
+            # 3. Baixa em streaming (condicional se houver entrada expirada). O tipo vem
+            # dos headers/assinatura: PDFs chegam em arquivo temporário, binários e
+            # corpos acima do limite são recusados antes de serem baixados por inteiro
+            if fetch_result is None:
+                fetch_result = async_fetch_engine.fetch(
+                    url, headers=extraction_cache.conditional_headers(cached), min_length=500, accept_pdf=True
+                )
             
-            for line in lines:
-                line = line.strip()
-                if (len(line) > 20 and  # Linha substancial
-                    not line.lower().startswith(('menu', 'nav', 'footer', 'header')) and
-                    not re.match(r'^[\s\W]*$', line)):  # Não só espaços/símbolos
-                    meaningful_lines.append(line)
+            if fetch_result.status == 304 and cached:
+                logger.info(f"♻️ Conteúdo não modificado (304), usando cache: {url}")
+                extraction_cache.mark_revalidated(url)
+                self._record_success()
+                return cached['content']
+            
+            response_headers = fetch_result.headers or {}
+            etag = response_headers.get('ETag') or response_headers.get('Etag')
+            last_modified = response_headers.get('Last-Modified')
+            
+            # 4. PDF: extratores especializados
+            if fetch_result.ok and fetch_result.is_pdf:
+                logger.info(f"📄 PDF recebido ({fetch_result.size // 1024} KB) - usando extratores especializados")
+                content = self._extract_pdf_file(fetch_result.file_path, url)
+                if content and validate_content(content, url):
+                    return self._store_success(url, content, 'pdf', etag, last_modified)
+                return self._record_failure(url)
+            
+            html_content = self._html_from_fetch_result(fetch_result)
+            if not html_content:
+                logger.error(f"❌ Falha ao baixar HTML para {url}")
+                return self._record_failure(url)
             
-            if meaningful_lines:
-                content = '\n'.join(meaningful_lines)
-                return self._clean_content(content)
+            logger.info(f"📥 HTML baixado: {len(html_content)} caracteres")
             
-            return None
+            # Ordem dos extratores aprendida no domínio (o que costuma funcionar vai primeiro)
+            ordered_names, skipped_names = domain_reputation.order_extractors(
+                url, ['dynamic'] + HTML_EXTRACTORS
+            )
+            if skipped_names:
+                logger.info(f"⏭️ Extratores sem sucesso neste domínio, pulados: {', '.join(skipped_names)}")
             
-        except Exception as e:
-            logger.error(f"Erro na extração agressiva: {e}")
-            return None
-    
-    def _fetch_html(self, url: str) -> Optional[str]:
-        """Baixa conteúdo HTML da URL com retry"""
-        max_retries = 3
-        
-        for attempt in range(max_retries):
+            # 5-7. Parsing (CPU): na thread atual ou no pool de processos (EXTRACTION_EXECUTOR)
             try:
-                response = self.session.get(
-                    url,
-                    timeout=self.timeout,
-                    verify=False,  # Para evitar problemas de SSL
-                    allow_redirects=True
-                )
-                
-                response.raise_for_status()
-                
-                # Detecta encoding
-                if response.encoding is None:
-                    response.encoding = 'utf-8'
-                
-                html = response.text
-                
-                if len(html) < 500:
-                    logger.warning(f"⚠️ HTML muito pequeno (tentativa {attempt + 1}): {len(html)} caracteres")
-                    if attempt < max_retries - 1:
-                        time.sleep(2)  # Aguarda antes de tentar novamente
-                        continue
-                
-                return html
-                
-            except requests.exceptions.Timeout:
-                logger.warning(f"⏰ Timeout na tentativa {attempt + 1} para {url}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-            except Exception as e:
-                logger.error(f"❌ Erro ao baixar {url} (tentativa {attempt + 1}): {str(e)}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-        
-        return None
-    
-    def _extract_with_trafilatura(self, html: str, url: str) -> Optional[str]:
-        """Extrai com Trafilatura (prioridade 1) com configurações aprimoradas"""
-        if not HAS_TRAFILATURA:
-            return None
-        
-        try:
-            # Configurações mais agressivas para trafilatura
-            content = trafilatura.extract(
-                html, 
-                include_comments=False,
-                include_tables=True,
-                include_formatting=False,
-                favor_precision=False,  # Mudado para False para ser mais inclusivo
-                favor_recall=True,      # Prioriza recuperar mais conteúdo
-                url=url,
-                config=trafilatura.settings.use_config()
-            )
+                outcome = extraction_pool.run('run_html_extractors', html_content, url, ordered_names, skipped_names)
+            except TimeoutError as e:
+                logger.error(f"⏰ Extração interrompida para {url}: {e}")
+                return self._record_failure(url)
             
-            if content:
-                content = self._clean_content(content)
-                return content
+            self._record_attempts(url, outcome['attempts'])
+            if outcome['content']:
+                return self._store_success(url, outcome['content'], outcome['extractor'], etag, last_modified)
             
-            return None
+            # Todos os extratores falharam
+            logger.error(f"❌ FALHA CRÍTICA: Todos os extratores falharam para {url}")
+            return self._record_failure(url)
             
         except Exception as e:
-            logger.error(f"Erro Trafilatura: {e}")
-            return None
-    
-    def _extract_with_readability(self, html: str, url: str) -> Optional[str]:
-        """Extrai com Readability (prioridade 2) com configurações aprimoradas"""
-        if not HAS_READABILITY:
-            return None
+            logger.error(f"❌ Erro crítico na extração de {url}: {str(e)}")
+            return self._record_failure(url)
         
-        try:
-            # Configurações mais inclusivas
-            doc = Document(html, positive_keywords=['content', 'article', 'post', 'text', 'main'])
-            content = doc.summary()
-            
-            if content:
-                # Remove tags HTML
-                if HAS_BEAUTIFULSOUP:
-                    soup = BeautifulSoup(content, 'html.parser')
-                    content = soup.get_text()
+        finally:
+            # Download feito aqui: remove o PDF temporário (os de batch_extract são removidos lá)
+            if prefetched is None and fetch_result is not None:
+                fetch_result.discard_file()
+
+    def _record_attempts(self, url: str, attempts: List[Tuple[str, bool, float]]):
+        """Registra nas estatísticas e no histórico do domínio as tentativas de cada extrator"""
+        for extractor_name, success, elapsed in attempts:
+            stats = self.stats.get(extractor_name)
+            if stats is not None:
+                stats['usage_count'] += 1
+                if success:
+                    stats['success'] += 1
+                    stats['total_time'] += elapsed
                 else:
-                    # Remove tags manualmente
-                    content = re.sub(r'<[^>]+>', '', content)
-                
-                content = self._clean_content(content)
-                return content
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro Readability: {e}")
-            return None
+                    stats['failed'] += 1
+            domain_reputation.record_extractor(url, extractor_name, success, elapsed)
     
-    def _extract_with_newspaper(self, html: str, url: str) -> Optional[str]:
-        """Extrai com Newspaper3k (prioridade 3) com configurações aprimoradas"""
-        if not HAS_NEWSPAPER:
-            return None
-        
+    def _record_success(self):
+        """Contabiliza extração bem-sucedida"""
+        self.stats['global']['total_successes'] += 1
+        self._update_global_stats()
+
+    def _record_failure(self, url: str) -> None:
+        """Contabiliza falha de extração (global e por domínio)"""
+        self.stats['global']['total_failures'] += 1
+        self._update_global_stats()
+        domain_reputation.record_failure(url)
+        return None
+
+    def _store_success(
+        self,
+        url: str,
+        content: str,
+        extractor: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> str:
+        """Contabiliza sucesso e grava o conteúdo no cache persistente"""
+        self._record_success()
+        domain_reputation.record_success(url)
+        extraction_cache.set(url, content, extractor, etag, last_modified)
+        return content
+    
+    def _extract_pdf_file(self, pdf_path: str, url: str) -> Optional[str]:
+        """Extrai o texto de um PDF já baixado (arquivo temporário do fetch engine)"""
         try:
-            article = Article(url)
-            article.set_html(html)
-            article.parse()
-            
-            content = article.text
-            if content:
-                content = self._clean_content(content)
-                return content
-            
+            # Parsing do PDF (CPU): na thread atual ou no pool de processos
+            outcome = extraction_pool.run('run_pdf_extractors', pdf_path)
+            for extractor_name, success, elapsed in outcome['attempts']:
+                self.stats[extractor_name]['usage_count'] += 1
+                self.stats[extractor_name]['success' if success else 'failed'] += 1
+                if success:
+                    self.stats[extractor_name]['total_time'] += elapsed
+            
+            if outcome['content']:
+                return outcome['content']
+            
+            logger.error(f"❌ Falha na extração de PDF: {url}")
             return None
             
         except Exception as e:
-            logger.error(f"Erro Newspaper: {e}")
+            logger.error(f"❌ Erro ao processar PDF {url}: {str(e)}")
             return None
     
-    def _extract_with_beautifulsoup(self, html: str, url: str) -> Optional[str]:
-        """Extrai com BeautifulSoup (fallback final) com estratégia aprimorada"""
-        if not HAS_BEAUTIFULSOUP:
+    def _html_from_fetch_result(self, result) -> Optional[str]:
+        """Converte FetchResult em HTML, registrando falhas"""
+        if result.rejected:
+            logger.warning(f"🚫 Download recusado para {result.url}: {result.error}")
             return None
         
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # Remove scripts e styles
-            for script in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'form']):
-                script.decompose()
-            
-            # Estratégia em camadas para encontrar conteúdo
-            content_strategies = [
-                # Estratégia 1: Elementos semânticos
-                lambda: self._extract_semantic_content(soup),
-                # Estratégia 2: Elementos por classe/ID
-                lambda: self._extract_by_selectors(soup),
-                # Estratégia 3: Maior bloco de texto
-                lambda: self._extract_largest_text_block(soup),
-                # Estratégia 4: Todo o body
-                lambda: self._extract_full_body(soup)
-            ]
-            
-            for strategy in content_strategies:
-                try:
-                    content = strategy()
-                    if content and len(content) > 100:
-                        return self._clean_content(content)
-                except:
-                    continue
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro BeautifulSoup: {e}")
+        if not result.ok or result.text is None:
+            if result.error == 'timeout':
+                logger.warning(f"⏰ Timeout após {result.attempts} tentativa(s) para {result.url}")
+            else:
+                logger.error(f"❌ Erro ao baixar {result.url} ({result.attempts} tentativa(s)): {result.error or f'status {result.status}'}")
             return None
-    
-    def _extract_semantic_content(self, soup) -> Optional[str]:
-        """Extrai usando elementos semânticos HTML5"""
-        semantic_elements = soup.find_all(['article', 'main', 'section'])
-        
-        if semantic_elements:
-            content_parts = []
-            for element in semantic_elements:
-                text = element.get_text()
-                if len(text) > 50:
-                    content_parts.append(text)
-            
-            if content_parts:
-                return '\n\n'.join(content_parts)
-        
-        return None
-    
-    def _extract_by_selectors(self, soup) -> Optional[str]:
-        """Extrai usando seletores CSS comuns"""
-        content_selectors = [
-            '.content', '#content', '.post', '.article',
-            '.entry', '.text', '.body', '.main-content',
-            '.post-content', '.article-content', '.entry-content',
-            '.page-content', '.text-content', '.story-content'
-        ]
-        
-        for selector in content_selectors:
-            try:
-                elements = soup.select(selector)
-                if elements:
-                    content_parts = []
-                    for element in elements:
-                        text = element.get_text()
-                        if len(text) > 50:
-                            content_parts.append(text)
-                    
-                    if content_parts:
-                        return '\n\n'.join(content_parts)
-            except:
-                continue
-        
-        return None
-    
-    def _extract_largest_text_block(self, soup) -> Optional[str]:
-        """Encontra e extrai o maior bloco de texto"""
-        all_divs = soup.find_all(['div', 'section', 'article'])
-        
-        largest_text = ""
-        largest_size = 0
-        
-        for div in all_divs:
-            text = div.get_text()
-            if len(text) > largest_size:
-                largest_size = len(text)
-                largest_text = text
-        
-        return largest_text if largest_size > 100 else None
-    
-    def _extract_full_body(self, soup) -> Optional[str]:
-        """Extrai todo o conteúdo do body como último recurso"""
-        body = soup.find('body')
-        if body:
-            return body.get_text()
-        else:
-            return soup.get_text()
-    
-    def _clean_content(self, content: str) -> str:
-        """Limpa e normaliza o conteúdo extraído com melhorias"""
-        if not content:
-            return ""
-        
-        # Remove quebras de linha excessivas
-        content = re.sub(r'\n\s*\n\s*\n+', '\n\n', content)
-        
-        # Remove espaços excessivos
-        content = re.sub(r'[ \t]+', ' ', content)
-        
-        # Remove caracteres de controle
-        content = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', content)
-        
-        # Remove linhas muito curtas (provavelmente navegação)
-        lines = content.split('\n')
-        meaningful_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if (len(line) > 10 and  # Linha substancial
-                not re.match(r'^[\s\W]*$', line) and  # Não só símbolos
-                not line.lower() in ['menu', 'home', 'contato', 'sobre', 'login']):  # Não navegação
-                meaningful_lines.append(line)
-        
-        content = '\n'.join(meaningful_lines)
-        
-        # Normaliza
-        content = content.strip()
-        
-        # Limita tamanho
-        if len(content) > self.max_content_length:
-            content = content[:self.max_content_length] + "..."
-        
-        return content
-    
-    def _validate_content(self, content: str, url: str) -> bool:
-        """Valida se o conteúdo extraído é válido com critérios aprimorados"""
-        if not content:
-            return False
-        
-        # Verifica tamanho mínimo (reduzido para ser mais flexível)
-        if len(content) < self.min_content_length:
-            logger.warning(f"⚠️ Conteúdo pequeno para {url}: {len(content)} < {self.min_content_length}")
-            # Para PDFs, aceita conteúdo menor
-            if self._is_pdf_url(url) and len(content) > 100:
-                logger.info(f"✅ PDF aceito com conteúdo menor: {len(content)} caracteres")
-                return True
-            return False
-        
-        # Verifica se não é só lixo
-        words = content.split()
-        if len(words) < 20:  # Reduzido de 50 para 20
-            logger.warning(f"⚠️ Poucas palavras para {url}: {len(words)}")
-            return False
-        
-        # Verifica densidade de conteúdo real
-        common_words = ['o', 'a', 'de', 'da', 'do', 'e', 'em', 'um', 'uma', 'com', 'não', 'para', 'que', 'se', 'é', 'ou']
-        real_words = sum(1 for word in words if any(common in word.lower() for common in common_words))
-        
-        if real_words / len(words) < 0.05:  # Reduzido de 0.1 para 0.05
-            logger.warning(f"⚠️ Conteúdo suspeito para {url}: poucos conectivos ({real_words}/{len(words)})")
-            return False
-        
-        # Verifica se não é página de erro
-        error_indicators = ['404', 'not found', 'página não encontrada', 'erro', 'error', 'forbidden', 'access denied']
-        content_lower = content.lower()
-        
-        error_count = sum(1 for indicator in error_indicators if indicator in content_lower)
-        if error_count > 2 and len(content) < 1000:  # Muitos indicadores de erro em conteúdo pequeno
-            logger.warning(f"⚠️ Possível página de erro para {url}")
-            return False
-        
-        logger.info(f"✅ Conteúdo válido para {url}: {len(content)} caracteres, {len(words)} palavras")
-        return True
-    
-    def _is_extractor_available(self, extractor_name: str) -> bool:
-        """Verifica se o extrator está disponível"""
-        return self.stats.get(extractor_name, {}).get('available', False)
+
+        if len(result.text) < 500:
+            logger.warning(f"⚠️ HTML muito pequeno após {result.attempts} tentativa(s): {len(result.text)} caracteres")
+
+        return result.text
     
     def _get_available_extractors(self) -> List[str]:
         """Retorna lista de extratores disponíveis"""
@@ -735,8 +288,8 @@ class RobustContentExtractor:
                     stats['reason'] = 'Biblioteca readability-lxml não instalada'
                 elif extractor_name == 'newspaper' and not HAS_NEWSPAPER:
                     stats['reason'] = 'Biblioteca newspaper3k não instalada'
-                elif extractor_name == 'beautifulsoup' and not HAS_BEAUTIFULSOUP:
-                    stats['reason'] = 'Biblioteca beautifulsoup4 não instalada'
+                elif extractor_name == 'beautifulsoup' and not HAS_LXML:
+                    stats['reason'] = 'Biblioteca lxml não instalada'
                 elif extractor_name == 'pdf_pypdf2' and not HAS_PYPDF2:
                     stats['reason'] = 'Biblioteca PyPDF2 não instalada'
                 elif extractor_name == 'pdf_pdfplumber' and not HAS_PDFPLUMBER:
@@ -774,11 +327,49 @@ class RobustContentExtractor:
             logger.info("🔄 Reset estatísticas de todos os extratores")
     
     def batch_extract(self, urls: List[str], max_workers: int = 5) -> Dict[str, Optional[str]]:
-        """Extrai conteúdo de múltiplas URLs em paralelo"""
+        """
+        Extrai conteúdo de múltiplas URLs em paralelo.
+        Downloads vão todos juntos para o motor assíncrono; max_workers limita
+        apenas a etapa de parsing (CPU).
+        """
         results = {}
         
+        # Downloads concorrentes (páginas frescas no cache ficam de fora; PDFs vão para disco)
+        resolved = {url: url_resolver.resolve_redirect_url(url) for url in urls}
+        # Domínios sem extrações bem-sucedidas nem são baixados
+        hopeless = {u for u in set(resolved.values()) if domain_reputation.is_hopeless(u)}
+        headers_by_url = {}
+        known_bad = {}
+        for resolved_url in set(resolved.values()) - hopeless:
+            cached = extraction_cache.get(resolved_url)
+            if cached and cached['fresh']:
+                continue
+            # Falhou há pouco / host instável: fica fora do lote de downloads
+            skip_reason = fetch_health.should_skip(resolved_url)
+            if skip_reason:
+                known_bad[resolved_url] = (skip_reason, cached)
+                continue
+            headers_by_url[resolved_url] = extraction_cache.conditional_headers(cached)
+        
+        fetched = async_fetch_engine.fetch_many(
+            list(headers_by_url), headers_by_url=headers_by_url, min_length=500, accept_pdf=True
+        )
+        
+        def extract_one(url: str) -> Optional[str]:
+            resolved_url = resolved[url]
+            if resolved_url in hopeless:
+                logger.warning(f"⏭️ Domínio sem extrações bem-sucedidas no histórico, pulando: {resolved_url}")
+                return None
+            if resolved_url in known_bad:
+                skip_reason, cached = known_bad[resolved_url]
+                if cached:
+                    return cached['content']
+                logger.warning(f"⏭️ Pulando {resolved_url}: {skip_reason}")
+                return None
+            return self._extract_content(resolved_url, fetched.get(resolved_url), check_domain=False)
+        
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_url = {executor.submit(self.extract_content, url): url for url in urls}
+            future_to_url = {executor.submit(extract_one, url): url for url in urls}
             
             for future in as_completed(future_to_url):
                 url = future_to_url[future]
@@ -789,6 +380,9 @@ class RobustContentExtractor:
                     logger.error(f"Erro na extração paralela de {url}: {e}")
                     results[url] = None
         
+        for fetch_result in fetched.values():
+            fetch_result.discard_file()
+        
         return results
     
     def test_extraction(self, url: str) -> Dict[str, Any]:
@@ -831,13 +425,17 @@ class RobustContentExtractor:
         return result
     
     def clear_cache(self):
-        """Limpa cache de sessão"""
-        self.session.close()
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        })
+        """Limpa cache de páginas extraídas"""
+        extraction_cache.clear()
         logger.info("🧹 Cache de extração limpo")
 
+    def close(self):
+        """Fecha o motor de downloads e os pools de extração mantendo o cache persistente de páginas"""
+        async_fetch_engine.close()
+        # Gravações pendentes da saúde de downloads (fila da thread de gravação)
+        fetch_health.flush()
+        extraction_pool.shutdown()
+        pdf_text_engine.shutdown()
+
 # Instância global
 robust_content_extractor = RobustContentExtractor()
\ No newline at end of file
@@ -13,6 +13,7 @@ from typing import Dict, List, Optional, Any
 from urllib.parse import quote_plus
 from bs4 import BeautifulSoup
 import json
+from services.politeness_scheduler import politeness_scheduler, HostRateLimited
 
 logger = logging.getLogger(__name__)
 
@@ -145,7 +146,7 @@ class SearchManager:
                 'dateRestrict': 'm6'
             }
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=15)
+            response = politeness_scheduler.get(url, params=params, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -187,7 +188,7 @@ class SearchManager:
                 'num': max_results
             }
             
-            response = requests.post(url, json=payload, headers=headers, timeout=15)
+            response = politeness_scheduler.post(url, json=payload, headers=headers, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -217,7 +218,7 @@ class SearchManager:
         try:
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br&count={max_results}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = politeness_scheduler.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -257,7 +258,7 @@ class SearchManager:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(search_url, headers=self.headers, timeout=15)
+            response = politeness_scheduler.get(search_url, headers=self.headers, timeout=15)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, 'html.parser')
@@ -319,6 +320,9 @@ class SearchManager:
                     return self._search_bing(query, max_results)
                 elif provider_name == 'duckduckgo':
                     return self._search_duckduckgo(query, max_results)
+            except HostRateLimited as e:
+                logger.warning(f"⏳ Fallback de busca {provider_name} adiado: {str(e)}")
+                continue
             except Exception as e:
                 logger.warning(f"⚠️ Fallback de busca {provider_name} falhou: {str(e)}")
                 self.providers[provider_name]['error_count'] += 1
@@ -353,8 +357,11 @@ class SearchManager:
                     continue
                 
                 all_results.extend(results)
-                time.sleep(1)  # Rate limiting
                 
+            except HostRateLimited as e:
+                # Espera pedida pelo host: não conta como erro do provedor
+                logger.warning(f"⏳ {provider_name} adiado: {str(e)}")
+                continue
             except Exception as e:
                 logger.warning(f"⚠️ Erro em {provider_name}: {str(e)}")
                 self.providers[provider_name]['error_count'] += 1
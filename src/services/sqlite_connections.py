@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - SQLite Connections
+Conexões SQLite por thread e por processo, seguras com gunicorn preload_app (fork)
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Iterable, List
+
+# Conexões herdadas do processo pai via fork. Ficam referenciadas para nunca serem
+# finalizadas no filho: fechar um handle herdado mexe nos locks/WAL do banco do pai.
+_inherited_connections: List[sqlite3.Connection] = []
+
+
+class SQLiteConnections:
+    """
+    Uma conexão por (processo, thread) para um arquivo SQLite.
+
+    Os serviços criam seus bancos na importação, ainda no master do gunicorn;
+    com preload_app os workers nascem de um fork e herdariam o mesmo handle,
+    o que o SQLite não suporta (principalmente em WAL). Aqui a conexão guarda o
+    PID que a abriu: num processo diferente ela é abandonada e uma nova é
+    aberta sob demanda, já dentro do worker.
+    """
+
+    DEFAULT_PRAGMAS = ('journal_mode=WAL', 'synchronous=NORMAL')
+
+    def __init__(self, db_path: str, pragmas: Iterable[str] = DEFAULT_PRAGMAS, timeout: float = 10):
+        self.db_path = db_path
+        self.pragmas = tuple(pragmas)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        """Conexão da thread atual neste processo"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        if conn is not None:
+            _inherited_connections.append(conn)
+
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        for pragma in self.pragmas:
+            conn.execute(f"PRAGMA {pragma}")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
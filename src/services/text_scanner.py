@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Text Scanner
+Varredura de texto em passagem única: frases indicadoras e contagem de palavras por categoria
+"""
+
+import re
+import bisect
+from collections import Counter
+from typing import Dict, List, Iterable, Any
+
+
+class TextScan:
+    """Resultado da varredura de um texto (tudo que as verificações precisam)"""
+
+    __slots__ = ('content', 'lowered', 'char_count', 'word_count', 'line_count',
+                 'paragraph_count', 'phrase_matches', 'category_counts')
+
+    def __init__(self, content: str, lowered: str):
+        self.content = content
+        self.lowered = lowered
+        self.char_count = len(content)
+        self.word_count = 0
+        self.line_count = 0
+        self.paragraph_count = 0
+        self.phrase_matches: Dict[str, List[str]] = {}
+        self.category_counts: Dict[str, int] = {}
+
+
+class MultiPatternScanner:
+    """
+    Compila uma vez as listas de frases (busca por substring) e de palavras
+    (comparação com tokens) e produz todas as contagens numa passada por texto.
+
+    - Frases: uma única regex em forma de trie (prefixos comuns fatorados, o que
+      permite ao motor pular posições pelo primeiro caractere); a busca avança
+      uma posição após cada ocorrência para achar também as sobrepostas, e frases
+      que são prefixo de outra são resolvidas por um mapa pré-calculado.
+    - Palavras: um dicionário token -> categorias aplicado ao Counter dos tokens.
+    """
+
+    PARAGRAPH_MIN_CHARS = 50
+
+    def __init__(self, phrase_lists: Dict[str, List[str]], word_lists: Dict[str, Iterable[str]]):
+        self.phrase_lists = {name: list(phrases) for name, phrases in phrase_lists.items()}
+        self.word_lists = {name: set(words) for name, words in word_lists.items()}
+
+        # Frase -> categorias (a mesma frase pode estar em mais de uma lista)
+        self._phrase_categories: Dict[str, List[str]] = {}
+        for name, phrases in self.phrase_lists.items():
+            for phrase in phrases:
+                self._phrase_categories.setdefault(phrase, []).append(name)
+
+        # No mesmo ponto a trie (gulosa) fica com a frase mais longa...
+        ordered = sorted(self._phrase_categories, key=len, reverse=True)
+        self._phrase_regex = re.compile(self._trie_pattern(ordered)) if ordered else None
+
+        # ...e as que são prefixo dela também contam como encontradas
+        self._prefixes = {
+            phrase: [other for other in ordered if other != phrase and phrase.startswith(other)]
+            for phrase in ordered
+        }
+
+        # Token -> categorias de palavra
+        self._token_categories: Dict[str, List[str]] = {}
+        for name, words in self.word_lists.items():
+            for word in words:
+                self._token_categories.setdefault(word, []).append(name)
+
+    @staticmethod
+    def _trie_pattern(phrases: List[str]) -> str:
+        """Regex equivalente à alternância das frases, com prefixos comuns fatorados"""
+        trie: Dict[str, Any] = {}
+        for phrase in phrases:
+            node = trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[''] = True  # Fim de frase
+
+        def build(node: Dict[str, Any]) -> str:
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            return f'(?:{body})?' if '' in node else body
+
+        return build(trie)
+
+    def scan(self, content: str) -> TextScan:
+        """Varre um texto"""
+        lowered = content.lower()
+        found = self._collect_phrases(m.group() for m in self._iter_phrase_matches(lowered))
+        return self._finish(content, lowered, found)
+
+    def scan_batch(self, contents: List[str]) -> List[TextScan]:
+        """
+        Varre vários textos com uma única execução da regex de frases sobre o lote
+        concatenado (separador que não ocorre nas frases); ocorrências são
+        atribuídas ao texto de origem por busca binária nos offsets.
+        """
+        lowered_list = [content.lower() for content in contents]
+        starts = []
+        offset = 0
+        for lowered in lowered_list:
+            starts.append(offset)
+            offset += len(lowered) + 1
+
+        matches_per_item: List[List[str]] = [[] for _ in contents]
+        for match in self._iter_phrase_matches('\x00'.join(lowered_list)):
+            item = bisect.bisect_right(starts, match.start()) - 1
+            matches_per_item[item].append(match.group())
+
+        return [
+            self._finish(content, lowered, self._collect_phrases(matches))
+            for content, lowered, matches in zip(contents, lowered_list, matches_per_item)
+        ]
+
+    def _iter_phrase_matches(self, text: str):
+        """Todas as posições onde começa alguma frase (inclusive sobrepostas)"""
+        if self._phrase_regex is None:
+            return
+        search = self._phrase_regex.search
+        match = search(text)
+        while match:
+            yield match
+            match = search(text, match.start() + 1)
+
+    def _collect_phrases(self, matched: Iterable[str]) -> set:
+        found = set()
+        for phrase in matched:
+            if phrase not in found:
+                found.add(phrase)
+                found.update(self._prefixes[phrase])
+        return found
+
+    def _finish(self, content: str, lowered: str, found_phrases: set) -> TextScan:
+        scan = TextScan(content, lowered)
+
+        # Mesma ordem das listas configuradas
+        scan.phrase_matches = {
+            name: [phrase for phrase in phrases if phrase in found_phrases]
+            for name, phrases in self.phrase_lists.items()
+        }
+
+        token_counts = Counter(lowered.split())
+        scan.word_count = sum(token_counts.values())
+        category_counts = dict.fromkeys(self.word_lists, 0)
+        # Só os tokens do vocabulário (interseção feita em C)
+        for token in token_counts.keys() & self._token_categories.keys():
+            for name in self._token_categories[token]:
+                category_counts[name] += token_counts[token]
+        scan.category_counts = category_counts
+
+        lines = content.split('\n')
+        scan.line_count = len(lines)
+        scan.paragraph_count = sum(1 for line in lines if len(line.strip()) > self.PARAGRAPH_MIN_CHARS)
+
+        return scan
+
+    def describe(self) -> Dict[str, Any]:
+        """Tamanho das listas compiladas (diagnóstico)"""
+        return {
+            'phrases': len(self._phrase_categories),
+            'tokens': len(self._token_categories),
+            'phrase_lists': list(self.phrase_lists),
+            'word_lists': list(self.word_lists)
+        }
@@ -12,15 +12,19 @@ import time
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
 from services.ai_manager import ai_manager
 from services.production_search_manager import production_search_manager
 from services.robust_content_extractor import robust_content_extractor
+from services.fetch_health import fetch_health
 from services.mental_drivers_architect import mental_drivers_architect
 from services.visual_proofs_generator import visual_proofs_generator
 from services.anti_objection_system import anti_objection_system
 from services.pre_pitch_architect import pre_pitch_architect
 from services.future_prediction_engine import future_prediction_engine
+from services.dag_scheduler import DAGScheduler, DAGTask
+from services.relevance_engine import RelevanceProfile
+from services.context_builder import context_builder
 
 logger = logging.getLogger(__name__)
 
@@ -32,9 +36,20 @@ class UltraDetailedAnalysisEngine:
         self.min_content_threshold = 2000   # Mais flexível mas ainda exigente
         self.min_sources_threshold = 2      # Mínimo 2 fontes reais
         self.quality_threshold = 70.0       # Score mínimo mais flexível
-        self.max_parallel_workers = 2       # Reduzido para estabilidade
         self.analysis_timeout = 1800        # 30 minutos timeout
         self.component_timeout = 300        # 5 minutos por componente
+        self.dual_ai_timeout = 660          # Análise dupla (2 chamadas de 10 min em paralelo)
+
+        # Limites de concorrência por classe de recurso no DAG de componentes
+        self.max_llm_workers = 3            # Chamadas simultâneas às IAs
+        self.max_cpu_workers = 2            # Geradores locais (sem IA)
+
+        # Pipeline de pesquisa: buscas concorrentes alimentam pool de extração
+        self.max_search_workers = 6         # Queries simultâneas nos provedores
+        self.max_extraction_workers = 8     # Downloads/extrações simultâneos
+        self.urls_per_query = 5             # Top URLs (já ranqueadas por RRF) extraídas por query
+        self.research_target_content_length = 150000  # Para ao atingir ~150K chars únicos
+        self.research_timeout = 600         # 10 minutos para toda a pesquisa
 
         logger.info("🚀 Ultra Detailed Analysis Engine GIGANTE ROBUSTO inicializado")
 
@@ -42,9 +57,13 @@ class UltraDetailedAnalysisEngine:
         self, 
         data: Dict[str, Any],
         session_id: Optional[str] = None,
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        component_callback: Optional[callable] = None
     ) -> Dict[str, Any]:
-        """Gera análise GIGANTE ultra-detalhada com sistema ROBUSTO que NUNCA PARA"""
+        """
+        Gera análise GIGANTE ultra-detalhada com sistema ROBUSTO que NUNCA PARA.
+        component_callback(nome, payload) é chamado a cada componente concluído.
+        """
 
         start_time = time.time()
         logger.info(f"🚀 INICIANDO ANÁLISE GIGANTE ROBUSTA para {data.get('segmento')}")
@@ -86,18 +105,13 @@ class UltraDetailedAnalysisEngine:
             research_data = self._execute_massive_real_research_robust(data, progress_callback)
             final_analysis['pesquisa_web_massiva'] = research_data
 
-            # FASE 2: ANÁLISE DUPLA COM IA REAL (DUAS IAs TRABALHANDO)
-            if progress_callback:
-                progress_callback(4, "🧠 Analisando com DUAS IAs REAIS trabalhando em paralelo...")
-
-            ai_analysis_primary, ai_analysis_secondary = self._execute_dual_ai_analysis(data, research_data, progress_callback)
-
-            # FASE 3: GERAÇÃO PARALELA ROBUSTA DE TODOS OS COMPONENTES
+            # FASE 2 + 3: ANÁLISE DUPLA COM IA E COMPONENTES EM DAG
+            # Componentes que só dependem da pesquisa começam junto com as duas IAs
             if progress_callback:
-                progress_callback(6, "⚡ Gerando TODOS os componentes em paralelo...")
+                progress_callback(4, "🧠 Analisando com DUAS IAs REAIS e gerando componentes em paralelo...")
 
             components = self._generate_all_components_parallel_robust(
-                data, research_data, ai_analysis_primary, ai_analysis_secondary, progress_callback
+                data, research_data, progress_callback, component_callback
             )
 
             # INTEGRA COMPONENTES NA ANÁLISE FINAL
@@ -149,9 +163,9 @@ class UltraDetailedAnalysisEngine:
         data: Dict[str, Any], 
         progress_callback: Optional[callable] = None
     ) -> Dict[str, Any]:
-        """Executa pesquisa web massiva REAL com sistema ROBUSTO"""
+        """Executa pesquisa web massiva REAL com pipeline concorrente busca -> extração"""
 
-        logger.info("🌐 INICIANDO PESQUISA WEB MASSIVA ROBUSTA")
+        logger.info("🌐 INICIANDO PESQUISA WEB MASSIVA ROBUSTA (PIPELINE CONCORRENTE)")
 
         # Gera queries inteligentes expandidas
         queries = self._generate_comprehensive_queries(data)
@@ -160,52 +174,125 @@ class UltraDetailedAnalysisEngine:
         extracted_content = []
         total_content_length = 0
         successful_queries = 0
+        completed_queries = 0
+        target_reached = False
+
+        # URLs já enviadas para extração (dedup antes de baixar, não depois)
+        scheduled_urls = set()
+        skipped_known_bad = 0
+
+        search_executor = ThreadPoolExecutor(
+            max_workers=min(self.max_search_workers, max(len(queries), 1)),
+            thread_name_prefix='research-search'
+        )
+        extraction_executor = ThreadPoolExecutor(
+            max_workers=self.max_extraction_workers,
+            thread_name_prefix='research-extract'
+        )
 
-        for i, query in enumerate(queries):
-            if progress_callback:
-                progress_callback(2, f"🔍 Pesquisando: {query[:50]}...", f"Query {i+1}/{len(queries)}")
+        try:
+            # 1. Todas as queries vão para os provedores de uma vez
+            pending = {}
+            for query in queries:
+                future = search_executor.submit(
+                    production_search_manager.search_with_fallback, query, 10
+                )
+                pending[future] = ('search', query, None)
 
-            try:
-                # Busca com múltiplos provedores
-                search_results = production_search_manager.search_with_fallback(query, max_results=10)
+            deadline = time.time() + self.research_timeout
 
-                if search_results:
-                    successful_queries += 1
-                    all_results.extend(search_results)
+            # 2. Consome buscas e extrações conforme completam
+            while pending:
+                remaining_time = deadline - time.time()
+                if remaining_time <= 0:
+                    logger.warning(f"⏰ Timeout da pesquisa ({self.research_timeout}s) - encerrando com {len(extracted_content)} páginas")
+                    break
+
+                done, _ = wait(list(pending), timeout=remaining_time, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    kind, query, result = pending.pop(future)
+
+                    if kind == 'search':
+                        completed_queries += 1
+                        if progress_callback:
+                            progress_callback(2, f"🔍 Pesquisado: {query[:50]}...", f"Query {completed_queries}/{len(queries)}")
 
-                    # Extrai conteúdo das URLs encontradas
-                    for result in search_results[:8]:  # Top 8 URLs por query
                         try:
-                            content = robust_content_extractor.extract_content(result['url'])
-                            if content and len(content) >= 200:  # Mínimo mais flexível
-                                extracted_content.append({
-                                    'url': result['url'],
-                                    'title': result.get('title', 'Sem título'),
-                                    'content': content[:2500],  # Limita tamanho
-                                    'snippet': result.get('snippet', ''),
-                                    'query_origin': query
-                                })
-                                total_content_length += len(content)
-                                logger.info(f"✅ Conteúdo extraído: {len(content)} chars de {result['url']}")
-                            else:
-                                logger.warning(f"⚠️ Conteúdo insuficiente: {len(content) if content else 0} chars")
+                            search_results = future.result()
                         except Exception as e:
-                            logger.error(f"❌ Erro ao extrair {result['url']}: {str(e)}")
+                            logger.error(f"❌ Erro na query '{query}': {str(e)}")
                             continue
 
-                time.sleep(0.5)  # Rate limiting reduzido
+                        if not search_results:
+                            continue
 
-            except Exception as e:
-                logger.error(f"❌ Erro na query '{query}': {str(e)}")
-                continue
+                        successful_queries += 1
+                        all_results.extend(search_results)
 
-        # Remove duplicatas
-        unique_content = []
-        seen_urls = set()
-        for content_item in extracted_content:
-            if content_item['url'] not in seen_urls:
-                seen_urls.add(content_item['url'])
-                unique_content.append(content_item)
+                        if target_reached:
+                            continue
+
+                        # URLs entram no pool de extração assim que chegam; as que falharam há
+                        # pouco (ou de host instável) cedem a vaga para o próximo resultado
+                        scheduled_for_query = 0
+                        for search_result in search_results:
+                            if scheduled_for_query >= self.urls_per_query:
+                                break
+                            url = search_result.get('url')
+                            if not url or url in scheduled_urls:
+                                continue
+                            scheduled_urls.add(url)
+                            skip_reason = fetch_health.should_skip(url)
+                            if skip_reason:
+                                skipped_known_bad += 1
+                                logger.info(f"⏭️ Pulando {url}: {skip_reason}")
+                                continue
+                            scheduled_for_query += 1
+                            extraction_future = extraction_executor.submit(
+                                robust_content_extractor.extract_content, url
+                            )
+                            pending[extraction_future] = ('extract', query, search_result)
+
+                    else:
+                        url = result['url']
+                        try:
+                            content = future.result()
+                        except Exception as e:
+                            logger.error(f"❌ Erro ao extrair {url}: {str(e)}")
+                            continue
+
+                        if content and len(content) >= 200:  # Mínimo mais flexível
+                            stored_content = content[:2500]  # Limita tamanho
+                            extracted_content.append({
+                                'url': url,
+                                'title': result.get('title', 'Sem título'),
+                                'content': stored_content,
+                                'snippet': result.get('snippet', ''),
+                                'query_origin': query
+                            })
+                            # Meta e total contam só o que de fato vai para a análise
+                            total_content_length += len(stored_content)
+                            logger.info(f"✅ Conteúdo extraído: {len(content)} chars de {url}")
+                        else:
+                            logger.warning(f"⚠️ Conteúdo insuficiente: {len(content) if content else 0} chars")
+
+                if not target_reached and total_content_length >= self.research_target_content_length:
+                    target_reached = True
+                    logger.info(f"🎯 Meta de conteúdo atingida ({total_content_length:,} chars) - cancelando extrações pendentes")
+
+                    # Cancela extrações ainda na fila; buscas continuam para estatísticas
+                    for pending_future, (kind, _, _) in list(pending.items()):
+                        if kind == 'extract' and pending_future.cancel():
+                            del pending[pending_future]
+
+        finally:
+            # Não bloqueia a análise esperando requisições retardatárias
+            search_executor.shutdown(wait=False, cancel_futures=True)
+            extraction_executor.shutdown(wait=False, cancel_futures=True)
+
+        # URLs já foram deduplicadas antes da extração
+        unique_content = extracted_content
 
         research_data = {
             'queries_executadas': queries,
@@ -214,6 +301,7 @@ class UltraDetailedAnalysisEngine:
             'total_resultados': len(all_results),
             'fontes_unicas': len(unique_content),
             'total_content_length': total_content_length,
+            'urls_puladas_por_falha_recente': skipped_known_bad,
             'conteudo_extraido': unique_content,
             'sources': [{'url': item['url'], 'title': item['title']} for item in unique_content],
             'research_timestamp': datetime.now().isoformat(),
@@ -274,7 +362,7 @@ class UltraDetailedAnalysisEngine:
     ) -> tuple:
         """Executa análise com DUAS IAs trabalhando em paralelo"""
 
-        search_context = self._prepare_comprehensive_search_context(research_data)
+        search_context = self._prepare_comprehensive_search_context(research_data, data)
 
         # Prompts especializados para cada IA
         prompt_primary = self._build_primary_analysis_prompt(data, search_context)
@@ -310,7 +398,7 @@ class UltraDetailedAnalysisEngine:
                 logger.info("✅ Análise dupla com IA concluída")
                 return processed_primary, processed_secondary
 
-            except TimeoutError:
+            except (TimeoutError, FutureTimeoutError):
                 logger.error("❌ Timeout na análise dupla com IA")
                 # Tenta pegar o que conseguiu
                 try:
@@ -332,78 +420,106 @@ class UltraDetailedAnalysisEngine:
         self,
         data: Dict[str, Any],
         research_data: Dict[str, Any],
-        ai_analysis_primary: Dict[str, Any],
-        ai_analysis_secondary: Dict[str, Any],
-        progress_callback: Optional[callable] = None
+        progress_callback: Optional[callable] = None,
+        component_callback: Optional[callable] = None
     ) -> Dict[str, Any]:
-        """Gera TODOS os componentes em paralelo com sistema ROBUSTO"""
-
-        logger.info("⚡ INICIANDO GERAÇÃO PARALELA ROBUSTA DE TODOS OS COMPONENTES")
+        """
+        Gera TODOS os componentes como um DAG: cada um declara suas entradas
+        (pesquisa, análise das IAs, avatar, drivers) e sua classe de recurso
+        (llm/cpu), e roda assim que as entradas ficam prontas
+        """
 
-        # Combina análises das duas IAs
-        combined_ai_analysis = self._merge_ai_analyses(ai_analysis_primary, ai_analysis_secondary)
+        logger.info("⚡ INICIANDO GERAÇÃO EM DAG DE TODOS OS COMPONENTES")
 
-        # Define todas as tarefas de geração
+        # (componente, gerador, entradas, recurso)
         generation_tasks = [
-            ('avatar_ultra_detalhado', self._generate_avatar_component),
-            ('drivers_mentais_customizados', self._generate_drivers_component),
-            ('provas_visuais_sugeridas', self._generate_visual_proofs_component),
-            ('sistema_anti_objecao', self._generate_anti_objection_component),
-            ('pre_pitch_invisivel', self._generate_pre_pitch_component),
-            ('predicoes_futuro_completas', self._generate_future_predictions_component),
-            ('escopo_posicionamento', self._generate_positioning_component),
-            ('analise_concorrencia_detalhada', self._generate_competition_component),
-            ('estrategia_palavras_chave', self._generate_keywords_component),
-            ('metricas_performance_detalhadas', self._generate_metrics_component),
-            ('funil_vendas_detalhado', self._generate_funnel_component),
-            ('plano_acao_detalhado', self._generate_action_plan_component),
-            ('insights_exclusivos', self._generate_insights_component)
+            ('avatar_ultra_detalhado', self._generate_avatar_component, ['research'], 'llm'),
+            ('drivers_mentais_customizados', self._generate_drivers_component, ['ai_analysis', 'avatar_ultra_detalhado'], 'cpu'),
+            ('provas_visuais_sugeridas', self._generate_visual_proofs_component, ['ai_analysis', 'avatar_ultra_detalhado'], 'llm'),
+            ('sistema_anti_objecao', self._generate_anti_objection_component, ['ai_analysis', 'avatar_ultra_detalhado'], 'llm'),
+            ('pre_pitch_invisivel', self._generate_pre_pitch_component, ['ai_analysis', 'avatar_ultra_detalhado', 'drivers_mentais_customizados'], 'llm'),
+            ('predicoes_futuro_completas', self._generate_future_predictions_component, [], 'cpu'),
+            ('escopo_posicionamento', self._generate_positioning_component, ['research'], 'llm'),
+            ('analise_concorrencia_detalhada', self._generate_competition_component, ['research'], 'llm'),
+            ('estrategia_palavras_chave', self._generate_keywords_component, ['research'], 'llm'),
+            ('metricas_performance_detalhadas', self._generate_metrics_component, [], 'llm'),
+            ('funil_vendas_detalhado', self._generate_funnel_component, [], 'llm'),
+            ('plano_acao_detalhado', self._generate_action_plan_component, [], 'llm'),
+            ('insights_exclusivos', self._generate_insights_component, ['research'], 'llm')
         ]
+        component_names = {name for name, _, _, _ in generation_tasks}
 
-        # Executa geração em paralelo com sistema ROBUSTO
-        components_results = {}
-        completed_components = 0
+        def dual_ai_task(inputs: Dict[str, Any]) -> Dict[str, Any]:
+            primary, secondary = self._execute_dual_ai_analysis(data, inputs['research'], progress_callback)
+            return self._merge_ai_analyses(primary, secondary)
 
-        with ThreadPoolExecutor(max_workers=self.max_parallel_workers) as executor:
-            # Submete todas as tarefas
-            future_to_component = {}
-            for component_name, generator_func in generation_tasks:
-                future = executor.submit(
-                    self._safe_component_generation,
-                    component_name,
-                    generator_func,
-                    data,
-                    research_data,
-                    combined_ai_analysis
+        def component_task(component_name: str, generator_func: callable):
+            def run(inputs: Dict[str, Any]) -> Any:
+                return self._safe_component_generation(
+                    component_name, generator_func, data, research_data, self._build_component_ai_view(inputs)
                 )
-                future_to_component[future] = component_name
+            return run
 
-            # Coleta resultados conforme completam
-            for future in as_completed(future_to_component, timeout=self.analysis_timeout):
-                component_name = future_to_component[future]
-                
+        dag_tasks = [DAGTask('ai_analysis', dual_ai_task, ['research'], 'llm', timeout=self.dual_ai_timeout)]
+        dag_tasks.extend(
+            DAGTask(name, component_task(name, generator_func), inputs, resource)
+            for name, generator_func, inputs, resource in generation_tasks
+        )
+
+        completed_components = 0
+
+        def on_complete(name: str, result: Any):
+            nonlocal completed_components
+            if name == 'ai_analysis':
+                logger.info("✅ Análise dupla integrada ao DAG - liberando componentes dependentes")
+                return
+
+            completed_components += 1
+            if progress_callback:
+                progress = 6 + (completed_components / len(generation_tasks)) * 5
+                progress_callback(int(progress), f"✅ {name} gerado", f"{completed_components}/{len(generation_tasks)} componentes")
+
+            logger.info(f"✅ Componente gerado: {name}")
+
+            if component_callback:
                 try:
-                    result = future.result(timeout=self.component_timeout)
-                    components_results[component_name] = result
-                    completed_components += 1
-                    
-                    if progress_callback:
-                        progress = 6 + (completed_components / len(generation_tasks)) * 5
-                        progress_callback(int(progress), f"✅ {component_name} gerado", f"{completed_components}/{len(generation_tasks)} componentes")
-                    
-                    logger.info(f"✅ Componente gerado: {component_name}")
-                    
+                    component_callback(name, result)
                 except Exception as e:
-                    logger.error(f"❌ Erro no componente {component_name}: {str(e)}")
-                    # GERA COMPONENTE BÁSICO REAL (NÃO SIMULADO)
-                    components_results[component_name] = self._generate_basic_real_component(
-                        component_name, data, research_data, combined_ai_analysis
-                    )
-                    completed_components += 1
-
-        logger.info(f"✅ Geração paralela concluída: {completed_components}/{len(generation_tasks)} componentes")
+                    logger.warning(f"⚠️ Erro ao publicar componente {name}: {e}")
+
+        def on_error(name: str, error: Exception, inputs: Dict[str, Any]) -> Any:
+            if name == 'ai_analysis':
+                if not isinstance(error, (TimeoutError, FutureTimeoutError)):
+                    # Falha real das duas IAs aborta a geração (vai para a conclusão de emergência)
+                    raise error
+                # Timeout: os dependentes usam avatar gerado ou básico
+                return {}
+            # GERA COMPONENTE BÁSICO REAL (NÃO SIMULADO)
+            return self._generate_basic_real_component(name, data, research_data, self._build_component_ai_view(inputs))
+
+        scheduler = DAGScheduler({'llm': self.max_llm_workers, 'cpu': self.max_cpu_workers})
+        results = scheduler.run(
+            dag_tasks,
+            initial={'research': research_data},
+            on_complete=on_complete,
+            on_error=on_error,
+            timeout=self.analysis_timeout,
+            task_timeout=self.component_timeout
+        )
+
+        components_results = {name: value for name, value in results.items() if name in component_names}
+        logger.info(f"✅ Geração em DAG concluída: {completed_components}/{len(generation_tasks)} componentes")
         return components_results
 
+    def _build_component_ai_view(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Análise das IAs enriquecida com os componentes já gerados (avatar, drivers)"""
+
+        ai_view = dict(inputs.get('ai_analysis') or {})
+        for component_name in ('avatar_ultra_detalhado', 'drivers_mentais_customizados'):
+            if inputs.get(component_name):
+                ai_view[component_name] = inputs[component_name]
+        return ai_view
+
     def _safe_component_generation(
         self,
         component_name: str,
@@ -957,20 +1073,52 @@ RETORNE APENAS LISTA JSON:
         
         return merged
 
-    def _prepare_comprehensive_search_context(self, research_data: Dict[str, Any]) -> str:
-        """Prepara contexto abrangente de pesquisa"""
+    def _prepare_comprehensive_search_context(
+        self,
+        research_data: Dict[str, Any],
+        data: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Prepara contexto abrangente de pesquisa: os trechos mais relevantes das
+        páginas extraídas, sem repetições, dentro do orçamento de tokens do provedor
+        """
         
         extracted_content = research_data.get('conteudo_extraido', [])
         
         if not extracted_content:
             return "PESQUISA LIMITADA: Poucos dados disponíveis"
         
-        context = "PESQUISA WEB MASSIVA REAL EXECUTADA:\n\n"
-        
-        for i, content_item in enumerate(extracted_content[:12], 1):  # Top 12 páginas
-            context += f"--- FONTE REAL {i}: {content_item['title']} ---\n"
-            context += f"URL: {content_item['url']}\n"
-            context += f"Conteúdo: {content_item['content'][:1500]}\n\n"
+        # Trechos ranqueados (BM25) contra o projeto; números e valores contam como evidência
+        data = data or {}
+        profile = RelevanceProfile.for_research(
+            data.get('query') or '', data,
+            query_weight=2.0,
+            context_weight=1.5,
+            number_weight=0.5,
+            money_weight=1.0
+        )
+        
+        # O prompt pode cair em qualquer fallback: o orçamento é o do provedor com menor janela
+        candidates = ai_manager.get_candidate_providers()
+        budgets = {
+            name: context_builder.budget_for(name, ai_manager.get_provider_model(name))
+            for name in candidates
+        }
+        provider = min(budgets, key=budgets.get) if budgets else None
+        budget = budgets[provider] if provider else context_builder.budget_for()
+
+        pack = context_builder.build(
+            extracted_content,
+            profile,
+            budget,
+            header="PESQUISA WEB MASSIVA REAL EXECUTADA:\n\n"
+        )
+        logger.info(
+            f"📏 Contexto de pesquisa limitado por {provider or 'provedor padrão'} "
+            f"(candidatos: {', '.join(candidates) or '-'}): {pack.stats}"
+        )
+        
+        context = pack.text
         
         context += f"\n=== ESTATÍSTICAS DA PESQUISA REAL ===\n"
         context += f"Total de queries executadas: {research_data.get('total_queries', 0)}\n"
@@ -995,7 +1143,7 @@ Você é o DIRETOR SUPREMO DE ANÁLISE DE MERCADO, especialista de elite com 30+
 - **Público-Alvo**: {data.get('publico', 'Não informado')}
 - **Preço**: R$ {data.get('preco', 'Não informado')}
 
-{search_context[:8000]}
+{search_context}
 
 GERE ANÁLISE ULTRA-COMPLETA EM JSON:
 
@@ -1029,7 +1177,7 @@ Você é o ESPECIALISTA EM ESTRATÉGIA COMPETITIVA, focado em análise de mercad
 - **Segmento**: {data.get('segmento', 'Não informado')}
 - **Produto/Serviço**: {data.get('produto', 'Não informado')}
 
-{search_context[:8000]}
+{search_context}
 
 GERE ANÁLISE ESTRATÉGICA COMPLEMENTAR EM JSON:
 
@@ -16,6 +16,9 @@ import re
 from datetime import datetime
 from bs4 import BeautifulSoup
 import random
+from services.relevance_engine import relevance_engine, RelevanceProfile, BM25Index
+from services.politeness_scheduler import politeness_scheduler
+from services.fetch_health import fetch_health
 
 logger = logging.getLogger(__name__)
 
@@ -71,6 +74,10 @@ class WebSailorAgent:
             
             all_page_contents = []
             
+            # Índice BM25 desta pesquisa: cada página é tokenizada uma vez
+            relevance_index = relevance_engine.new_index()
+            relevance_profile = self._build_relevance_profile(query, context)
+            
             # 1. BUSCA REAL MÚLTIPLA
             search_engines = [
                 self._google_search_real,
@@ -85,21 +92,20 @@ class WebSailorAgent:
                     if results:
                         logger.info(f"✅ {search_engine.__name__}: {len(results)} resultados REAIS")
                         
-                        # Extrai conteúdo REAL de cada página
-                        for result in results[:10]:  # Top 10 por engine
+                        # Extrai conteúdo REAL de cada página (top 10 por engine, sem as que falharam há pouco)
+                        for result in fetch_health.take_fresh(results, 10):
                             content = self._extract_real_page_content(result["url"])
                             if content and len(content) > 100:  # Só conteúdo substancial
                                 all_page_contents.append({
                                     "url": result["url"],
                                     "title": result["title"],
                                     "content": content,
-                                    "relevance_score": self._calculate_real_relevance(content, query, context),
+                                    "relevance_score": self._calculate_real_relevance(
+                                        content, query, context, relevance_index, result["url"], relevance_profile
+                                    ),
                                     "source_type": "real_search",
                                     "search_engine": search_engine.__name__
                                 })
-                                
-                                # Delay para não sobrecarregar
-                                time.sleep(0.5)
                     
                 except Exception as e:
                     logger.warning(f"Erro em {search_engine.__name__}: {str(e)}")
@@ -119,11 +125,13 @@ class WebSailorAgent:
                                 "url": link,
                                 "title": f"Link interno de {page['title']}",
                                 "content": internal_content,
-                                "relevance_score": self._calculate_real_relevance(internal_content, query, context) * 0.8,
+                                "relevance_score": self._calculate_real_relevance(
+                                    internal_content, query, context, relevance_index, link, relevance_profile
+                                ) * 0.8,
+                                "relevance_factor": 0.8,
                                 "source_type": "internal_link",
                                 "parent_url": page["url"]
                             })
-                            time.sleep(0.3)
             
             # 3. PESQUISA DE QUERIES RELACIONADAS REAIS
             if aggressive_mode:
@@ -133,23 +141,29 @@ class WebSailorAgent:
                 for related_query in related_queries[:3]:
                     try:
                         related_results = self._google_search_real(related_query, 5)
-                        for result in related_results:
+                        for result in fetch_health.take_fresh(related_results, 5):
                             content = self._extract_real_page_content(result["url"])
                             if content and len(content) > 100:
                                 all_page_contents.append({
                                     "url": result["url"],
                                     "title": result["title"],
                                     "content": content,
-                                    "relevance_score": self._calculate_real_relevance(content, query, context) * 0.7,
+                                    "relevance_score": self._calculate_real_relevance(
+                                        content, query, context, relevance_index, result["url"], relevance_profile
+                                    ) * 0.7,
+                                    "relevance_factor": 0.7,
                                     "source_type": "related_query",
                                     "original_query": related_query
                                 })
-                                time.sleep(0.4)
                     except Exception as e:
                         logger.warning(f"Erro em query relacionada '{related_query}': {str(e)}")
                         continue
             
             # 4. FILTRA E ORDENA POR RELEVÂNCIA REAL
+            # Recalcula com as estatísticas finais do corpus (IDF de todas as páginas)
+            for page in all_page_contents:
+                page["relevance_score"] = relevance_index.score(page["url"], relevance_profile) * page.pop("relevance_factor", 1.0)
+            
             all_page_contents = [p for p in all_page_contents if p["relevance_score"] > 1.0]
             all_page_contents.sort(key=lambda x: x["relevance_score"], reverse=True)
             
@@ -188,7 +202,7 @@ class WebSailorAgent:
                 "sort": "date"
             }
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 self.google_search_url,
                 params=params,
                 headers=self.headers,
@@ -224,7 +238,7 @@ class WebSailorAgent:
             # Bing search via scraping
             search_url = f"https://www.bing.com/search?q={quote_plus(query)}&cc=br&setlang=pt-br"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 search_url,
                 headers=self.headers,
                 timeout=10
@@ -269,7 +283,7 @@ class WebSailorAgent:
         try:
             search_url = f"https://html.duckduckgo.com/html/?q={quote_plus(query)}"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 search_url,
                 headers=self.headers,
                 timeout=10
@@ -311,7 +325,7 @@ class WebSailorAgent:
         try:
             search_url = f"https://br.search.yahoo.com/search?p={quote_plus(query)}"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 search_url,
                 headers=self.headers,
                 timeout=10
@@ -355,6 +369,12 @@ class WebSailorAgent:
         if not url or not url.startswith("http"):
             return None
         
+        # URL que falhou há pouco ou host instável: não gasta requisição
+        skip_reason = fetch_health.should_skip(url)
+        if skip_reason:
+            logger.info(f"⏭️ Pulando {url}: {skip_reason}")
+            return None
+        
         try:
             # Tenta primeiro com Jina Reader se disponível
             if self.jina_api_key:
@@ -380,7 +400,7 @@ class WebSailorAgent:
             
             jina_url = f"{self.jina_reader_url}{url}"
             
-            response = requests.get(
+            response = politeness_scheduler.get(
                 jina_url,
                 headers=headers,
                 timeout=30
@@ -406,12 +426,13 @@ class WebSailorAgent:
         """Extração REAL direta usando requests + BeautifulSoup"""
         
         try:
-            response = requests.get(
+            response = politeness_scheduler.get(
                 url,
                 headers=self.headers,
                 timeout=20,
                 allow_redirects=True
             )
+            fetch_health.record(url, response.status_code, text_length=len(response.content), min_length=500)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
@@ -443,6 +464,7 @@ class WebSailorAgent:
                 return None
                 
         except Exception as e:
+            fetch_health.record_exception(url, e)
             logger.error(f"Erro na extração direta REAL para {url}: {str(e)}")
             return None
     
@@ -452,7 +474,7 @@ class WebSailorAgent:
         links = []
         try:
             # Faz nova requisição para obter HTML completo
-            response = requests.get(base_url, headers=self.headers, timeout=10)
+            response = politeness_scheduler.get(base_url, headers=self.headers, timeout=10)
             if response.status_code == 200:
                 soup = BeautifulSoup(response.content, "html.parser")
                 base_domain = base_url.split('/')[2]
@@ -475,71 +497,47 @@ class WebSailorAgent:
         
         return list(set(links))[:10]  # Remove duplicatas e limita
     
+    # Termos de mercado que reforçam a relevância
+    MARKET_TERMS = [
+        "mercado", "análise", "tendência", "oportunidade", "estratégia", 
+        "marketing", "concorrência", "público", "crescimento", "demanda", 
+        "inovação", "tecnologia", "brasil", "brasileiro", "2024", "2025",
+        "dados", "estatística", "pesquisa", "relatório", "estudo"
+    ]
+    
+    def _build_relevance_profile(self, query: str, context: Dict[str, Any]) -> RelevanceProfile:
+        """Perfil de relevância da pesquisa (pesos do WebSailor)"""
+        
+        return RelevanceProfile.for_research(
+            query, context,
+            query_weight=2.0,
+            context_weight=1.5,
+            market_terms=self.MARKET_TERMS,
+            market_weight=0.5,
+            number_weight=0.3,
+            length_bonuses=[(500, 2.0)]
+        )
+    
     def _calculate_real_relevance(
         self, 
         content: str, 
         query: str, 
-        context: Dict[str, Any]
+        context: Dict[str, Any],
+        index: Optional[BM25Index] = None,
+        doc_id: Optional[str] = None,
+        profile: Optional[RelevanceProfile] = None
     ) -> float:
-        """Calcula score de relevância REAL do conteúdo"""
+        """Calcula score de relevância REAL do conteúdo (BM25 do motor compartilhado)"""
         
         if not content or len(content) < 50:
             return 0.0
         
-        content_lower = content.lower()
-        query_lower = query.lower()
-        
-        score = 0.0
-        
-        # Score baseado na query (peso maior)
-        query_words = [w for w in query_lower.split() if len(w) > 2]
-        for word in query_words:
-            occurrences = content_lower.count(word)
-            score += occurrences * 2.0  # Peso aumentado
-        
-        # Score baseado no contexto
-        context_terms = []
-        
-        if context.get("segmento"):
-            context_terms.append(str(context["segmento"]).lower())
-        
-        if context.get("produto"):
-            context_terms.append(str(context["produto"]).lower())
-        
-        if context.get("publico"):
-            context_terms.append(str(context["publico"]).lower())
-        
-        for term in context_terms:
-            if term and len(term) > 2:
-                occurrences = content_lower.count(term)
-                score += occurrences * 1.5
-        
-        # Bonus para termos de mercado específicos
-        market_terms = [
-            "mercado", "análise", "tendência", "oportunidade", "estratégia", 
-            "marketing", "concorrência", "público", "crescimento", "demanda", 
-            "inovação", "tecnologia", "brasil", "brasileiro", "2024", "2025",
-            "dados", "estatística", "pesquisa", "relatório", "estudo"
-        ]
-        
-        for term in market_terms:
-            occurrences = content_lower.count(term)
-            score += occurrences * 0.5
-        
-        # Bonus por densidade de informação
-        word_count = len(content.split())
-        if word_count > 500:
-            score += 2.0
-        
-        # Bonus por presença de números/percentuais
-        import re
-        numbers = re.findall(r'\d+(?:\.\d+)?%?', content)
-        score += len(numbers) * 0.3
-        
-        # Normaliza score baseado no tamanho do conteúdo
-        normalized_score = score / (len(content) / 1000 + 1)
+        profile = profile or self._build_relevance_profile(query, context)
+        if index is None:
+            return relevance_engine.score_text(content, profile)
         
-        return min(normalized_score, 100.0)
+        index.add(doc_id, content)
+        return index.score(doc_id, profile)
     
     def _enhance_search_query_real(self, query: str) -> str:
         """Melhora a query de busca para pesquisa REAL de mercado"""
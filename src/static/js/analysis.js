@@ -4,7 +4,7 @@ class AnalysisManager {
     constructor() {
         this.currentAnalysis = null;
         this.sessionId = this.generateSessionId();
-        this.progressInterval = null;
+        this.progressStream = null;
         this.init();
     }
 
@@ -107,7 +107,8 @@ class AnalysisManager {
         }
 
         try {
-            // Adiciona session ID
+            // Adiciona session ID (novo a cada análise, para o streaming não misturar execuções)
+            this.sessionId = this.generateSessionId();
             formData.session_id = this.sessionId;
             
             // Adiciona arquivos enviados
@@ -117,7 +118,8 @@ class AnalysisManager {
             this.showProgressSection();
             this.startProgressTracking();
 
-            const response = await fetch('/api/analyze', {
+            // Análise roda como job em background; a resposta só traz o job_id
+            const submitResponse = await fetch('/api/analyze?async=true', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json'
@@ -125,7 +127,16 @@ class AnalysisManager {
                 body: JSON.stringify(formData)
             });
 
-            const result = await response.json();
+            const job = await submitResponse.json();
+
+            if (!submitResponse.ok || !job.job_id) {
+                this.hideProgressSection();
+                this.showError(job.message || job.error || 'Erro ao iniciar análise');
+                console.error('Erro ao iniciar análise:', job);
+                return;
+            }
+
+            const { response, result } = await this.waitForJobResult(job.result_url);
 
             if (response.ok && result) {
                 this.currentAnalysis = result;
@@ -145,6 +156,19 @@ class AnalysisManager {
         }
     }
 
+    async waitForJobResult(resultUrl) {
+        // 202 enquanto o job está na fila ou rodando
+        while (true) {
+            const response = await fetch(resultUrl);
+            if (response.status !== 202) {
+                return { response, result: await response.json() };
+            }
+
+            const retryAfter = parseInt(response.headers.get('Retry-After') || '3', 10);
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+        }
+    }
+
     collectFormData() {
         const form = document.getElementById('analysisForm');
         const formData = new FormData(form);
@@ -196,42 +220,80 @@ class AnalysisManager {
             analyzeBtn.innerHTML = '<i class="fas fa-magic"></i> <span>Gerar Análise Ultra-Detalhada</span>';
         }
 
-        if (this.progressInterval) {
-            clearInterval(this.progressInterval);
-            this.progressInterval = null;
-        }
+        this.stopProgressTracking();
     }
 
     startProgressTracking() {
-        let progress = 0;
-        let step = 0;
-        const steps = [
-            "🔍 Coletando dados do formulário",
-            "📊 Processando anexos inteligentes", 
-            "🌐 Realizando pesquisa profunda massiva",
-            "🧠 Analisando com múltiplas IAs",
-            "👤 Criando avatar arqueológico completo",
-            "🧠 Gerando drivers mentais customizados",
-            "🎭 Desenvolvendo provas visuais instantâneas",
-            "🛡️ Construindo sistema anti-objeção",
-            "🎯 Arquitetando pré-pitch invisível",
-            "⚔️ Mapeando concorrência profunda",
-            "📈 Calculando métricas e projeções",
-            "🔮 Predizendo futuro do mercado",
-            "✨ Consolidando insights exclusivos"
-        ];
+        this.stopProgressTracking();
+        this.partialResultsShown = false;
+
+        // Progresso real via Server-Sent Events; ao cair, o navegador reconecta
+        // sozinho enviando Last-Event-ID e o servidor retoma do ponto certo
+        const stream = new EventSource(`/api/progress/stream/${encodeURIComponent(this.sessionId)}`);
+        this.progressStream = stream;
+
+        stream.addEventListener('progress', (event) => {
+            const progress = JSON.parse(event.data);
+            this.updateProgress(
+                progress.percentage,
+                Math.max(progress.current_step - 1, 0),
+                progress.current_message,
+                progress.estimated_remaining
+            );
+        });
 
-        this.progressInterval = setInterval(() => {
-            if (progress < 95) {
-                progress += Math.random() * 3;
-                step = Math.min(Math.floor(progress / 8), steps.length - 1);
-                
-                this.updateProgress(progress, step, steps[step]);
-            }
-        }, 2000);
+        stream.addEventListener('component', (event) => {
+            const { component, payload } = JSON.parse(event.data);
+            this.displayPartialComponent(component, payload);
+        });
+
+        stream.addEventListener('complete', () => this.stopProgressTracking());
+        stream.addEventListener('failed', () => this.stopProgressTracking());
     }
 
-    updateProgress(percentage, stepIndex, stepMessage) {
+    stopProgressTracking() {
+        if (this.progressStream) {
+            this.progressStream.close();
+            this.progressStream = null;
+        }
+    }
+
+    displayPartialComponent(component, payload) {
+        // Mostra cada componente assim que fica pronto; displayResults redesenha tudo no final
+        const displayers = {
+            avatar_ultra_detalhado: (data) => this.displayAvatar(data),
+            drivers_mentais_customizados: (data) => this.displayDrivers(data),
+            provas_visuais_sugeridas: (data) => this.displayVisualProofs(data),
+            sistema_anti_objecao: (data) => this.displayAntiObjection(data),
+            pre_pitch_invisivel: (data) => this.displayPrePitch(data),
+            escopo_posicionamento: (data) => this.displayPositioning(data),
+            analise_concorrencia_detalhada: (data) => this.displayCompetition(data),
+            estrategia_palavras_chave: (data) => this.displayKeywords(data),
+            metricas_performance_detalhadas: (data) => this.displayMetrics(data),
+            funil_vendas_detalhado: (data) => this.displayFunnel(data),
+            plano_acao_detalhado: (data) => this.displayActionPlan(data),
+            insights_exclusivos: (data) => this.displayInsights(data),
+            predicoes_futuro_completas: (data) => this.displayFuturePredictions(data)
+        };
+
+        const display = displayers[component];
+        if (!display || !payload) return;
+
+        if (!this.partialResultsShown) {
+            const resultsArea = document.getElementById('resultsArea');
+            if (resultsArea) resultsArea.style.display = 'block';
+            this.clearPreviousResults();
+            this.partialResultsShown = true;
+        }
+
+        try {
+            display(payload);
+        } catch (error) {
+            console.warn(`Erro ao exibir ${component} parcial:`, error);
+        }
+    }
+
+    updateProgress(percentage, stepIndex, stepMessage, remainingSeconds = null) {
         const progressFill = document.querySelector('.progress-fill');
         const currentStep = document.getElementById('currentStep');
         const stepCounter = document.getElementById('stepCounter');
@@ -250,7 +312,9 @@ class AnalysisManager {
         }
 
         if (estimatedTime) {
-            const remaining = Math.max(0, Math.floor((100 - percentage) / 2));
+            const remaining = remainingSeconds !== null
+                ? Math.max(0, Math.floor(remainingSeconds))
+                : Math.max(0, Math.floor((100 - percentage) / 2));
             const minutes = Math.floor(remaining / 60);
             const seconds = remaining % 60;
             estimatedTime.textContent = `${minutes}:${seconds.toString().padStart(2, '0')}`;
@@ -1264,13 +1328,17 @@ class AnalysisManager {
         }
 
         try {
-            const response = await fetch('/api/generate_pdf', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify(this.currentAnalysis)
-            });
+            // Análise salva: o servidor carrega (e cacheia) pelo ID, sem reenviar o JSON
+            const analysisId = this.currentAnalysis.local_files?.analysis_id;
+            const response = analysisId
+                ? await fetch(`/api/generate_pdf?analysis_id=${encodeURIComponent(analysisId)}`)
+                : await fetch('/api/generate_pdf', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json'
+                    },
+                    body: JSON.stringify(this.currentAnalysis)
+                });
 
             if (response.ok) {
                 const blob = await response.blob();
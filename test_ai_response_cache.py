@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do AI Response Cache
+Chave normalizada, TTL, eviction LRU por tamanho e escrita de last_access
+"""
+
+import sys
+import os
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.ai_response_cache import AIResponseCache
+
+RESPONSE = "Análise detalhada do mercado gerada pelo modelo. " * 40
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AIResponseCache(cache_dir=str(tmp_path))
+
+
+def _age(cache, seconds, column='created_at'):
+    conn = cache._get_connection()
+    conn.execute(f"UPDATE ai_response_cache SET {column} = {column} - ?", (seconds,))
+    conn.commit()
+
+
+def test_chave_ignora_espacos_mas_separa_provedor_modelo_e_tokens(cache):
+    cache.set("Analise o  mercado\n de cafés", 'gemini', 'gemini-pro', 8192, RESPONSE)
+
+    assert cache.get("  Analise o mercado de cafés ", 'gemini', 'gemini-pro', 8192) == RESPONSE
+    assert cache.get("Analise o mercado de cafés", 'groq', 'gemini-pro', 8192) is None
+    assert cache.get("Analise o mercado de cafés", 'gemini', 'outro-modelo', 8192) is None
+    assert cache.get("Analise o mercado de cafés", 'gemini', 'gemini-pro', 4096) is None
+
+
+def test_resposta_expirada_nao_e_servida_e_sai_na_eviction(cache):
+    cache.set("prompt", 'gemini', None, 1000, RESPONSE)
+    _age(cache, cache.ttl + 1)
+
+    assert cache.get("prompt", 'gemini', None, 1000) is None
+    cache.evict_if_needed()
+    assert cache.get_stats()['entries'] == 0
+
+
+def test_eviction_remove_as_menos_acessadas(cache):
+    cache.access_update_interval = 0
+    for i in range(4):
+        cache.set(f"prompt {i}", 'gemini', None, 1000, RESPONSE)
+        _age(cache, 10, 'last_access')  # As anteriores ficam mais antigas a cada gravação
+
+    cache.get("prompt 0", 'gemini', None, 1000)
+    size = len(RESPONSE.encode('utf-8'))
+    cache.max_size_bytes = int(size * 3.4)  # Alvo de 90%: cabem 3 respostas
+    cache.evict_if_needed()
+
+    remaining = [i for i in range(4) if cache.get(f"prompt {i}", 'gemini', None, 1000)]
+    assert remaining == [0, 2, 3]
+
+
+def test_hit_so_regrava_last_access_depois_do_intervalo(cache):
+    cache.set("prompt", 'gemini', None, 1000, RESPONSE)
+
+    def last_access():
+        return cache._get_connection().execute("SELECT last_access FROM ai_response_cache").fetchone()[0]
+
+    stored = last_access()
+    cache.get("prompt", 'gemini', None, 1000)
+    assert last_access() == stored
+
+    _age(cache, cache.access_update_interval + 1, 'last_access')
+    aged = last_access()
+    cache.get("prompt", 'gemini', None, 1000)
+    assert last_access() > aged
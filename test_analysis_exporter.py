@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Analysis Exporter
+ZIP gerado em streaming, cache do arquivo pronto e downloads interrompidos
+"""
+
+import sys
+import os
+import io
+import zipfile
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services import analysis_exporter as exporter_module
+from services.analysis_exporter import AnalysisExporter
+from services.local_file_manager import LocalFileManager
+
+
+def _analysis():
+    return {
+        'projeto_dados': {'segmento': 'Marketing Digital', 'produto': 'Curso'},
+        'pesquisa_web_massiva': {'conteudo_extraido': [{'url': f'https://exemplo.com/{i}', 'content': f'texto {i} ' * 5000} for i in range(8)]},
+        'avatar_ultra_detalhado': {'nome_ficticio': 'Ana', 'idade': 34},
+        'insights_exclusivos': ['insight 1', 'insight 2']
+    }
+
+
+@pytest.fixture
+def analysis_id(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCAL_STORAGE_FORMAT', 'container')
+    manager = LocalFileManager(base_dir=str(tmp_path / 'analyses_data'))
+    monkeypatch.setattr(exporter_module, 'local_file_manager', manager)
+    return manager.save_analysis_locally(_analysis())['analysis_id']
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    return AnalysisExporter(cache_dir=str(tmp_path / 'cache'))
+
+
+def _cache_files(exporter):
+    return sorted(os.listdir(exporter.cache_dir))
+
+
+def test_stream_gera_zip_valido_e_depois_serve_do_cache(exporter, analysis_id):
+    export = exporter.get_export(analysis_id)
+    chunks = list(export['stream'])
+
+    assert len(chunks) > 1  # Enviado em blocos, não montado inteiro antes
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert any(name.startswith('avatars/') for name in archive.namelist())
+
+    [cached] = _cache_files(exporter)
+    assert cached.endswith('.zip')
+
+    again = exporter.get_export(analysis_id)
+    assert again == {'cached_path': os.path.join(exporter.cache_dir, cached)}
+    with open(again['cached_path'], 'rb') as f:
+        assert f.read() == b''.join(chunks)
+
+
+def test_download_interrompido_nao_deixa_arquivo_parcial(exporter, analysis_id):
+    stream = exporter.get_export(analysis_id)['stream']
+    next(stream)
+    assert any(name.endswith('.tmp') for name in _cache_files(exporter))
+
+    # Cliente desconecta: o servidor fecha o gerador
+    stream.close()
+
+    assert _cache_files(exporter) == []
+    assert 'stream' in exporter.get_export(analysis_id)
+
+
+def test_opcoes_de_compressao(exporter, analysis_id):
+    stored = b''.join(exporter.get_export(analysis_id, compression='store')['stream'])
+    with zipfile.ZipFile(io.BytesIO(stored)) as archive:
+        assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_STORED}
+
+    # Cada combinação de opções tem sua própria entrada no cache
+    assert 'stream' in exporter.get_export(analysis_id, compression='deflate', level='1')
+
+    with pytest.raises(ValueError):
+        exporter.get_export(analysis_id, compression='bzip2')
+    with pytest.raises(ValueError):
+        exporter.get_export(analysis_id, level=12)
+
+
+def test_analise_inexistente(exporter, analysis_id):
+    assert exporter.get_export('nao-existe') is None
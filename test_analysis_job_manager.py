@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Analysis Job Manager
+Fila persistida: enfileirar, consumir, limite global e detecção de job perdido por heartbeat
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.analysis_job_manager import AnalysisJobManager, JobQueueFullError
+
+
+def _wait_for(manager, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get_job(job_id, include_result=True)
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} não terminou")
+
+
+@pytest.fixture
+def make_manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('ANALYSIS_JOB_POLL_INTERVAL', '0.05')
+    managers = []
+
+    def make(execution='inline', **env):
+        monkeypatch.setenv('ANALYSIS_JOB_EXECUTION', execution)
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        manager = AnalysisJobManager(cache_dir=str(tmp_path))
+        manager.register_runner('echo', lambda data: ({'eco': data['valor']}, 200))
+        manager.register_runner('falha', lambda data: ({'message': 'sem IA'}, 500))
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.shutdown()
+
+
+def test_job_inline_executa_e_guarda_resultado(make_manager):
+    manager = make_manager('inline')
+
+    job = manager.submit({'valor': 42, 'segmento': 'teste'}, 'echo')
+    done = _wait_for(manager, job['job_id'])
+
+    assert done['status'] == 'completed'
+    assert done['http_status'] == 200
+    assert done['result'] == {'eco': 42}
+
+    failed = _wait_for(manager, manager.submit({}, 'falha')['job_id'])
+    assert failed['status'] == 'failed' and failed['error'] == 'sem IA'
+
+
+def test_modo_worker_so_enfileira_e_outro_consumidor_executa(make_manager):
+    web = make_manager('worker')
+    job = web.submit({'valor': 'x'}, 'echo')
+
+    time.sleep(0.2)
+    assert web.get_job(job['job_id'])['status'] == 'queued'
+
+    # Consumidor dedicado (outro processo em produção) lendo o mesmo banco
+    consumer = make_manager('worker')
+    consumer.start_consumers(1)
+
+    assert _wait_for(web, job['job_id'])['result'] == {'eco': 'x'}
+
+
+def test_limite_global_de_pendentes(make_manager):
+    manager = make_manager('worker', ANALYSIS_JOB_MAX_PENDING=2)
+    manager.submit({'valor': 1}, 'echo')
+    manager.submit({'valor': 2}, 'echo')
+
+    with pytest.raises(JobQueueFullError):
+        manager.submit({'valor': 3}, 'echo')
+    with pytest.raises(ValueError):
+        manager.submit({'valor': 4}, 'inexistente')
+
+
+def test_job_sem_heartbeat_e_marcado_como_falho(make_manager):
+    manager = make_manager('worker', ANALYSIS_JOB_HEARTBEAT_TIMEOUT=0.2)
+    job_id = manager.submit({'valor': 1}, 'echo')['job_id']
+
+    # Reivindicado por um consumidor que morreu logo depois
+    assert manager._claim_next('host:1234:t')[0] == job_id
+    assert manager.get_job(job_id)['status'] == 'running'
+
+    time.sleep(0.3)
+    job = manager.get_job(job_id)
+    assert job['status'] == 'failed'
+    assert 'parou de responder' in job['error']
+
+
+def test_consumidor_remove_resultados_expirados_sem_restart(make_manager):
+    manager = make_manager('worker', ANALYSIS_JOB_RESULT_TTL=1, ANALYSIS_JOB_CLEANUP_INTERVAL=0.1)
+    manager.start_consumers(1)
+    job_id = manager.submit({'valor': 1}, 'echo')['job_id']
+    assert _wait_for(manager, job_id)['status'] == 'completed'
+
+    # Passado o TTL, a limpeza periódica do consumidor apaga o job (sem recriar o manager)
+    deadline = time.time() + 3
+    while manager.get_job(job_id) is not None and time.time() < deadline:
+        time.sleep(0.1)
+    assert manager.get_job(job_id) is None
+
+
+def test_verificacao_de_jobs_perdidos_respeita_o_intervalo(make_manager, monkeypatch):
+    manager = make_manager('worker', ANALYSIS_JOB_STALE_CHECK_INTERVAL=60)
+    calls = []
+    monkeypatch.setattr(manager, 'fail_stale_jobs', lambda: calls.append(1) or 0)
+
+    for _ in range(5):
+        manager._run_maintenance()
+
+    assert len(calls) == 1
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Async Fetch Engine
+Downloads concorrentes contra um servidor HTTP local: limite por host, retry, charset
+e política de corpo (tipo recusado antes do download, teto de bytes, PDF em disco)
+"""
+
+import sys
+import os
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services import async_fetch_engine as fetch_module
+from services.async_fetch_engine import AsyncFetchEngine
+from services.fetch_health import FetchHealth
+
+PDF_BODY = b'%PDF-1.4\n' + b'0' * 200_000 + b'\n%%EOF'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        hits = _Handler.hits[self.path] = _Handler.hits.get(self.path, 0) + 1
+
+        if self.path.startswith('/lenta/'):
+            time.sleep(0.3)
+            self._send(200, 'text/html', f'<p>{self.path}</p>'.encode())
+        elif self.path == '/instavel':
+            self._send(503 if hits == 1 else 200, 'text/html', b'<p>ok na segunda</p>')
+        elif self.path == '/latin1':
+            body = '<html><head><meta charset="iso-8859-1"></head><body>promoção</body></html>'
+            self._send(200, 'text/html', body.encode('latin-1'))
+        elif self.path == '/imagem.png':
+            self._send(200, 'image/png', b'\x89PNG' + b'\x00' * 1024)
+        elif self.path == '/declarada-grande':
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(50 * 1024 * 1024))
+            self.end_headers()
+        elif self.path == '/sem-tamanho':
+            # Sem Content-Length: o corpo só termina quando a conexão fecha
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            for _ in range(64):
+                self.wfile.write(b'<p>' + b'x' * 4096 + b'</p>')
+        elif self.path in ('/relatorio.pdf', '/download'):
+            content_type = 'application/pdf' if self.path == '/relatorio.pdf' else 'application/octet-stream'
+            self._send(200, content_type, PDF_BODY)
+        else:
+            self._send(404, 'text/html', b'nada aqui')
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    _Handler.hits.clear()
+    monkeypatch.setattr(fetch_module.politeness_scheduler, 'enabled', False)
+    monkeypatch.setattr(fetch_module, 'fetch_health', FetchHealth(cache_dir=str(tmp_path)))
+    engine = AsyncFetchEngine()
+    engine.retry_backoff = 0
+    yield engine
+    engine.close()
+
+
+def test_lote_baixa_em_paralelo_e_remove_duplicadas(engine, server):
+    urls = [f"{server}/lenta/{i}" for i in range(6)]
+
+    started = time.time()
+    results = engine.fetch_many(urls + urls[:2])
+
+    assert list(results) == urls
+    assert all(result.ok and result.text == f'<p>/lenta/{i}</p>' for i, result in enumerate(results.values()))
+    # Seis requisições de 0.3s no mesmo host (limite padrão de 6 por host) em paralelo
+    assert time.time() - started < 1.2
+    assert engine.get_stats()['peak_in_flight'] > 1
+
+
+def test_limite_por_host_enfileira_o_excedente(engine, server):
+    engine.per_host_limit = 2
+    urls = [f"{server}/lenta/{i}" for i in range(4)]
+
+    started = time.time()
+    results = engine.fetch_many(urls)
+
+    assert all(result.ok for result in results.values())
+    assert time.time() - started >= 0.55  # Duas levas de 0.3s
+    assert engine.get_stats()['peak_in_flight'] <= 2
+
+
+def test_status_transitorio_e_tentado_de_novo(engine, server):
+    result = engine.fetch(f"{server}/instavel")
+
+    assert result.ok and result.attempts == 2
+    assert engine.stats['retries'] == 1
+
+    missing = engine.fetch(f"{server}/nao-existe")
+    assert missing.status == 404 and missing.attempts == 1 and not missing.ok
+
+
+def test_charset_vem_do_meta_quando_o_header_nao_informa(engine, server):
+    assert 'promoção' in engine.fetch(f"{server}/latin1").text
+
+
+def test_tipo_nao_suportado_e_recusado_sem_nova_tentativa(engine, server):
+    result = engine.fetch(f"{server}/imagem.png")
+
+    assert result.rejected and not result.ok
+    assert result.attempts == 1 and result.size == 0
+    assert engine.get_stats()['rejected'] == 1
+
+
+def test_tamanho_declarado_acima_do_limite_e_recusado_antes_do_corpo(engine, server):
+    result = engine.fetch(f"{server}/declarada-grande")
+
+    assert result.rejected and result.size == 0
+    assert 'excede o limite' in result.error
+
+
+def test_corpo_sem_tamanho_para_no_teto_de_bytes(engine, server):
+    engine.max_body_bytes = 100 * 1024
+
+    result = engine.fetch(f"{server}/sem-tamanho")
+
+    assert result.rejected and result.text is None
+    assert engine.max_body_bytes < result.size <= engine.max_body_bytes + fetch_module.CHUNK_SIZE
+
+
+def test_pdf_vai_para_disco_so_quando_solicitado(engine, server, tmp_path):
+    spool_dir = tmp_path / 'spool'
+    spool_dir.mkdir()
+    engine.spool_dir = str(spool_dir)
+
+    assert engine.fetch(f"{server}/relatorio.pdf").rejected
+
+    for path in ('/relatorio.pdf', '/download'):  # Tipo genérico: decide pela assinatura %PDF
+        result = engine.fetch(f"{server}{path}", accept_pdf=True)
+        assert result.ok and result.is_pdf and result.text is None
+        spooled = result.file_path
+        with open(spooled, 'rb') as f:
+            assert f.read() == PDF_BODY
+        result.discard_file()
+        assert not os.path.exists(spooled)
+
+    # A recusa do PDF não solicitado não deixou arquivo parcial
+    assert os.listdir(spool_dir) == []
+
+
+def test_timeout_do_lote_escala_com_o_host_mais_repetido(engine):
+    engine.max_in_flight, engine.per_host_limit = 200, 6
+    single = engine._overall_timeout()
+
+    spread = [f"https://site{i}.com/" for i in range(30)]
+    same_host = [f"https://mesmo.com/{i}" for i in range(30)]
+
+    assert engine._batch_timeout(spread) == single
+    assert engine._batch_timeout(same_host) == single * 6
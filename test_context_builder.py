@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Context Builder
+Orçamento de tokens por modelo, escolha dos trechos por relevância e descarte de repetidos
+"""
+
+import sys
+import os
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.context_builder import ContextBuilder, estimate_tokens
+from services.relevance_engine import RelevanceProfile
+
+PROFILE = RelevanceProfile.for_research(
+    'mercado marketing digital',
+    {'segmento': 'marketing digital'},
+    query_weight=2.0,
+    context_weight=3.0
+)
+
+RELEVANT = (
+    "O mercado de marketing digital no Brasil movimentou R$ 5 bilhões em 2023, "
+    "com crescimento de 18% ao ano segundo a associação do setor de marketing digital."
+)
+FILLER = (
+    "A receita de bolo de cenoura leva três ovos, uma xícara de óleo e duas de açúcar, "
+    "batidos no liquidificador antes de ir ao forno por quarenta minutos."
+)
+
+
+def _page(number: int, paragraphs):
+    return {
+        'title': f'Página {number}',
+        'url': f'https://exemplo.com/{number}',
+        'content': '\n\n'.join(paragraphs)
+    }
+
+
+@pytest.fixture
+def builder():
+    return ContextBuilder()
+
+
+def test_orcamento_pela_janela_do_modelo(builder, monkeypatch):
+    # Janela grande: limitado pelo teto CONTEXT_MAX_TOKENS
+    assert builder.budget_for('gemini', 'gemini-1.5-flash') == builder.max_tokens
+    # Janela pequena: janela menos as reservas de resposta e prompt
+    assert builder.budget_for('huggingface', 'HuggingFaceH4/zephyr-7b-beta') == 4096 - 2048 - 800
+    # Vários modelos no fallback do provedor: vale a menor janela
+    assert builder.budget_for('huggingface', 'gpt-3.5-turbo, HuggingFaceH4/zephyr-7b-beta') == 4096 - 2048 - 800
+    # Janela menor que as reservas: piso mínimo
+    assert builder.budget_for('huggingface', 'google/flan-t5-base') == builder.min_tokens
+
+    monkeypatch.setenv('CONTEXT_BUDGET_GROQ', '1234')
+    assert builder.budget_for('groq', 'llama3-70b-8192') == 1234
+
+
+@pytest.mark.parametrize('budget', [300, 600, 1200])
+def test_contexto_cabe_no_orcamento(builder, budget):
+    pages = [_page(i, [f"{RELEVANT} Fonte {i}, trecho {j}." for j in range(6)] + [FILLER] * 3) for i in range(10)]
+
+    pack = builder.build(pages, PROFILE, budget, header='PESQUISA:\n')
+
+    assert pack.text.startswith('PESQUISA:\n')
+    assert pack.estimated_tokens == estimate_tokens(pack.text) <= budget
+    assert pack.stats['passages_used'] > 0
+
+
+def test_trechos_relevantes_entram_antes_do_resto(builder):
+    builder.PASSAGE_TARGET_CHARS = 200  # Um parágrafo por trecho
+    pages = [
+        _page(1, [FILLER.replace('bolo', f'bolo {i}') for i in range(3)]),
+        _page(2, [FILLER, RELEVANT])
+    ]
+    budget = estimate_tokens(RELEVANT) + 40
+
+    pack = builder.build(pages, PROFILE, budget)
+
+    assert pack.stats['passages_used'] == 1
+    assert 'FONTE REAL 1: Página 2' in pack.text
+    assert RELEVANT in pack.text and 'bolo' not in pack.text
+
+
+def test_trechos_repetidos_entre_fontes_entram_uma_vez(builder):
+    builder.PASSAGE_TARGET_CHARS = 200
+    copied = _page(1, [RELEVANT])
+    republished = _page(2, [RELEVANT.replace('Brasil', 'país'), "Outras informações sobre vendas online e conversão de clientes em escala."])
+
+    pack = builder.build([copied, republished], PROFILE, 2000)
+
+    assert pack.stats['duplicates_skipped'] == 1
+    assert pack.text.count('associação do setor') == 1
+
+
+def test_limite_de_trechos_por_fonte_e_ordem_original(builder):
+    builder.PASSAGE_TARGET_CHARS = 200
+    builder.max_passages_per_source = 2
+    paragraphs = [
+        "Parágrafo 0: agências pequenas contratam freelancers para atender clientes locais durante o ano inteiro.",
+        "Parágrafo 1: o marketing digital aparece nas pautas de empresas que vendem pela internet hoje em dia.",
+        "Parágrafo 2: o mercado de marketing digital cresce, e o marketing digital de performance lidera as verbas.",
+        "Parágrafo 3: investimentos em marketing digital no mercado brasileiro superam a mídia impressa e o rádio."
+    ]
+
+    pack = builder.build([_page(1, paragraphs)], PROFILE, 2000)
+
+    # Os dois trechos mais relevantes, exibidos na ordem da página
+    assert pack.stats['passages_used'] == 2
+    assert 'Parágrafo 0' not in pack.text and 'Parágrafo 1' not in pack.text
+    assert pack.text.index('Parágrafo 2') < pack.text.index('Parágrafo 3')
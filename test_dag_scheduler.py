@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do DAG Scheduler
+Ordem de dependências, limites por recurso, timeouts e aborto via on_error
+"""
+
+import sys
+import os
+import time
+import threading
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.dag_scheduler import DAGScheduler, DAGTask
+
+
+def _recorder():
+    order = []
+    lock = threading.Lock()
+
+    def task(name, value=None, delay=0.0):
+        def run(inputs):
+            time.sleep(delay)
+            with lock:
+                order.append((name, dict(inputs)))
+            return value if value is not None else name
+        return run
+
+    return order, task
+
+
+def test_dependencias_recebem_resultados_em_ordem():
+    order, task = _recorder()
+    tasks = [
+        DAGTask('c', task('c'), ['a', 'b']),
+        DAGTask('a', task('a', delay=0.05), ['research']),
+        DAGTask('b', task('b'), ['research']),
+    ]
+
+    results = DAGScheduler({'cpu': 2}).run(tasks, initial={'research': 'r'})
+
+    assert results == {'research': 'r', 'a': 'a', 'b': 'b', 'c': 'c'}
+    names = [name for name, _ in order]
+    assert names.index('c') > names.index('a') and names.index('c') > names.index('b')
+    assert dict(order)['c'] == {'a': 'a', 'b': 'b'}
+
+
+def test_limite_por_recurso():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def run(inputs):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+
+    tasks = [DAGTask(f't{i}', run, [], 'llm') for i in range(6)]
+    DAGScheduler({'llm': 2}).run(tasks)
+
+    assert max(peak) == 2
+
+
+def test_ciclo_e_entrada_inexistente_sao_rejeitados():
+    noop = lambda inputs: None
+    with pytest.raises(ValueError):
+        DAGScheduler({'cpu': 1}).run([DAGTask('a', noop, ['b']), DAGTask('b', noop, ['a'])])
+    with pytest.raises(ValueError):
+        DAGScheduler({'cpu': 1}).run([DAGTask('a', noop, ['x'])])
+
+
+def test_timeout_da_tarefa_usa_fallback_e_libera_dependentes():
+    errors = {}
+
+    def on_error(name, error, inputs):
+        errors[name] = error
+        return 'fallback'
+
+    tasks = [
+        DAGTask('lenta', lambda inputs: time.sleep(0.5) or 'tarde', [], timeout=0.1),
+        DAGTask('dependente', lambda inputs: inputs['lenta'], ['lenta']),
+    ]
+    results = DAGScheduler({'cpu': 2}).run(tasks, on_error=on_error)
+
+    assert results['lenta'] == 'fallback'
+    assert results['dependente'] == 'fallback'
+    assert isinstance(errors['lenta'], TimeoutError)
+
+
+def test_tarefa_abandonada_continua_ocupando_a_vaga():
+    # Com uma vaga só, a dependente não pode entrar no pool enquanto a thread
+    # da tarefa abandonada por timeout ainda roda; se entrasse, ficaria na fila
+    # com o relógio correndo e estouraria o próprio timeout sem ter rodado.
+    started = {}
+
+    def stuck(inputs):
+        time.sleep(0.4)
+        return 'tarde'
+
+    def quick(inputs):
+        started['quick'] = time.time()
+        return 'ok'
+
+    tasks = [
+        DAGTask('stuck', stuck, [], timeout=0.1),
+        DAGTask('quick', quick, ['stuck'], timeout=0.2),
+    ]
+    begin = time.time()
+    results = DAGScheduler({'cpu': 1}).run(tasks, on_error=lambda name, error, inputs: 'fallback')
+
+    assert results == {'stuck': 'fallback', 'quick': 'ok'}
+    assert started['quick'] - begin >= 0.4
+
+
+def test_on_error_que_levanta_aborta_o_dag():
+    calls = []
+
+    def boom(inputs):
+        raise RuntimeError('AMBAS AS IAs FALHARAM')
+
+    def on_error(name, error, inputs):
+        raise error
+
+    tasks = [
+        DAGTask('ai', boom, []),
+        DAGTask('depois', lambda inputs: calls.append('depois'), ['ai']),
+    ]
+    with pytest.raises(RuntimeError):
+        DAGScheduler({'cpu': 1}).run(tasks, on_error=on_error)
+    assert calls == []
+
+
+def test_timeout_global_resolve_pendentes_com_fallback():
+    tasks = [
+        DAGTask('lenta', lambda inputs: time.sleep(0.5), []),
+        DAGTask('depois', lambda inputs: 'nunca', ['lenta']),
+    ]
+    results = DAGScheduler({'cpu': 1}).run(tasks, on_error=lambda name, error, inputs: 'fallback', timeout=0.1)
+
+    assert results == {'lenta': 'fallback', 'depois': 'fallback'}
+
+
+def test_caminho_critico():
+    tasks = [
+        DAGTask('a', None, []),
+        DAGTask('b', None, ['a']),
+        DAGTask('c', None, []),
+    ]
+    assert DAGScheduler.critical_path(tasks, {'a': 2.0, 'b': 3.0, 'c': 4.0}) == 5.0
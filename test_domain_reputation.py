@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Domain Reputation
+Ordem dos extratores aprendida por domínio e corte de domínios sem esperança
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.domain_reputation import DomainReputation
+
+EXTRACTORS = ['dynamic', 'trafilatura', 'readability', 'newspaper', 'beautifulsoup']
+
+
+@pytest.fixture
+def reputation(tmp_path):
+    return DomainReputation(cache_dir=str(tmp_path))
+
+
+def test_sem_historico_mantem_a_ordem_padrao(reputation):
+    assert reputation.order_extractors('https://novo.com/a', EXTRACTORS) == (EXTRACTORS, [])
+
+
+def test_ordena_por_sucesso_depois_por_tempo_e_pula_os_que_nunca_funcionam(reputation):
+    url = 'https://www.portal.com.br/noticia'
+    for _ in range(3):
+        reputation.record_extractor(url, 'readability', True, 0.4)
+        reputation.record_extractor(url, 'newspaper', True, 0.1)
+        reputation.record_extractor(url, 'trafilatura', False)
+    for _ in range(reputation.extractor_skip_failures):
+        reputation.record_extractor(url, 'dynamic', False)
+
+    # Mesmo histórico vale com ou sem www.
+    ordered, skipped = reputation.order_extractors('https://portal.com.br/outra', EXTRACTORS)
+
+    # newspaper e readability empatam na taxa; newspaper é mais rápido.
+    # beautifulsoup sem histórico (0.5) fica à frente de trafilatura (1/5)
+    assert ordered == ['newspaper', 'readability', 'beautifulsoup', 'trafilatura']
+    assert skipped == ['dynamic']
+
+
+def test_historico_sobrevive_ao_restart(tmp_path):
+    first = DomainReputation(cache_dir=str(tmp_path))
+    first.record_extractor('https://a.com/1', 'readability', True, 0.2)
+    first.record_failure('https://a.com/1')
+
+    restarted = DomainReputation(cache_dir=str(tmp_path))
+    assert restarted.order_extractors('https://a.com/2', ['trafilatura', 'readability'])[0] == ['readability', 'trafilatura']
+    assert restarted.get_multiplier('https://a.com/2') == first.get_multiplier('https://a.com/2')
+
+
+def test_dominio_sem_esperanca_e_pulado_ate_a_janela_de_nova_tentativa(reputation):
+    url = 'https://bloqueado.com/pagina'
+    for _ in range(reputation.hopeless_min_failures - 1):
+        reputation.record_failure(url)
+    assert not reputation.is_hopeless(url)
+
+    reputation.record_failure(url)
+    assert reputation.is_hopeless(url)
+    assert reputation.get_multiplier(url) < 1.0
+
+    # Passada a janela, libera uma única tentativa e volta a pular
+    reputation._domains['bloqueado.com']['updated_at'] = time.time() - reputation.hopeless_retry_after
+    assert not reputation.is_hopeless(url)
+    assert reputation.is_hopeless(url)
+
+
+def test_um_sucesso_acima_do_limite_tira_o_dominio_do_corte(reputation):
+    url = 'https://instavel.com/a'
+    for _ in range(reputation.hopeless_min_failures):
+        reputation.record_failure(url)
+    reputation.record_success(url)
+
+    # 1 sucesso em 7 (14%) passa do limite padrão de 5%
+    assert not reputation.is_hopeless(url)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Extraction Cache
+TTL, revalidação condicional (304), eviction LRU por tamanho e escrita de last_access
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.extraction_cache import ExtractionCache
+from services.async_fetch_engine import FetchResult
+from services import robust_content_extractor as extractor_module
+
+PAGE = "Conteúdo extraído da página sobre o mercado de marketing digital. " * 20
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExtractionCache(cache_dir=str(tmp_path), ttl=3600, max_size_mb=10)
+
+
+def _age(cache, url, seconds):
+    """Envelhece a entrada (download e último acesso) em `seconds`"""
+    conn = cache._get_connection()
+    conn.execute(
+        "UPDATE extraction_cache SET fetched_at = fetched_at - ?, last_access = last_access - ? WHERE url = ?",
+        (seconds, seconds, url)
+    )
+    conn.commit()
+
+
+def _last_access(cache, url):
+    return cache._get_connection().execute(
+        "SELECT last_access FROM extraction_cache WHERE url = ?", (url,)
+    ).fetchone()[0]
+
+
+def test_entrada_expirada_continua_disponivel_para_revalidacao(cache):
+    url = 'https://exemplo.com/artigo'
+    cache.set(url, PAGE, 'trafilatura', etag='"v1"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+
+    entry = cache.get(url)
+    assert entry['fresh'] and entry['content'] == PAGE
+
+    _age(cache, url, 7200)
+    stale = cache.get(url)
+    assert not stale['fresh']
+    assert cache.conditional_headers(stale) == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'
+    }
+
+    # 304: renova o TTL sem regravar o conteúdo
+    cache.mark_revalidated(url)
+    assert cache.get(url)['fresh']
+
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['stale_hits'], stats['revalidated']) == (2, 1, 1)
+    assert cache.get('https://exemplo.com/outra') is None
+    assert cache.conditional_headers(None) is None
+
+
+def test_eviction_remove_as_menos_acessadas(cache):
+    cache.access_update_interval = 0
+    urls = [f'https://exemplo.com/{i}' for i in range(4)]
+    for age, url in zip((40, 30, 20, 10), urls):
+        cache.set(url, PAGE, 'readability')
+        _age(cache, url, age)
+
+    # A mais antiga volta a ser usada: a próxima da fila sai no lugar dela
+    cache.get(urls[0])
+    entry_size = len(PAGE.encode('utf-8'))
+    cache.max_size_bytes = int(entry_size * 3.4)  # Alvo de 90%: cabem 3 entradas
+    cache.evict_if_needed()
+
+    remaining = [url for url in urls if cache.get(url)]
+    assert remaining == [urls[0], urls[2], urls[3]]
+    assert cache.stats['evictions'] == 1
+
+
+def test_hit_so_regrava_last_access_depois_do_intervalo(cache):
+    url = 'https://exemplo.com/popular'
+    cache.set(url, PAGE, 'trafilatura')
+    stored = _last_access(cache, url)
+
+    cache.get(url)
+    assert _last_access(cache, url) == stored
+
+    _age(cache, url, cache.access_update_interval + 1)
+    aged = _last_access(cache, url)
+    cache.get(url)
+    assert _last_access(cache, url) > aged
+
+
+def test_extrator_usa_o_cache_quando_o_servidor_responde_304(cache, monkeypatch):
+    monkeypatch.setattr(extractor_module, 'extraction_cache', cache)
+    url = 'https://exemplo.com/nao-mudou'
+    cache.set(url, PAGE, 'trafilatura', etag='"abc"')
+    _age(cache, url, 7200)
+
+    not_modified = FetchResult(url=url, status=304, headers={'ETag': '"abc"'})
+    content = extractor_module.robust_content_extractor._extract_content(url, prefetched=not_modified, check_domain=False)
+
+    assert content == PAGE
+    assert cache.stats['revalidated'] == 1
+    assert cache.get(url)['fresh']
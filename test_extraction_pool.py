@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Extraction Pool
+Mesmo resultado na thread e no pool de processos, limite de CPU e workers sem pool de PDF aninhado
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services import content_extractors
+from services.extraction_pool import ExtractionPool, ExtractionCPUTimeout, _cpu_time_limit, _run_limited
+
+PARAGRAPH = (
+    "O mercado de marketing digital no Brasil segue em expansão, com empresas de todos os portes "
+    "investindo em conteúdo, anúncios segmentados e automação de vendas para conquistar clientes. "
+)
+HTML = f"""
+<html><head><title>Mercado</title></head><body>
+<nav>Início | Blog | Contato</nav>
+<article><h1>Panorama do marketing digital</h1>{''.join(f'<p>{PARAGRAPH}</p>' for _ in range(12))}</article>
+<footer>Todos os direitos reservados</footer>
+</body></html>
+"""
+
+
+def _pdf_page_workers() -> int:
+    """Executada no worker do pool"""
+    from services.pdf_text_engine import pdf_text_engine
+    return pdf_text_engine.workers
+
+
+def _busy(seconds: float):
+    deadline = time.process_time() + seconds
+    while time.process_time() < deadline:
+        pass
+    return 'terminou'
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setenv('EXTRACTION_EXECUTOR', 'process')
+    monkeypatch.setenv('EXTRACTION_POOL_SIZE', '1')
+    pool = ExtractionPool()
+    yield pool
+    pool.shutdown()
+
+
+def test_modo_invalido_volta_para_thread(monkeypatch):
+    monkeypatch.setenv('EXTRACTION_EXECUTOR', 'fila')
+    pool = ExtractionPool()
+
+    assert pool.mode == 'thread' and not pool.uses_processes
+    assert pool.run('clean_content', '  texto   com  espaços  ') == content_extractors.clean_content('  texto   com  espaços  ')
+    assert pool.get_stats()['inline_tasks'] == 1
+
+
+def test_pool_de_processos_devolve_o_mesmo_que_a_thread(process_pool):
+    args = (HTML, 'https://exemplo.com/artigo', ['trafilatura', 'readability', 'beautifulsoup'], [])
+
+    in_process = process_pool.run('run_html_extractors', *args)
+    inline = content_extractors.run_html_extractors(*args)
+
+    assert in_process['content'] and in_process['content'] == inline['content']
+    assert in_process['extractor'] == inline['extractor']
+    assert [name for name, _, _ in in_process['attempts']] == [name for name, _, _ in inline['attempts']]
+    assert process_pool.get_stats()['inline_tasks'] == 0
+
+
+def test_worker_le_pdfs_no_caminho_serial(process_pool):
+    executor = process_pool._get_executor()
+
+    assert executor.submit(_pdf_page_workers).result(timeout=60) == 1
+
+
+def test_limite_de_cpu_nao_e_engolido_pelo_extrator():
+    def swallowing():
+        try:
+            _busy(5)
+        except Exception:
+            return 'engoliu'
+
+    started = time.time()
+    with pytest.raises(ExtractionCPUTimeout):
+        with _cpu_time_limit(0.2):
+            swallowing()
+    assert time.time() - started < 3
+
+
+def test_estouro_de_cpu_vira_timeout_error(monkeypatch):
+    monkeypatch.setattr(content_extractors, 'busy_for_test', _busy, raising=False)
+
+    with pytest.raises(TimeoutError):
+        _run_limited(0.2, 'busy_for_test', 5)
+    assert _run_limited(0.5, 'busy_for_test', 0.01) == 'terminou'
+
+
+def test_espera_esgotada_conta_timeout(process_pool):
+    process_pool.wait_timeout = 0.01
+    process_pool._get_executor().submit(time.sleep, 0.5)  # Ocupa o único worker
+
+    with pytest.raises(TimeoutError):
+        process_pool.run('clean_content', 'texto')
+    assert process_pool.get_stats()['timeouts'] == 1
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Fetch Health
+Registro em memória imediato e gravação no SQLite pela thread de gravação
+"""
+
+import sys
+import os
+import sqlite3
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.fetch_health import FetchHealth
+
+
+def test_registro_vale_na_hora_e_persiste_apos_flush(tmp_path):
+    health = FetchHealth(cache_dir=str(tmp_path))
+
+    assert health.record('https://exemplo.com/sumiu', status=404) == 'not_found'
+    assert health.record('https://exemplo.com/ok', status=200, text_length=900, min_length=500) == 'ok'
+    # A consulta usa a memória: não depende da gravação ter terminado
+    assert 'not_found' in health.should_skip('https://exemplo.com/sumiu')
+
+    assert health.flush()
+    reloaded = FetchHealth(cache_dir=str(tmp_path))
+    assert 'not_found' in reloaded.should_skip('https://exemplo.com/sumiu')
+    assert reloaded.should_skip('https://exemplo.com/ok') is None
+    assert round(reloaded._hosts['exemplo.com']['requests'], 3) == 2
+
+
+def test_gravacoes_da_mesma_url_mantem_a_ordem(tmp_path):
+    health = FetchHealth(cache_dir=str(tmp_path))
+    url = 'https://exemplo.com/instavel'
+
+    health.record(url, error='timeout')
+    health.record(url, status=200)
+    health.record(url, status=503)
+    assert health.flush()
+
+    with sqlite3.connect(health.db_path) as conn:
+        rows = conn.execute("SELECT outcome, failures FROM negative_urls WHERE url = ?", (url,)).fetchall()
+    assert rows == [('server_error', 1)]
+    assert health.get_stats()['pending_writes'] == 0
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do HTML Document
+Árvore parseada uma vez, texto equivalente ao do BeautifulSoup "limpo" e seletores simples
+"""
+
+import sys
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services import html_document as html_module
+from services.html_document import ParsedDocument
+
+HTML = """
+<html><head><title>Mercado</title><style>p { color: red }</style></head>
+<body>
+  <nav class="menu">Início | Contato</nav>
+  <script>var x = 1;</script>
+  <article id="principal" class="post destaque">
+    <h1>Marketing digital em 2024</h1>
+    <p>O mercado <b>cresceu</b> 18% no ano.</p>
+    <!-- comentário que não é texto -->
+    <p data-fonte="abc">Empresas investem em   conteúdo.</p>
+  </article>
+  <footer>Rodapé</footer>
+</body></html>
+"""
+
+BOILERPLATE = frozenset({'script', 'style', 'nav', 'footer'})
+
+
+@pytest.fixture
+def document():
+    return ParsedDocument(HTML)
+
+
+def _cleaned_soup_text(strip: bool) -> str:
+    """Como as estratégias faziam antes: decompose das tags e get_text()"""
+    soup = BeautifulSoup(HTML, 'html.parser')
+    for tag in soup(list(BOILERPLATE)):
+        tag.decompose()
+    return soup.get_text(strip=True, separator='') if strip else soup.get_text()
+
+
+def test_html_e_parseado_uma_unica_vez(monkeypatch):
+    calls = []
+    original = html_module.lxml.html.document_fromstring
+    monkeypatch.setattr(html_module.lxml.html, 'document_fromstring', lambda html: calls.append(1) or original(html))
+
+    document = ParsedDocument(HTML)
+    document.text(exclude=BOILERPLATE)
+    document.select('p', exclude=BOILERPLATE)
+    document.iter_elements(['h1'])
+    document.block_lengths(BOILERPLATE)
+
+    assert calls == [1]
+
+
+def test_texto_sem_as_tags_ignoradas_equivale_ao_get_text(document):
+    assert ' '.join(document.text(exclude=BOILERPLATE).split()) == ' '.join(_cleaned_soup_text(False).split())
+    assert document.text(exclude=BOILERPLATE, strip=True) == _cleaned_soup_text(True)
+
+    # A árvore não é alterada: sem exclusão o menu e o script continuam lá
+    full = document.text()
+    assert 'Início' in full and 'var x' in full
+    assert 'comentário' not in full
+
+
+def test_tamanho_dos_blocos_ignora_subarvores_excluidas(document):
+    lengths = document.block_lengths(BOILERPLATE)
+    article = document.select('#principal')[0]
+
+    assert lengths[article] == len(document.text(article))
+    assert lengths[document.body] == len(document.text(document.body, exclude=BOILERPLATE))
+    assert not any(element.tag in BOILERPLATE for element in lengths)
+    assert document.block_lengths(BOILERPLATE) is lengths
+
+
+def test_seletores_simples(document):
+    assert [e.get('id') for e in document.select('.destaque')] == ['principal']
+    assert [e.tag for e in document.select('#principal')] == ['article']
+    assert [e.get('data-fonte') for e in document.select('[data-fonte]')] == ['abc']
+    assert len(document.select('p')) == 2
+    assert document.select('.menu', exclude=BOILERPLATE) == []
+    assert [e.tag for e in document.iter_elements(['h1', 'p', 'nav'], exclude=BOILERPLATE)] == ['h1', 'p', 'p']
+
+
+def test_html_vazio_nao_quebra():
+    document = ParsedDocument('')
+
+    assert document.tree is None and document.body is None
+    assert document.text() == ''
+    assert document.select('p') == [] and document.block_lengths() == {}
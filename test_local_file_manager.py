@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Local File Manager
+Ida e volta do container: salvar, carregar seções, exportar ZIP e reconstruir o índice
+"""
+
+import sys
+import os
+import io
+import json
+import zipfile
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.local_file_manager import LocalFileManager
+from services.analysis_exporter import AnalysisExporter
+
+
+def _sample_analysis():
+    pesquisa = {
+        'total_content_length': 5000,
+        'conteudo_extraido': [{'url': f'https://exemplo.com/{i}', 'content': 'texto ' * 200} for i in range(5)]
+    }
+    return {
+        'projeto_dados': {'segmento': 'Marketing Digital', 'produto': 'Curso', 'preco': 997.0},
+        'pesquisa_web_massiva': pesquisa,
+        'avatar_ultra_detalhado': {'nome_ficticio': 'Ana', 'dores': ['tempo', 'dinheiro'], 'idade': 34},
+        'drivers_mentais_customizados': [{'nome': 'Urgência', 'acao': 'ação imediata'}],
+        'insights_exclusivos': ['insight 1', 'insight 2'],
+        # Mesmo conteúdo em dois campos: gravado uma única vez no container
+        'pesquisa_duplicada': pesquisa,
+        'metadata': {'quality_score': 87.5, 'processing_time_seconds': 12.3}
+    }
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv('LOCAL_STORAGE_FORMAT', 'container')
+    return LocalFileManager(base_dir=str(tmp_path / 'analyses_data'))
+
+
+def test_salvar_e_carregar_secoes(manager):
+    analysis = _sample_analysis()
+    saved = manager.save_analysis_locally(analysis)
+
+    assert saved['success']
+    analysis_id = saved['analysis_id']
+
+    assert manager.load_analysis_section(analysis_id, 'avatars') == analysis['avatar_ultra_detalhado']
+    assert manager.load_analysis_section(analysis_id, 'pesquisa_web') == analysis['pesquisa_web_massiva']
+    assert manager.load_analysis_section(analysis_id, 'insights') == analysis['insights_exclusivos']
+    assert manager.load_analysis_section(analysis_id, 'completas') == json.loads(json.dumps(analysis))
+    # Prefixo curto do ID também resolve
+    assert manager.load_analysis_section(analysis_id[:8], 'avatars') == analysis['avatar_ultra_detalhado']
+
+    assert json.loads(manager.read_section_bytes(analysis_id, 'drivers_mentais')) == analysis['drivers_mentais_customizados']
+    assert json.loads(manager.read_section_bytes(analysis_id, 'completas')) == json.loads(json.dumps(analysis))
+
+
+def test_conteudo_repetido_vira_um_blob(manager):
+    analysis_id = manager.save_analysis_locally(_sample_analysis())['analysis_id']
+    container_path = manager.get_analysis_files(analysis_id)[0]['path']
+
+    with zipfile.ZipFile(container_path) as container:
+        manifest = json.loads(container.read(LocalFileManager.CONTAINER_MANIFEST))
+
+    fields = manifest['fields']
+    assert fields['pesquisa_web_massiva'] == fields['pesquisa_duplicada']
+    assert len(set(fields.values())) == len(fields) - 1
+
+
+def test_exportacao_zip_ida_e_volta(manager, tmp_path):
+    analysis = _sample_analysis()
+    analysis_id = manager.save_analysis_locally(analysis)['analysis_id']
+
+    exporter = AnalysisExporter(cache_dir=str(tmp_path / 'cache'))
+    entries = manager.iter_export_entries(analysis_id)
+    archive_bytes = b''.join(exporter._stream_zip(entries, 'deflate', 6, None))
+
+    with zipfile.ZipFile(io.BytesIO(archive_bytes)) as archive:
+        assert archive.testzip() is None
+        contents = {name: json.loads(archive.read(name)) for name in archive.namelist()}
+
+    by_section = {name.split('/')[0]: value for name, value in contents.items()}
+    assert by_section['avatars'] == analysis['avatar_ultra_detalhado']
+    assert by_section['pesquisa_web'] == analysis['pesquisa_web_massiva']
+    assert by_section['completas'] == json.loads(json.dumps(analysis))
+    assert by_section['metadata']['analysis_id'] == analysis_id
+
+
+def test_reconstruir_indice_a_partir_dos_containers(manager):
+    analysis = _sample_analysis()
+    analysis_id = manager.save_analysis_locally(analysis)['analysis_id']
+
+    with manager._get_connection() as conn:
+        conn.execute("DELETE FROM analysis_files")
+        conn.execute("DELETE FROM analyses")
+    assert manager.load_analysis_section(analysis_id, 'avatars') is None
+
+    assert manager.rebuild_index() == 1
+    assert manager.load_analysis_section(analysis_id, 'avatars') == analysis['avatar_ultra_detalhado']
+    assert [item['analysis_id'] for item in manager.list_local_analyses()] == [analysis_id]
+
+
+def test_remover_analise(manager):
+    analysis_id = manager.save_analysis_locally(_sample_analysis())['analysis_id']
+
+    assert manager.delete_local_analysis(analysis_id)
+    assert manager.load_analysis_section(analysis_id, 'avatars') is None
+    assert manager.list_local_analyses() == []
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do PDF Render Cache
+Renderizações simultâneas agrupadas, cache em disco e rota /generate_pdf
+"""
+
+import sys
+import os
+import io
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.pdf_render_cache import PDFRenderCache
+from routes import pdf_generator as pdf_module
+
+PDF_BYTES = b'%PDF-1.4 relatorio de teste'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PDFRenderCache(cache_dir=str(tmp_path))
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, 'condição não atingida a tempo'
+        time.sleep(0.01)
+
+
+def test_pedidos_simultaneos_renderizam_uma_vez(cache):
+    release = threading.Event()
+    calls = []
+
+    def render():
+        calls.append(1)
+        release.wait(5)
+        return PDF_BYTES
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_render('chave', render)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Todos os seguidores já estão esperando a renderização da primeira thread
+    _wait_for(lambda: cache.stats['coalesced'] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert [result['data'] for result in results] == [PDF_BYTES] * 5
+    assert cache.get_or_render('chave', render) == {'path': cache._path('chave')}
+    assert cache.get_stats()['renders'] == 1
+
+
+def test_erro_chega_a_quem_espera_e_a_proxima_chamada_tenta_de_novo(cache):
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('falha no reportlab')
+
+    errors = []
+
+    def request():
+        try:
+            cache.get_or_render('chave', failing)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=request) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    _wait_for(lambda: cache.stats['coalesced'] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ['falha no reportlab'] * 3
+    assert cache.get_or_render('chave', lambda: PDF_BYTES) == {'data': PDF_BYTES}
+
+
+def test_chave_pelo_conteudo_ignora_a_ordem_dos_campos(cache):
+    assert cache.content_key({'a': 1, 'b': [1, 2]}) == cache.content_key({'b': [1, 2], 'a': 1})
+    assert cache.content_key({'a': 1}) != cache.content_key({'a': 2})
+    assert cache.analysis_key('id', 'sig1') != cache.analysis_key('id', 'sig2')
+
+
+@pytest.fixture
+def client(cache, monkeypatch):
+    monkeypatch.setattr(pdf_module, 'pdf_render_cache', cache)
+    app = Flask(__name__)
+    app.register_blueprint(pdf_module.pdf_bp)
+    return app.test_client()
+
+
+def test_rota_renderiza_uma_vez_e_depois_serve_do_cache(client, monkeypatch):
+    calls = []
+
+    def fake_report(data):
+        calls.append(data)
+        return io.BytesIO(PDF_BYTES)
+
+    monkeypatch.setattr(pdf_module.pdf_generator, 'generate_analysis_report', fake_report)
+    analysis = {'segmento': 'Marketing Digital', 'insights': ['a', 'b']}
+
+    first = client.post('/generate_pdf', json=analysis)
+    second = client.post('/generate_pdf', json=dict(reversed(list(analysis.items()))))
+
+    assert first.status_code == second.status_code == 200
+    assert first.mimetype == 'application/pdf'
+    assert first.data == second.data == PDF_BYTES
+    assert len(calls) == 1
+
+
+def test_rota_devolve_404_para_analise_salva_inexistente(client, monkeypatch):
+    monkeypatch.setattr(pdf_module.local_file_manager, 'get_analysis_signature', lambda analysis_id: 'assinatura')
+    monkeypatch.setattr(pdf_module, '_load_saved_analysis', lambda analysis_id: None)
+
+    # Índice conhece o ID mas a seção 'completas' não existe
+    assert client.get('/generate_pdf?analysis_id=abc123').status_code == 404
+
+    monkeypatch.setattr(pdf_module.local_file_manager, 'get_analysis_signature', lambda analysis_id: None)
+    assert client.get('/generate_pdf?analysis_id=abc123').status_code == 404
+    assert client.post('/generate_pdf', json={}).status_code == 400
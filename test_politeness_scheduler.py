@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Politeness Scheduler
+Token bucket por host, Retry-After (segundos e data HTTP) e espera máxima
+"""
+
+import sys
+import os
+import asyncio
+import time
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services import politeness_scheduler as politeness_module
+from services.politeness_scheduler import PolitenessScheduler, HostRateLimited
+
+
+class FakeClock:
+    """Relógio controlado pelo teste; sleep só avança o tempo"""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(politeness_module, 'time', SimpleNamespace(time=clock.time, sleep=clock.sleep))
+    return clock
+
+
+@pytest.fixture
+def scheduler(clock, monkeypatch):
+    monkeypatch.setenv('POLITENESS_DEFAULT_RATE', '2')
+    monkeypatch.setenv('POLITENESS_DEFAULT_BURST', '2')
+    monkeypatch.setenv('POLITENESS_MAX_WAIT', '30')
+    monkeypatch.setenv('POLITENESS_HOST_RATES', 'lento.com=0.25:1, invalido=x')
+    return PolitenessScheduler()
+
+
+def test_rajada_passa_e_o_resto_e_espacado_pela_taxa(scheduler):
+    delays = [scheduler.reserve('https://exemplo.com/p') for _ in range(4)]
+
+    assert delays == pytest.approx([0, 0, 0.5, 1.0])
+    # Outro host tem o próprio balde
+    assert scheduler.reserve('https://outro.com/') == 0
+    assert scheduler.get_stats()['delayed'] == 2
+
+
+def test_tokens_recarregam_com_o_tempo(scheduler, clock):
+    for _ in range(2):
+        scheduler.reserve('https://exemplo.com/')
+
+    clock.now += 0.5
+    assert scheduler.reserve('https://exemplo.com/') == 0
+    assert scheduler.reserve('https://exemplo.com/') == pytest.approx(0.5)
+
+
+def test_regras_por_sufixo_do_dominio(scheduler):
+    assert scheduler.rule_for('www.bing.com') == PolitenessScheduler.DEFAULT_HOST_RATES['bing.com']
+    assert scheduler.rule_for('api.lento.com') == (0.25, 1)
+    assert scheduler.rule_for('exemplo.com') == (2.0, 2)
+    assert 'invalido' not in scheduler.host_rates
+
+
+def test_wait_dorme_o_atraso_reservado(scheduler, clock):
+    scheduler.wait('https://lento.com/1')
+    scheduler.wait('https://lento.com/2')
+
+    assert clock.slept == [pytest.approx(4.0)]
+
+
+def test_retry_after_em_segundos_suspende_o_host(scheduler):
+    scheduler.observe('https://exemplo.com/a', 429, {'Retry-After': '5'})
+
+    # Depois da pausa volta com um token só, sem rajada
+    assert scheduler.reserve('https://exemplo.com/b') == pytest.approx(5)
+    assert scheduler.reserve('https://exemplo.com/c') == pytest.approx(5.5)
+    assert scheduler.get_stats()['blocked_hosts'] == ['exemplo.com']
+
+
+def test_retry_after_como_data_http(scheduler, clock):
+    headers = {'retry-after': formatdate(clock.now + 20, usegmt=True)}
+    scheduler.observe('https://exemplo.com/', 503, headers)
+
+    assert scheduler.reserve('https://exemplo.com/') == pytest.approx(20, abs=1)
+
+
+def test_429_sem_retry_after_usa_a_pausa_padrao_e_503_sem_header_nao(scheduler):
+    scheduler.observe('https://a.com/', 503, {})
+    assert scheduler.reserve('https://a.com/') == 0
+
+    scheduler.observe('https://b.com/', 429, None)
+    assert scheduler.reserve('https://b.com/') == pytest.approx(scheduler.cooldown_429)
+
+
+def test_espera_acima_do_limite_falha_sem_gastar_a_vez(scheduler, clock):
+    scheduler.observe('https://exemplo.com/', 429, {'Retry-After': '120'})
+
+    with pytest.raises(HostRateLimited) as excinfo:
+        scheduler.reserve('https://exemplo.com/')
+    assert excinfo.value.host == 'exemplo.com'
+    assert excinfo.value.delay == pytest.approx(120)
+
+    # A reserva recusada foi devolvida: terminada a pausa, a vez está livre
+    clock.now += 120
+    assert scheduler.reserve('https://exemplo.com/') == 0
+    assert scheduler.get_stats()['rate_limited'] == 1
+
+
+def test_wait_async_espera_no_event_loop(monkeypatch):
+    monkeypatch.setenv('POLITENESS_DEFAULT_RATE', '20')
+    monkeypatch.setenv('POLITENESS_DEFAULT_BURST', '1')
+    scheduler = PolitenessScheduler()
+
+    async def fetch_three():
+        return await asyncio.gather(*(scheduler.wait_async('https://exemplo.com/') for _ in range(3)))
+
+    started = time.time()
+    delays = asyncio.run(fetch_three())
+
+    assert sorted(delays) == pytest.approx([0, 0.05, 0.1], abs=0.02)
+    assert time.time() - started >= 0.09
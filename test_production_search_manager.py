@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Production Search Manager
+Cache de buscas (memória na frente do SQLite, formato sem pickle), busca hedged e fusão de rankings (RRF)
+"""
+
+import sys
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services import production_search_manager as search_module
+from services.production_search_manager import ProductionSearchCache, ProductionSearchManager, SearchResult
+
+
+def _results(prefix: str, count: int):
+    return [
+        SearchResult(title=f"{prefix} {i}", url=f"https://{prefix}.com/{i}", snippet=f"snippet {i}", source=prefix)
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ProductionSearchCache(cache_dir=str(tmp_path), ttl=3600)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ProductionSearchManager()
+    manager.cache = ProductionSearchCache(cache_dir=str(tmp_path), ttl=3600)
+    manager.hedge_delay = 0.3
+    manager.hedge_timeout = 3
+    yield manager
+    manager._search_executor.shutdown(wait=True)
+
+
+def _install_providers(monkeypatch, manager, functions):
+    """Provedores falsos no lugar das buscas reais (google, serper, bing)"""
+    monkeypatch.setattr(manager, '_get_provider_search_func', lambda name: functions.get(name))
+    return [(name, {'priority': priority}) for priority, name in enumerate(functions, 1)]
+
+
+def test_cache_devolve_dicts_da_memoria_e_depois_do_disco(cache):
+    cache.set('marketing digital', _results('a', 3), 'combined')
+
+    first = cache.get('marketing digital', 'combined')
+    assert [r['url'] for r in first] == ['https://a.com/0', 'https://a.com/1', 'https://a.com/2']
+    assert all(isinstance(r, dict) for r in first)
+
+    # Sem a camada em memória (outro worker), o mesmo resultado vem do SQLite
+    cache._memory.clear()
+    assert cache.get('marketing digital', 'combined') == first
+    assert cache.get('outra query', 'combined') is None
+
+    stats = cache.get_stats()
+    assert (stats['memory_hits'], stats['disk_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_entrada_em_pickle_ou_expirada_e_miss(cache, monkeypatch):
+    query_hash = cache._get_query_hash('antiga', 'combined')
+    conn = cache._get_connection()
+    conn.execute(
+        "INSERT INTO search_cache (query_hash, query, results, timestamp, ttl) VALUES (?, ?, ?, ?, ?)",
+        (query_hash, 'antiga', pickle.dumps([{'url': 'https://x.com'}]), time.time(), 3600)
+    )
+    conn.commit()
+    assert cache.get('antiga', 'combined') is None
+
+    monkeypatch.setenv('SEARCH_CACHE_TTL', '0')
+    cache.set('expira', _results('b', 1), 'combined')
+    assert cache.get('expira', 'combined') is None
+
+
+def test_camada_em_memoria_e_limitada(cache):
+    cache.memory_max_items = 2
+    for i in range(4):
+        cache.set(f"q{i}", _results(f"q{i}", 1), 'combined')
+
+    assert len(cache._memory) == 2
+    # As mais antigas saíram da memória mas continuam no disco
+    assert cache.get('q0', 'combined')[0]['url'] == 'https://q0.com/0'
+    assert cache.get_stats()['disk_hits'] == 1
+
+
+def test_contadores_consistentes_com_leituras_concorrentes(cache):
+    cache.set('q', _results('c', 1), 'combined')
+
+    def read():
+        for _ in range(200):
+            cache.get('q', 'combined')
+            cache.get('ausente', 'combined')
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.get_stats()
+    assert stats['memory_hits'] + stats['disk_hits'] == 1600
+    assert stats['misses'] == 1600
+
+
+def test_hedged_retorna_no_primeiro_conjunto_suficiente(manager, monkeypatch):
+    called = []
+
+    def fast(query, max_results):
+        called.append('google')
+        return _results('rapido', max_results)
+
+    def slow(query, max_results):
+        called.append('serper')
+        time.sleep(1)
+        return _results('lento', max_results)
+
+    providers = _install_providers(monkeypatch, manager, {'google': fast, 'serper': slow})
+
+    started = time.time()
+    results = manager._search_hedged('q', 5, providers)
+
+    assert [name for name, _ in results] == ['google']
+    assert called == ['google']  # O segundo provedor nem foi acionado
+    assert time.time() - started < manager.hedge_delay
+
+
+def test_hedged_aciona_o_proximo_quando_o_primeiro_falha_ou_atrasa(manager, monkeypatch):
+    def broken(query, max_results):
+        raise RuntimeError('quota excedida')
+
+    def slow_and_short(query, max_results):
+        time.sleep(1)
+        return _results('atrasado', 1)
+
+    def backup(query, max_results):
+        return _results('reserva', max_results)
+
+    providers = _install_providers(monkeypatch, manager, {'google': broken, 'serper': slow_and_short, 'bing': backup})
+
+    started = time.time()
+    results = manager._search_hedged('q', 5, providers)
+
+    # Falha aciona o seguinte na hora; o lento é contornado após hedge_delay e abandonado
+    assert [name for name, _ in results] == ['bing']
+    assert time.time() - started < 1
+    assert manager.providers['google']['error_count'] == 1
+
+
+def test_hedged_devolve_o_que_houver_quando_todos_sao_insuficientes(manager, monkeypatch):
+    providers = _install_providers(monkeypatch, manager, {
+        'google': lambda query, max_results: _results('a', 2),
+        'serper': lambda query, max_results: [],
+        'bing': lambda query, max_results: _results('b', 2)
+    })
+
+    results = manager._search_hedged('q', 10, providers)
+
+    assert sorted(name for name, _ in results) == ['bing', 'google']
+
+
+def _ranked(source: str, urls):
+    return [SearchResult(title=url, url=url, snippet='', source=source) for url in urls]
+
+
+def test_rrf_sobe_urls_citadas_por_varios_provedores(manager, monkeypatch):
+    monkeypatch.setattr(search_module.domain_reputation, 'get_multiplier', lambda url: 1.0)
+    provider_results = [
+        ('google', _ranked('google', ['https://a.com', 'https://b.com', 'https://c.com'])),
+        ('bing', _ranked('bing', ['https://c.com/', 'https://d.com', 'https://a.com#topo']))
+    ]
+
+    merged = manager._merge_ranked_results(provider_results, 10)
+
+    # a: 1/61 + 1/63, c: 1/63 + 1/61 (empate, ordem de chegada), b: 1/62, d: 1/62
+    assert [r.url for r in merged] == ['https://a.com', 'https://c.com', 'https://b.com', 'https://d.com']
+    assert merged[0].relevance_score == pytest.approx(1 / 61 + 1 / 63, abs=1e-6)
+
+
+def test_rrf_aplica_reputacao_do_dominio_e_corta_em_max_results(manager, monkeypatch):
+    multipliers = {'https://ruim.com/1': 0.2}
+    monkeypatch.setattr(search_module.domain_reputation, 'get_multiplier', lambda url: multipliers.get(url, 1.0))
+    provider_results = [
+        ('google', _ranked('google', ['https://ruim.com/1', 'https://bom.com/1', 'https://bom.com/2'])),
+    ]
+
+    merged = manager._merge_ranked_results(provider_results, 2)
+
+    assert [r.url for r in merged] == ['https://bom.com/1', 'https://bom.com/2']
+
+
+def test_rrf_mantem_o_snippet_mais_informativo(manager, monkeypatch):
+    monkeypatch.setattr(search_module.domain_reputation, 'get_multiplier', lambda url: 1.0)
+    short = SearchResult(title='a', url='https://a.com', snippet='curto', source='google')
+    long = SearchResult(title='a', url='https://a.com/', snippet='um snippet bem mais completo', source='bing')
+
+    merged = manager._merge_ranked_results([('google', [short]), ('bing', [long])], 10)
+
+    assert len(merged) == 1
+    assert merged[0].snippet == 'um snippet bem mais completo'
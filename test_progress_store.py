@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Progress Store
+Backends em memória e SQLite: estado, log de eventos com ids, espera e expiração
+"""
+
+import sys
+import os
+import threading
+import time
+
+import pytest
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.progress_store import MemoryProgressStore, SQLiteProgressStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryProgressStore()
+    return SQLiteProgressStore(cache_dir=str(tmp_path))
+
+
+def test_estado_e_atualizado_por_campos(store):
+    store.create_session('s1', {'session_id': 's1', 'current_step': 0, 'is_finished': False})
+
+    assert store.update_state('s1', current_step=3)['current_step'] == 3
+    assert store.get_state('s1') == {'session_id': 's1', 'current_step': 3, 'is_finished': False}
+    assert store.update_state('inexistente', current_step=1) is None
+    assert store.get_state('inexistente') is None
+
+
+def test_eventos_tem_ids_crescentes_e_sao_lidos_a_partir_do_ultimo_visto(store):
+    store.create_session('s1', {'session_id': 's1'})
+    ids = [store.append_event('s1', 'progress', {'step': step})['id'] for step in range(3)]
+
+    assert ids == [1, 2, 3]
+    assert [event['data']['step'] for event in store.get_events_since('s1', 1)] == [1, 2]
+    assert store.get_events_since('s1', 3) == []
+    assert store.append_event('inexistente', 'progress', {}) is None
+
+
+def test_log_de_eventos_e_limitado_e_recriar_a_sessao_recomeca(store):
+    store.max_events = 3
+    store.create_session('s1', {'session_id': 's1'})
+    for step in range(5):
+        store.append_event('s1', 'progress', {'step': step})
+
+    assert [event['id'] for event in store.get_events_since('s1', 0)] == [3, 4, 5]
+
+    store.create_session('s1', {'session_id': 's1'})
+    assert store.get_events_since('s1', 0) == []
+    assert store.append_event('s1', 'progress', {})['id'] == 1
+
+
+def test_espera_acorda_quando_chega_evento(store):
+    store.poll_interval = 0.05
+    store.create_session('s1', {'session_id': 's1', 'is_finished': False})
+    threading.Timer(0.2, store.append_event, args=('s1', 'progress', {'step': 1})).start()
+
+    started = time.time()
+    events = store.get_events_since('s1', 0, timeout=5)
+
+    assert [event['id'] for event in events] == [1]
+    assert time.time() - started < 2
+
+
+def test_sessao_finalizada_nao_espera_pelo_timeout(store):
+    store.create_session('s1', {'session_id': 's1', 'is_finished': True})
+
+    started = time.time()
+    assert store.get_events_since('s1', 0, timeout=5) == []
+    assert time.time() - started < 1
+
+
+def test_reaper_remove_so_sessoes_sem_atividade(store):
+    store.create_session('antiga', {'session_id': 'antiga'})
+    store.append_event('antiga', 'progress', {})
+    store.session_ttl = 0.2
+    time.sleep(0.3)
+    store.create_session('nova', {'session_id': 'nova'})
+
+    assert store.reap_expired() == 1
+    assert [state['session_id'] for state in store.list_sessions()] == ['nova']
+    assert store.get_events_since('antiga', 0) == []
+
+
+def test_sqlite_compartilha_a_sessao_entre_workers(tmp_path):
+    # Duas instâncias no mesmo arquivo fazem o papel de dois workers do gunicorn
+    creator = SQLiteProgressStore(cache_dir=str(tmp_path))
+    other = SQLiteProgressStore(cache_dir=str(tmp_path))
+
+    creator.create_session('s1', {'session_id': 's1', 'is_finished': False})
+    other.append_event('s1', 'progress', {'step': 1})
+    other.update_state('s1', current_step=1)
+    creator.append_event('s1', 'complete', {})
+
+    assert creator.get_state('s1')['current_step'] == 1
+    assert [(event['id'], event['event']) for event in other.get_events_since('s1', 0)] == [(1, 'progress'), (2, 'complete')]
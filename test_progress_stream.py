@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do streaming de progresso (SSE)
+Retomada com Last-Event-ID, fim do stream e polling incremental
+"""
+
+import sys
+import os
+import json
+
+import pytest
+from flask import Flask
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from routes import progress as progress_module
+from services.progress_store import MemoryProgressStore
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = MemoryProgressStore()
+    monkeypatch.setattr(progress_module, 'progress_store', store)
+    monkeypatch.setattr(progress_module, 'STREAM_BLOCKING_HOLD_SECONDS', 0.3)
+    return store
+
+
+@pytest.fixture
+def client(store):
+    app = Flask(__name__)
+    app.register_blueprint(progress_module.progress_bp)
+    return app.test_client()
+
+
+def _parse_sse(body: str):
+    """Eventos (id, tipo, dados) de um corpo text/event-stream, ignorando retry e comentários"""
+    events = []
+    for block in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if 'id' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_stream_retoma_a_partir_do_last_event_id(client):
+    tracker = progress_module.ProgressTracker('s1')
+    for step in range(1, 4):
+        tracker.update_progress(step, f"etapa {step}")
+
+    response = client.get('/progress/stream/s1', headers={'Last-Event-ID': '1'})
+
+    assert response.mimetype == 'text/event-stream'
+    body = response.get_data(as_text=True)
+    assert body.startswith('retry: ')
+    events = _parse_sse(body)
+    assert [(event_id, event_type) for event_id, event_type, _ in events] == [(2, 'progress'), (3, 'progress')]
+    assert events[-1][2]['current_step'] == 3
+
+
+def test_stream_entrega_componentes_e_encerra_no_complete(client):
+    tracker = progress_module.ProgressTracker('s1')
+    progress_module.publish_component('s1', 'avatar', {'nome': 'Ana'})
+    tracker.complete()
+
+    events = _parse_sse(client.get('/progress/stream/s1?last_event_id=0').get_data(as_text=True))
+
+    assert [event_type for _, event_type, _ in events] == ['component', 'progress', 'complete']
+    assert events[0][2] == {'component': 'avatar', 'payload': {'nome': 'Ana'}}
+
+    # Cliente com todos os eventos de uma sessão finalizada: 204 para de reconectar
+    assert client.get('/progress/stream/s1', headers={'Last-Event-ID': str(events[-1][0])}).status_code == 204
+
+
+def test_stream_sem_eventos_novos_fecha_com_keep_alive(client):
+    progress_module.ProgressTracker('s1').update_progress(1, "etapa 1")
+
+    body = client.get('/progress/stream/s1', headers={'Last-Event-ID': '1'}).get_data(as_text=True)
+
+    assert _parse_sse(body) == []
+    assert ': keep-alive' in body
+
+
+def test_polling_devolve_so_atualizacoes_novas(client):
+    tracker = progress_module.ProgressTracker('s1')
+    tracker.update_progress(1, "etapa 1")
+    tracker.update_progress(2, "etapa 2")
+
+    data = client.get('/poll_updates/s1?last_event_id=1').get_json()
+
+    assert [update['current_step'] for update in data['updates']] == [2]
+    assert data['last_event_id'] == 2
+    assert client.get('/poll_updates/ausente').status_code == 404
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Relevance Engine
+Escala do BM25: scores do índice comparáveis ao score de um texto isolado
+"""
+
+import sys
+import os
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.relevance_engine import relevance_engine, RelevanceProfile, BM25Index
+
+
+PROFILE = RelevanceProfile.for_research(
+    'mercado marketing digital',
+    {'segmento': 'marketing digital'},
+    query_weight=2.0,
+    context_weight=3.0
+)
+
+
+def _page(extra: str = '') -> str:
+    return (
+        "O mercado de marketing digital cresce no Brasil. Empresas de marketing digital "
+        "investem em conteúdo e o mercado segue aquecido. " + extra
+    )
+
+
+def test_corpus_todo_no_assunto_nao_derruba_os_scores():
+    # Todas as páginas contêm os termos da query: sem piso o IDF tende a zero
+    pages = {f'https://exemplo.com/{i}': _page(f'Página {i}.') for i in range(8)}
+    index = relevance_engine.new_index()
+    for url, text in pages.items():
+        index.add(url, text)
+
+    for url, text in pages.items():
+        alone = relevance_engine.score_text(text, PROFILE)
+        in_corpus = index.score(url, PROFILE)
+        assert in_corpus > 1.0
+        assert in_corpus >= 0.9 * alone
+
+
+def test_idf_tem_piso_um_e_premia_termo_raro():
+    index = BM25Index()
+    for i in range(10):
+        index.add(str(i), 'marketing digital ' + ('nicho' if i == 0 else 'geral'))
+
+    assert index.idf('marketing') == 1.0
+    assert index.idf('nicho') > 1.0
+    assert index.idf('inexistente') > index.idf('nicho')
+
+
+def test_poucos_documentos_usam_idf_neutro():
+    index = BM25Index(min_docs_for_idf=3)
+    index.add('a', 'marketing')
+    index.add('b', 'vendas')
+
+    assert index.idf('marketing') == 1.0
+    assert index.idf('vendas') == 1.0
+
+
+def test_ranking_prefere_pagina_com_termo_raro_do_perfil():
+    profile = RelevanceProfile.for_research('nicho', query_weight=5.0)
+    items = [{'url': f'u{i}', 'content': _page('nicho nicho' if i == 3 else 'outro assunto')} for i in range(6)]
+
+    ranked = relevance_engine.rank_items(items, profile)
+
+    assert ranked[0][0]['url'] == 'u3'
+    assert ranked[0][1] > ranked[1][1]
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQV30 Enhanced v2.0 - Teste do Text Scanner
+Equivalência da varredura em passagem única com as verificações ingênuas (substring / split)
+"""
+
+import sys
+import os
+import random
+
+# Adiciona src ao path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.text_scanner import MultiPatternScanner
+from services.content_quality_validator import content_quality_validator
+
+
+def _reference(content, phrase_lists, word_lists):
+    """Implementação direta, como as verificações faziam antes do scanner"""
+    lowered = content.lower()
+    words = lowered.split()
+    lines = content.split('\n')
+    return {
+        'phrase_matches': {
+            name: [phrase for phrase in phrases if phrase in lowered]
+            for name, phrases in phrase_lists.items()
+        },
+        'category_counts': {
+            name: sum(1 for word in words if word in set(vocabulary))
+            for name, vocabulary in word_lists.items()
+        },
+        'word_count': len(words),
+        'line_count': len(lines),
+        'paragraph_count': len([line.strip() for line in lines if len(line.strip()) > 50])
+    }
+
+
+def _as_dict(scan):
+    return {
+        'phrase_matches': scan.phrase_matches,
+        'category_counts': scan.category_counts,
+        'word_count': scan.word_count,
+        'line_count': scan.line_count,
+        'paragraph_count': scan.paragraph_count
+    }
+
+
+def _random_text(rng, phrases, words):
+    filler = ['lorem', 'ipsum', 'dolor', 'Mercado', 'ANÁLISE', 'x' * 60, '404', 'not', 'erro']
+    pool = phrases + words + filler
+    parts = []
+    for _ in range(rng.randint(0, 120)):
+        piece = rng.choice(pool)
+        if rng.random() < 0.2:
+            piece = piece.upper()
+        parts.append(piece)
+        parts.append(rng.choice([' ', ' ', ' ', '\n', '\n\n', '', '. ']))
+    return ''.join(parts)
+
+
+def test_frases_sobrepostas_e_prefixos():
+    phrase_lists = {'error': ['erro', 'erro interno', 'interno do servidor', '404 not found', 'not found']}
+    scanner = MultiPatternScanner(phrase_lists, {})
+
+    scan = scanner.scan('ERRO INTERNO DO SERVIDOR: 404 Not Found')
+
+    assert scan.phrase_matches['error'] == phrase_lists['error']
+
+
+def test_scan_equivale_a_referencia_com_listas_do_validador():
+    validator = content_quality_validator
+    phrase_lists = validator.scanner.phrase_lists
+    word_lists = {name: sorted(words) for name, words in validator.scanner.word_lists.items()}
+    phrases = [phrase for phrases in phrase_lists.values() for phrase in phrases]
+    words = [word for vocabulary in word_lists.values() for word in vocabulary]
+
+    rng = random.Random(1234)
+    for _ in range(300):
+        text = _random_text(rng, phrases, words)
+        assert _as_dict(validator.scanner.scan(text)) == _reference(text, phrase_lists, word_lists), text
+
+
+def test_scan_batch_equivale_a_scan_individual():
+    validator = content_quality_validator
+    phrases = validator.error_indicators
+    words = validator.navigation_words + validator.quality_indicators
+
+    rng = random.Random(42)
+    texts = [_random_text(rng, phrases, words) for _ in range(50)]
+    # Frase que só existiria atravessando a fronteira entre dois textos
+    texts += ['texto termina com page', 'not found no começo do próximo']
+
+    batch = validator.scanner.scan_batch(texts)
+
+    assert [_as_dict(scan) for scan in batch] == [_as_dict(validator.scanner.scan(text)) for text in texts]
+
+
+def test_validate_batch_igual_a_validate_content():
+    rng = random.Random(7)
+    validator = content_quality_validator
+    words = validator.quality_indicators + validator.portuguese_words
+    contents = [
+        {'url': f'https://exemplo.com/{i}', 'content': _random_text(rng, validator.error_indicators, words)}
+        for i in range(20)
+    ]
+    context = {'segmento': 'marketing', 'produto': 'curso'}
+
+    batch = validator.validate_batch(contents, context)
+    individual = [validator.validate_content(item['content'], item['url'], context) for item in contents]
+
+    def strip(result):
+        return {key: value for key, value in result.items() if key not in ('validated_at', 'item_index')}
+
+    assert [strip(result) for result in batch['batch_results']] == [strip(result) for result in individual]